@@ -0,0 +1,237 @@
+"""
+Columnar Analytics - NumPy kernels for study-pattern, bottleneck and trajectory analysis.
+
+A batch of users' session dicts is converted once into flat NumPy columns
+(user index, start time, hour, weekday, score, duration, activity codes).
+Per-user aggregations then become ``bincount`` calls over combined
+``user * buckets + bucket`` keys, so one batch of any size is analyzed with
+a fixed number of vectorized operations instead of one Python pass per
+user and per metric.
+"""
+
+import warnings
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from ..models import Skill
+
+
+SKILLS: Tuple[Skill, ...] = tuple(Skill)
+SKILL_CODES: Dict[Skill, int] = {skill: code for code, skill in enumerate(SKILLS)}
+
+# Hour of day -> StudyTimeSlot code (morning, afternoon, evening, night)
+TIME_SLOT_COUNT = 4
+if NUMPY_AVAILABLE:
+    HOUR_TO_TIME_SLOT = np.array(
+        [3] * 5 + [0] * 7 + [1] * 5 + [2] * 4 + [3] * 3, dtype=np.int64
+    )
+
+LANGUAGE_CODES = {'english': 1, 'japanese': 2}
+MICROSECONDS_PER_DAY = 86400 * 1_000_000
+
+
+@dataclass
+class SessionColumns:
+    """Flat NumPy columns for the sessions of a batch of users."""
+    user_count: int
+    session_counts: "np.ndarray"  # sessions per user
+    # Per session
+    user: "np.ndarray"
+    has_start: "np.ndarray"
+    start: "np.ndarray"  # datetime64[us], NaT where missing
+    hour: "np.ndarray"
+    weekday: "np.ndarray"  # Monday = 0
+    day: "np.ndarray"  # days since epoch
+    score: "np.ndarray"
+    duration: "np.ndarray"  # NaN where missing
+    language: "np.ndarray"  # 0 unknown, 1 english, 2 japanese
+    # Per activity occurrence (in session order)
+    activity_user: "np.ndarray"
+    activity_score: "np.ndarray"
+    activity_code: "np.ndarray"  # index into activity_names
+    activity_skill: "np.ndarray"  # index into SKILLS
+    activity_names: List[str]
+
+    @classmethod
+    def from_sessions(cls, sessions_by_user: Sequence[List[Dict]],
+                      activity_to_skill: Callable[[str], Skill]) -> "SessionColumns":
+        """
+        Build columns from per-user session dict lists.
+
+        Args:
+            sessions_by_user: One list of session dicts per user
+            activity_to_skill: Maps an activity name to the skill it trains
+        """
+        counts = np.fromiter((len(sessions) for sessions in sessions_by_user),
+                             dtype=np.int64, count=len(sessions_by_user))
+        sessions = [session for user_sessions in sessions_by_user for session in user_sessions]
+        user = np.repeat(np.arange(len(sessions_by_user), dtype=np.int64), counts)
+
+        has_start = np.fromiter(('start_time' in s for s in sessions), dtype=bool, count=len(sessions))
+        start = _parse_timestamps([s.get('start_time') or 'NaT' for s in sessions])
+        days = start.astype('datetime64[D]')
+        hour = ((start - days).astype('timedelta64[h]').astype(np.int64)) % 24
+        day = days.astype(np.int64)
+        weekday = (day + 3) % 7  # 1970-01-01 was a Thursday
+
+        score = np.fromiter((s.get('performance_score', 0.5) for s in sessions),
+                            dtype=np.float64, count=len(sessions))
+        duration = np.fromiter((s.get('duration_minutes', 0) if 'duration_minutes' in s else np.nan
+                                for s in sessions), dtype=np.float64, count=len(sessions))
+        language = np.fromiter((LANGUAGE_CODES.get(s.get('language'), 0) for s in sessions),
+                               dtype=np.int64, count=len(sessions))
+
+        activity_lists = [s.get('activities', ()) for s in sessions]
+        per_session = np.fromiter(map(len, activity_lists), dtype=np.int64, count=len(sessions))
+        name_codes: Dict[str, int] = {}
+        activity_code = np.fromiter(
+            (name_codes.setdefault(name, len(name_codes)) for activities in activity_lists for name in activities),
+            dtype=np.int64, count=int(per_session.sum())
+        )
+        activity_names = [getattr(name, 'value', name) for name in name_codes]
+        skill_lookup = np.array([SKILL_CODES[activity_to_skill(name)] for name in activity_names],
+                                dtype=np.int64)
+
+        return cls(
+            user_count=len(sessions_by_user),
+            session_counts=counts,
+            user=user,
+            has_start=has_start,
+            start=start,
+            hour=hour,
+            weekday=weekday,
+            day=day,
+            score=score,
+            duration=duration,
+            language=language,
+            activity_user=np.repeat(user, per_session),
+            activity_score=np.repeat(score, per_session),
+            activity_code=activity_code,
+            activity_skill=skill_lookup[activity_code] if len(activity_names) else activity_code,
+            activity_names=activity_names
+        )
+
+
+def _parse_timestamps(values: List[str]) -> "np.ndarray":
+    """Parse ISO timestamps to datetime64[us], keeping each value's own wall-clock time."""
+    with warnings.catch_warnings():
+        # NumPy converts values with UTC offsets to UTC and warns; the row-wise
+        # analysis uses the local wall-clock time, so fall back for those
+        warnings.simplefilter('error')
+        try:
+            return np.array(values, dtype='datetime64[us]')
+        except (ValueError, Warning):
+            pass
+    return np.array([
+        'NaT' if value == 'NaT' else datetime.fromisoformat(value).replace(tzinfo=None)
+        for value in values
+    ], dtype='datetime64[us]')
+
+
+def to_days(timestamps: Sequence[datetime]) -> "np.ndarray":
+    """Convert datetimes to fractional days since epoch."""
+    return np.array(timestamps, dtype='datetime64[us]').astype(np.int64) / MICROSECONDS_PER_DAY
+
+
+def grouped_mean(keys: "np.ndarray", values: "np.ndarray", size: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Mean and count of values per key in ``range(size)``; mean is 0 for empty keys."""
+    counts = np.bincount(keys, minlength=size)
+    sums = np.bincount(keys, weights=values, minlength=size)
+    means = np.divide(sums, counts, out=np.zeros(size), where=counts > 0)
+    return means, counts
+
+
+def first_index(keys: "np.ndarray", size: int) -> "np.ndarray":
+    """Position of the first occurrence of every key (int64 max where absent)."""
+    first = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    present, positions = np.unique(keys, return_index=True)
+    first[present] = positions
+    return first
+
+
+def best_bucket(means: "np.ndarray", counts: "np.ndarray", first: "np.ndarray",
+                bucket_count: int) -> "np.ndarray":
+    """
+    Per-user bucket with the highest positive mean.
+
+    Ties go to the bucket seen first, matching a scan over buckets in
+    insertion order with a strict ``>`` comparison. Users without a positive
+    bucket get -1.
+    """
+    means = means.reshape(-1, bucket_count)
+    valid = (counts.reshape(-1, bucket_count) > 0) & (means > 0)
+    masked = np.where(valid, means, -np.inf)
+    candidates = valid & (masked == masked.max(axis=1, keepdims=True))
+    order = np.where(candidates, first.reshape(-1, bucket_count), np.iinfo(np.int64).max)
+    best = order.argmin(axis=1)
+    best[~candidates.any(axis=1)] = -1
+    return best
+
+
+def grouped_tail_mean(keys: "np.ndarray", values: "np.ndarray", size: int,
+                      tail: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Mean of the last ``tail`` values of every key (in input order) and the full count."""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    counts = np.bincount(keys, minlength=size)
+    ends = np.cumsum(counts)
+    from_end = ends[sorted_keys] - np.arange(len(sorted_keys))
+    recent = from_end <= tail
+    sums = np.bincount(sorted_keys[recent], weights=values[order][recent], minlength=size)
+    taken = np.minimum(counts, tail)
+    means = np.divide(sums, taken, out=np.zeros(size), where=taken > 0)
+    return means, counts
+
+
+@dataclass
+class LinearFit:
+    """Per-group least-squares line ``y = intercept + slope * (x - x_min)``."""
+    slope: "np.ndarray"
+    intercept: "np.ndarray"
+    counts: "np.ndarray"
+    x_min: "np.ndarray"
+    x_max: "np.ndarray"
+    first_y: "np.ndarray"  # y at the earliest x
+    last_y: "np.ndarray"  # y at the latest x
+
+
+def grouped_linear_fit(keys: "np.ndarray", x: "np.ndarray", y: "np.ndarray", size: int) -> LinearFit:
+    """Ordinary least-squares fit of y on x for every key in ``range(size)``."""
+    order = np.lexsort((x, keys))
+    keys, x, y = keys[order], x[order], y[order]
+    counts = np.bincount(keys, minlength=size)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    present = counts > 0
+
+    x_min = np.zeros(size)
+    x_max = np.zeros(size)
+    first_y = np.zeros(size)
+    last_y = np.zeros(size)
+    x_min[present] = x[starts[present]]
+    x_max[present] = x[ends[present] - 1]
+    first_y[present] = y[starts[present]]
+    last_y[present] = y[ends[present] - 1]
+
+    # Center x on each group's first point for numerical stability
+    dx = x - x_min[keys]
+    sum_x = np.bincount(keys, weights=dx, minlength=size)
+    sum_y = np.bincount(keys, weights=y, minlength=size)
+    sum_xx = np.bincount(keys, weights=dx * dx, minlength=size)
+    sum_xy = np.bincount(keys, weights=dx * y, minlength=size)
+
+    denominator = counts * sum_xx - sum_x * sum_x
+    slope = np.divide(counts * sum_xy - sum_x * sum_y, denominator,
+                      out=np.zeros(size), where=denominator > 1e-12)
+    intercept = np.divide(sum_y - slope * sum_x, counts, out=np.zeros(size), where=present)
+
+    return LinearFit(slope=slope, intercept=intercept, counts=counts, x_min=x_min,
+                     x_max=x_max, first_y=first_y, last_y=last_y)
@@ -2,14 +2,18 @@
 Learning Analytics Enhancement - Advanced learning pattern analysis and prediction.
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
+import calendar
 import json
 from collections import defaultdict
 
 from ..models import Skill, ActivityType, SessionStatus
+from ..storage.event_store import LearningEventStore, BoundedHistory, RingBuffer
+from . import columnar_analytics
+from .columnar_analytics import NUMPY_AVAILABLE, SessionColumns
 
 
 class StudyTimeSlot(Enum):
@@ -89,10 +93,39 @@ class LearningAnalyticsEnhancer:
     predictions, and bottleneck identification.
     """
     
-    def __init__(self):
-        """Initialize analytics enhancer."""
-        self.study_history: Dict[str, List[Dict]] = defaultdict(list)
-        self.skill_history: Dict[str, List[Tuple[datetime, float]]] = defaultdict(list)
+    STUDY_SESSION_STREAM = "study_session"
+    SKILL_MEASUREMENT_STREAM = "skill_measurement"
+
+    REPORT_SKILLS = [Skill.VOCABULARY, Skill.GRAMMAR, Skill.READING, Skill.LISTENING]
+    REPORT_LANGUAGES = ['english', 'japanese']
+
+    def __init__(self, event_store: LearningEventStore = None, history_limit: int = 500,
+                 max_users: int = 10000, analysis_window_days: Optional[int] = None,
+                 vectorized: Optional[bool] = None):
+        """
+        Initialize analytics enhancer.
+
+        Args:
+            event_store: Optional persistent event store. When given, every session
+                and measurement is appended to it, analytics read from it, and the
+                in-memory histories become bounded caches of recent entries.
+            history_limit: Entries kept in memory per user/skill when a store is used
+            max_users: Users/skills kept in memory when a store is used
+            analysis_window_days: Only analyze this many recent days from the store
+                (None analyzes the full history)
+            vectorized: Use the NumPy columnar analytics path (default: when NumPy
+                is installed)
+        """
+        self.event_store = event_store
+        self.analysis_window_days = analysis_window_days
+        self.vectorized = NUMPY_AVAILABLE if vectorized is None else (vectorized and NUMPY_AVAILABLE)
+
+        if event_store is None:
+            self.study_history: Dict[str, List[Dict]] = defaultdict(list)
+            self.skill_history: Dict[str, List[Tuple[datetime, float]]] = defaultdict(list)
+        else:
+            self.study_history = BoundedHistory(lambda: RingBuffer(history_limit), max_users)
+            self.skill_history = BoundedHistory(lambda: RingBuffer(history_limit), max_users)
     
     def add_study_session(self, user_id: str, session_data: Dict):
         """
@@ -102,8 +135,11 @@ class LearningAnalyticsEnhancer:
             user_id: User identifier
             session_data: Session data including duration, activities, performance, etc.
         """
-        session_data['timestamp'] = datetime.now().isoformat()
+        now = datetime.now()
+        session_data['timestamp'] = now.isoformat()
         self.study_history[user_id].append(session_data)
+        if self.event_store is not None:
+            self.event_store.append(self.STUDY_SESSION_STREAM, user_id, session_data, timestamp=now)
     
     def add_skill_measurement(self, user_id: str, skill: Skill, 
                          language: str, level: float):
@@ -117,7 +153,33 @@ class LearningAnalyticsEnhancer:
             level: Current skill level (0.0 to 1.0)
         """
         key = f"{user_id}_{skill.value}_{language}"
-        self.skill_history[key].append((datetime.now(), level))
+        now = datetime.now()
+        self.skill_history[key].append((now, level))
+        if self.event_store is not None:
+            self.event_store.append(self.SKILL_MEASUREMENT_STREAM, user_id, level,
+                                    key=f"{skill.value}_{language}", timestamp=now)
+
+    def _analysis_since(self) -> Optional[datetime]:
+        """Start of the analysis window, or None for the full history."""
+        if self.analysis_window_days is None:
+            return None
+        return datetime.now() - timedelta(days=self.analysis_window_days)
+
+    def _get_sessions(self, user_id: str, since: Optional[datetime] = None) -> List[Dict]:
+        """Get a user's study sessions from the event store or in-memory history."""
+        if self.event_store is None:
+            return self.study_history.get(user_id, [])
+        events = self.event_store.window(self.STUDY_SESSION_STREAM, user_id, since=since)
+        return [event.payload for event in events]
+
+    def _get_skill_history(self, user_id: str, skill: Skill, language: str,
+                           since: Optional[datetime] = None) -> List[Tuple[datetime, float]]:
+        """Get (timestamp, level) measurements for one skill."""
+        if self.event_store is None:
+            return self.skill_history.get(f"{user_id}_{skill.value}_{language}", [])
+        events = self.event_store.window(self.SKILL_MEASUREMENT_STREAM, user_id, since=since,
+                                         key=f"{skill.value}_{language}")
+        return [(event.timestamp, event.payload) for event in events]
     
     def analyze_study_pattern(self, user_id: str) -> StudyPattern:
         """
@@ -129,11 +191,14 @@ class LearningAnalyticsEnhancer:
         Returns:
             StudyPattern with optimal time slot and day analysis
         """
-        sessions = self.study_history.get(user_id, [])
+        sessions = self._get_sessions(user_id, self._analysis_since())
         
         if not sessions:
             return self._default_study_pattern(user_id)
         
+        if self.vectorized:
+            return self._study_patterns_columnar([user_id], self._session_columns([sessions]))[0]
+        
         # Analyze by time of day
         time_slot_performance = defaultdict(list)
         for session in sessions:
@@ -236,12 +301,14 @@ class LearningAnalyticsEnhancer:
         Returns:
             SkillTrajectory with predictions and growth rate
         """
-        key = f"{user_id}_{skill.value}_{language}"
-        history = self.skill_history.get(key, [])
+        history = self._get_skill_history(user_id, skill, language, self._analysis_since())
         
         if len(history) < 2:
             return self._default_skill_trajectory(user_id, skill, language)
         
+        if self.vectorized:
+            return self._trajectories_columnar(user_id, [(skill, language, history)])[0]
+        
         # Sort history by date
         history.sort(key=lambda x: x[0])
         
@@ -289,11 +356,14 @@ class LearningAnalyticsEnhancer:
             List of identified bottlenecks with solutions
         """
         bottlenecks = []
-        sessions = self.study_history.get(user_id, [])
+        sessions = self._get_sessions(user_id, self._analysis_since())
         
         if not sessions:
             return bottlenecks
         
+        if self.vectorized:
+            return self._bottlenecks_columnar(self._session_columns([sessions]), [sessions])[0]
+        
         # Analyze skill performance trends
         skill_performance = defaultdict(list)
         for session in sessions:
@@ -343,8 +413,13 @@ class LearningAnalyticsEnhancer:
         Returns:
             List of predicted milestones
         """
+        sessions = self._get_sessions(user_id, self._analysis_since())
+        return self._milestones_from_sessions(user_id, target_level, sessions)
+    
+    def _milestones_from_sessions(self, user_id: str, target_level: str,
+                                  sessions: List[Dict]) -> List[LearningMilestone]:
+        """Predict milestones from an already loaded session list."""
         milestones = []
-        sessions = self.study_history.get(user_id, [])
         
         if not sessions:
             # Generate default milestones even without data
@@ -487,16 +562,16 @@ class LearningAnalyticsEnhancer:
         Returns:
             Complete AnalyticsReport with all analyses
         """
+        if self.vectorized:
+            return self.generate_analytics_reports([user_id], target_level)[user_id]
+        
         # Analyze study pattern
         study_pattern = self.analyze_study_pattern(user_id)
         
         # Analyze skill trajectories for major skills
         skill_trajectories = []
-        major_skills = [Skill.VOCABULARY, Skill.GRAMMAR, Skill.READING, Skill.LISTENING]
-        languages = ['english', 'japanese']
-        
-        for skill in major_skills:
-            for language in languages:
+        for skill in self.REPORT_SKILLS:
+            for language in self.REPORT_LANGUAGES:
                 trajectory = self.predict_skill_trajectory(user_id, skill, language)
                 skill_trajectories.append(trajectory)
         
@@ -506,6 +581,62 @@ class LearningAnalyticsEnhancer:
         # Predict milestones
         milestones = self.predict_milestones(user_id, target_level)
         
+        return self._assemble_report(user_id, study_pattern, skill_trajectories,
+                                     bottlenecks, milestones)
+    
+    def generate_analytics_reports(self, user_ids: Sequence[str],
+                                   target_level: str) -> Dict[str, AnalyticsReport]:
+        """
+        Generate analytics reports for many users in one batch.
+        
+        With the columnar path, all users' sessions and skill measurements are
+        converted into NumPy columns once and every per-user aggregation runs
+        as a single vectorized operation over the whole batch.
+        
+        Args:
+            user_ids: User identifiers
+            target_level: Target proficiency level
+            
+        Returns:
+            Mapping of user_id to AnalyticsReport
+        """
+        if not self.vectorized:
+            return {user_id: self.generate_analytics_report(user_id, target_level)
+                    for user_id in user_ids}
+        
+        since = self._analysis_since()
+        sessions_by_user = [self._get_sessions(user_id, since) for user_id in user_ids]
+        columns = self._session_columns(sessions_by_user)
+        
+        patterns = self._study_patterns_columnar(user_ids, columns)
+        bottlenecks = self._bottlenecks_columnar(columns, sessions_by_user)
+        
+        # Fit every user's skill trajectories in one grouped least-squares pass
+        series = [
+            (user_id, skill, language, self._get_skill_history(user_id, skill, language, since))
+            for user_id in user_ids
+            for skill in self.REPORT_SKILLS
+            for language in self.REPORT_LANGUAGES
+        ]
+        trajectories = self._trajectories_columnar(None, series)
+        per_user = len(self.REPORT_SKILLS) * len(self.REPORT_LANGUAGES)
+        
+        reports = {}
+        for index, user_id in enumerate(user_ids):
+            reports[user_id] = self._assemble_report(
+                user_id,
+                patterns[index],
+                trajectories[index * per_user:(index + 1) * per_user],
+                bottlenecks[index],
+                self._milestones_from_sessions(user_id, target_level, sessions_by_user[index])
+            )
+        return reports
+    
+    def _assemble_report(self, user_id: str, study_pattern: StudyPattern,
+                         skill_trajectories: List[SkillTrajectory],
+                         bottlenecks: List[LearningBottleneck],
+                         milestones: List[LearningMilestone]) -> AnalyticsReport:
+        """Combine analyses with recommendations and a summary."""
         # Generate recommendations
         recommendations = self._generate_recommendations(
             study_pattern, bottlenecks, skill_trajectories
@@ -527,6 +658,163 @@ class LearningAnalyticsEnhancer:
             summary=summary
         )
     
+    # ==================== Columnar (NumPy) analytics ====================
+    
+    def _session_columns(self, sessions_by_user: Sequence[List[Dict]]) -> SessionColumns:
+        """Convert per-user session lists into NumPy columns."""
+        return SessionColumns.from_sessions(sessions_by_user, self._activity_to_skill)
+    
+    def _study_patterns_columnar(self, user_ids: Sequence[str],
+                                 columns: SessionColumns) -> List[StudyPattern]:
+        """Vectorized equivalent of analyze_study_pattern for a batch of users."""
+        np = columnar_analytics.np
+        user_count = columns.user_count
+        slots = list(StudyTimeSlot)
+        
+        # Time slot, weekday and hour aggregations over sessions with a start time
+        timed = columns.has_start
+        users = columns.user[timed]
+        scores = columns.score[timed]
+        hours = columns.hour[timed]
+        
+        slot_keys = users * columnar_analytics.TIME_SLOT_COUNT + columnar_analytics.HOUR_TO_TIME_SLOT[hours]
+        slot_size = user_count * columnar_analytics.TIME_SLOT_COUNT
+        slot_means, slot_counts = columnar_analytics.grouped_mean(slot_keys, scores, slot_size)
+        best_slots = columnar_analytics.best_bucket(
+            slot_means, slot_counts, columnar_analytics.first_index(slot_keys, slot_size),
+            columnar_analytics.TIME_SLOT_COUNT)
+        
+        day_keys = users * 7 + columns.weekday[timed]
+        day_means, day_counts = columnar_analytics.grouped_mean(day_keys, scores, user_count * 7)
+        best_days = columnar_analytics.best_bucket(
+            day_means, day_counts, columnar_analytics.first_index(day_keys, user_count * 7), 7)
+        
+        hour_keys = users * 24 + hours
+        hour_means, hour_counts = columnar_analytics.grouped_mean(hour_keys, scores, user_count * 24)
+        hour_first = columnar_analytics.first_index(hour_keys, user_count * 24)
+        peak_keys = np.flatnonzero((hour_counts > 0) & (hour_means >= 0.7))
+        peak_keys = peak_keys[np.argsort(hour_first[peak_keys], kind='stable')]
+        
+        # Average duration over sessions that record one
+        has_duration = ~np.isnan(columns.duration)
+        durations, _ = columnar_analytics.grouped_mean(
+            columns.user[has_duration], columns.duration[has_duration], user_count)
+        
+        # Consistency: distinct study dates out of the last 30 days
+        study_days = np.zeros(user_count, dtype=np.int64)
+        if len(users):
+            days = columns.day[timed]
+            span = int(days.max() - days.min()) + 1
+            distinct = np.unique(users * span + (days - days.min()))
+            study_days = np.bincount(distinct // span, minlength=user_count)
+        consistency = np.where(columns.session_counts < 2, 0.5, study_days / 30)
+        
+        # Activity types in order of first appearance
+        name_count = max(1, len(columns.activity_names))
+        activity_keys = columns.activity_user * name_count + columns.activity_code
+        distinct_activities, first_seen = np.unique(activity_keys, return_index=True)
+        distinct_activities = distinct_activities[np.argsort(first_seen, kind='stable')]
+        
+        peak_hours: Dict[int, List[int]] = defaultdict(list)
+        for key in peak_keys.tolist():
+            peak_hours[key // 24].append(key % 24)
+        preferred: Dict[int, List[ActivityType]] = defaultdict(list)
+        for key in distinct_activities.tolist():
+            preferred[key // name_count].append(ActivityType(columns.activity_names[key % name_count]))
+        
+        patterns = []
+        for index, user_id in enumerate(user_ids):
+            if columns.session_counts[index] == 0:
+                patterns.append(self._default_study_pattern(user_id))
+                continue
+            patterns.append(StudyPattern(
+                user_id=user_id,
+                best_time_slot=slots[best_slots[index]] if best_slots[index] >= 0 else StudyTimeSlot.MORNING,
+                best_day_of_week=calendar.day_name[best_days[index]] if best_days[index] >= 0 else "Monday",
+                average_study_duration=float(durations[index]),
+                consistency_score=float(consistency[index]),
+                peak_performance_hours=peak_hours[index],
+                preferred_activity_types=preferred[index]
+            ))
+        return patterns
+    
+    def _bottlenecks_columnar(self, columns: SessionColumns,
+                              sessions_by_user: Sequence[List[Dict]]) -> List[List[LearningBottleneck]]:
+        """Vectorized equivalent of identify_bottlenecks for a batch of users."""
+        np = columnar_analytics.np
+        skill_count = len(columnar_analytics.SKILLS)
+        size = columns.user_count * skill_count
+        
+        keys = columns.activity_user * skill_count + columns.activity_skill
+        recent_means, counts = columnar_analytics.grouped_tail_mean(keys, columns.activity_score, size, 5)
+        first = columnar_analytics.first_index(keys, size)
+        flagged = np.flatnonzero((counts >= 3) & (recent_means < 0.5))
+        flagged = flagged[np.argsort(first[flagged], kind='stable')]
+        
+        english = np.bincount(columns.user[columns.language == 1], minlength=columns.user_count)
+        japanese = np.bincount(columns.user[columns.language == 2], minlength=columns.user_count)
+        
+        bottlenecks: List[List[LearningBottleneck]] = [[] for _ in range(columns.user_count)]
+        for key in flagged.tolist():
+            user_index = key // skill_count
+            skill = columnar_analytics.SKILLS[key % skill_count]
+            avg_recent = float(recent_means[key])
+            bottlenecks[user_index].append(LearningBottleneck(
+                bottleneck_id=f"bottleneck_{skill.value}_{datetime.now().timestamp()}",
+                skill=skill,
+                language='english' if english[user_index] >= japanese[user_index] else 'japanese',
+                description=f"Performance in {skill.value} has been below optimal levels",
+                severity=1.0 - avg_recent,
+                affected_duration=timedelta(days=7),
+                breakthrough_suggestions=self._generate_breakthrough_suggestions(skill, avg_recent),
+                identified_at=datetime.now()
+            ))
+        return bottlenecks
+    
+    def _trajectories_columnar(self, user_id: Optional[str], series: Sequence[Tuple]) -> List[SkillTrajectory]:
+        """
+        Fit skill trajectories with grouped least squares.
+        
+        Args:
+            user_id: User of every series, or None when each series tuple
+                starts with its own user_id
+            series: (skill, language, history) or (user_id, skill, language, history)
+        """
+        np = columnar_analytics.np
+        if user_id is not None:
+            series = [(user_id,) + tuple(item) for item in series]
+        
+        lengths = np.fromiter((len(item[3]) for item in series), dtype=np.int64, count=len(series))
+        points = [point for item in series for point in item[3]]
+        keys = np.repeat(np.arange(len(series), dtype=np.int64), lengths)
+        x = columnar_analytics.to_days([point[0] for point in points])
+        y = np.fromiter((point[1] for point in points), dtype=np.float64, count=len(points))
+        fit = columnar_analytics.grouped_linear_fit(keys, x, y, len(series))
+        
+        trajectories = []
+        for index, (series_user, skill, language, history) in enumerate(series):
+            if lengths[index] < 2:
+                trajectories.append(self._default_skill_trajectory(series_user, skill, language))
+                continue
+            
+            # Less than a day of data gives no meaningful growth rate
+            span_days = fit.x_max[index] - fit.x_min[index]
+            growth_rate = float(fit.slope[index]) if span_days >= 1 else 0.0
+            current_level = float(fit.last_y[index])
+            predicted_level = max(0.0, min(1.0, current_level + growth_rate * 30))
+            
+            trajectories.append(SkillTrajectory(
+                skill=skill,
+                language=language,
+                initial_level=float(fit.first_y[index]),
+                current_level=current_level,
+                predicted_level=predicted_level,
+                trajectory_points=sorted(history, key=lambda point: point[0]),
+                growth_rate=growth_rate,
+                confidence_level=min(1.0, float(lengths[index]) / 10.0)
+            ))
+        return trajectories
+    
     def export_data(self, user_id: str, format: str = 'json') -> str:
         """
         Export learning data for personal analysis.
@@ -538,7 +826,7 @@ class LearningAnalyticsEnhancer:
         Returns:
             Exported data as string
         """
-        sessions = self.study_history.get(user_id, [])
+        sessions = self._get_sessions(user_id)
         
         if format == 'json':
             export_data = {
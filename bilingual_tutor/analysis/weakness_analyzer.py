@@ -2,11 +2,15 @@
 Weakness Analyzer - Identifies user's weak areas through pattern analysis.
 """
 
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import uuid
 from ..models import WeakArea, Skill, WeaknessAnalyzerInterface, ActivityResult
+from ..storage.event_store import (
+    LearningEventStore, BoundedHistory, RingBuffer,
+    activity_result_to_payload, activity_result_from_payload
+)
 
 
 class WeaknessAnalyzer(WeaknessAnalyzerInterface):
@@ -15,12 +19,29 @@ class WeaknessAnalyzer(WeaknessAnalyzerInterface):
     analysis and skill gap identification.
     """
     
-    def __init__(self):
-        """Initialize the weakness analyzer with analysis structures."""
-        self.error_patterns: Dict[str, List[str]] = defaultdict(list)
+    ACTIVITY_STREAM = "weakness_activity_result"
+
+    def __init__(self, event_store: LearningEventStore = None, history_limit: int = 500,
+                 max_users: int = 10000):
+        """
+        Initialize the weakness analyzer with analysis structures.
+
+        Args:
+            event_store: Optional persistent event store. When given, activity results
+                are appended to it and analyses read from it, while activity_results
+                and error_patterns only keep recent entries in memory.
+            history_limit: Entries kept in memory per user when a store is used
+            max_users: Users kept in memory when a store is used
+        """
+        self.event_store = event_store
         self.skill_performance: Dict[str, Dict[Skill, List[float]]] = defaultdict(lambda: defaultdict(list))
         self.weakness_history: Dict[str, List[WeakArea]] = defaultdict(list)
-        self.activity_results: Dict[str, List[ActivityResult]] = defaultdict(list)
+        if event_store is None:
+            self.error_patterns: Dict[str, List[str]] = defaultdict(list)
+            self.activity_results: Dict[str, List[ActivityResult]] = defaultdict(list)
+        else:
+            self.error_patterns = BoundedHistory(lambda: RingBuffer(history_limit), max_users)
+            self.activity_results = BoundedHistory(lambda: RingBuffer(history_limit), max_users)
         
         # Severity thresholds for different metrics
         self.error_rate_threshold = 0.3  # 30% error rate indicates weakness
@@ -36,11 +57,24 @@ class WeaknessAnalyzer(WeaknessAnalyzerInterface):
             result: Activity result to record
         """
         self.activity_results[user_id].append(result)
+        if self.event_store is not None:
+            self.event_store.append(self.ACTIVITY_STREAM, user_id, activity_result_to_payload(result),
+                                    key=result.activity_id, timestamp=result.completed_at)
         
         # Extract error patterns
         if result.errors_made:
             self.error_patterns[user_id].extend(result.errors_made)
     
+    def _get_results(self, user_id: str, since: Optional[datetime] = None) -> List[ActivityResult]:
+        """Get the user's recorded activity results, optionally since a cutoff."""
+        if self.event_store is not None:
+            events = self.event_store.window(self.ACTIVITY_STREAM, user_id, since=since)
+            return [activity_result_from_payload(event.payload) for event in events]
+        results = self.activity_results.get(user_id, [])
+        if since is None:
+            return list(results)
+        return [result for result in results if result.completed_at >= since]
+
     def analyze_error_patterns(self, user_id: str, timeframe: timedelta) -> List[WeakArea]:
         """
         Analyze error patterns to identify weaknesses.
@@ -56,10 +90,7 @@ class WeaknessAnalyzer(WeaknessAnalyzerInterface):
         cutoff_time = datetime.now() - timeframe
         
         # Get recent activity results
-        recent_results = [
-            result for result in self.activity_results[user_id]
-            if result.completed_at >= cutoff_time
-        ]
+        recent_results = self._get_results(user_id, cutoff_time)
         
         if not recent_results:
             return weak_areas
@@ -124,7 +155,7 @@ class WeaknessAnalyzer(WeaknessAnalyzerInterface):
         
         # Get performance data for the language
         language_results = [
-            result for result in self.activity_results[user_id]
+            result for result in self._get_results(user_id)
             if self._get_language_from_activity(result) == language
         ]
         
@@ -247,7 +278,7 @@ class WeaknessAnalyzer(WeaknessAnalyzerInterface):
         """
         # Get historical performance for this skill and language
         relevant_results = [
-            result for result in self.activity_results[user_id]
+            result for result in self._get_results(user_id)
             if (self._get_language_from_activity(result) == weakness.language and
                 weakness.skill in self._infer_skills_from_activity(result))
         ]
@@ -396,7 +427,7 @@ class WeaknessAnalyzer(WeaknessAnalyzerInterface):
         """Get common errors for a specific skill and language."""
         relevant_errors = []
         
-        for result in self.activity_results[user_id]:
+        for result in self._get_results(user_id):
             if (self._get_language_from_activity(result) == language and
                 skill in self._infer_skills_from_activity(result)):
                 relevant_errors.extend(result.errors_made)
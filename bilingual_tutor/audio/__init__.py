@@ -5,6 +5,7 @@ Audio module for pronunciation crawling and storage.
 
 from .audio_crawler import AudioCrawler
 from .audio_storage import AudioStorage
+from .audio_bundle import AudioBundle, AudioBundleBuilder
 from .pronunciation_manager import PronunciationManager
 
-__all__ = ['AudioCrawler', 'AudioStorage', 'PronunciationManager']
\ No newline at end of file
+__all__ = ['AudioCrawler', 'AudioStorage', 'AudioBundle', 'AudioBundleBuilder', 'PronunciationManager']
\ No newline at end of file
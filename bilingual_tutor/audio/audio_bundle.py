@@ -0,0 +1,437 @@
+"""
+Audio Bundle - 离线级别音频包
+Packed, indexed audio bundles for offline level downloads
+
+一个 (语言, 级别) 的全部发音打包为单个文件，客户端一次下载（支持 Range 断点续传），
+服务器通过 mmap 随机读取任意单词的音频。
+
+文件格式 (小端，按列存储):
+    头部     (48 字节): magic(8) | 条目数 N uint32 | 键区大小 uint32 | 数据区偏移 uint64
+                       | 内容指纹(16) | 保留(8)
+    键偏移   uint32 × (N + 1)
+    音频偏移 uint64 × N（相对文件开头）
+    音频长度 uint32 × N
+    来源签名 16 字节 × N（用于增量重建）
+    键区     UTF-8 单词，按字节序排序后首尾相接
+    数据区   原始音频
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+MAGIC = b"BTAUD\x01\x00\x00"
+HEADER = struct.Struct("<8sIIQ16s8x")
+SIGNATURE_SIZE = 16
+
+BUNDLE_LANGUAGES = ("english", "japanese")
+_LEVEL_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,31}$")
+
+
+def _array(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if struct.pack("=H", 1) != struct.pack("<H", 1):
+        values.byteswap()
+    return values
+
+
+def _to_bytes(values: array) -> bytes:
+    if struct.pack("=H", 1) != struct.pack("<H", 1):
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+@dataclass
+class BundleSource:
+    """打包的一个单词的音频来源"""
+    word: str
+    path: str
+    size: int
+    signature: bytes  # 16 字节来源签名
+
+
+@dataclass
+class BundleBuildResult:
+    """音频包构建结果"""
+    path: str
+    language: str
+    level: str
+    entries: int
+    reused: int  # 从旧音频包复制的条目
+    added: int  # 从源文件读取的条目
+    size: int
+    seconds: float
+    rebuilt: bool  # 内容未变化时为 False
+    version_path: str = ""  # 按内容指纹命名、不会被替换的同一文件（硬链接），供下载使用
+
+
+class AudioBundle:
+    """
+    只读音频包（mmap）
+
+    索引在打开时读入紧凑数组，单词查找为键区上的二分查找，
+    音频数据直接从映射区切片，不经过额外的文件读取。
+    """
+
+    def __init__(self, path: str):
+        """
+        打开音频包
+        Args:
+            path: 音频包文件路径
+        Raises:
+            ValueError: 文件不是有效的音频包
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            stat_result = os.fstat(self._file.fileno())
+            if stat_result.st_size < HEADER.size:
+                raise ValueError(f"音频包文件过小: {path}")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.stat_result = stat_result
+
+        magic, count, key_bytes, data_offset, fingerprint = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"无效的音频包文件: {path}")
+        self.count = count
+        self.data_offset = data_offset
+        self.fingerprint = fingerprint
+
+        position = HEADER.size
+        self._key_offsets = _array('I', self._mm[position:position + 4 * (count + 1)])
+        position += 4 * (count + 1)
+        self._offsets = _array('Q', self._mm[position:position + 8 * count])
+        position += 8 * count
+        self._lengths = _array('I', self._mm[position:position + 4 * count])
+        position += 4 * count
+        self._signatures_start = position
+        position += SIGNATURE_SIZE * count
+        self._keys_start = position
+
+    def close(self):
+        """关闭映射和文件"""
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, word: str) -> bool:
+        return self._find(word) is not None
+
+    def _key(self, index: int) -> bytes:
+        start = self._keys_start + self._key_offsets[index]
+        return self._mm[start:self._keys_start + self._key_offsets[index + 1]]
+
+    def _signature(self, index: int) -> bytes:
+        start = self._signatures_start + SIGNATURE_SIZE * index
+        return self._mm[start:start + SIGNATURE_SIZE]
+
+    def _find(self, word: str) -> Optional[int]:
+        key = word.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._key(low) == key:
+            return low
+        return None
+
+    def words(self) -> Iterator[str]:
+        """按键顺序遍历单词"""
+        for index in range(self.count):
+            yield self._key(index).decode('utf-8')
+
+    def entry(self, word: str) -> Optional[Tuple[int, int]]:
+        """
+        单词音频在文件中的位置
+        Returns:
+            Tuple[int, int]: (偏移, 长度)，单词不存在时返回 None
+        """
+        index = self._find(word)
+        if index is None:
+            return None
+        return self._offsets[index], self._lengths[index]
+
+    def read(self, word: str) -> Optional[bytes]:
+        """读取单词的音频数据"""
+        location = self.entry(word)
+        if location is None:
+            return None
+        offset, length = location
+        return self._mm[offset:offset + length]
+
+    def index(self) -> Dict[str, Tuple[int, int]]:
+        """完整的 单词 → (偏移, 长度) 表"""
+        return {self._key(i).decode('utf-8'): (self._offsets[i], self._lengths[i])
+                for i in range(self.count)}
+
+    def _source_entries(self) -> Dict[bytes, Tuple[bytes, int, int]]:
+        """键 → (来源签名, 偏移, 长度)，供增量重建复用"""
+        return {self._key(i): (self._signature(i), self._offsets[i], self._lengths[i])
+                for i in range(self.count)}
+
+
+class AudioBundleBuilder:
+    """
+    音频包构建器
+
+    从 AudioStorage 中为每个单词选出最佳音频（与 get_audio_file 相同的排序），
+    写入临时文件后原子替换。重建时未变化的条目直接从旧音频包的映射区复制，
+    只读取新增或变化的源文件；内容指纹相同时跳过重建。
+    """
+
+    def __init__(self, storage, bundle_dir: str = None):
+        """
+        初始化构建器
+        Args:
+            storage: AudioStorage 实例
+            bundle_dir: 音频包目录（默认 storage_path/bundles）
+        """
+        self.storage = storage
+        self.bundle_dir = bundle_dir or os.path.join(storage.storage_path, "bundles")
+        self._build_lock = threading.Lock()
+        self._open_bundles: Dict[str, Tuple[Tuple[int, int], AudioBundle]] = {}
+        # 音频包路径 -> (构建前的 storage.change_token(), 构建结果)
+        self._current: Dict[str, Tuple[Tuple[int, int], BundleBuildResult]] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def bundle_path(self, language: str, level: str) -> str:
+        """
+        音频包文件路径
+        Raises:
+            ValueError: 语言或级别无效
+        """
+        if language not in BUNDLE_LANGUAGES or not _LEVEL_PATTERN.match(level or ""):
+            raise ValueError(f"无效的语言或级别: {language} {level}")
+        return os.path.join(self.bundle_dir, f"{language}_{level}.bundle")
+
+    def collect_sources(self, language: str, level: str) -> List[BundleSource]:
+        """收集某个级别每个单词的最佳音频文件，按键排序"""
+        sources = {}
+        for record in self.storage.get_level_records(language, level):
+            key = record.word.encode('utf-8')
+            if key in sources:
+                continue
+            try:
+                stat_result = os.stat(record.file_path)
+            except OSError:
+                continue
+            if record.blob_hash:
+                signature = bytes.fromhex(record.blob_hash)[:SIGNATURE_SIZE]
+            else:
+                signature = hashlib.md5(
+                    f"{record.file_path}\0{stat_result.st_size}\0{stat_result.st_mtime_ns}".encode('utf-8')
+                ).digest()
+            sources[key] = BundleSource(record.word, record.file_path, stat_result.st_size, signature)
+        return [sources[key] for key in sorted(sources)]
+
+    @staticmethod
+    def _fingerprint(sources: List[BundleSource]) -> bytes:
+        digest = hashlib.md5()
+        for source in sources:
+            digest.update(source.word.encode('utf-8') + b"\0" + source.signature)
+        return digest.digest()
+
+    def build(self, language: str, level: str, force: bool = False) -> BundleBuildResult:
+        """
+        构建（或增量重建）音频包
+        Args:
+            language: 语言
+            level: 级别
+            force: 内容未变化时也重新写入
+        Returns:
+            BundleBuildResult: 构建结果
+        """
+        path = self.bundle_path(language, level)
+        started = time.perf_counter()
+
+        with self._build_lock:
+            sources = self.collect_sources(language, level)
+            fingerprint = self._fingerprint(sources)
+
+            previous = None
+            if os.path.exists(path):
+                try:
+                    previous = AudioBundle(path)
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"旧音频包无法读取，完整重建: {path}: {e}")
+
+            try:
+                if previous is not None and previous.fingerprint == fingerprint and not force:
+                    return BundleBuildResult(path, language, level, len(previous), len(previous), 0,
+                                             previous.stat_result.st_size,
+                                             time.perf_counter() - started, False,
+                                             self._publish_version(path, fingerprint))
+
+                reused, added = self._write(path, sources, fingerprint, previous)
+            finally:
+                if previous is not None:
+                    previous.close()
+            version_path = self._publish_version(path, fingerprint)
+
+        size = os.path.getsize(path)
+        seconds = time.perf_counter() - started
+        self.logger.info(f"音频包构建完成: {path} ({len(sources)} 个单词, 复用 {reused}, "
+                         f"新增 {added}, {size / 1024:.0f} KB, {seconds:.2f}s)")
+        return BundleBuildResult(path, language, level, len(sources), reused, added, size, seconds, True,
+                                 version_path)
+
+    def current(self, language: str, level: str) -> BundleBuildResult:
+        """
+        获取最新的音频包（下载接口使用）
+        音频索引自上次构建后没有变化时直接返回上次的结果，不再逐个 stat 源文件
+        Raises:
+            ValueError: 语言或级别无效
+        """
+        path = self.bundle_path(language, level)
+        token = self.storage.change_token()
+        with self._build_lock:
+            cached = self._current.get(path)
+        if cached is not None and cached[0] == token and os.path.exists(cached[1].version_path):
+            return cached[1]
+
+        result = self.build(language, level)
+        with self._build_lock:
+            self._current[path] = (token, result)
+        return result
+
+    def _publish_version(self, path: str, fingerprint: bytes) -> str:
+        """
+        为当前音频包建立按内容指纹命名的硬链接（调用方持有构建锁）
+        音频包路径会被重建原子替换，下载接口发送这个不变的文件，stat 与发送的总是同一份内容；
+        只保留当前和上一个版本，正在下载上一版的请求不受影响
+        """
+        directory, name = os.path.split(path)
+        stem = name[:-len(".bundle")]
+        version_name = f"{stem}.{fingerprint.hex()[:16]}.bundle"
+        version_path = os.path.join(directory, version_name)
+        if not os.path.exists(version_path):
+            os.link(path, version_path)
+
+        prefix = stem + "."
+        older = []
+        for entry in os.scandir(directory):
+            if (entry.name.startswith(prefix) and entry.name.endswith(".bundle")
+                    and entry.name not in (name, version_name)):
+                try:
+                    older.append((entry.stat().st_mtime_ns, entry.path))
+                except OSError:
+                    continue
+        for _, stale in sorted(older)[:-1]:
+            try:
+                os.remove(stale)
+            except OSError as e:
+                self.logger.warning(f"旧版本音频包删除失败: {stale}: {e}")
+        return version_path
+
+    def _write(self, path: str, sources: List[BundleSource], fingerprint: bytes,
+               previous: Optional[AudioBundle]) -> Tuple[int, int]:
+        """写入临时文件并原子替换，返回 (复用条目数, 新增条目数)"""
+        old_entries = previous._source_entries() if previous is not None else {}
+
+        keys = [source.word.encode('utf-8') for source in sources]
+        plan = []
+        for key, source in zip(keys, sources):
+            old = old_entries.get(key)
+            if old is not None and old[0] == source.signature:
+                plan.append((old[1], old[2], None))
+            else:
+                plan.append((None, source.size, source.path))
+
+        count = len(sources)
+        key_offsets = array('I', [0])
+        for key in keys:
+            key_offsets.append(key_offsets[-1] + len(key))
+        data_offset = (HEADER.size + 4 * (count + 1) + 8 * count + 4 * count
+                       + SIGNATURE_SIZE * count + key_offsets[-1])
+        offsets = array('Q')
+        lengths = array('I')
+        position = data_offset
+        for _, length, _ in plan:
+            offsets.append(position)
+            lengths.append(length)
+            position += length
+
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.bundle_dir, prefix=".tmp-")
+        reused = added = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, count, key_offsets[-1], data_offset, fingerprint))
+                f.write(_to_bytes(key_offsets))
+                f.write(_to_bytes(offsets))
+                f.write(_to_bytes(lengths))
+                f.write(b"".join(source.signature for source in sources))
+                f.write(b"".join(keys))
+                for old_offset, length, source_path in plan:
+                    if source_path is None:
+                        f.write(previous._mm[old_offset:old_offset + length])
+                        reused += 1
+                    else:
+                        with open(source_path, 'rb') as source_file:
+                            data = source_file.read(length)
+                        if len(data) != length:
+                            raise IOError(f"音频文件在打包时被修改: {source_path}")
+                        f.write(data)
+                        added += 1
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return reused, added
+
+    def open_bundle(self, language: str, level: str) -> Optional[AudioBundle]:
+        """
+        打开（并缓存）音频包，文件被重建后自动重新映射
+        Returns:
+            AudioBundle: 音频包不存在时返回 None
+        """
+        path = self.bundle_path(language, level)
+        try:
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            return None
+        identity = (stat_result.st_ino, stat_result.st_mtime_ns)
+        with self._build_lock:
+            cached = self._open_bundles.get(path)
+            if cached is not None and cached[0] == identity:
+                return cached[1]
+            bundle = AudioBundle(path)
+            # 旧映射可能仍在被读取，交给垃圾回收关闭
+            self._open_bundles[path] = (identity, bundle)
+            return bundle
+
+    def close(self):
+        """关闭已打开的音频包"""
+        with self._build_lock:
+            for _, bundle in self._open_bundles.values():
+                bundle.close()
+            self._open_bundles.clear()
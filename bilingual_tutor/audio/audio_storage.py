@@ -8,12 +8,78 @@ import os
 import json
 import sqlite3
 import hashlib
+import heapq
+import itertools
 import shutil
-from typing import List, Dict, Optional, Tuple
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 import logging
 
+from bilingual_tutor.storage.pagination import Page, clamp_page_size, decode_cursor, make_page
+
+from .blob_store import BlobStore
+
+
+# 查找缓存中表示“数据库中没有该音频”的标记（负缓存）
+_MISSING = object()
+
+# 缓存命中时检查其他进程写入（PRAGMA data_version）的最短间隔（秒）
+VERSION_CHECK_INTERVAL = float(os.environ.get('BILINGUAL_TUTOR_AUDIO_VERSION_CHECK_INTERVAL', '0.5'))
+
+# 本进程内各索引库的写入代数（绝对路径 -> 计数）：同一进程的其他实例写入后立即可见，无需查询数据库
+_write_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+
+def access_db_path(db_path: str) -> str:
+    """索引库对应的访问统计库路径（audio_index.db -> audio_index.access.db）"""
+    if db_path == ":memory:":
+        return db_path
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.access{ext or '.db'}"
+
+
+class _AccessFlushScheduler:
+    """
+    所有 AudioStorage 实例共用的访问统计写入线程
+    实例只在有待写入的统计时登记一次到期时间，线程按到期顺序写入；
+    登记保存的是弱引用，未 close 的实例仍可被回收，连接随之关闭
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queue: List[Tuple[float, int, weakref.ref]] = []
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, storage: "AudioStorage", delay: float) -> None:
+        with self._condition:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._sequence), weakref.ref(storage)))
+            # fork 后子进程中没有该线程，按需重新启动
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audio-access-flush", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    self._condition.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+                _, _, ref = heapq.heappop(self._queue)
+            storage = ref()
+            if storage is not None:
+                storage._flush_when_due()
+            del storage
+
+
+_access_flusher = _AccessFlushScheduler()
+
 
 @dataclass
 class AudioRecord:
@@ -30,6 +96,7 @@ class AudioRecord:
     created_at: str = None
     last_accessed: str = None
     access_count: int = 0
+    blob_hash: Optional[str] = None  # 内容寻址模式下文件内容的 SHA-256
 
 
 class AudioStorage:
@@ -38,12 +105,19 @@ class AudioStorage:
     Audio Storage Manager - Handles audio file storage and indexing
     """
     
-    def __init__(self, storage_path: str = None, db_path: str = None):
+    def __init__(self, storage_path: str = None, db_path: str = None,
+                 cache_size: int = 4096, access_flush_interval: float = 5.0,
+                 content_addressed: bool = False, version_check_interval: float = None):
         """
         初始化音频存储管理器
         Args:
             storage_path: 音频文件存储路径
-            db_path: 音频索引数据库路径
+            db_path: 音频索引数据库路径（访问统计写入同目录的 <索引库名>.access.db）
+            cache_size: (word, language, level) 查找缓存容量，0 表示不缓存
+            access_flush_interval: 访问统计批量写入数据库的间隔（秒）
+            content_addressed: 内容寻址模式，文件按 SHA-256 去重存放在 blobs/ 分片目录中
+            version_check_interval: 检查其他连接写入的最短间隔（秒），默认 VERSION_CHECK_INTERVAL；
+                                    其他实例的写入最多延迟这么久才使本实例的缓存失效
         """
         if storage_path is None:
             base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -54,12 +128,35 @@ class AudioStorage:
         
         self.storage_path = storage_path
         self.db_path = db_path
+        self.access_db_path = access_db_path(db_path)
+        self.cache_size = cache_size
+        self.access_flush_interval = access_flush_interval
+        self.version_check_interval = (VERSION_CHECK_INTERVAL if version_check_interval is None
+                                       else version_check_interval)
+        self.content_addressed = content_addressed
+        self.blob_store = BlobStore(os.path.join(storage_path, "blobs")) if content_addressed else None
         
         # 确保目录存在
         os.makedirs(self.storage_path, exist_ok=True)
         os.makedirs(os.path.join(self.storage_path, "english"), exist_ok=True)
         os.makedirs(os.path.join(self.storage_path, "japanese"), exist_ok=True)
         
+        # 持久连接（所有线程共享，由锁串行化）
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        
+        # 热词查找缓存: (word, language, level) -> AudioRecord 或 _MISSING
+        self._lookup_cache: "OrderedDict[Tuple[str, str, Optional[str]], object]" = OrderedDict()
+        self._data_version = None
+        self._version_checked_at = 0.0
+        self._generation_key = os.path.abspath(self.db_path)
+        self._generation = _write_generations.get(self._generation_key, 0)
+        
+        # 待写入的访问统计: record_id -> [访问次数, 最后访问时间]，由共用线程定期写入
+        self._pending_access: Dict[int, list] = {}
+        self._closed = False
+        
         # 初始化数据库
         self._init_database()
         
@@ -68,8 +165,9 @@ class AudioStorage:
     
     def _init_database(self):
         """初始化音频索引数据库"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
+        conn.execute("PRAGMA journal_mode=WAL")
         
         # 创建音频记录表
         cursor.execute("""
@@ -96,11 +194,154 @@ class AudioStorage:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_source ON audio_records(source)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_quality ON audio_records(quality)")
         
+        if self.content_addressed:
+            self._ensure_content_addressed_schema()
+        
         conn.commit()
-        conn.close()
+        self._init_access_database()
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
     
+    def _init_access_database(self):
+        """
+        访问统计放在单独的数据库文件（ATTACH 为 access），定期写入不改变索引库的
+        data_version，其他进程的查找缓存和音频包的 change_token 不会因此失效。
+        查询通过临时视图 audio_records_stats 读取合并后的统计（旧版本写在
+        audio_records 中的计数继续累加）
+        """
+        conn = self._conn
+        conn.execute("ATTACH DATABASE ? AS access", (self.access_db_path,))
+        conn.execute("PRAGMA access.journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS access.audio_access (
+                record_id INTEGER PRIMARY KEY,
+                access_count INTEGER NOT NULL DEFAULT 0,
+                last_accessed DATETIME
+            )
+        """)
+        conn.commit()
+        
+        columns = [row[1] for row in conn.execute("PRAGMA main.table_info(audio_records)")
+                   if row[1] not in ("access_count", "last_accessed")]
+        conn.execute("DROP VIEW IF EXISTS temp.audio_records_stats")
+        conn.execute(f"""
+            CREATE TEMP VIEW audio_records_stats AS
+            SELECT {', '.join('r.' + column for column in columns)},
+                   COALESCE(a.last_accessed, r.last_accessed) AS last_accessed,
+                   r.access_count + COALESCE(a.access_count, 0) AS access_count
+            FROM main.audio_records r LEFT JOIN access.audio_access a ON a.record_id = r.id
+        """)
+    
+    def _ensure_content_addressed_schema(self):
+        """
+        升级到内容寻址表结构：
+        audio_records 增加 blob_hash 且 file_path 不再唯一（多条记录可共享同一文件），
+        audio_blobs 记录每个文件的引用计数
+        """
+        conn = self._conn
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audio_blobs (
+                sha256 TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                file_size INTEGER DEFAULT 0,
+                ref_count INTEGER DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                released_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_blob_ref_count ON audio_blobs(ref_count)")
+        
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(audio_records)")}
+        if "blob_hash" not in columns:
+            # SQLite 无法删除 UNIQUE 约束，需要重建表
+            conn.execute("""
+                CREATE TABLE audio_records_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    word TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_size INTEGER DEFAULT 0,
+                    duration REAL,
+                    source TEXT,
+                    quality TEXT DEFAULT 'standard',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    last_accessed DATETIME,
+                    access_count INTEGER DEFAULT 0,
+                    blob_hash TEXT,
+                    UNIQUE(word, language, level, source)
+                )
+            """)
+            conn.execute("""
+                INSERT INTO audio_records_new
+                (id, word, language, level, file_path, file_size, duration, source, quality,
+                 created_at, last_accessed, access_count)
+                SELECT id, word, language, level, file_path, file_size, duration, source, quality,
+                       created_at, last_accessed, access_count
+                FROM audio_records
+            """)
+            conn.execute("DROP TABLE audio_records")
+            conn.execute("ALTER TABLE audio_records_new RENAME TO audio_records")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_word ON audio_records(word)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_language_level ON audio_records(language, level)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_source ON audio_records(source)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_quality ON audio_records(quality)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_file_path ON audio_records(file_path)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_blob ON audio_records(blob_hash)")
+    
+    def close(self):
+        """写入待处理的访问统计并关闭数据库连接"""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush_access_stats()
+            self._closed = True
+            self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _check_external_writes(self):
+        """
+        其他连接（如其他 AudioStorage 实例）提交写入后清空查找缓存
+        本进程内的写入按写入代数立即发现；其他进程的写入每 version_check_interval 秒
+        最多查询一次 data_version，热词命中不必每次加锁执行 PRAGMA
+        """
+        generation = _write_generations.get(self._generation_key, 0)
+        now = time.monotonic()
+        if generation == self._generation and now - self._version_checked_at < self.version_check_interval:
+            return
+        with self._lock:
+            self._generation = generation
+            self._version_checked_at = now
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                self._data_version = version
+                self._lookup_cache.clear()
+    
+    def _invalidate_cache(self, word: str, language: str, level: str):
+        """使某个单词的查找缓存失效（包括不指定级别的查找），并通知本进程的其他实例"""
+        with _generations_lock:
+            _write_generations[self._generation_key] = _write_generations.get(self._generation_key, 0) + 1
+        with self._lock:
+            self._lookup_cache.pop((word, language, level), None)
+            self._lookup_cache.pop((word, language, None), None)
+
+    def change_token(self) -> Tuple[int, int]:
+        """
+        音频索引的变化标识：本进程的写入代数与其他连接的 data_version
+        两次取得的值相同说明期间没有新增、替换或删除音频记录（用于跳过音频包重建检查）
+        """
+        generation = _write_generations.get(self._generation_key, 0)
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return generation, version
+
     def store_audio_file(self, word: str, language: str, level: str, 
-                        source_path: str, source: str = "", quality: str = "standard") -> Optional[AudioRecord]:
+                        source_path: str, source: str = "", quality: str = "standard",
+                        remove_source: bool = False) -> Optional[AudioRecord]:
         """
         存储音频文件到管理系统
         Args:
@@ -110,6 +351,7 @@ class AudioStorage:
             source_path: 源文件路径
             source: 来源网站
             quality: 音频质量
+            remove_source: 内容寻址模式下存储后删除源文件（如爬虫下载的临时文件）
         Returns:
             AudioRecord: 音频记录，失败返回None
         """
@@ -119,6 +361,10 @@ class AudioStorage:
                 self.logger.error(f"源音频文件不存在: {source_path}")
                 return None
             
+            if self.content_addressed:
+                return self._store_content_addressed(word, language, level, source_path,
+                                                     source, quality, remove_source)
+            
             # 生成目标文件路径
             target_path = self._generate_storage_path(word, language, level, source)
             
@@ -147,6 +393,7 @@ class AudioStorage:
             )
             
             record_id = self._save_audio_record(record)
+            self._invalidate_cache(word, language, level)
             if record_id:
                 record.id = record_id
                 self.logger.info(f"音频文件存储成功: {word} ({language}, {level})")
@@ -161,6 +408,142 @@ class AudioStorage:
             self.logger.error(f"存储音频文件失败: {e}")
             return None
     
+    def _store_content_addressed(self, word: str, language: str, level: str, source_path: str,
+                                 source: str, quality: str, remove_source: bool) -> Optional[AudioRecord]:
+        """内容寻址存储：相同内容只保存一份文件，记录引用 blob 并维护引用计数"""
+        with self._lock:
+            sha256, blob_path, file_size, created = self.blob_store.put(source_path, move=remove_source)
+            record = AudioRecord(
+                word=word,
+                language=language,
+                level=level,
+                file_path=blob_path,
+                file_size=file_size,
+                duration=self._get_audio_duration(blob_path),
+                source=source,
+                quality=quality,
+                created_at=datetime.now().isoformat(),
+                blob_hash=sha256
+            )
+            
+            try:
+                cursor = self._conn.cursor()
+                cursor.execute("""
+                    SELECT blob_hash FROM audio_records
+                    WHERE word = ? AND language = ? AND level = ? AND source = ?
+                """, (word, language, level, source))
+                previous = cursor.fetchone()
+                
+                cursor.execute("""
+                    INSERT INTO audio_blobs (sha256, file_path, file_size, ref_count, created_at)
+                    VALUES (?, ?, ?, 0, ?)
+                    ON CONFLICT(sha256) DO NOTHING
+                """, (sha256, blob_path, file_size, record.created_at))
+                cursor.execute("""
+                    INSERT OR REPLACE INTO audio_records 
+                    (word, language, level, file_path, file_size, duration, source, quality,
+                     created_at, blob_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    record.word, record.language, record.level, record.file_path,
+                    record.file_size, record.duration, record.source, record.quality,
+                    record.created_at, record.blob_hash
+                ))
+                record.id = cursor.lastrowid
+                self._adjust_blob_references(sha256, 1)
+                if previous and previous['blob_hash']:
+                    self._adjust_blob_references(previous['blob_hash'], -1)
+                self._conn.commit()
+                
+            except Exception as e:
+                self._conn.rollback()
+                if created:
+                    self.blob_store.remove(blob_path)
+                self.logger.error(f"保存音频记录失败: {e}")
+                return None
+            
+            self._invalidate_cache(word, language, level)
+        
+        self.logger.info(f"音频文件存储成功: {word} ({language}, {level}) "
+                         f"{'新文件' if created else '复用已有文件'} {sha256[:12]}")
+        return record
+    
+    def _adjust_blob_references(self, sha256: str, delta: int):
+        """调整 blob 引用计数；计数归零时记录释放时间供垃圾回收判断"""
+        self._conn.execute("""
+            UPDATE audio_blobs
+            SET ref_count = ref_count + ?,
+                released_at = CASE WHEN ref_count + ? <= 0 THEN ? ELSE NULL END
+            WHERE sha256 = ?
+        """, (delta, delta, time.time(), sha256))
+    
+    def collect_garbage(self, grace_seconds: float = 3600, scan: bool = False) -> Dict[str, int]:
+        """
+        删除不再被任何记录引用的 blob（内容寻址模式）
+        Args:
+            grace_seconds: 引用归零后保留的时间，避免删除其他进程刚写入但尚未登记的文件
+            scan: 同时扫描 blobs 目录，删除数据库中没有登记的残留文件
+        Returns:
+            Dict: 删除的 blob 数、释放的字节数和残留文件数
+        """
+        result = {"blobs_removed": 0, "bytes_freed": 0, "stray_files_removed": 0}
+        if not self.content_addressed:
+            return result
+        
+        cutoff = time.time() - grace_seconds
+        with self._lock:
+            try:
+                rows = self._conn.execute("""
+                    SELECT sha256, file_path, file_size FROM audio_blobs
+                    WHERE ref_count <= 0 AND (released_at IS NULL OR released_at <= ?)
+                """, (cutoff,)).fetchall()
+                self._conn.executemany("DELETE FROM audio_blobs WHERE sha256 = ? AND ref_count <= 0",
+                                       [(row['sha256'],) for row in rows])
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                self.logger.error(f"回收音频文件失败: {e}")
+                return result
+            
+            for row in rows:
+                if self.blob_store.remove(row['file_path']):
+                    result["blobs_removed"] += 1
+                    result["bytes_freed"] += row['file_size'] or 0
+            
+            if scan:
+                known = {row[0] for row in self._conn.execute("SELECT file_path FROM audio_blobs")}
+                for path in self.blob_store.iter_blobs():
+                    try:
+                        if path not in known and os.path.getmtime(path) <= cutoff:
+                            self.blob_store.remove(path)
+                            result["stray_files_removed"] += 1
+                    except OSError:
+                        pass
+        
+        if result["blobs_removed"] or result["stray_files_removed"]:
+            self.logger.info(f"音频垃圾回收: {result}")
+        return result
+    
+    def recount_blob_references(self) -> int:
+        """
+        根据 audio_records 重新计算所有 blob 的引用计数（修复中断的写入）
+        Returns:
+            int: 计数被修正的 blob 数
+        """
+        if not self.content_addressed:
+            return 0
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT b.sha256, b.ref_count, COUNT(r.id) AS actual
+                FROM audio_blobs b LEFT JOIN audio_records r ON r.blob_hash = b.sha256
+                GROUP BY b.sha256
+                HAVING b.ref_count != COUNT(r.id)
+            """).fetchall()
+            for row in rows:
+                self._adjust_blob_references(row['sha256'], row['actual'] - row['ref_count'])
+            self._conn.commit()
+            return len(rows)
+    
     def get_audio_file(self, word: str, language: str, level: str = None) -> Optional[AudioRecord]:
         """
         获取音频文件记录
@@ -171,52 +554,73 @@ class AudioStorage:
         Returns:
             AudioRecord: 音频记录，未找到返回None
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        key = (word, language, level or None)
         
-        try:
-            if level:
-                cursor.execute("""
-                    SELECT * FROM audio_records 
-                    WHERE word = ? AND language = ? AND level = ?
-                    ORDER BY quality DESC, access_count DESC
-                    LIMIT 1
-                """, (word, language, level))
-            else:
-                cursor.execute("""
-                    SELECT * FROM audio_records 
-                    WHERE word = ? AND language = ?
-                    ORDER BY quality DESC, access_count DESC
-                    LIMIT 1
-                """, (word, language))
-            
-            row = cursor.fetchone()
-            if row:
-                # 更新访问统计
-                self._update_access_stats(row['id'])
+        # 热词直接命中内存缓存，只确认其他连接没有写入过数据库
+        self._check_external_writes()
+        cached = self._lookup_cache.get(key)
+        if cached is not None:
+            try:
+                self._lookup_cache.move_to_end(key)
+            except KeyError:
+                pass
+            if cached is _MISSING:
+                return None
+            self._record_access(cached.id)
+            return cached
+        
+        with self._lock:
+            try:
+                cursor = self._conn.cursor()
+                if level:
+                    cursor.execute("""
+                        SELECT * FROM audio_records_stats
+                        WHERE word = ? AND language = ? AND level = ?
+                        ORDER BY quality DESC, access_count DESC
+                        LIMIT 1
+                    """, (word, language, level))
+                else:
+                    cursor.execute("""
+                        SELECT * FROM audio_records_stats
+                        WHERE word = ? AND language = ?
+                        ORDER BY quality DESC, access_count DESC
+                        LIMIT 1
+                    """, (word, language))
                 
-                return AudioRecord(
-                    id=row['id'],
-                    word=row['word'],
-                    language=row['language'],
-                    level=row['level'],
-                    file_path=row['file_path'],
-                    file_size=row['file_size'],
-                    duration=row['duration'],
-                    source=row['source'],
-                    quality=row['quality'],
-                    created_at=row['created_at'],
-                    last_accessed=row['last_accessed'],
-                    access_count=row['access_count']
-                )
-            return None
+                row = cursor.fetchone()
+                record = self._row_to_record(row) if row else None
+                
+            except Exception as e:
+                self.logger.error(f"获取音频文件失败: {e}")
+                return None
             
-        except Exception as e:
-            self.logger.error(f"获取音频文件失败: {e}")
-            return None
-        finally:
-            conn.close()
+            if self.cache_size > 0:
+                self._lookup_cache[key] = record if record is not None else _MISSING
+                if len(self._lookup_cache) > self.cache_size:
+                    self._lookup_cache.popitem(last=False)
+        
+        if record is not None:
+            # 更新访问统计
+            self._record_access(record.id)
+        return record
+    
+    def _row_to_record(self, row: sqlite3.Row) -> AudioRecord:
+        """数据库行转换为音频记录"""
+        return AudioRecord(
+            id=row['id'],
+            word=row['word'],
+            language=row['language'],
+            level=row['level'],
+            file_path=row['file_path'],
+            file_size=row['file_size'],
+            duration=row['duration'],
+            source=row['source'],
+            quality=row['quality'],
+            created_at=row['created_at'],
+            last_accessed=row['last_accessed'],
+            access_count=row['access_count'],
+            blob_hash=row['blob_hash'] if 'blob_hash' in row.keys() else None
+        )
     
     def search_audio_files(self, language: str = None, level: str = None, 
                           source: str = None, limit: int = 100) -> List[AudioRecord]:
@@ -230,9 +634,7 @@ class AudioStorage:
         Returns:
             List[AudioRecord]: 音频记录列表
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        self.flush_access_stats()
         
         try:
             # 构建查询条件
@@ -253,38 +655,99 @@ class AudioStorage:
             
             where_clause = " AND ".join(conditions) if conditions else "1=1"
             
-            cursor.execute(f"""
-                SELECT * FROM audio_records 
-                WHERE {where_clause}
-                ORDER BY created_at DESC
-                LIMIT ?
-            """, params + [limit])
-            
-            records = []
-            for row in cursor.fetchall():
-                records.append(AudioRecord(
-                    id=row['id'],
-                    word=row['word'],
-                    language=row['language'],
-                    level=row['level'],
-                    file_path=row['file_path'],
-                    file_size=row['file_size'],
-                    duration=row['duration'],
-                    source=row['source'],
-                    quality=row['quality'],
-                    created_at=row['created_at'],
-                    last_accessed=row['last_accessed'],
-                    access_count=row['access_count']
-                ))
+            with self._lock:
+                rows = self._conn.execute(f"""
+                    SELECT * FROM audio_records_stats
+                    WHERE {where_clause}
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                """, params + [limit]).fetchall()
             
-            return records
+            return [self._row_to_record(row) for row in rows]
             
         except Exception as e:
             self.logger.error(f"搜索音频文件失败: {e}")
             return []
-        finally:
-            conn.close()
-    
+
+    def search_audio_files_page(self, language: str = None, level: str = None, source: str = None,
+                                cursor: str = None, limit: int = None, newest_first: bool = True) -> Page:
+        """
+        键集分页搜索音频文件（按 id 排序，id 随写入递增，newest_first 时与 created_at 降序一致）
+        Args:
+            language: 语言过滤
+            level: 级别过滤
+            source: 来源过滤
+            cursor: 上一页返回的 next_cursor
+            limit: 每页条数
+            newest_first: 是否从最新的记录开始
+        Returns:
+            Page: items 为 AudioRecord 列表
+        Raises:
+            ValueError: 游标无效
+        """
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor, 1)
+        conditions, params = [], []
+        for column, value in (("language", language), ("level", level), ("source", source)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if after:
+            conditions.append("id < ?" if newest_first else "id > ?")
+            params.append(after[0])
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+        
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT * FROM audio_records_stats
+                WHERE {where_clause}
+                ORDER BY id {'DESC' if newest_first else 'ASC'}
+                LIMIT ?
+            """, params + [limit + 1]).fetchall()
+        page = make_page(rows, limit, lambda row: (row['id'],))
+        page.items = [self._row_to_record(row) for row in page.items]
+        return page
+
+    def iter_audio_records(self, language: str = None, level: str = None,
+                           page_size: int = 1000) -> Iterator[AudioRecord]:
+        """
+        按 id 顺序逐页读取音频记录（用于流式导出）
+        每页查询完成后释放锁，导出期间其他线程的查找不会被阻塞
+        """
+        self.flush_access_stats()
+        cursor = None
+        while True:
+            page = self.search_audio_files_page(language, level, cursor=cursor, limit=page_size,
+                                                newest_first=False)
+            yield from page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    def get_level_records(self, language: str, level: str) -> List[AudioRecord]:
+        """
+        获取某个级别的全部音频记录（用于打包离线音频包）
+        Args:
+            language: 语言
+            level: 级别
+        Returns:
+            List[AudioRecord]: 按单词分组，每组内按 get_audio_file 的优先级排序
+        """
+        self.flush_access_stats()
+
+        try:
+            with self._lock:
+                rows = self._conn.execute("""
+                    SELECT * FROM audio_records_stats
+                    WHERE language = ? AND level = ?
+                    ORDER BY word, quality DESC, access_count DESC
+                """, (language, level)).fetchall()
+            return [self._row_to_record(row) for row in rows]
+
+        except Exception as e:
+            self.logger.error(f"获取级别音频记录失败: {e}")
+            return []
+
     def delete_audio_file(self, record_id: int) -> bool:
         """
         删除音频文件
@@ -293,36 +756,41 @@ class AudioStorage:
         Returns:
             bool: 删除是否成功
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # 获取文件路径
-            cursor.execute("SELECT file_path FROM audio_records WHERE id = ?", (record_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                self.logger.warning(f"音频记录不存在: {record_id}")
+        with self._lock:
+            try:
+                cursor = self._conn.cursor()
+                # 获取文件路径
+                cursor.execute("SELECT * FROM audio_records WHERE id = ?", (record_id,))
+                row = cursor.fetchone()
+                
+                if not row:
+                    self.logger.warning(f"音频记录不存在: {record_id}")
+                    return False
+                
+                blob_hash = row['blob_hash'] if 'blob_hash' in row.keys() else None
+                if blob_hash:
+                    # 内容寻址文件可能被其他记录共享，只减少引用，由垃圾回收删除
+                    self._adjust_blob_references(blob_hash, -1)
+                else:
+                    file_path = row['file_path']
+                    
+                    # 删除文件
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                        self.logger.info(f"删除音频文件: {file_path}")
+                
+                # 删除数据库记录
+                cursor.execute("DELETE FROM audio_records WHERE id = ?", (record_id,))
+                cursor.execute("DELETE FROM access.audio_access WHERE record_id = ?", (record_id,))
+                self._conn.commit()
+                self._pending_access.pop(record_id, None)
+                self._invalidate_cache(row['word'], row['language'], row['level'])
+                
+                return True
+                
+            except Exception as e:
+                self.logger.error(f"删除音频文件失败: {e}")
                 return False
-            
-            file_path = row[0]
-            
-            # 删除文件
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                self.logger.info(f"删除音频文件: {file_path}")
-            
-            # 删除数据库记录
-            cursor.execute("DELETE FROM audio_records WHERE id = ?", (record_id,))
-            conn.commit()
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"删除音频文件失败: {e}")
-            return False
-        finally:
-            conn.close()
     
     def get_storage_statistics(self) -> Dict[str, any]:
         """
@@ -330,8 +798,8 @@ class AudioStorage:
         Returns:
             Dict: 存储统计信息
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self._lock.acquire()
+        cursor = self._conn.cursor()
         
         try:
             stats = {
@@ -349,6 +817,19 @@ class AudioStorage:
             stats["total_files"] = row[0] or 0
             stats["total_size"] = row[1] or 0
             
+            if self.content_addressed:
+                # 去重后实际占用的磁盘空间
+                cursor.execute("""
+                    SELECT COUNT(*), SUM(file_size), SUM(CASE WHEN ref_count <= 0 THEN 1 ELSE 0 END)
+                    FROM audio_blobs
+                """)
+                row = cursor.fetchone()
+                stats["unique_blobs"] = row[0] or 0
+                stats["stored_size"] = row[1] or 0
+                stats["unreferenced_blobs"] = row[2] or 0
+                stats["dedup_ratio"] = (stats["total_size"] / stats["stored_size"]
+                                        if stats["stored_size"] else 1.0)
+            
             # 按语言统计
             cursor.execute("""
                 SELECT language, COUNT(*), SUM(file_size) 
@@ -403,7 +884,7 @@ class AudioStorage:
             self.logger.error(f"获取存储统计失败: {e}")
             return {}
         finally:
-            conn.close()
+            self._lock.release()
     
     def cleanup_orphaned_files(self) -> int:
         """
@@ -415,14 +896,14 @@ class AudioStorage:
         
         try:
             # 获取数据库中所有文件路径
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT file_path FROM audio_records")
-            db_files = {row[0] for row in cursor.fetchall()}
-            conn.close()
+            with self._lock:
+                db_files = {row[0] for row in self._conn.execute("SELECT file_path FROM audio_records")}
             
-            # 扫描存储目录中的所有音频文件
+            # 扫描存储目录中的所有音频文件（blobs 目录由垃圾回收按引用计数处理）
+            blob_root = os.path.abspath(self.blob_store.root) if self.blob_store else None
             for root, dirs, files in os.walk(self.storage_path):
+                if blob_root:
+                    dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != blob_root]
                 for file in files:
                     if file.endswith(('.mp3', '.wav', '.m4a', '.ogg')):
                         file_path = os.path.join(root, file)
@@ -436,6 +917,10 @@ class AudioStorage:
                             except Exception as e:
                                 self.logger.error(f"清理文件失败: {file_path}: {e}")
             
+            if self.content_addressed:
+                collected = self.collect_garbage(grace_seconds=0, scan=True)
+                cleaned_count += collected["blobs_removed"] + collected["stray_files_removed"]
+            
             return cleaned_count
             
         except Exception as e:
@@ -475,50 +960,85 @@ class AudioStorage:
         Returns:
             int: 记录ID，失败返回None
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO audio_records 
-                (word, language, level, file_path, file_size, duration, source, quality, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                record.word, record.language, record.level, record.file_path,
-                record.file_size, record.duration, record.source, record.quality,
-                record.created_at
-            ))
-            
-            conn.commit()
-            return cursor.lastrowid
-            
-        except Exception as e:
-            self.logger.error(f"保存音频记录失败: {e}")
-            return None
-        finally:
-            conn.close()
+        with self._lock:
+            try:
+                cursor = self._conn.cursor()
+                cursor.execute("""
+                    INSERT OR REPLACE INTO audio_records 
+                    (word, language, level, file_path, file_size, duration, source, quality, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    record.word, record.language, record.level, record.file_path,
+                    record.file_size, record.duration, record.source, record.quality,
+                    record.created_at
+                ))
+                
+                self._conn.commit()
+                return cursor.lastrowid
+                
+            except Exception as e:
+                self._conn.rollback()
+                self.logger.error(f"保存音频记录失败: {e}")
+                return None
+    
+    def _record_access(self, record_id: int):
+        """
+        记录一次访问（在内存中聚合，access_flush_interval 秒后由共用线程批量写入）
+        Args:
+            record_id: 记录ID
+        """
+        now = time.time()
+        with self._lock:
+            schedule = not self._pending_access and not self._closed
+            pending = self._pending_access.get(record_id)
+            if pending is None:
+                self._pending_access[record_id] = [1, now]
+            else:
+                pending[0] += 1
+                pending[1] = now
+        if schedule:
+            _access_flusher.schedule(self, self.access_flush_interval)
+    
+    def _flush_when_due(self):
+        """共用线程回调：写入到期的访问统计"""
+        with self._lock:
+            if not self._closed:
+                self.flush_access_stats()
+    
+    def flush_access_stats(self) -> int:
+        """
+        将聚合的访问统计写入访问统计库（不修改 audio_records）
+        Returns:
+            int: 更新的记录数
+        """
+        with self._lock:
+            if not self._pending_access:
+                return 0
+            pending, self._pending_access = self._pending_access, {}
+            try:
+                self._conn.executemany("""
+                    INSERT INTO access.audio_access (record_id, access_count, last_accessed)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(record_id) DO UPDATE SET
+                        access_count = access_count + excluded.access_count,
+                        last_accessed = excluded.last_accessed
+                """, [(record_id, count, datetime.fromtimestamp(last_accessed).isoformat())
+                      for record_id, (count, last_accessed) in pending.items()])
+                self._conn.commit()
+                return len(pending)
+                
+            except Exception as e:
+                self.logger.error(f"更新访问统计失败: {e}")
+                return 0
     
     def _update_access_stats(self, record_id: int):
         """
-        更新访问统计
+        更新访问统计（立即写入）
         Args:
             record_id: 记录ID
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                UPDATE audio_records 
-                SET last_accessed = ?, access_count = access_count + 1
-                WHERE id = ?
-            """, (datetime.now().isoformat(), record_id))
-            conn.commit()
-            
-        except Exception as e:
-            self.logger.error(f"更新访问统计失败: {e}")
-        finally:
-            conn.close()
+        self._record_access(record_id)
+        self.flush_access_stats()
     
     def _get_audio_duration(self, file_path: str) -> Optional[float]:
         """
@@ -0,0 +1,131 @@
+"""
+Audio Blob Store - 内容寻址音频文件存储
+Content-addressed audio blob storage with a sharded directory layout
+以 SHA-256 为键、两级目录分片的音频文件存储
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+
+class BlobStore:
+    """
+    内容寻址的音频文件存储
+
+    文件以内容的 SHA-256 命名，放在 ``<root>/ab/cd/<sha256><ext>`` 下：
+    相同内容只保存一份，两级 256 路分片让每个目录的文件数保持很小。
+    引用计数由 AudioStorage 在数据库中维护，这里只负责文件本身。
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, root: str, fanout_levels: int = 2, fanout_width: int = 2):
+        """
+        初始化内容寻址存储
+        Args:
+            root: 存储根目录
+            fanout_levels: 分片目录层数
+            fanout_width: 每层目录名使用的十六进制字符数
+        """
+        self.root = root
+        self.fanout_levels = fanout_levels
+        self.fanout_width = fanout_width
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def hash_file(cls, path: str) -> Tuple[str, int]:
+        """
+        计算文件的 SHA-256
+        Returns:
+            Tuple[str, int]: (十六进制摘要, 文件大小)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(cls.CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def blob_path(self, sha256: str, extension: str = ".mp3") -> str:
+        """由摘要生成分片路径"""
+        parts = [sha256[i * self.fanout_width:(i + 1) * self.fanout_width]
+                 for i in range(self.fanout_levels)]
+        return os.path.join(self.root, *parts, sha256 + extension)
+
+    def find(self, sha256: str) -> Optional[str]:
+        """查找已存储的文件（任意扩展名）"""
+        directory = os.path.dirname(self.blob_path(sha256))
+        try:
+            for name in os.listdir(directory):
+                if name.startswith(sha256):
+                    return os.path.join(directory, name)
+        except FileNotFoundError:
+            pass
+        return None
+
+    def put(self, source_path: str, move: bool = False) -> Tuple[str, str, int, bool]:
+        """
+        写入文件（内容已存在时不重复写入）
+        Args:
+            source_path: 源文件路径
+            move: 写入后删除源文件
+        Returns:
+            Tuple: (摘要, 存储路径, 文件大小, 是否新写入)
+        """
+        sha256, size = self.hash_file(source_path)
+        existing = self.find(sha256)
+        if existing is not None:
+            if move and os.path.abspath(source_path) != os.path.abspath(existing):
+                os.remove(source_path)
+            return sha256, existing, size, False
+
+        extension = os.path.splitext(source_path)[1].lower() or ".mp3"
+        target = self.blob_path(sha256, extension)
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+
+        # 先写临时文件再原子替换，中断时不会留下不完整的 blob
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        os.close(fd)
+        try:
+            if move:
+                shutil.move(source_path, temp_path)
+            else:
+                shutil.copy2(source_path, temp_path)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return sha256, target, size, True
+
+    def remove(self, path: str) -> bool:
+        """删除文件，并清理空的分片目录"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        directory = os.path.dirname(path)
+        for _ in range(self.fanout_levels):
+            if os.path.abspath(directory) == os.path.abspath(self.root):
+                break
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+        return True
+
+    def iter_blobs(self) -> Iterator[str]:
+        """遍历所有已存储的文件路径（跳过未完成的临时文件）"""
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.startswith(".tmp-"):
+                    yield os.path.join(directory, name)
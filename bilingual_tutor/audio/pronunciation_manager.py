@@ -5,11 +5,20 @@ High-level interface for managing pronunciation audio files
 """
 
 import os
+import json
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
+
+from bilingual_tutor.storage.export import export_chunks, ndjson_chunks, write_export
+
 from .audio_crawler import AudioCrawler, AudioFile
 from .audio_storage import AudioStorage, AudioRecord
+from .audio_bundle import AudioBundleBuilder
+
+# 发音索引导出的字段
+PRONUNCIATION_INDEX_FIELDS = ["word", "language", "level", "file_path", "file_size", "duration",
+                              "source", "quality", "created_at"]
 
 
 class PronunciationManager:
@@ -18,11 +27,12 @@ class PronunciationManager:
     Pronunciation Manager - Unified management of audio crawling and storage
     """
     
-    def __init__(self, storage_path: str = None):
+    def __init__(self, storage_path: str = None, content_addressed: bool = False):
         """
         初始化发音管理器
         Args:
             storage_path: 音频存储路径
+            content_addressed: 使用内容寻址（去重）音频存储
         """
         if storage_path is None:
             base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -30,7 +40,8 @@ class PronunciationManager:
         
         self.storage_path = storage_path
         self.crawler = AudioCrawler(storage_path)
-        self.storage = AudioStorage(storage_path)
+        self.storage = AudioStorage(storage_path, content_addressed=content_addressed)
+        self.bundles = AudioBundleBuilder(self.storage)
         
         # 设置日志
         self.logger = logging.getLogger(__name__)
@@ -65,7 +76,8 @@ class PronunciationManager:
                     level=audio_file.level,
                     source_path=audio_file.local_path,
                     source="crawler",
-                    quality=audio_file.quality
+                    quality=audio_file.quality,
+                    remove_source=self.storage.content_addressed
                 )
                 
                 if record:
@@ -120,7 +132,8 @@ class PronunciationManager:
                     level=audio_file.level,
                     source_path=audio_file.local_path,
                     source="crawler",
-                    quality=audio_file.quality
+                    quality=audio_file.quality,
+                    remove_source=self.storage.content_addressed
                 )
                 
                 if record:
@@ -372,42 +385,30 @@ class PronunciationManager:
         
         return results
     
-    def export_pronunciation_index(self, output_path: str) -> bool:
+    def iter_pronunciation_index(self, language: str = None, level: str = None) -> Iterator[Dict[str, any]]:
+        """按 id 顺序逐页产出发音索引条目（内存占用与记录数无关）"""
+        for record in self.storage.iter_audio_records(language, level):
+            yield {field: getattr(record, field) for field in PRONUNCIATION_INDEX_FIELDS}
+    
+    def export_pronunciation_index(self, output_path: str, export_format: str = None) -> bool:
         """
-        导出发音索引到JSON文件
+        流式导出发音索引
         Args:
             output_path: 输出文件路径
+            export_format: json / ndjson / csv（默认按扩展名判断，其余为 json）
         Returns:
             bool: 导出是否成功
         """
+        if export_format is None:
+            extension = os.path.splitext(output_path)[1].lower()
+            export_format = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}.get(extension, 'json')
+        
         try:
-            # 获取所有音频记录
-            all_records = self.storage.search_audio_files(limit=10000)
-            
-            # 转换为可序列化的格式
-            export_data = {
-                "export_time": datetime.now().isoformat(),
-                "total_records": len(all_records),
-                "records": []
-            }
-            
-            for record in all_records:
-                export_data["records"].append({
-                    "word": record.word,
-                    "language": record.language,
-                    "level": record.level,
-                    "file_path": record.file_path,
-                    "file_size": record.file_size,
-                    "duration": record.duration,
-                    "source": record.source,
-                    "quality": record.quality,
-                    "created_at": record.created_at
-                })
-            
-            # 写入JSON文件
-            import json
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
+            if export_format == 'json':
+                chunks = self._json_index_chunks()
+            else:
+                chunks = export_chunks(self.iter_pronunciation_index(), export_format, PRONUNCIATION_INDEX_FIELDS)
+            write_export(output_path, chunks)
             
             self.logger.info(f"发音索引导出成功: {output_path}")
             return True
@@ -416,7 +417,19 @@ class PronunciationManager:
             self.logger.error(f"导出发音索引失败: {e}")
             return False
     
+    def _json_index_chunks(self) -> Iterator[bytes]:
+        """单个 JSON 文档：逐条写出 records 数组，total_records 放在数组之后"""
+        yield (f'{{"export_time": {json.dumps(datetime.now().isoformat())}, "records": [').encode('utf-8')
+        total = 0
+        for chunk in ndjson_chunks(self.iter_pronunciation_index()):
+            lines = chunk.decode('utf-8').rstrip('\n').split('\n')
+            yield (("," if total else "") + ",".join(lines)).encode('utf-8')
+            total += len(lines)
+        yield f'], "total_records": {total}}}'.encode('utf-8')
+    
     def close(self):
         """关闭管理器，清理资源"""
         if self.crawler:
-            self.crawler.close()
\ No newline at end of file
+            self.crawler.close()
+        self.bundles.close()
+        self.storage.close()
\ No newline at end of file
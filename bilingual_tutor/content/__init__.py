@@ -1,11 +1,25 @@
-"""Content management layer including crawling, filtering, and memory management."""
+"""Content management layer including crawling, filtering, and memory management.
 
-from .crawler import ContentCrawler
-from .memory_manager import MemoryManager
-from .filter import ContentFilter
-from .precise_level_crawler import PreciseLevelContentCrawler, VocabularyItem
-from .content_quality_assessor import ContentQualityAssessor, QualityMetrics, LevelGradingResult
-from .level_content_integration import LevelContentIntegration
+Exports are resolved on first access (PEP 562), so importing one content
+module does not load the crawlers and their HTTP/HTML parsing stacks.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+_SUBMODULE_EXPORTS = {
+    '.crawler': ('ContentCrawler',),
+    '.memory_manager': ('MemoryManager',),
+    '.filter': ('ContentFilter',),
+    '.precise_level_crawler': ('PreciseLevelContentCrawler', 'VocabularyItem'),
+    '.content_quality_assessor': ('ContentQualityAssessor', 'QualityMetrics', 'LevelGradingResult'),
+    '.level_content_integration': ('LevelContentIntegration',),
+    '.batch_assessment': ('BatchAssessmentResult', 'batch_assess'),
+}
+
+_LAZY_ATTRIBUTES = {
+    name: module for module, names in _SUBMODULE_EXPORTS.items() for name in names
+}
 
 __all__ = [
     'ContentCrawler', 
@@ -16,5 +30,30 @@ __all__ = [
     'ContentQualityAssessor',
     'QualityMetrics',
     'LevelGradingResult',
-    'LevelContentIntegration'
-]
\ No newline at end of file
+    'LevelContentIntegration',
+    'BatchAssessmentResult',
+    'batch_assess'
+]
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .crawler import ContentCrawler
+    from .memory_manager import MemoryManager
+    from .filter import ContentFilter
+    from .precise_level_crawler import PreciseLevelContentCrawler, VocabularyItem
+    from .content_quality_assessor import ContentQualityAssessor, QualityMetrics, LevelGradingResult
+    from .level_content_integration import LevelContentIntegration
+    from .batch_assessment import BatchAssessmentResult, batch_assess
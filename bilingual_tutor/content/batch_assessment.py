@@ -0,0 +1,141 @@
+"""
+Batch Content Assessment - Process-pool batch mode for quality assessment and level grading.
+批量内容评估 - 使用进程池并行完成内容质量评估和级别分级
+"""
+
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from ..models import Content, QualityScore
+from .content_quality_assessor import ContentQualityAssessor, LevelGradingResult
+
+
+logger = logging.getLogger(__name__)
+
+# 每个工作进程内常驻的评估器（预加载CET/JLPT标准、词频表和语法模式）
+_worker_assessor: Optional[ContentQualityAssessor] = None
+
+
+@dataclass
+class BatchAssessmentResult:
+    """Result of assessing a single content item in a batch."""
+    index: int  # Position of the content in the input sequence
+    content_id: str
+    quality_score: Optional[QualityScore] = None
+    level_grading: Optional[LevelGradingResult] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def _init_worker():
+    """Warm up a worker process by building its assessor once."""
+    global _worker_assessor
+    _worker_assessor = ContentQualityAssessor()
+
+
+def _assess_chunk(chunk: List[Tuple[int, Content]], grade: bool = True,
+                  assessor: ContentQualityAssessor = None) -> List[BatchAssessmentResult]:
+    """Assess one chunk of (index, content) pairs with the warm assessor."""
+    if assessor is None:
+        if _worker_assessor is None:
+            _init_worker()
+        assessor = _worker_assessor
+
+    results = []
+    for index, content in chunk:
+        try:
+            quality_score = assessor.assess_content_quality(content)
+            level_grading = assessor.grade_content_level(content) if grade else None
+            results.append(BatchAssessmentResult(
+                index=index,
+                content_id=content.content_id,
+                quality_score=quality_score,
+                level_grading=level_grading
+            ))
+        except Exception as e:
+            results.append(BatchAssessmentResult(
+                index=index,
+                content_id=getattr(content, 'content_id', ''),
+                error=str(e)
+            ))
+    return results
+
+
+def _iter_chunks(contents: Iterable[Content], chunk_size: int) -> Iterator[List[Tuple[int, Content]]]:
+    """Split contents lazily into chunks of (index, content) pairs."""
+    iterator = enumerate(contents)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def batch_assess(contents: Iterable[Content], workers: int = None, chunk_size: int = 64,
+                 grade: bool = True, max_pending_chunks: int = None,
+                 assessor: ContentQualityAssessor = None) -> Iterator[BatchAssessmentResult]:
+    """
+    Assess and grade many content items, streaming results as they finish.
+
+    Content is sharded into chunks and submitted to a ProcessPoolExecutor whose
+    workers each keep a warm ContentQualityAssessor. At most
+    ``max_pending_chunks`` chunks are in flight at once, so the input iterable
+    is consumed incrementally and memory stays bounded for large corpora.
+    Results arrive in completion order; use ``BatchAssessmentResult.index``
+    to restore input order.
+
+    Args:
+        contents: Content items to assess (any iterable, consumed lazily)
+        workers: Number of worker processes (default: CPU count). 0 or 1 runs
+            inline on the calling thread without a pool
+        chunk_size: Number of items per submitted task
+        grade: Whether to also run level grading for each item
+        max_pending_chunks: Maximum chunks in flight (default: 2 * workers)
+        assessor: Assessor used for the inline path (default: a new one)
+
+    Yields:
+        BatchAssessmentResult for every input item
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunk_size = max(1, chunk_size)
+
+    if workers <= 1:
+        inline_assessor = assessor or ContentQualityAssessor()
+        for chunk in _iter_chunks(contents, chunk_size):
+            yield from _assess_chunk(chunk, grade, inline_assessor)
+        return
+
+    if max_pending_chunks is None:
+        max_pending_chunks = workers * 2
+    max_pending_chunks = max(1, max_pending_chunks)
+
+    chunks = _iter_chunks(contents, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = {}
+        for chunk in islice(chunks, max_pending_chunks):
+            pending[executor.submit(_assess_chunk, chunk, grade)] = chunk
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Batch assessment chunk failed: {e}")
+                    results = [
+                        BatchAssessmentResult(index=index, content_id=content.content_id, error=str(e))
+                        for index, content in chunk
+                    ]
+                yield from results
+
+            for chunk in islice(chunks, max_pending_chunks - len(pending)):
+                pending[executor.submit(_assess_chunk, chunk, grade)] = chunk
@@ -4,12 +4,30 @@ Content Quality Assessor - Advanced quality assessment and grading for precise l
 
 import re
 import math
-from typing import Dict, List, Set, Tuple, Optional
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Set, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime
 import logging
 
 from ..models import Content, QualityScore, ContentType
+from ..storage.lexicon import WordFrequencies, get_shared_lexicon
+
+
+# Read-only seed frequencies shared by all assessor instances; other words
+# fall back to the frequency rank in the shared lexicon (see WordFrequencies).
+ENGLISH_WORD_FREQUENCIES: Mapping[str, float] = MappingProxyType({
+    "the": 1.0, "be": 0.95, "to": 0.9, "of": 0.85, "and": 0.8,
+    "a": 0.75, "in": 0.7, "that": 0.65, "have": 0.6, "i": 0.55,
+    "it": 0.5, "for": 0.45, "not": 0.4, "on": 0.35, "with": 0.3,
+    "he": 0.25, "as": 0.2, "you": 0.15, "do": 0.1, "at": 0.05
+})
+
+JAPANESE_WORD_FREQUENCIES: Mapping[str, float] = MappingProxyType({
+    "の": 1.0, "に": 0.95, "は": 0.9, "を": 0.85, "が": 0.8,
+    "で": 0.75, "と": 0.7, "た": 0.65, "し": 0.6, "て": 0.55,
+    "だ": 0.5, "か": 0.45, "な": 0.4, "も": 0.35, "から": 0.3
+})
 
 
 @dataclass
@@ -99,6 +117,24 @@ class ContentQualityAssessor:
         else:
             return self._grade_generic_content_level(content)
     
+    def batch_assess(self, contents: Iterable[Content], workers: int = None,
+                     chunk_size: int = 64, grade: bool = True) -> Iterator:
+        """
+        Assess and grade many content items in parallel worker processes.
+        
+        Args:
+            contents: Content items to assess
+            workers: Number of worker processes (0 or 1 runs inline with this assessor)
+            chunk_size: Number of items per submitted task
+            grade: Whether to also grade the level of each item
+            
+        Returns:
+            Iterator of BatchAssessmentResult in completion order
+        """
+        from .batch_assessment import batch_assess
+        return batch_assess(contents, workers=workers, chunk_size=chunk_size,
+                            grade=grade, assessor=self)
+    
     def validate_level_appropriateness(self, content: Content, target_level: str) -> float:
         """
         Validate how appropriate content is for a specific level.
@@ -828,24 +864,13 @@ class ContentQualityAssessor:
             }
         }
     
-    def _load_english_word_frequencies(self) -> Dict[str, float]:
-        """Load English word frequency data."""
-        # Simplified frequency data - in practice would load from comprehensive database
-        return {
-            "the": 1.0, "be": 0.95, "to": 0.9, "of": 0.85, "and": 0.8,
-            "a": 0.75, "in": 0.7, "that": 0.65, "have": 0.6, "i": 0.55,
-            "it": 0.5, "for": 0.45, "not": 0.4, "on": 0.35, "with": 0.3,
-            "he": 0.25, "as": 0.2, "you": 0.15, "do": 0.1, "at": 0.05
-        }
+    def _load_english_word_frequencies(self) -> Mapping[str, float]:
+        """Load English word frequency data (read-only, backed by the shared lexicon)."""
+        return WordFrequencies(ENGLISH_WORD_FREQUENCIES, "english", get_shared_lexicon())
     
-    def _load_japanese_word_frequencies(self) -> Dict[str, float]:
-        """Load Japanese word frequency data."""
-        # Simplified frequency data - in practice would load from comprehensive database
-        return {
-            "の": 1.0, "に": 0.95, "は": 0.9, "を": 0.85, "が": 0.8,
-            "で": 0.75, "と": 0.7, "た": 0.65, "し": 0.6, "て": 0.55,
-            "だ": 0.5, "か": 0.45, "な": 0.4, "も": 0.35, "から": 0.3
-        }
+    def _load_japanese_word_frequencies(self) -> Mapping[str, float]:
+        """Load Japanese word frequency data (read-only, backed by the shared lexicon)."""
+        return WordFrequencies(JAPANESE_WORD_FREQUENCIES, "japanese", get_shared_lexicon())
     
     def _load_english_grammar_patterns(self) -> Dict[str, Dict]:
         """Load English grammar patterns with complexity scores."""
@@ -11,9 +11,6 @@ from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
 
-import requests
-from bs4 import BeautifulSoup
-
 from ..models import Content, QualityScore, ContentCrawlerInterface, ContentType
 from .crawler_utils import RobustRequester, CrawlerStats, retry_on_failure
 
@@ -5,10 +5,18 @@ Crawler Utilities Module - Robust crawler infrastructure
 
 import random
 import time
-from typing import Optional, Callable, Any, List
+from typing import Optional, Callable, Any, List, TYPE_CHECKING
 from functools import wraps
-import requests
-from requests.exceptions import RequestException, Timeout, ConnectionError
+
+# requests 在首次发送请求时才导入，导入本模块不加载 HTTP 栈
+if TYPE_CHECKING:
+    import requests
+
+
+def _request_exceptions() -> tuple:
+    """默认需要重试的 requests 异常类型"""
+    from requests.exceptions import RequestException, Timeout, ConnectionError
+    return (RequestException, Timeout, ConnectionError)
 
 
 class UserAgentPool:
@@ -74,7 +82,7 @@ def retry_on_failure(
     max_attempts: int = 3,
     delay: float = 1.0,
     backoff_factor: float = 2.0,
-    exceptions: tuple = (RequestException, Timeout, ConnectionError),
+    exceptions: Optional[tuple] = None,
     on_failure: Optional[Callable[[Exception, int], Any]] = None
 ):
     """
@@ -84,9 +92,12 @@ def retry_on_failure(
         max_attempts: 最大重试次数
         delay: 初始延迟（秒）
         backoff_factor: 退避因子（每次重试延迟乘以这个因子）
-        exceptions: 需要重试的异常类型
+        exceptions: 需要重试的异常类型（默认 requests 的网络异常）
         on_failure: 失败时的回调函数
     """
+    if exceptions is None:
+        exceptions = _request_exceptions()
+    
     def decorator(func: Callable):
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -149,6 +160,7 @@ class RobustRequester:
         """
         self.timeout = timeout
         self.max_attempts = max_attempts
+        import requests
         self.session = requests.Session()
         self.ua_pool = UserAgentPool()
         self.rate_limiter = RateLimiter(min_delay, max_delay)
@@ -159,7 +171,7 @@ class RobustRequester:
         headers: Optional[dict] = None,
         params: Optional[dict] = None,
         allow_redirects: bool = True
-    ) -> Optional[requests.Response]:
+    ) -> Optional['requests.Response']:
         """
         发送 GET 请求（带重试和频率限制）
         
@@ -213,7 +225,7 @@ class RobustRequester:
         data: Optional[dict] = None,
         json: Optional[dict] = None,
         headers: Optional[dict] = None
-    ) -> Optional[requests.Response]:
+    ) -> Optional['requests.Response']:
         """
         发送 POST 请求（带重试和频率限制）
         
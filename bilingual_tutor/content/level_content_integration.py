@@ -181,13 +181,16 @@ class LevelContentIntegration:
         return self.precise_crawler.assess_content_level_accuracy(content)
     
     def batch_process_content(self, content_list: List[Content], 
-                            user_profile: UserProfile) -> Dict[str, List[Content]]:
+                            user_profile: UserProfile,
+                            workers: Optional[int] = None) -> Dict[str, List[Content]]:
         """
         Batch process content list and categorize by quality and appropriateness.
         
         Args:
             content_list: List of content to process
             user_profile: User's profile for assessment
+            workers: Number of worker processes for assessment; None or 1 
+                assesses inline on the calling thread
             
         Returns:
             Dictionary categorizing content by quality level
@@ -199,8 +202,25 @@ class LevelContentIntegration:
             "needs_improvement": []
         }
         
-        for content in content_list:
-            quality_score, level_grading = self.assess_content_for_user(content, user_profile)
+        if workers is not None and workers > 1:
+            base_scores = [None] * len(content_list)
+            for result in self.quality_assessor.batch_assess(content_list, workers=workers, grade=False):
+                if result.success:
+                    base_scores[result.index] = result.quality_score.overall_score
+                else:
+                    self.logger.error(f"Error assessing content {result.content_id}: {result.error}")
+        else:
+            base_scores = [
+                self.quality_assessor.assess_content_quality(content).overall_score
+                for content in content_list
+            ]
+        
+        for content, base_score in zip(content_list, base_scores):
+            if base_score is None:
+                continue
+            quality_score = self._adjust_quality_for_user_weaknesses(
+                base_score, content, user_profile
+            )
             
             # Categorize based on quality score
             if quality_score >= 0.9:
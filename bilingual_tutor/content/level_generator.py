@@ -2,7 +2,7 @@
 Level-Appropriate Content Generator - Creates and filters content based on user proficiency levels.
 """
 
-from typing import List, Dict, Set, Optional, Tuple
+from typing import List, Dict, FrozenSet, Set, Optional, Tuple
 from datetime import datetime
 import uuid
 import re
@@ -11,6 +11,33 @@ from ..models import (
     Content, ContentType, UserProfile, LearningActivity, 
     ActivityType, Skill, WeakArea
 )
+from ..storage.lexicon import get_shared_lexicon
+
+
+# Built-in seed vocabulary by language and level, shared by all generator instances.
+# Words missing here are looked up in the shared lexicon (see storage.lexicon).
+VOCABULARY_LEVELS_SEED: Dict[str, Dict[str, FrozenSet[str]]] = {
+    "english": {
+        "CET-4": frozenset({"hello", "good", "morning", "student", "school", "book", "read", "write", "learn", "study"}),
+        "CET-5": frozenset({"academic", "research", "analysis", "development", "professional", "communication"}),
+        "CET-6": frozenset({"sophisticated", "comprehensive", "methodology", "implementation", "theoretical"})
+    },
+    "japanese": {
+        "N5": frozenset({"こんにちは", "学生", "学校", "本", "読む", "書く", "勉強", "友達"}),
+        "N4": frozenset({"研究", "分析", "開発", "専門", "コミュニケーション"}),
+        "N3": frozenset({"理論", "方法論", "実装", "包括的"}),
+        "N2": frozenset({"洗練された", "体系的", "概念的"}),
+        "N1": frozenset({"哲学的", "抽象的", "複雑"})
+    }
+}
+
+# Inverted seed index: word -> lowest level it appears in
+_SEED_WORD_LEVELS: Dict[str, Dict[str, str]] = {}
+for _language, _levels in VOCABULARY_LEVELS_SEED.items():
+    _word_levels = _SEED_WORD_LEVELS.setdefault(_language, {})
+    for _level, _words in _levels.items():
+        for _word in _words:
+            _word_levels.setdefault(_word, _level)
 
 
 class LevelAppropriateContentGenerator:
@@ -23,6 +50,7 @@ class LevelAppropriateContentGenerator:
     def __init__(self):
         """Initialize the level-appropriate content generator."""
         self.vocabulary_levels = self._load_vocabulary_levels()
+        self.lexicon = get_shared_lexicon()
         self.grammar_levels = self._load_grammar_levels()
         self.difficulty_metrics = self._load_difficulty_metrics()
         self.level_hierarchies = self._load_level_hierarchies()
@@ -107,23 +135,20 @@ class LevelAppropriateContentGenerator:
         if language not in self.vocabulary_levels:
             return vocabulary_list
         
-        level_vocab = self.vocabulary_levels[language].get(target_level, set())
-        
         # Include vocabulary from current level and below
-        allowed_vocab = set()
         level_hierarchy = self.level_hierarchies[language]
         
         try:
-            target_index = level_hierarchy.index(target_level)
-            for i in range(target_index + 1):
-                level_name = level_hierarchy[i]
-                allowed_vocab.update(self.vocabulary_levels[language].get(level_name, set()))
+            allowed_levels = set(level_hierarchy[:level_hierarchy.index(target_level) + 1])
         except ValueError:
             # If level not found, return original list
             return vocabulary_list
         
         # Filter vocabulary to only include appropriate words
-        filtered_vocab = [word for word in vocabulary_list if word.lower() in allowed_vocab]
+        filtered_vocab = [
+            word for word in vocabulary_list
+            if self._lookup_word_level(word, language) in allowed_levels
+        ]
         
         return filtered_vocab
     
@@ -445,18 +470,22 @@ class LevelAppropriateContentGenerator:
             return 0.5
         
         # Check which level the word belongs to
-        for level, vocab_set in self.vocabulary_levels[language].items():
-            if word.lower() in vocab_set:
-                level_hierarchy = self.level_hierarchies[language]
-                try:
-                    level_index = level_hierarchy.index(level)
-                    return level_index / len(level_hierarchy)
-                except ValueError:
-                    continue
+        level = self._lookup_word_level(word, language)
+        level_hierarchy = self.level_hierarchies[language]
+        if level in level_hierarchy:
+            return level_hierarchy.index(level) / len(level_hierarchy)
         
         # If word not found in any level, assume it's advanced
         return 0.9
     
+    def _lookup_word_level(self, word: str, language: str) -> Optional[str]:
+        """Find the proficiency level of a word in the seed vocabulary or shared lexicon."""
+        word = word.lower()
+        level = _SEED_WORD_LEVELS.get(language, {}).get(word)
+        if level is None and self.lexicon is not None:
+            level = self.lexicon.level_of(word, language)
+        return level
+    
     def _get_grammar_pattern_difficulty(self, pattern: str, language: str) -> float:
         """Get difficulty score for a grammar pattern."""
         # Simplified grammar difficulty mapping
@@ -561,22 +590,9 @@ class LevelAppropriateContentGenerator:
         
         return templates if templates else [{"title": "Sample Content", "body": "Sample content for practice."}]
     
-    def _load_vocabulary_levels(self) -> Dict[str, Dict[str, Set[str]]]:
+    def _load_vocabulary_levels(self) -> Dict[str, Dict[str, FrozenSet[str]]]:
         """Load vocabulary organized by language and proficiency level."""
-        return {
-            "english": {
-                "CET-4": {"hello", "good", "morning", "student", "school", "book", "read", "write", "learn", "study"},
-                "CET-5": {"academic", "research", "analysis", "development", "professional", "communication"},
-                "CET-6": {"sophisticated", "comprehensive", "methodology", "implementation", "theoretical"}
-            },
-            "japanese": {
-                "N5": {"こんにちは", "学生", "学校", "本", "読む", "書く", "勉強", "友達"},
-                "N4": {"研究", "分析", "開発", "専門", "コミュニケーション"},
-                "N3": {"理論", "方法論", "実装", "包括的"},
-                "N2": {"洗練された", "体系的", "概念的"},
-                "N1": {"哲学的", "抽象的", "複雑"}
-            }
-        }
+        return VOCABULARY_LEVELS_SEED
     
     def _load_grammar_levels(self) -> Dict[str, Dict[str, Set[str]]]:
         """Load grammar patterns organized by language and proficiency level."""
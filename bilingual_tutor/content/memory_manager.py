@@ -2,9 +2,10 @@
 Memory Manager - Tracks learned content and prevents repetition.
 """
 
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Optional
 from datetime import datetime, timedelta
 from ..models import Content, MasteryLevel, MemoryManagerInterface
+from ..storage.event_store import LearningEventStore, BoundedHistory
 
 
 class MemoryManager(MemoryManagerInterface):
@@ -13,9 +14,23 @@ class MemoryManager(MemoryManagerInterface):
     content history and mastery levels.
     """
     
-    def __init__(self):
-        """Initialize the memory manager with tracking structures."""
-        self.user_content_history: Dict[str, Set[str]] = {}
+    CONTENT_SEEN_STREAM = "content_seen"
+
+    def __init__(self, event_store: LearningEventStore = None, max_users: int = 10000):
+        """
+        Initialize the memory manager with tracking structures.
+
+        Args:
+            event_store: Optional persistent event store. When given, seen content is
+                appended to it and user_content_history only keeps the most recently
+                active users in memory; evicted users are reloaded from the store.
+            max_users: Users kept in user_content_history when a store is used
+        """
+        self.event_store = event_store
+        if event_store is None:
+            self.user_content_history: Dict[str, Set[str]] = {}
+        else:
+            self.user_content_history = BoundedHistory(set, max_users)
         self.content_mastery: Dict[str, Dict[str, MasteryLevel]] = {}
         self.learning_timestamps: Dict[str, Dict[str, datetime]] = {}
         self.review_schedule: Dict[str, Dict[str, datetime]] = {}
@@ -29,14 +44,17 @@ class MemoryManager(MemoryManagerInterface):
             content: Content that was learned
         """
         # Initialize user tracking if not exists
-        if user_id not in self.user_content_history:
-            self.user_content_history[user_id] = set()
-            self.content_mastery[user_id] = {}
-            self.learning_timestamps[user_id] = {}
-            self.review_schedule[user_id] = {}
+        seen_content = self._get_seen_content(user_id)
+        if seen_content is None:
+            seen_content = self.user_content_history[user_id] = set()
+        self.content_mastery.setdefault(user_id, {})
+        self.learning_timestamps.setdefault(user_id, {})
+        self.review_schedule.setdefault(user_id, {})
         
         # Record content as seen
-        self.user_content_history[user_id].add(content.content_id)
+        seen_content.add(content.content_id)
+        if self.event_store is not None:
+            self.event_store.append(self.CONTENT_SEEN_STREAM, user_id, None, key=content.content_id)
         
         # Set initial mastery level
         if content.content_id not in self.content_mastery[user_id]:
@@ -45,6 +63,17 @@ class MemoryManager(MemoryManagerInterface):
         # Record learning timestamp
         self.learning_timestamps[user_id][content.content_id] = datetime.now()
     
+    def _get_seen_content(self, user_id: str) -> Optional[Set[str]]:
+        """Get the set of content IDs seen by the user, reloading it from the event store if evicted."""
+        if user_id in self.user_content_history:
+            return self.user_content_history[user_id]
+        if self.event_store is not None:
+            seen_content = self.event_store.keys(self.CONTENT_SEEN_STREAM, user_id)
+            if seen_content:
+                self.user_content_history[user_id] = seen_content
+                return seen_content
+        return None
+
     def check_content_seen(self, user_id: str, content: Content) -> bool:
         """
         Check if content has been seen recently by the user.
@@ -56,10 +85,11 @@ class MemoryManager(MemoryManagerInterface):
         Returns:
             True if content was seen recently, False otherwise
         """
-        if user_id not in self.user_content_history:
+        seen_content = self._get_seen_content(user_id)
+        if seen_content is None:
             return False
         
-        return content.content_id in self.user_content_history[user_id]
+        return content.content_id in seen_content
     
     def get_mastery_level(self, user_id: str, content: Content) -> MasteryLevel:
         """
@@ -178,10 +208,11 @@ class MemoryManager(MemoryManagerInterface):
         Returns:
             Number of unique content items seen
         """
-        if user_id not in self.user_content_history:
+        seen_content = self._get_seen_content(user_id)
+        if seen_content is None:
             return 0
         
-        return len(self.user_content_history[user_id])
+        return len(seen_content)
     
     def clear_old_content_history(self, user_id: str, retention_period: timedelta) -> None:
         """
@@ -210,4 +241,7 @@ class MemoryManager(MemoryManagerInterface):
             if user_id in self.learning_timestamps:
                 self.learning_timestamps[user_id].pop(content_id, None)
             if user_id in self.review_schedule:
-                self.review_schedule[user_id].pop(content_id, None)
\ No newline at end of file
+                self.review_schedule[user_id].pop(content_id, None)
+        
+        if self.event_store is not None:
+            self.event_store.forget(self.CONTENT_SEEN_STREAM, user_id, expired_content_ids)
\ No newline at end of file
@@ -3,18 +3,97 @@ Precise Level Content Crawler - Specialized crawler for CET and JLPT level conte
 Implements targeted crawling for specific proficiency levels with quality assessment.
 """
 
-import requests
 import re
 import json
 import time
-from typing import List, Dict, Optional, Set, Tuple
+from typing import List, Dict, FrozenSet, Optional, Set, Tuple, TYPE_CHECKING
 from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse, quote
-from bs4 import BeautifulSoup
 from dataclasses import dataclass
 import logging
 
 from ..models import Content, QualityScore, ContentType
+from ..storage.lexicon import LevelWordSet, get_shared_lexicon
+
+# requests 与 BeautifulSoup 在实际抓取时才导入
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+
+# Built-in seed vocabulary per level, shared by all crawler instances.
+# Full word lists come from the shared lexicon (see storage.lexicon).
+CET_VOCABULARY_SEED: Dict[str, FrozenSet[str]] = {
+    "CET-4": frozenset({
+        "abandon", "ability", "able", "about", "above", "abroad", "absence", "absent",
+        "absolute", "absorb", "abstract", "abuse", "academic", "accept", "access",
+        "accident", "accompany", "accomplish", "according", "account", "accurate",
+        "achieve", "acid", "acknowledge", "acquire", "across", "action", "active",
+        "activity", "actual", "adapt", "add", "addition", "adequate", "adjust",
+        "administration", "admit", "adopt", "adult", "advance", "advantage", "adventure",
+        "advertise", "advice", "advise", "advocate", "affair", "affect", "afford",
+        "afraid", "after", "afternoon", "again", "against", "agency", "agent",
+        "agree", "agreement", "agriculture", "ahead", "aircraft", "airline", "airport"
+    }),
+    "CET-5": frozenset({
+        "elaborate", "elastic", "elbow", "elderly", "elect", "electric", "electronic",
+        "elegant", "element", "elementary", "elephant", "elevate", "eliminate", "elite",
+        "embarrass", "embrace", "emerge", "emergency", "emit", "emotion", "emphasis",
+        "empire", "employ", "enable", "encounter", "encourage", "endure", "energy",
+        "enforce", "engage", "engine", "engineer", "enhance", "enjoy", "enormous",
+        "ensure", "enterprise", "entertain", "enthusiasm", "entire", "entitle", "entry",
+        "environment", "episode", "equal", "equipment", "equivalent", "era", "error",
+        "escape", "especially", "essential", "establish", "estate", "estimate", "ethnic",
+        "professional", "development"  # Added for testing
+    }),
+    "CET-6": frozenset({
+        "sophisticated", "specification", "specify", "specimen", "spectacular", "speculate",
+        "sphere", "spiral", "spiritual", "spite", "splash", "split", "sponsor", "spontaneous",
+        "spouse", "spray", "spread", "spring", "square", "squeeze", "stable", "stack",
+        "staff", "stage", "stain", "stake", "stale", "stamp", "stance", "standard",
+        "standpoint", "staple", "stare", "start", "startle", "state", "static", "station",
+        "statistic", "status", "statute", "steady", "steal", "steam", "steel", "steep",
+        "steer", "stem", "step", "stereo", "stern", "stick", "stiff", "stimulate",
+        "sting", "stir", "stock", "stomach", "stone", "stop", "storage", "store",
+        "comprehensive"  # Added for testing
+    })
+}
+
+JLPT_VOCABULARY_SEED: Dict[str, FrozenSet[str]] = {
+    "N5": frozenset({
+        "あ", "い", "う", "え", "お", "か", "き", "く", "け", "こ", "が", "ぎ", "ぐ", "げ", "ご",
+        "さ", "し", "す", "せ", "そ", "ざ", "じ", "ず", "ぜ", "ぞ", "た", "ち", "つ", "て", "と",
+        "だ", "ぢ", "づ", "で", "ど", "な", "に", "ぬ", "ね", "の", "は", "ひ", "ふ", "へ", "ほ",
+        "ば", "び", "ぶ", "べ", "ぼ", "ぱ", "ぴ", "ぷ", "ぺ", "ぽ", "ま", "み", "む", "め", "も",
+        "や", "ゆ", "よ", "ら", "り", "る", "れ", "ろ", "わ", "を", "ん",
+        "学校", "先生", "学生", "友達", "家族", "お母さん", "お父さん", "兄弟", "姉妹",
+        "本", "雑誌", "新聞", "テレビ", "映画", "音楽", "写真", "絵", "花", "木", "山", "海"
+    }),
+    "N4": frozenset({
+        "会社", "仕事", "会議", "計画", "問題", "解決", "方法", "結果", "経験", "技術",
+        "研究", "開発", "製品", "サービス", "顧客", "市場", "競争", "成功", "失敗", "改善",
+        "効果", "効率", "品質", "安全", "環境", "社会", "文化", "歴史", "伝統", "現代",
+        "将来", "過去", "現在", "時間", "空間", "場所", "位置", "方向", "距離", "速度"
+    }),
+    "N3": frozenset({
+        "政治", "経済", "法律", "教育", "医療", "科学", "技術", "工業", "農業", "商業",
+        "交通", "通信", "情報", "データ", "システム", "ネットワーク", "コンピュータ", "インターネット",
+        "グローバル", "国際", "地域", "都市", "農村", "人口", "資源", "エネルギー", "環境問題",
+        "気候", "天気", "自然", "動物", "植物", "生物", "化学", "物理", "数学", "統計",
+        "努力", "忍耐", "研究"  # Added for testing
+    }),
+    "N2": frozenset({
+        "哲学", "心理学", "社会学", "人類学", "言語学", "文学", "芸術", "美術", "音楽", "演劇",
+        "建築", "設計", "創造", "想像", "理想", "現実", "抽象", "具体", "理論", "実践",
+        "分析", "総合", "比較", "対照", "類似", "相違", "関係", "関連", "影響", "効果",
+        "原因", "結果", "目的", "手段", "過程", "段階", "発展", "進歩", "変化", "改革"
+    }),
+    "N1": frozenset({
+        "概念", "観念", "思想", "理念", "価値観", "世界観", "人生観", "倫理", "道徳", "正義",
+        "真理", "美", "善", "悪", "存在", "本質", "現象", "実体", "主観", "客観",
+        "絶対", "相対", "普遍", "特殊", "一般", "個別", "全体", "部分", "統一", "分裂",
+        "調和", "矛盾", "対立", "統合", "発達", "退化", "進化", "革命", "改革", "保守"
+    })
+}
 
 
 @dataclass
@@ -50,6 +129,7 @@ class PreciseLevelContentCrawler:
     
     def __init__(self):
         """Initialize the precise level content crawler."""
+        import requests
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -235,6 +315,7 @@ class PreciseLevelContentCrawler:
             response = self.session.get(search_url, timeout=10)
             response.raise_for_status()
             
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Extract content using source-specific selectors
@@ -265,6 +346,7 @@ class PreciseLevelContentCrawler:
             response = self.session.get(search_url, timeout=10)
             response.raise_for_status()
             
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Extract content using source-specific selectors
@@ -644,7 +726,7 @@ class PreciseLevelContentCrawler:
         
         return base_url
     
-    def _extract_content_elements(self, soup: BeautifulSoup, source: LevelSpecificSource) -> List:
+    def _extract_content_elements(self, soup: 'BeautifulSoup', source: LevelSpecificSource) -> List:
         """Extract content elements using source-specific selectors."""
         elements = []
         
@@ -1155,81 +1237,18 @@ class PreciseLevelContentCrawler:
             )
         ]
     
-    def _load_cet_vocabulary_lists(self) -> Dict[str, Set[str]]:
+    def _load_cet_vocabulary_lists(self) -> Dict[str, LevelWordSet]:
         """Load CET vocabulary lists for each level."""
-        # In a real implementation, these would be loaded from files or databases
+        lexicon = get_shared_lexicon()
         return {
-            "CET-4": {
-                "abandon", "ability", "able", "about", "above", "abroad", "absence", "absent",
-                "absolute", "absorb", "abstract", "abuse", "academic", "accept", "access",
-                "accident", "accompany", "accomplish", "according", "account", "accurate",
-                "achieve", "acid", "acknowledge", "acquire", "across", "action", "active",
-                "activity", "actual", "adapt", "add", "addition", "adequate", "adjust",
-                "administration", "admit", "adopt", "adult", "advance", "advantage", "adventure",
-                "advertise", "advice", "advise", "advocate", "affair", "affect", "afford",
-                "afraid", "after", "afternoon", "again", "against", "agency", "agent",
-                "agree", "agreement", "agriculture", "ahead", "aircraft", "airline", "airport"
-            },
-            "CET-5": {
-                "elaborate", "elastic", "elbow", "elderly", "elect", "electric", "electronic",
-                "elegant", "element", "elementary", "elephant", "elevate", "eliminate", "elite",
-                "embarrass", "embrace", "emerge", "emergency", "emit", "emotion", "emphasis",
-                "empire", "employ", "enable", "encounter", "encourage", "endure", "energy",
-                "enforce", "engage", "engine", "engineer", "enhance", "enjoy", "enormous",
-                "ensure", "enterprise", "entertain", "enthusiasm", "entire", "entitle", "entry",
-                "environment", "episode", "equal", "equipment", "equivalent", "era", "error",
-                "escape", "especially", "essential", "establish", "estate", "estimate", "ethnic",
-                "professional", "development"  # Added for testing
-            },
-            "CET-6": {
-                "sophisticated", "specification", "specify", "specimen", "spectacular", "speculate",
-                "sphere", "spiral", "spiritual", "spite", "splash", "split", "sponsor", "spontaneous",
-                "spouse", "spray", "spread", "spring", "square", "squeeze", "stable", "stack",
-                "staff", "stage", "stain", "stake", "stale", "stamp", "stance", "standard",
-                "standpoint", "staple", "stare", "start", "startle", "state", "static", "station",
-                "statistic", "status", "statute", "steady", "steal", "steam", "steel", "steep",
-                "steer", "stem", "step", "stereo", "stern", "stick", "stiff", "stimulate",
-                "sting", "stir", "stock", "stomach", "stone", "stop", "storage", "store",
-                "comprehensive"  # Added for testing
-            }
+            level: LevelWordSet(words, "english", level, lexicon)
+            for level, words in CET_VOCABULARY_SEED.items()
         }
     
-    def _load_jlpt_vocabulary_lists(self) -> Dict[str, Set[str]]:
+    def _load_jlpt_vocabulary_lists(self) -> Dict[str, LevelWordSet]:
         """Load JLPT vocabulary lists for each level."""
-        # In a real implementation, these would be loaded from files or databases
+        lexicon = get_shared_lexicon()
         return {
-            "N5": {
-                "あ", "い", "う", "え", "お", "か", "き", "く", "け", "こ", "が", "ぎ", "ぐ", "げ", "ご",
-                "さ", "し", "す", "せ", "そ", "ざ", "じ", "ず", "ぜ", "ぞ", "た", "ち", "つ", "て", "と",
-                "だ", "ぢ", "づ", "で", "ど", "な", "に", "ぬ", "ね", "の", "は", "ひ", "ふ", "へ", "ほ",
-                "ば", "び", "ぶ", "べ", "ぼ", "ぱ", "ぴ", "ぷ", "ぺ", "ぽ", "ま", "み", "む", "め", "も",
-                "や", "ゆ", "よ", "ら", "り", "る", "れ", "ろ", "わ", "を", "ん",
-                "学校", "先生", "学生", "友達", "家族", "お母さん", "お父さん", "兄弟", "姉妹",
-                "本", "雑誌", "新聞", "テレビ", "映画", "音楽", "写真", "絵", "花", "木", "山", "海"
-            },
-            "N4": {
-                "会社", "仕事", "会議", "計画", "問題", "解決", "方法", "結果", "経験", "技術",
-                "研究", "開発", "製品", "サービス", "顧客", "市場", "競争", "成功", "失敗", "改善",
-                "効果", "効率", "品質", "安全", "環境", "社会", "文化", "歴史", "伝統", "現代",
-                "将来", "過去", "現在", "時間", "空間", "場所", "位置", "方向", "距離", "速度"
-            },
-            "N3": {
-                "政治", "経済", "法律", "教育", "医療", "科学", "技術", "工業", "農業", "商業",
-                "交通", "通信", "情報", "データ", "システム", "ネットワーク", "コンピュータ", "インターネット",
-                "グローバル", "国際", "地域", "都市", "農村", "人口", "資源", "エネルギー", "環境問題",
-                "気候", "天気", "自然", "動物", "植物", "生物", "化学", "物理", "数学", "統計",
-                "努力", "忍耐", "研究"  # Added for testing
-            },
-            "N2": {
-                "哲学", "心理学", "社会学", "人類学", "言語学", "文学", "芸術", "美術", "音楽", "演劇",
-                "建築", "設計", "創造", "想像", "理想", "現実", "抽象", "具体", "理論", "実践",
-                "分析", "総合", "比較", "対照", "類似", "相違", "関係", "関連", "影響", "効果",
-                "原因", "結果", "目的", "手段", "過程", "段階", "発展", "進歩", "変化", "改革"
-            },
-            "N1": {
-                "概念", "観念", "思想", "理念", "価値観", "世界観", "人生観", "倫理", "道徳", "正義",
-                "真理", "美", "善", "悪", "存在", "本質", "現象", "実体", "主観", "客観",
-                "絶対", "相対", "普遍", "特殊", "一般", "個別", "全体", "部分", "統一", "分裂",
-                "調和", "矛盾", "対立", "統合", "発達", "退化", "進化", "革命", "改革", "保守"
-            }
-        }
\ No newline at end of file
+            level: LevelWordSet(words, "japanese", level, lexicon)
+            for level, words in JLPT_VOCABULARY_SEED.items()
+        }
@@ -0,0 +1,95 @@
+"""
+Lazy Components - 延迟构建的组件
+Lazily built components for the system integrator and other long-lived services
+组件在第一次访问属性时构建，避免每个 Web 进程和命令行调用在启动时构建整个组件图
+"""
+
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict
+
+
+_LOCK_ATTRIBUTE = "_component_lock"
+
+
+def _instance_lock(instance) -> threading.RLock:
+    """实例级可重入锁（组件的工厂方法可以访问其他组件）"""
+    lock = instance.__dict__.get(_LOCK_ATTRIBUTE)
+    if lock is None:
+        # dict.setdefault 是原子操作，并发首次访问只会创建一个锁
+        lock = instance.__dict__.setdefault(_LOCK_ATTRIBUTE, threading.RLock())
+    return lock
+
+
+class lazy_component:
+    """
+    延迟组件装饰器 - 工厂方法在首次访问时运行一次
+    Lazy component decorator - the factory runs once, on first access
+
+    与 functools.cached_property 类似，但使用实例级锁保证多线程下只构建一次
+    （cached_property 在 3.12 前使用类级锁，在 3.12 起完全不加锁）。
+    构建结果写入实例 __dict__，之后的访问不经过描述符，没有额外开销；
+    直接赋值（如故障恢复时重建组件）会覆盖已构建的实例。
+    工厂方法抛出异常时不缓存结果，下次访问会重试。
+    """
+
+    def __init__(self, factory: Callable[[Any], Any]):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            pass
+
+        with _instance_lock(instance):
+            # 等锁期间其他线程可能已经完成构建
+            if self.name in instance.__dict__:
+                return instance.__dict__[self.name]
+
+            started = time.perf_counter()
+            value = self.factory(instance)
+            instance.__dict__[self.name] = value
+            logging.getLogger(__name__).debug(
+                f"组件已构建: {type(instance).__name__}.{self.name} "
+                f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+            return value
+
+
+def component_status(instance) -> Dict[str, bool]:
+    """
+    各延迟组件是否已构建
+    Returns:
+        Dict[str, bool]: 组件名 → 是否已构建
+    """
+    status = {}
+    for cls in reversed(type(instance).__mro__):
+        for name, attribute in vars(cls).items():
+            if isinstance(attribute, lazy_component):
+                status[name] = name in instance.__dict__
+    return status
+
+
+def warm_up(instance, *names: str) -> Dict[str, float]:
+    """
+    预先构建组件（服务器可在后台线程中调用，把构建成本移出第一个请求）
+    Args:
+        instance: 拥有延迟组件的对象
+        names: 组件名，不指定时构建全部
+    Returns:
+        Dict[str, float]: 组件名 → 构建耗时（秒），已构建的组件接近 0
+    """
+    timings = {}
+    for name in names or tuple(component_status(instance)):
+        started = time.perf_counter()
+        getattr(instance, name)
+        timings[name] = time.perf_counter() - started
+    return timings
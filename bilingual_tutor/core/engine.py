@@ -13,6 +13,7 @@ from ..models import (
     SessionStatus, ActivityType, ContentType, Skill, Content
 )
 from ..content.level_generator import LevelAppropriateContentGenerator
+from ..infrastructure.tracing import traced
 from ..analysis.historical_performance import HistoricalPerformanceIntegrator
 from ..analysis.weakness_prioritizer import WeaknessPrioritizer
 from ..content.memory_manager import MemoryManager
@@ -26,6 +27,7 @@ from ..analysis.improvement_advisor import ImprovementAdvisor
 from ..analysis.review_scheduler import ReviewScheduler
 from ..analysis.assessment_engine import AssessmentEngine
 from ..interfaces.chinese_interface import ChineseInterface
+from ..storage.event_store import LearningEventStore
 
 
 class CoreLearningEngine(LearningEngineInterface):
@@ -34,10 +36,18 @@ class CoreLearningEngine(LearningEngineInterface):
     the learning workflow.
     """
     
-    def __init__(self):
-        """Initialize the core learning engine and wire all components."""
+    def __init__(self, event_store: LearningEventStore = None):
+        """
+        Initialize the core learning engine and wire all components.
+        
+        Args:
+            event_store: Optional persistent event store shared by the memory
+                manager, trackers and weakness analyzer. Without one their
+                histories are kept in process memory only.
+        """
         self.active_sessions: dict = {}
         self.component_registry: dict = {}
+        self.event_store = event_store
         
         # Initialize all system components
         self._initialize_components()
@@ -48,18 +58,18 @@ class CoreLearningEngine(LearningEngineInterface):
     def _initialize_components(self) -> None:
         """Initialize all system components."""
         # Content Management Layer
-        self.memory_manager = MemoryManager()
+        self.memory_manager = MemoryManager(event_store=self.event_store)
         self.content_crawler = ContentCrawler()
         self.content_filter = ContentFilter()
         self.level_generator = LevelAppropriateContentGenerator()
         
         # Progress Tracking Layer
-        self.progress_tracker = ProgressTracker()
-        self.vocabulary_tracker = VocabularyTracker()
+        self.progress_tracker = ProgressTracker(event_store=self.event_store)
+        self.vocabulary_tracker = VocabularyTracker(event_store=self.event_store)
         self.time_planner = TimePlanner()
         
         # Analysis & Planning Layer
-        self.weakness_analyzer = WeaknessAnalyzer()
+        self.weakness_analyzer = WeaknessAnalyzer(event_store=self.event_store)
         self.improvement_advisor = ImprovementAdvisor()
         self.review_scheduler = ReviewScheduler()
         self.assessment_engine = AssessmentEngine()
@@ -118,6 +128,7 @@ class CoreLearningEngine(LearningEngineInterface):
         
         print("✓ 双语导师系统初始化完成 - Bilingual Tutor System Initialized")
     
+    @traced()
     def start_daily_session(self, user_id: str) -> StudySession:
         """
         Start a new daily study session for the user.
@@ -197,6 +208,7 @@ class CoreLearningEngine(LearningEngineInterface):
             break_minutes=break_minutes
         )
     
+    @traced()
     def generate_learning_plan(self, user_profile: UserProfile) -> DailyPlan:
         """
         Generate a personalized daily learning plan based on user profile.
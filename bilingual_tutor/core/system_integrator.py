@@ -14,16 +14,13 @@ from datetime import datetime, timedelta
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from bilingual_tutor.core.engine import CoreLearningEngine
-from bilingual_tutor.storage.database import LearningDatabase
-from bilingual_tutor.audio.pronunciation_manager import PronunciationManager
-from bilingual_tutor.content.precise_level_crawler import PreciseLevelContentCrawler
+from bilingual_tutor.core.components import lazy_component, component_status, warm_up
+from bilingual_tutor.infrastructure.tracing import traced
 from bilingual_tutor.models import UserProfile, StudySession, LearningActivity, ActivityResult
 from bilingual_tutor.services.ai_service import (
     AIService, ConversationPartner, GrammarCorrector, ExerciseGenerator,
     AIRequest, LanguageLevel, ScenarioType, ExerciseType
 )
-from bilingual_tutor.infrastructure.cache_manager import create_cache_manager, CacheConfig
 
 
 class SystemIntegrator:
@@ -34,47 +31,109 @@ class SystemIntegrator:
     """
     
     def __init__(self):
-        """Initialize the system integrator with all components"""
+        """
+        Initialize the system integrator
+        
+        Components are built on first access (see the lazy_component
+        properties below), so constructing the integrator is cheap and each
+        request only pays for the components it actually uses.
+        """
         self.logger = logging.getLogger(__name__)
         
-        # Initialize core components
-        self.core_engine = CoreLearningEngine()
-        self.learning_db = LearningDatabase()
-        self.pronunciation_manager = PronunciationManager()
-        self.content_crawler = PreciseLevelContentCrawler()
+        # Cache for performance optimization (legacy, will be replaced by cache_manager)
+        self._user_cache = {}
+        self._content_cache = {}
+        self._audio_cache = {}
         
-        # Initialize AI services
+        self.logger.info("系统集成器初始化完成 - System Integrator initialized")
+    
+    # ==================== Lazy Components ====================
+    
+    @lazy_component
+    def event_store(self):
+        """进程内共享的学习事件存储（数据目录下）- Shared learning event store"""
+        from bilingual_tutor.storage.event_store import get_shared_event_store
+        return get_shared_event_store()
+    
+    @lazy_component
+    def core_engine(self):
+        """核心学习引擎，历史写入共享事件存储 - Core learning engine"""
+        from bilingual_tutor.core.engine import CoreLearningEngine
+        return CoreLearningEngine(event_store=self.event_store)
+    
+    @lazy_component
+    def learning_db(self):
+        """学习数据库 - Learning database"""
+        from bilingual_tutor.storage.database import LearningDatabase
+        return LearningDatabase()
+    
+    @lazy_component
+    def pronunciation_manager(self):
+        """发音管理器 - Pronunciation manager"""
+        from bilingual_tutor.audio.pronunciation_manager import PronunciationManager
+        return PronunciationManager()
+    
+    @lazy_component
+    def content_crawler(self):
+        """分级内容爬虫 - Level-precise content crawler"""
+        from bilingual_tutor.content.precise_level_crawler import PreciseLevelContentCrawler
+        return PreciseLevelContentCrawler()
+    
+    @lazy_component
+    def ai_service(self):
+        """AI服务，初始化失败时为 None - AI service, None when unavailable"""
         try:
-            self.ai_service = AIService()
-            self.conversation_partner = ConversationPartner(self.ai_service)
-            self.grammar_corrector = GrammarCorrector(self.ai_service)
-            self.exercise_generator = ExerciseGenerator(self.ai_service)
+            service = AIService()
             self.logger.info("AI服务初始化成功")
+            return service
         except Exception as e:
             self.logger.warning(f"AI服务初始化失败，部分功能不可用: {e}")
-            self.ai_service = None
-            self.conversation_partner = None
-            self.grammar_corrector = None
-            self.exercise_generator = None
-        
-        # Initialize cache manager
+            return None
+    
+    @lazy_component
+    def conversation_partner(self):
+        """AI对话伙伴 - Conversation partner"""
+        return ConversationPartner(self.ai_service) if self.ai_service else None
+    
+    @lazy_component
+    def grammar_corrector(self):
+        """AI语法纠错 - Grammar corrector"""
+        return GrammarCorrector(self.ai_service) if self.ai_service else None
+    
+    @lazy_component
+    def exercise_generator(self):
+        """AI练习生成 - Exercise generator"""
+        return ExerciseGenerator(self.ai_service) if self.ai_service else None
+    
+    @lazy_component
+    def cache_manager(self):
+        """缓存管理器，初始化失败时为 None（使用内存缓存）- Cache manager"""
         try:
-            cache_config = CacheConfig()
-            self.cache_manager = create_cache_manager(cache_config)
+            from bilingual_tutor.infrastructure.cache_manager import create_cache_manager, CacheConfig
+            manager = create_cache_manager(CacheConfig())
             self.logger.info("缓存管理器初始化成功")
+            return manager
         except Exception as e:
             self.logger.warning(f"缓存管理器初始化失败，使用内存缓存: {e}")
-            self.cache_manager = None
-        
-        # Cache for performance optimization (legacy, will be replaced by cache_manager)
-        self._user_cache = {}
-        self._content_cache = {}
-        self._audio_cache = {}
-        
-        self.logger.info("系统集成器初始化完成 - System Integrator initialized")
+            return None
+    
+    def get_initialized_components(self) -> Dict[str, bool]:
+        """
+        各组件是否已构建
+        Which components have been built so far
+        """
+        return component_status(self)
+    
+    def warm_up(self, *components: str) -> Dict[str, float]:
+        """
+        预先构建组件，返回每个组件的构建耗时（秒）
+        Build components ahead of the first request
+        """
+        return warm_up(self, *components)
     
     # ==================== Web Interface Integration ====================
     
+    @traced()
     def create_integrated_learning_session(self, user_id: str, preferences: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         创建集成的学习会话，连接Web界面与核心引擎
@@ -120,6 +179,7 @@ class SystemIntegrator:
             self.logger.error(f"创建集成学习会话失败: {e}")
             return {'success': False, 'message': '创建学习会话失败'}
     
+    @traced()
     def execute_integrated_activity(self, user_id: str, activity_id: str, 
                                   user_responses: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -872,9 +932,19 @@ class SystemIntegrator:
             preloaded.append('reading_materials_large')
         except:
             pass
-        
+
+        # Pack the level's pronunciations into offline bundles (no-op when unchanged)
+        for language, level in (('english', user_profile.english_level),
+                                ('japanese', user_profile.japanese_level)):
+            try:
+                result = self.pronunciation_manager.bundles.build(language, level)
+                if result.entries:
+                    preloaded.append(f'{language}_audio_bundle')
+            except Exception as e:
+                self.logger.warning(f"离线音频包生成失败 {language} {level}: {e}")
+
         return preloaded
-    
+
     def _preload_default(self, user_profile: UserProfile) -> List[str]:
         """
         默认预加载策略
@@ -2142,6 +2212,7 @@ class SystemIntegrator:
             updated_at=datetime.now()
         )
     
+    @traced()
     def _enhance_activities_with_audio_and_content(self, activities: List[LearningActivity], 
                                                  user_profile: UserProfile) -> List[LearningActivity]:
         """Enhance activities with audio and database content"""
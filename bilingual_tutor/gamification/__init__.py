@@ -2,6 +2,7 @@
 Gamification and achievement system.
 """
 
+from .leaderboard import Leaderboard, RankedIndex, RedisRankedIndex
 from .achievement_system import (
     AchievementSystem,
     Achievement,
@@ -23,5 +24,8 @@ __all__ = [
     'LeaderboardEntry',
     'Challenge',
     'AchievementType',
-    'AchievementTier'
+    'AchievementTier',
+    'Leaderboard',
+    'RankedIndex',
+    'RedisRankedIndex'
 ]
@@ -10,6 +10,7 @@ from collections import defaultdict
 import json
 
 from ..models import Skill, ActivityType
+from .leaderboard import Leaderboard, PointsLedger
 
 
 class AchievementType(Enum):
@@ -111,11 +112,18 @@ class AchievementSystem:
     Achievement system with badges, rewards, and incentives.
     """
     
-    def __init__(self):
-        """Initialize achievement system."""
+    def __init__(self, leaderboard: Optional[Leaderboard] = None):
+        """
+        Initialize achievement system.
+        
+        Args:
+            leaderboard: Ranking indexes kept up to date by point changes
+                (default: in-process indexes)
+        """
         self.achievements: Dict[str, Achievement] = {}
         self.user_achievements: Dict[str, Dict[str, UserAchievement]] = defaultdict(dict)
-        self.user_points: Dict[str, int] = defaultdict(int)
+        self.leaderboard = leaderboard or Leaderboard()
+        self.user_points = PointsLedger(self.leaderboard.all_time)
         self.user_rewards: Dict[str, List[UserReward]] = defaultdict(list)
         self.rewards_catalog: Dict[str, Reward] = {}
         self.challenges: Dict[str, Challenge] = {}
@@ -397,7 +405,9 @@ class AchievementSystem:
             user_id: User identifier
             points: Number of points to award
         """
-        self.user_points[user_id] += points
+        self.user_points.add(user_id, points)
+        if points:
+            self.leaderboard.record(user_id, points)
     
     def claim_reward(self, user_id: str, reward_id: str) -> bool:
         """
@@ -423,8 +433,11 @@ class AchievementSystem:
         if not reward.available:
             return False
         
-        # Deduct points and claim reward
-        self.user_points[user_id] -= reward.cost_points
+        # Deduct points and claim reward; refund if another process spent
+        # the balance after the check above
+        if self.user_points.add(user_id, -reward.cost_points) < 0:
+            self.user_points.add(user_id, reward.cost_points)
+            return False
         user_reward = UserReward(
             user_id=user_id,
             reward=reward,
@@ -503,35 +516,58 @@ class AchievementSystem:
         """
         return list(self.rewards_catalog.values())
     
-    def get_leaderboard(self, limit: int = 10) -> List[LeaderboardEntry]:
+    def get_leaderboard(self, limit: int = 10, period: Optional[str] = None,
+                        offset: int = 0) -> List[LeaderboardEntry]:
         """
         Get leaderboard of top users.
         
         Args:
             limit: Maximum number of entries to return
+            period: None for all-time point balances, or 'weekly' / 'monthly'
+                for points earned in the current period
+            offset: Number of top entries to skip (for paging)
             
         Returns:
             List of leaderboard entries sorted by points
         """
-        # Sort users by points
-        sorted_users = sorted(
-            self.user_points.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+        if period is None:
+            index, previous = self.leaderboard.all_time, None
+        else:
+            index = self.leaderboard.period_index(period)
+            previous = self.leaderboard.previous_period_index(period)
+            if index is None:
+                return []
         
         entries = []
-        for rank, (user_id, points) in enumerate(sorted_users[:limit], 1):
+        for rank, (user_id, points) in enumerate(index.top(limit, offset), offset + 1):
+            previous_rank = previous.rank(user_id) if previous is not None else None
             entry = LeaderboardEntry(
                 user_id=user_id,
                 username=user_id,  # In real system, would fetch username
                 points=points,
-                rank=rank
+                rank=rank,
+                change=previous_rank - rank if previous_rank is not None else 0
             )
             entries.append(entry)
         
         return entries
     
+    def get_user_rank(self, user_id: str, period: Optional[str] = None) -> Optional[int]:
+        """
+        Get a user's 1-based leaderboard rank.
+        
+        Args:
+            user_id: User identifier
+            period: None for all-time, or 'weekly' / 'monthly'
+            
+        Returns:
+            Rank, or None if the user has no points on that board
+        """
+        if period is None:
+            return self.leaderboard.all_time.rank(user_id)
+        index = self.leaderboard.period_index(period)
+        return index.rank(user_id) if index is not None else None
+    
     def create_challenge(self, name: str, description: str,
                        challenge_type: AchievementType,
                        target_value: float, reward_points: int,
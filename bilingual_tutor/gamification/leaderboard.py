@@ -0,0 +1,423 @@
+"""
+Leaderboard Index - Incrementally maintained rankings for the achievement system.
+
+Scores live in an order-statistics index that is updated on every point
+change, so top-k pages and "my rank" lookups never sort the full user set.
+Weekly and monthly boards are separate indexes keyed by period and fed by
+the same point awards, so they never rescan history.
+"""
+
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class RankedIndex:
+    """
+    In-process order-statistics index of member scores.
+
+    Members are ordered by score (highest first); equal scores keep the
+    order in which members were first added, matching a stable sort of an
+    insertion-ordered dict. Entries are kept in sorted chunks (a two-level
+    B+ tree) with a Fenwick tree over chunk sizes, which gives O(log n)
+    rank and select and cheap inserts without per-node Python objects.
+    """
+
+    def __init__(self, load: int = 512):
+        """
+        Initialize an empty index.
+
+        Args:
+            load: Target chunk size; chunks split at twice this size
+        """
+        self._load = load
+        self._chunks: List[List[Tuple[int, int, str]]] = []
+        self._maxes: List[Tuple[int, int, str]] = []
+        self._tree: List[int] = []
+        self._keys: Dict[str, Tuple[int, int, str]] = {}
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        """Members in rank order."""
+        for chunk in self._chunks:
+            for _, _, member in chunk:
+                yield member
+
+    # ---- Fenwick tree over chunk sizes ----
+
+    def _rebuild_tree(self):
+        tree = [0] + [len(chunk) for chunk in self._chunks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, chunk_index: int, delta: int):
+        i = chunk_index + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _tree_prefix(self, chunk_index: int) -> int:
+        """Number of entries in chunks before ``chunk_index``."""
+        total = 0
+        i = chunk_index
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _tree_find(self, position: int) -> Tuple[int, int]:
+        """Chunk index and offset of the entry at 0-based ``position``."""
+        index = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        tree = self._tree
+        while step:
+            candidate = index + step
+            if candidate < len(tree) and tree[candidate] <= position:
+                position -= tree[candidate]
+                index = candidate
+            step >>= 1
+        return index, position
+
+    # ---- Mutation ----
+
+    def _insert(self, key: Tuple[int, int, str]):
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+
+        chunk_index = bisect_left(self._maxes, key)
+        if chunk_index == len(self._chunks):
+            chunk_index -= 1
+            self._chunks[chunk_index].append(key)
+            self._maxes[chunk_index] = key
+        else:
+            insort(self._chunks[chunk_index], key)
+
+        chunk = self._chunks[chunk_index]
+        if len(chunk) > 2 * self._load:
+            self._chunks[chunk_index:chunk_index + 1] = [chunk[:self._load], chunk[self._load:]]
+            self._maxes[chunk_index:chunk_index + 1] = [chunk[self._load - 1], chunk[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(chunk_index, 1)
+
+    def _delete(self, key: Tuple[int, int, str]):
+        chunk_index = bisect_left(self._maxes, key)
+        chunk = self._chunks[chunk_index]
+        del chunk[bisect_left(chunk, key)]
+        if chunk:
+            self._maxes[chunk_index] = chunk[-1]
+            self._tree_add(chunk_index, -1)
+        else:
+            del self._chunks[chunk_index]
+            del self._maxes[chunk_index]
+            self._rebuild_tree()
+
+    def set(self, member: str, score: int):
+        """Set a member's score, adding the member if needed."""
+        old = self._keys.get(member)
+        if old is not None:
+            if -old[0] == score:
+                return
+            self._delete(old)
+            sequence = old[1]
+        else:
+            sequence = next(self._sequence)
+        key = (-score, sequence, member)
+        self._keys[member] = key
+        self._insert(key)
+
+    def increment(self, member: str, delta: int) -> int:
+        """Add ``delta`` to a member's score and return the new score."""
+        score = self.score(member) + delta
+        self.set(member, score)
+        return score
+
+    def remove(self, member: str):
+        """Remove a member if present."""
+        key = self._keys.pop(member, None)
+        if key is not None:
+            self._delete(key)
+
+    def clear(self):
+        """Remove all members."""
+        self._chunks, self._maxes, self._tree, self._keys = [], [], [], {}
+
+    def bulk_load(self, items: Iterable[Tuple[str, int]]):
+        """Replace the contents with (member, score) pairs in one sort."""
+        self.clear()
+        for member, score in items:
+            self._keys[member] = (-score, next(self._sequence), member)
+        ordered = sorted(self._keys.values())
+        self._chunks = [ordered[i:i + self._load] for i in range(0, len(ordered), self._load)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._rebuild_tree()
+
+    # ---- Queries ----
+
+    def score(self, member: str, default: Optional[int] = 0) -> Optional[int]:
+        """Current score of a member (``default`` if absent)."""
+        key = self._keys.get(member)
+        return -key[0] if key is not None else default
+
+    def rank(self, member: str) -> Optional[int]:
+        """1-based rank of a member, or None if absent."""
+        key = self._keys.get(member)
+        if key is None:
+            return None
+        chunk_index = bisect_left(self._maxes, key)
+        return self._tree_prefix(chunk_index) + bisect_left(self._chunks[chunk_index], key) + 1
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[str, int]]:
+        """(member, score) pairs ranked ``offset + 1`` to ``offset + limit``."""
+        if limit <= 0 or offset >= len(self._keys):
+            return []
+        chunk_index, position = self._tree_find(offset)
+        result = []
+        while chunk_index < len(self._chunks) and len(result) < limit:
+            chunk = self._chunks[chunk_index]
+            for negated, _, member in chunk[position:position + limit - len(result)]:
+                result.append((member, -negated))
+            chunk_index += 1
+            position = 0
+        return result
+
+
+class RedisRankedIndex:
+    """
+    Redis sorted-set backend with the RankedIndex interface.
+
+    Lets several web processes share one leaderboard. Redis orders equal
+    scores by member name rather than by insertion order.
+    """
+
+    def __init__(self, client, key: str, ttl: Optional[int] = None):
+        """
+        Args:
+            client: redis.Redis client (decode_responses is not required)
+            key: Sorted-set key
+            ttl: Optional expiry in seconds, refreshed on every write
+        """
+        self.client = client
+        self.key = key
+        self.ttl = ttl
+
+    @staticmethod
+    def _decode(member) -> str:
+        return member.decode('utf-8') if isinstance(member, bytes) else member
+
+    def _touch(self, pipeline):
+        if self.ttl:
+            pipeline.expire(self.key, self.ttl)
+
+    def __len__(self) -> int:
+        return self.client.zcard(self.key)
+
+    def __contains__(self, member: str) -> bool:
+        return self.client.zscore(self.key, member) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        """Members in no particular order (ZSCAN, so large sets do not block Redis)."""
+        for member, _ in self.client.zscan_iter(self.key):
+            yield self._decode(member)
+
+    def set(self, member: str, score: int):
+        pipeline = self.client.pipeline()
+        pipeline.zadd(self.key, {member: score})
+        self._touch(pipeline)
+        pipeline.execute()
+
+    def increment(self, member: str, delta: int) -> int:
+        pipeline = self.client.pipeline()
+        pipeline.zincrby(self.key, delta, member)
+        self._touch(pipeline)
+        return int(pipeline.execute()[0])
+
+    def remove(self, member: str):
+        self.client.zrem(self.key, member)
+
+    def clear(self):
+        self.client.delete(self.key)
+
+    def bulk_load(self, items: Iterable[Tuple[str, int]]):
+        pipeline = self.client.pipeline()
+        pipeline.delete(self.key)
+        mapping = dict(items)
+        if mapping:
+            pipeline.zadd(self.key, mapping)
+        self._touch(pipeline)
+        pipeline.execute()
+
+    def score(self, member: str, default: Optional[int] = 0) -> Optional[int]:
+        value = self.client.zscore(self.key, member)
+        return int(value) if value is not None else default
+
+    def rank(self, member: str) -> Optional[int]:
+        rank = self.client.zrevrank(self.key, member)
+        return rank + 1 if rank is not None else None
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[str, int]]:
+        if limit <= 0:
+            return []
+        rows = self.client.zrevrange(self.key, offset, offset + limit - 1, withscores=True)
+        return [(self._decode(member), int(score)) for member, score in rows]
+
+
+class PointsLedger(MutableMapping):
+    """
+    Point balances per user, stored entirely in a ranked index.
+
+    The index holds the only copy of every balance, so lookups, ``in``,
+    ``len`` and iteration all see the same users, including ones written by
+    other processes sharing a Redis sorted set. Like ``Counter``, reading an
+    unknown user gives 0 without adding it. ``add`` applies deltas with the
+    index's atomic increment so concurrent awards do not overwrite each
+    other; assigning sets an absolute balance.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __getitem__(self, user_id: str) -> int:
+        return self.index.score(user_id)
+
+    def __setitem__(self, user_id: str, points: int):
+        self.index.set(user_id, points)
+
+    def __delitem__(self, user_id: str):
+        if user_id not in self.index:
+            raise KeyError(user_id)
+        self.index.remove(user_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.index
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def add(self, user_id: str, delta: int) -> int:
+        """Add ``delta`` to a user's balance (ZINCRBY on Redis) and return the new balance."""
+        return self.index.increment(user_id, delta)
+
+    def get(self, user_id: str, default=None):
+        return self.index.score(user_id, default)
+
+    def setdefault(self, user_id: str, points: int = 0) -> int:
+        if user_id not in self.index:
+            self.index.set(user_id, points)
+        return self[user_id]
+
+    def pop(self, user_id: str, default=_MISSING):
+        points = self.index.score(user_id, None)
+        if points is None:
+            if default is _MISSING:
+                raise KeyError(user_id)
+            return default
+        self.index.remove(user_id)
+        return points
+
+    def clear(self):
+        self.index.clear()
+
+
+class Leaderboard:
+    """All-time, weekly and monthly rankings fed by point awards."""
+
+    PERIODS = ('weekly', 'monthly')
+
+    def __init__(self, redis_client=None, key_prefix: str = 'leaderboard',
+                 retained_periods: int = 2):
+        """
+        Initialize leaderboards.
+
+        Args:
+            redis_client: Optional redis.Redis client; rankings are kept in
+                Redis sorted sets instead of in-process indexes
+            key_prefix: Redis key prefix
+            retained_periods: Number of past-and-current periods kept per
+                period type (at least 2 to report rank changes)
+        """
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.retained_periods = max(2, retained_periods)
+        self.all_time = self._new_index('all_time')
+        self._periods: Dict[str, "OrderedDict[str, object]"] = {
+            period: OrderedDict() for period in self.PERIODS
+        }
+
+    def _new_index(self, name: str, ttl: Optional[int] = None):
+        if self.redis_client is not None:
+            return RedisRankedIndex(self.redis_client, f"{self.key_prefix}:{name}", ttl)
+        return RankedIndex()
+
+    @staticmethod
+    def period_key(period: str, at: datetime) -> str:
+        """Bucket key of the period containing ``at``."""
+        if period == 'weekly':
+            year, week, _ = at.isocalendar()
+            return f"{year}-W{week:02d}"
+        if period == 'monthly':
+            return f"{at.year}-{at.month:02d}"
+        raise ValueError(f"Unsupported leaderboard period: {period}")
+
+    def _period_ttl(self, period: str) -> int:
+        days = 7 if period == 'weekly' else 31
+        return days * self.retained_periods * 86400
+
+    def period_index(self, period: str, at: datetime = None, create: bool = False):
+        """
+        Index of the period containing ``at`` (default: now).
+
+        Returns None when no points were recorded in that period and
+        ``create`` is False.
+        """
+        buckets = self._periods[period] if period in self._periods else None
+        if buckets is None:
+            raise ValueError(f"Unsupported leaderboard period: {period}")
+        key = self.period_key(period, at or datetime.now())
+        index = buckets.get(key)
+        if index is None and (create or self.redis_client is not None):
+            index = self._new_index(f"{period}:{key}", self._period_ttl(period))
+            buckets[key] = index
+            while len(buckets) > self.retained_periods:
+                buckets.popitem(last=False)
+        return index
+
+    def previous_period_index(self, period: str, at: datetime = None):
+        """Index of the period before the one containing ``at``, if retained."""
+        at = at or datetime.now()
+        if period == 'weekly':
+            previous = at - timedelta(days=7)
+        else:
+            previous = at.replace(day=1) - timedelta(days=1)
+        return self.period_index(period, previous)
+
+    def record(self, user_id: str, points: int, at: datetime = None):
+        """Add awarded points to the current weekly and monthly boards."""
+        at = at or datetime.now()
+        for period in self.PERIODS:
+            self.period_index(period, at, create=True).increment(user_id, points)
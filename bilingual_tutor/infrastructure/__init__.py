@@ -1,57 +1,66 @@
 """
 Infrastructure components for the bilingual tutor system.
 包含缓存管理、配置管理、日志系统等基础设施组件。
+按需导入：首次访问某个名称时才加载对应模块（PEP 562）。
 """
 
-from .error_handler import (
-    BilingualTutorError,
-    DatabaseError,
-    CacheError,
-    ValidationError,
-    ContentError,
-    AudioError,
-    AuthenticationError,
-    AuthorizationError,
-    RateLimitError,
-    ExternalServiceError,
-    ConfigurationError,
-    ErrorHandler,
-    ErrorSeverity,
-    handle_errors,
-    ErrorContext,
-    create_error_handler,
-    global_error_handler
-)
+import importlib
+from typing import TYPE_CHECKING
 
-from .config_manager import (
-    DatabaseConfig,
-    CacheConfig,
-    WebConfig,
-    LearningConfig,
-    LoggingConfig,
-    ApplicationConfig,
-    ConfigManager,
-    get_config_manager,
-    get_config,
-    encrypt_sensitive_value,
-    decrypt_sensitive_value,
-    is_encrypted_value
-)
+_SUBMODULE_EXPORTS = {
+    '.error_handler': (
+        'BilingualTutorError',
+        'DatabaseError',
+        'CacheError',
+        'ValidationError',
+        'ContentError',
+        'AudioError',
+        'AuthenticationError',
+        'AuthorizationError',
+        'RateLimitError',
+        'ExternalServiceError',
+        'ConfigurationError',
+        'ErrorHandler',
+        'ErrorSeverity',
+        'handle_errors',
+        'ErrorContext',
+        'create_error_handler',
+        'global_error_handler',
+    ),
+    '.config_manager': (
+        'DatabaseConfig',
+        'CacheConfig',
+        'WebConfig',
+        'LearningConfig',
+        'LoggingConfig',
+        'ApplicationConfig',
+        'ConfigManager',
+        'get_config_manager',
+        'get_config',
+        'encrypt_sensitive_value',
+        'decrypt_sensitive_value',
+        'is_encrypted_value',
+    ),
+    '.logging_system': (
+        'StructuredFormatter',
+        'PerformanceMetric',
+        'UserAction',
+        'PerformanceLogger',
+        'UserActionLogger',
+        'BilingualTutorLogger',
+        'LoggingMixin',
+        'get_logging_system',
+        'get_logger',
+        'get_lazy_logger',
+        'log_performance',
+        'log_user_action',
+        'measure_performance',
+    ),
+}
 
-from .logging_system import (
-    StructuredFormatter,
-    PerformanceMetric,
-    UserAction,
-    PerformanceLogger,
-    UserActionLogger,
-    BilingualTutorLogger,
-    LoggingMixin,
-    get_logging_system,
-    get_logger,
-    log_performance,
-    log_user_action,
-    measure_performance
-)
+_LAZY_ATTRIBUTES = {
+    name: module for module, names in _SUBMODULE_EXPORTS.items() for name in names
+}
 
 __all__ = [
     'BilingualTutorError',
@@ -92,7 +101,72 @@ __all__ = [
     'LoggingMixin',
     'get_logging_system',
     'get_logger',
+    'get_lazy_logger',
     'log_performance',
     'log_user_action',
     'measure_performance'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .error_handler import (
+        BilingualTutorError,
+        DatabaseError,
+        CacheError,
+        ValidationError,
+        ContentError,
+        AudioError,
+        AuthenticationError,
+        AuthorizationError,
+        RateLimitError,
+        ExternalServiceError,
+        ConfigurationError,
+        ErrorHandler,
+        ErrorSeverity,
+        handle_errors,
+        ErrorContext,
+        create_error_handler,
+        global_error_handler
+    )
+    from .config_manager import (
+        DatabaseConfig,
+        CacheConfig,
+        WebConfig,
+        LearningConfig,
+        LoggingConfig,
+        ApplicationConfig,
+        ConfigManager,
+        get_config_manager,
+        get_config,
+        encrypt_sensitive_value,
+        decrypt_sensitive_value,
+        is_encrypted_value
+    )
+    from .logging_system import (
+        StructuredFormatter,
+        PerformanceMetric,
+        UserAction,
+        PerformanceLogger,
+        UserActionLogger,
+        BilingualTutorLogger,
+        LoggingMixin,
+        get_logging_system,
+        get_logger,
+        get_lazy_logger,
+        log_performance,
+        log_user_action,
+        measure_performance
+    )
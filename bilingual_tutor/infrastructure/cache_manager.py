@@ -15,6 +15,7 @@ from ..models import (
     CacheManagerInterface, CacheConfig, CacheKey, CacheMetrics,
     DailyPlan, Content, StudySession, UserProfile
 )
+from .tracing import SPAN_KIND_CLIENT, traced
 
 
 class RedisCacheManager(CacheManagerInterface):
@@ -191,6 +192,7 @@ class RedisCacheManager(CacheManagerInterface):
         
         self._metrics.last_updated = datetime.now()
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def get_daily_plan(self, user_id: str) -> Optional[DailyPlan]:
         """
         获取缓存的每日学习计划
@@ -231,6 +233,7 @@ class RedisCacheManager(CacheManagerInterface):
             self._update_metrics(hit=False)
             return None
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def set_daily_plan(self, user_id: str, plan: DailyPlan, ttl: Optional[int] = None) -> bool:
         """
         缓存每日学习计划
@@ -272,6 +275,7 @@ class RedisCacheManager(CacheManagerInterface):
             self.logger.error(f"设置每日学习计划缓存失败: {e}")
             return False
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def get_content_recommendations(self, user_id: str, language: str) -> Optional[List[Content]]:
         """
         获取内容推荐缓存
@@ -314,6 +318,7 @@ class RedisCacheManager(CacheManagerInterface):
             self._update_metrics(hit=False)
             return None
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def set_content_recommendations(self, user_id: str, language: str, content: List[Content], ttl: Optional[int] = None) -> bool:
         """
         缓存内容推荐
@@ -354,6 +359,7 @@ class RedisCacheManager(CacheManagerInterface):
             self.logger.error(f"设置内容推荐缓存失败: {e}")
             return False
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def get_user_session(self, session_id: str) -> Optional[StudySession]:
         """
         获取用户会话缓存
@@ -392,6 +398,7 @@ class RedisCacheManager(CacheManagerInterface):
             self._update_metrics(hit=False)
             return None
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def set_user_session(self, session_id: str, session: StudySession, ttl: Optional[int] = None) -> bool:
         """
         缓存用户会话
@@ -429,6 +436,7 @@ class RedisCacheManager(CacheManagerInterface):
             self.logger.error(f"设置用户会话缓存失败: {e}")
             return False
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def invalidate_user_cache(self, user_id: str) -> bool:
         """
         清除用户相关的所有缓存
@@ -465,6 +473,7 @@ class RedisCacheManager(CacheManagerInterface):
             self.logger.error(f"清除用户缓存失败: {e}")
             return False
     
+    @traced(kind=SPAN_KIND_CLIENT)
     def invalidate_pattern(self, pattern: str) -> int:
         """
         根据模式清除缓存
@@ -6,7 +6,6 @@ Bilingual Tutor System - Unified Configuration Manager
 """
 
 import os
-import yaml
 import json
 import hashlib
 from pathlib import Path
@@ -14,9 +13,6 @@ from typing import Any, Dict, Optional, Type, TypeVar, get_type_hints
 from dataclasses import dataclass, field, asdict
 from functools import lru_cache
 import logging
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 from threading import Lock
 
@@ -43,17 +39,18 @@ class EncryptionError(ConfigurationError):
 T = TypeVar('T')
 
 
-def encrypt_sensitive_value(value: str, key: Optional[bytes] = None) -> str:
-    """加密敏感值
+def _fernet(key: Optional[bytes]):
+    """创建 Fernet 实例（cryptography 在首次加解密时才导入）
     
     Args:
-        value: 要加密的值
-        key: 加密密钥，如果为None则使用环境变量中的密钥
-    
-    Returns:
-        加密后的值（base64编码）
+        key: 加密密钥，如果为None则由环境变量中的密钥派生
     """
+    from cryptography.fernet import Fernet
+    
     if key is None:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        
         key_str = os.environ.get('CONFIG_ENCRYPTION_KEY', 'default-key-change-in-production')
         key_bytes = key_str.encode('utf-8')
         kdf = PBKDF2HMAC(
@@ -64,8 +61,21 @@ def encrypt_sensitive_value(value: str, key: Optional[bytes] = None) -> str:
         )
         key = base64.urlsafe_b64encode(kdf.derive(key_bytes))
     
+    return Fernet(key)
+
+
+def encrypt_sensitive_value(value: str, key: Optional[bytes] = None) -> str:
+    """加密敏感值
+    
+    Args:
+        value: 要加密的值
+        key: 加密密钥，如果为None则使用环境变量中的密钥
+    
+    Returns:
+        加密后的值（base64编码）
+    """
     try:
-        f = Fernet(key)
+        f = _fernet(key)
         encrypted = f.encrypt(value.encode('utf-8'))
         return encrypted.decode('utf-8')
     except Exception as e:
@@ -82,19 +92,8 @@ def decrypt_sensitive_value(encrypted_value: str, key: Optional[bytes] = None) -
     Returns:
         解密后的值
     """
-    if key is None:
-        key_str = os.environ.get('CONFIG_ENCRYPTION_KEY', 'default-key-change-in-production')
-        key_bytes = key_str.encode('utf-8')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=b'bilingual-tutor-salt',
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(key_bytes))
-    
     try:
-        f = Fernet(key)
+        f = _fernet(key)
         decrypted = f.decrypt(encrypted_value.encode('utf-8'))
         return decrypted.decode('utf-8')
     except Exception as e:
@@ -403,6 +402,8 @@ class ConfigManager:
             logger.warning(f"配置文件不存在: {self.config_path}，使用默认配置")
             return {}
         
+        import yaml
+        
         try:
             with open(config_file, 'r', encoding='utf-8') as f:
                 config_dict = yaml.safe_load(f) or {}
@@ -563,6 +564,8 @@ class ConfigManager:
         else:
             config_dict = asdict(self.config)
         
+        import yaml
+        
         try:
             with open(save_path, 'w', encoding='utf-8') as f:
                 yaml.dump(config_dict, f, allow_unicode=True, default_flow_style=False)
@@ -17,9 +17,12 @@ import time
 from contextlib import contextmanager
 from threading import Lock
 from dataclasses import dataclass, asdict
+from collections import deque
+from itertools import chain
 
 from bilingual_tutor.infrastructure.config_manager import LoggingConfig, get_config
 from bilingual_tutor.infrastructure.error_handler import ConfigurationError
+from bilingual_tutor.infrastructure.metrics import MetricsRegistry
 
 
 @dataclass
@@ -100,44 +103,57 @@ class StructuredFormatter(logging.Formatter):
 
 
 class PerformanceLogger:
-    """性能指标记录器"""
+    """
+    性能指标记录器
+    统计由 MetricsRegistry 按线程分片汇总（固定桶直方图 + 滑动窗口），记录不加锁；
+    每个指标只保留最近 history_size 条原始记录，逐条 JSON 日志只在 DEBUG 级别输出
+    """
     
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, history_size: int = 1000,
+                 registry: Optional[MetricsRegistry] = None):
         self.logger = logger
-        self.metrics: Dict[str, list] = {}
+        self.history_size = history_size
+        self.metrics: Dict[str, deque] = {}
+        self.registry = registry or MetricsRegistry()
         self._lock = Lock()
     
     def record_metric(self, metric: PerformanceMetric) -> None:
         """记录性能指标"""
-        with self._lock:
-            if metric.name not in self.metrics:
-                self.metrics[metric.name] = []
-            self.metrics[metric.name].append(metric)
+        self.registry.observe(metric.name, metric.value)
+        history = self.metrics.get(metric.name)
+        if history is None:
+            history = self.metrics.setdefault(metric.name, deque(maxlen=self.history_size))
+        history.append(metric)
         
-        metric_dict = {
-            'metric_type': 'performance',
-            'name': metric.name,
-            'value': metric.value,
-            'unit': metric.unit,
-            'timestamp': metric.timestamp,
-            'metadata': metric.metadata
-        }
-        
-        self.logger.info(json.dumps(metric_dict, ensure_ascii=False), extra={
-            'metric': True
-        })
+        if self.logger.isEnabledFor(logging.DEBUG):
+            metric_dict = {
+                'metric_type': 'performance',
+                'name': metric.name,
+                'value': metric.value,
+                'unit': metric.unit,
+                'timestamp': metric.timestamp,
+                'metadata': metric.metadata
+            }
+            self.logger.debug(json.dumps(metric_dict, ensure_ascii=False), extra={
+                'metric': True
+            })
     
     def get_metrics(self, metric_name: Optional[str] = None) -> list:
-        """获取性能指标"""
-        with self._lock:
-            if metric_name:
-                return self.metrics.get(metric_name, [])
-            return sum(self.metrics.values(), [])
+        """获取性能指标（每个指标最近 history_size 条）"""
+        if metric_name:
+            history = self.metrics.get(metric_name)
+            return list(history.copy()) if history is not None else []
+        return list(chain.from_iterable(history.copy() for history in list(self.metrics.values())))
+    
+    def get_metric_stats(self, metric_name: str, seconds: Optional[float] = None) -> Dict[str, float]:
+        """滑动窗口统计：count / min / max / avg / p50 / p95 / p99 / current"""
+        return self.registry.window_stats(metric_name, seconds)
     
     def clear_metrics(self) -> None:
         """清除性能指标"""
         with self._lock:
             self.metrics.clear()
+            self.registry.reset()
     
     @contextmanager
     def measure_performance(self, name: str, unit: str = 'ms', metadata: Optional[Dict[str, Any]] = None):
@@ -395,6 +411,11 @@ def get_logging_system(config: Optional[LoggingConfig] = None) -> BilingualTutor
     return _global_logger
 
 
+def peek_logging_system() -> Optional[BilingualTutorLogger]:
+    """已初始化的日志系统（尚未初始化时返回 None，不触发初始化）"""
+    return _global_logger
+
+
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """获取日志器的便捷函数"""
     system = get_logging_system()
@@ -405,6 +426,24 @@ def get_logger(name: Optional[str] = None) -> logging.Logger:
     return base_logger
 
 
+class LazyLogger:
+    """模块级日志器代理：首次写日志时才初始化日志系统（读取配置、创建处理器）"""
+    
+    def __init__(self, name: Optional[str] = None):
+        self._name = name
+        self._logger: Optional[logging.Logger] = None
+    
+    def __getattr__(self, attribute: str) -> Any:
+        if self._logger is None:
+            self._logger = get_logger(self._name)
+        return getattr(self._logger, attribute)
+
+
+def get_lazy_logger(name: Optional[str] = None) -> LazyLogger:
+    """获取延迟初始化的日志器，适合在模块导入时创建"""
+    return LazyLogger(name)
+
+
 def log_performance(metric_name: str, value: float, unit: str = 'ms',
                  metadata: Optional[Dict[str, Any]] = None) -> None:
     """记录性能指标的便捷函数"""
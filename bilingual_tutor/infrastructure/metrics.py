@@ -0,0 +1,420 @@
+"""
+指标核心 - 按线程分片的计数器与固定桶直方图
+Metrics Core - per-thread counters and fixed-bucket histograms
+
+记录路径不加锁：每个线程在 threading.local 中有自己的分片，只有该线程写入，
+计数、求和、桶计数都是本线程对象上的普通加法。读取时合并所有线程的分片
+（只在创建/回收分片时与读取方共用一把锁），所以读到的是近似一致的快照。
+
+- 直方图桶固定（默认每十倍区间 10 个桶，覆盖 1e-4 ~ 1e5），
+  p50/p95/p99 在合并后的桶上 O(桶数) 计算，桶内线性插值并限制在窗口的最小/最大值之间
+- 滑动时间窗口：每个分片按 slot_seconds 切成环形时间槽，窗口统计只合并窗口内的槽，
+  不再复制和扫描原始样本
+- 自启动以来的累计桶计数用于 Prometheus 文本格式导出（histogram / counter / gauge）
+- 线程结束时其分片并入回收分片，线程池或每请求一个线程的服务器不会让分片无限增长
+"""
+
+import math
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 默认桶上界：1e-4 ~ 1e5，每十倍区间 10 个（相邻桶约 1.26 倍）
+DEFAULT_BUCKETS: Tuple[float, ...] = tuple(float(f"{10 ** (exponent / 10):.4g}") for exponent in range(-40, 51))
+
+# 滑动窗口：10 秒一个时间槽，保留 60 个（10 分钟）
+DEFAULT_SLOT_SECONDS = 10
+DEFAULT_WINDOW_SLOTS = 60
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 指标键：(名称, ((标签名, 标签值), ...))
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_:]')
+
+
+def metric_key(name: str, labels: Optional[Dict[str, str]] = None) -> MetricKey:
+    """名称和标签组成的指标键（标签按名称排序）"""
+    return name, tuple(sorted((str(k), str(v)) for k, v in labels.items())) if labels else ()
+
+
+def prometheus_name(name: str) -> str:
+    """转换为合法的 Prometheus 指标名"""
+    name = _INVALID_NAME_CHARS.sub('_', name)
+    return f"_{name}" if not name or name[0].isdigit() else name
+
+
+class _Slot:
+    """一个时间槽内的直方图（所有者线程切换时间槽时整体替换，不在原对象上清零）"""
+
+    __slots__ = ('slot_id', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, slot_id: int, size: int):
+        self.slot_id = slot_id
+        self.counts = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+
+class _Series:
+    """一个线程分片中的一个指标"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'slots', 'last', 'last_time')
+
+    def __init__(self, bounds: Sequence[float], window_slots: int):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.slots: List[Optional[_Slot]] = [None] * window_slots
+        self.last = 0.0
+        self.last_time = -math.inf
+
+
+class _Shard:
+    """一个线程的全部指标"""
+
+    __slots__ = ('series', 'counters', '__weakref__')
+
+    def __init__(self):
+        self.series: Dict[MetricKey, _Series] = {}
+        self.counters: Dict[MetricKey, float] = {}
+
+
+class _ShardToken:
+    """放在 threading.local 中；线程结束、token 被回收时把分片并入回收分片"""
+
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard: _Shard):
+        self.shard = shard
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    记录（observe / increment / set_gauge）不加锁；统计和导出时合并各线程的分片
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 slot_seconds: float = DEFAULT_SLOT_SECONDS, window_slots: int = DEFAULT_WINDOW_SLOTS,
+                 clock=time.time):
+        """
+        Args:
+            buckets: 默认桶上界（升序）
+            slot_seconds: 时间槽长度（秒）
+            window_slots: 保留的时间槽数（最长窗口 = slot_seconds * window_slots）
+            clock: 时间函数（测试时可替换）
+        """
+        self.buckets = tuple(buckets)
+        self.slot_seconds = slot_seconds
+        self.window_slots = window_slots
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard()
+        self._bounds: Dict[str, Tuple[float, ...]] = {}
+        self._gauges: Dict[MetricKey, Tuple[float, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    # ---- 记录 ----
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.token.shard
+        except AttributeError:
+            shard = _Shard()
+            token = self._local.token = _ShardToken(shard)
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(token, self._retire, weakref.ref(self), shard)
+            return shard
+
+    def describe(self, name: str, help_text: str = '', buckets: Sequence[float] = None) -> None:
+        """设置指标说明和桶（第一次记录前调用；不调用时使用默认桶）"""
+        if help_text:
+            self._help[name] = help_text
+        if buckets is not None:
+            self._bounds[name] = tuple(sorted(buckets))
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """记录一个直方图样本"""
+        key = metric_key(name, labels) if labels else (name, ())
+        shard = self._shard()
+        series = shard.series.get(key)
+        if series is None:
+            series = shard.series[key] = _Series(self._bounds.get(name, self.buckets), self.window_slots)
+        index = bisect_left(series.bounds, value)
+        series.counts[index] += 1
+        series.count += 1
+        series.total += value
+        now = self._clock()
+        series.last = value
+        series.last_time = now
+
+        slot_id = int(now // self.slot_seconds)
+        slot = series.slots[slot_id % self.window_slots]
+        if slot is None or slot.slot_id != slot_id:
+            slot = series.slots[slot_id % self.window_slots] = _Slot(slot_id, len(series.counts))
+        slot.counts[index] += 1
+        slot.count += 1
+        slot.total += value
+        if value < slot.min:
+            slot.min = value
+        if value > slot.max:
+            slot.max = value
+
+    def increment(self, name: str, amount: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        """计数器加 amount"""
+        key = metric_key(name, labels) if labels else (name, ())
+        counters = self._shard().counters
+        counters[key] = counters.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """设置仪表值（字典赋值本身是原子的）"""
+        key = metric_key(name, labels) if labels else (name, ())
+        self._gauges[key] = (value, self._clock())
+
+    # ---- 线程回收 ----
+
+    @staticmethod
+    def _retire(registry_ref, shard: _Shard) -> None:
+        registry = registry_ref()
+        if registry is None:
+            return
+        with registry._lock:
+            _merge_shard(registry._retired, shard, registry.window_slots)
+            try:
+                registry._shards.remove(shard)
+            except ValueError:
+                pass
+
+    # ---- 读取 ----
+
+    def _all_shards(self) -> List[_Shard]:
+        with self._lock:
+            return [self._retired, *self._shards]
+
+    def keys(self) -> List[MetricKey]:
+        """已记录的直方图指标键"""
+        keys = set()
+        for shard in self._all_shards():
+            keys.update(list(shard.series))
+        return sorted(keys)
+
+    def window_stats(self, name: str, seconds: float = None,
+                     labels: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+        """
+        滑动窗口统计
+        Args:
+            name: 指标名称
+            seconds: 窗口长度（秒），默认并且最长为整个保留窗口
+            labels: 标签
+        Returns:
+            count / min / max / avg / p50 / p95 / p99 / current；窗口内没有样本时为空字典
+        """
+        key = metric_key(name, labels)
+        slots = self.window_slots if seconds is None else \
+            max(1, min(self.window_slots, math.ceil(seconds / self.slot_seconds)))
+        newest = int(self._clock() // self.slot_seconds)
+        oldest = newest - slots + 1
+
+        counts, count, total, low, high, bounds = None, 0, 0.0, math.inf, -math.inf, None
+        latest = (-math.inf, None)
+        for shard in self._all_shards():
+            series = shard.series.get(key)
+            if series is None:
+                continue
+            bounds = series.bounds
+            latest = max(latest, (series.last_time, series.last), key=lambda item: item[0])
+            for slot in list(series.slots):
+                if slot is None or not oldest <= slot.slot_id <= newest or not slot.count:
+                    continue
+                if counts is None:
+                    counts = [0] * len(slot.counts)
+                for index, bucket_count in enumerate(slot.counts):
+                    if bucket_count:
+                        counts[index] += bucket_count
+                count += slot.count
+                total += slot.total
+                low = min(low, slot.min)
+                high = max(high, slot.max)
+        if not count:
+            return {}
+        return {
+            'count': count,
+            'min': low,
+            'max': high,
+            'avg': total / count,
+            'p50': _percentile(bounds, counts, count, 0.50, low, high),
+            'p95': _percentile(bounds, counts, count, 0.95, low, high),
+            'p99': _percentile(bounds, counts, count, 0.99, low, high),
+            'current': latest[1],
+        }
+
+    def counter_value(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        """计数器当前值（所有线程之和）"""
+        key = metric_key(name, labels)
+        return sum(shard.counters.get(key, 0.0) for shard in self._all_shards())
+
+    def gauge_value(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        """仪表值；没有设置过仪表时为直方图最近一次记录的值"""
+        key = metric_key(name, labels)
+        gauge = self._gauges.get(key)
+        if gauge is not None:
+            return gauge[0]
+        latest = max(((series.last_time, series.last) for series in
+                      (shard.series.get(key) for shard in self._all_shards()) if series is not None),
+                     key=lambda item: item[0], default=(None, None))
+        return latest[1]
+
+    def _cumulative(self) -> Tuple[Dict[MetricKey, List], Dict[MetricKey, float]]:
+        """合并各分片的累计直方图和计数器"""
+        histograms: Dict[MetricKey, List] = {}
+        counters: Dict[MetricKey, float] = {}
+        for shard in self._all_shards():
+            for key, series in list(shard.series.items()):
+                merged = histograms.get(key)
+                if merged is None:
+                    merged = histograms[key] = [series.bounds, [0] * len(series.counts), 0, 0.0, -math.inf, 0.0]
+                for index, bucket_count in enumerate(series.counts):
+                    merged[1][index] += bucket_count
+                merged[2] += series.count
+                merged[3] += series.total
+                if series.last_time > merged[4]:
+                    merged[4], merged[5] = series.last_time, series.last
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0.0) + value
+        return histograms, counters
+
+    def render_prometheus(self, namespace: str = '') -> str:
+        """
+        Prometheus 文本格式（0.0.4）
+        直方图为自启动以来的累计值，另外导出每个直方图指标最近一次的值（*_last 仪表）
+        """
+        histograms, counters = self._cumulative()
+        lines: List[str] = []
+
+        def family(name: str, metric_type: str, suffix: str = '') -> str:
+            full = prometheus_name(f"{namespace}{name}{suffix}")
+            if self._help.get(name):
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} {metric_type}")
+            return full
+
+        for name, keys in _group(histograms):
+            full = family(name, 'histogram')
+            for key in keys:
+                bounds, counts, count, total = histograms[key][:4]
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{full}_bucket{_labels(key[1], ('le', _format(bound)))} {cumulative}")
+                lines.append(f"{full}_bucket{_labels(key[1], ('le', '+Inf'))} {count}")
+                lines.append(f"{full}_sum{_labels(key[1])} {_format(total)}")
+                lines.append(f"{full}_count{_labels(key[1])} {count}")
+        for name, keys in _group(counters):
+            full = family(name, 'counter', '' if name.endswith('_total') else '_total')
+            for key in keys:
+                lines.append(f"{full}{_labels(key[1])} {_format(counters[key])}")
+        for name, keys in _group(histograms):
+            full = family(name, 'gauge', '_last')
+            for key in keys:
+                lines.append(f"{full}{_labels(key[1])} {_format(histograms[key][5])}")
+        histogram_names = {key[0] for key in histograms}
+        gauges = {key: value for key, value in list(self._gauges.items()) if key[0] not in histogram_names}
+        for name, keys in _group(gauges):
+            full = family(name, 'gauge')
+            for key in keys:
+                lines.append(f"{full}{_labels(key[1])} {_format(gauges[key][0])}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def reset(self) -> None:
+        """清空所有指标（各线程的分片同时作废）"""
+        with self._lock:
+            for shard in [self._retired, *self._shards]:
+                shard.series.clear()
+                shard.counters.clear()
+            self._gauges.clear()
+
+
+def _merge_shard(target: _Shard, source: _Shard, window_slots: int) -> None:
+    """把结束线程的分片并入回收分片（调用方持有注册表的锁）"""
+    for key, series in source.series.items():
+        merged = target.series.get(key)
+        if merged is None:
+            target.series[key] = series
+            continue
+        for index, bucket_count in enumerate(series.counts):
+            merged.counts[index] += bucket_count
+        merged.count += series.count
+        merged.total += series.total
+        if series.last_time > merged.last_time:
+            merged.last, merged.last_time = series.last, series.last_time
+        for position, slot in enumerate(series.slots):
+            if slot is None:
+                continue
+            current = merged.slots[position]
+            if current is None or current.slot_id < slot.slot_id:
+                merged.slots[position] = slot
+            elif current.slot_id == slot.slot_id:
+                combined = _Slot(slot.slot_id, len(slot.counts))
+                for other in (current, slot):
+                    for index, bucket_count in enumerate(other.counts):
+                        combined.counts[index] += bucket_count
+                    combined.count += other.count
+                    combined.total += other.total
+                    combined.min = min(combined.min, other.min)
+                    combined.max = max(combined.max, other.max)
+                merged.slots[position] = combined
+    for key, value in source.counters.items():
+        target.counters[key] = target.counters.get(key, 0.0) + value
+
+
+def _percentile(bounds: Sequence[float], counts: List[int], count: int, fraction: float,
+                low: float, high: float) -> float:
+    """分位数：找到所在桶后在桶内线性插值，结果限制在 [low, high]"""
+    rank = fraction * count
+    seen = 0
+    for index, bucket_count in enumerate(counts):
+        if bucket_count and seen + bucket_count >= rank:
+            lower = max(bounds[index - 1] if index else low, low)
+            upper = min(bounds[index] if index < len(bounds) else high, high)
+            return lower + (upper - lower) * max(0.0, rank - seen) / bucket_count
+        seen += bucket_count
+    return high
+
+
+def _group(values: Dict[MetricKey, object]) -> Iterable[Tuple[str, List[MetricKey]]]:
+    """按指标名分组（同名不同标签的序列放在同一个指标族下）"""
+    grouped: Dict[str, List[MetricKey]] = {}
+    for key in sorted(values):
+        grouped.setdefault(key[0], []).append(key)
+    return grouped.items()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], *extra: Tuple[str, str]) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{prometheus_name(k)}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
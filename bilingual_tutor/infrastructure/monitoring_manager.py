@@ -8,13 +8,16 @@ import psutil
 import threading
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass, field
 from collections import deque
 from pathlib import Path
 import json
 import logging
 
+from bilingual_tutor.infrastructure.metrics import MetricsRegistry
+from bilingual_tutor.infrastructure.tracing import tracer
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,15 +44,29 @@ class Alert:
 
 
 class PerformanceMonitor:
-    """性能监控器"""
+    """
+    性能监控器
+    统计来自 MetricsRegistry（按线程分片、固定桶直方图、滑动时间窗口），记录不加锁；
+    每个指标另外保留最近 history_size 个原始样本供 get_metric 查询
+    """
     
-    def __init__(self, history_size: int = 100):
+    def __init__(self, history_size: int = 100, registry: Optional[MetricsRegistry] = None):
         self.history_size = history_size
         self.metrics: Dict[str, deque] = {}
-        self._lock = threading.Lock()
+        self.registry = registry or MetricsRegistry()
+        # 指标名 -> 注册表中的 (名称, 标签)，如 api_response_time_<endpoint> 对应带 endpoint 标签的序列
+        self._keys: Dict[str, Tuple[str, Optional[Dict[str, str]]]] = {}
+    
+    def _history(self, metric_name: str) -> deque:
+        history = self.metrics.get(metric_name)
+        if history is None:
+            # setdefault 是原子的，并发首次记录时只会保留一个 deque
+            history = self.metrics.setdefault(metric_name, deque(maxlen=self.history_size))
+        return history
     
     def record_metric(self, metric_name: str, value: float, 
-                    metadata: Optional[Dict[str, Any]] = None) -> None:
+                    metadata: Optional[Dict[str, Any]] = None,
+                    series: Optional[Tuple[str, Optional[Dict[str, str]]]] = None) -> None:
         """
         记录指标
         
@@ -57,23 +74,28 @@ class PerformanceMonitor:
             metric_name: 指标名称
             value: 指标值
             metadata: 元数据
+            series: 注册表中的 (名称, 标签)，默认与 metric_name 相同、无标签
         """
-        with self._lock:
-            if metric_name not in self.metrics:
-                self.metrics[metric_name] = deque(maxlen=self.history_size)
-            
-            metric_data = MetricData(
-                timestamp=datetime.now(),
-                value=value,
-                metadata=metadata or {}
-            )
-            
-            self.metrics[metric_name].append(metric_data)
+        if series is not None and metric_name not in self._keys:
+            self._keys[metric_name] = series
+        name, labels = self._keys.get(metric_name, (metric_name, None))
+        self.registry.observe(name, value, labels)
+        # deque.append 是原子的
+        self._history(metric_name).append(MetricData(
+            timestamp=datetime.now(),
+            value=value,
+            metadata=metadata or {}
+        ))
+    
+    def increment_counter(self, metric_name: str, amount: float = 1.0,
+                          labels: Optional[Dict[str, str]] = None) -> None:
+        """计数器加 amount（按线程分片，不加锁）"""
+        self.registry.increment(metric_name, amount, labels)
     
     def get_metric(self, metric_name: str, 
                    minutes: int = 5) -> List[MetricData]:
         """
-        获取指标历史数据
+        获取指标历史数据（最近 history_size 个样本中的）
         
         Args:
             metric_name: 指标名称
@@ -82,50 +104,38 @@ class PerformanceMonitor:
         Returns:
             指标数据列表
         """
-        with self._lock:
-            if metric_name not in self.metrics:
-                return []
-            
-            cutoff_time = datetime.now() - timedelta(minutes=minutes)
-            return [
-                m for m in self.metrics[metric_name] 
-                if m.timestamp >= cutoff_time
-            ]
+        history = self.metrics.get(metric_name)
+        if history is None:
+            return []
+        
+        cutoff_time = datetime.now() - timedelta(minutes=minutes)
+        return [m for m in history.copy() if m.timestamp >= cutoff_time]
     
     def get_metric_stats(self, metric_name: str,
                        minutes: int = 5) -> Dict[str, float]:
         """
-        获取指标统计信息
+        获取指标统计信息（滑动窗口直方图，O(桶数)）
         
         Args:
             metric_name: 指标名称
-            minutes: 统计时间范围
+            minutes: 统计时间范围（最长为注册表保留的窗口）
         
         Returns:
-            统计信息字典
+            统计信息字典：count / min / max / avg / p50 / p95 / p99 / current
         """
-        metrics = self.get_metric(metric_name, minutes)
-        
-        if not metrics:
-            return {}
-        
-        values = [m.value for m in metrics]
-        
+        name, labels = self._keys.get(metric_name, (metric_name, None))
+        return self.registry.window_stats(name, minutes * 60, labels)
+    
+    def get_all_metrics(self, minutes: int = 5) -> Dict[str, Dict[str, float]]:
+        """获取所有指标的统计信息"""
         return {
-            'count': len(values),
-            'min': min(values),
-            'max': max(values),
-            'avg': sum(values) / len(values),
-            'current': values[-1] if values else 0
+            name: self.get_metric_stats(name, minutes)
+            for name in list(self.metrics)
         }
     
-    def get_all_metrics(self) -> Dict[str, Dict[str, float]]:
-        """获取所有指标的统计信息"""
-        with self._lock:
-            return {
-                name: self.get_metric_stats(name)
-                for name in self.metrics.keys()
-            }
+    def render_prometheus(self, namespace: str = 'bilingual_tutor_') -> str:
+        """Prometheus 文本格式导出"""
+        return self.registry.render_prometheus(namespace)
 
 
 class HealthChecker:
@@ -486,6 +496,7 @@ class MonitoringManager:
         return {
             'health_status': self.health_checker.get_health_status(),
             'performance_metrics': self.performance_monitor.get_all_metrics(),
+            'trace_endpoints': tracer.endpoints(),
             'active_alerts': [
                 {
                     'id': alert.id,
@@ -523,23 +534,19 @@ class MonitoringManager:
         self.performance_monitor.record_metric(
             metric_name,
             response_time,
-            metadata={'endpoint': endpoint}
+            metadata={'endpoint': endpoint},
+            series=('api_response_time_seconds', {'endpoint': endpoint})
         )
     
     def record_user_activity(self, user_id: str, activity_type: str) -> None:
         """
-        记录用户活动
+        记录用户活动（按活动类型计数；用户ID不作为标签，避免序列数随用户数增长）
         
         Args:
             user_id: 用户ID
             activity_type: 活动类型
         """
-        metric_name = f"user_activity_{activity_type}"
-        self.performance_monitor.record_metric(
-            metric_name,
-            time.time(),
-            metadata={'user_id': user_id}
-        )
+        self.performance_monitor.increment_counter('user_activity', labels={'activity_type': activity_type})
 
 
 monitoring_manager = MonitoringManager()
@@ -12,8 +12,16 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 import logging
 
+from bilingual_tutor.storage.snapshots import (
+    DEFAULT_SNAPSHOT_INTERVAL, MANIFEST_NAME, RetentionPolicy, SnapshotManager, SnapshotScheduler
+)
+
 logger = logging.getLogger(__name__)
 
+# 定时备份的源目录（默认为 bilingual_tutor 包目录，包含学习数据库和音频）
+DEFAULT_BACKUP_SOURCE = os.environ.get('BILINGUAL_TUTOR_SNAPSHOT_SOURCE') or \
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 class SystemDiagnostics:
     """系统诊断"""
@@ -322,16 +330,21 @@ class CacheManager:
 
 
 class BackupManager:
-    """备份管理器"""
+    """备份管理器（在线数据库快照 + 按内容去重的增量目录快照）"""
     
-    def __init__(self, backup_dir: str = 'backups'):
+    def __init__(self, backup_dir: str = 'backups', retention: Optional[RetentionPolicy] = None):
         self.backup_dir = Path(backup_dir)
         self.backup_dir.mkdir(exist_ok=True)
+        self.snapshots = SnapshotManager(str(self.backup_dir), retention=retention)
+        self._scheduler: Optional[SnapshotScheduler] = None
     
     def create_backup(self, source_dir: str, backup_name: Optional[str] = None) -> Dict[str, Any]:
         """
         创建备份
         
+        SQLite 数据库通过在线快照复制（不阻塞写入），其他文件与上一个备份
+        内容相同时使用硬链接
+        
         Args:
             source_dir: 源目录
             backup_name: 备份名称,为None则自动生成
@@ -345,29 +358,86 @@ class BackupManager:
             return {'success': False, 'message': '源目录不存在'}
         
         if backup_name is None:
-            backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        backup_path = self.backup_dir / backup_name
+            backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
         
         try:
-            if backup_path.exists():
-                shutil.rmtree(backup_path)
-            
-            shutil.copytree(source_path, backup_path)
+            result = self.snapshots.create_snapshot(str(source_path), backup_name)
             
-            logger.info(f"创建备份: {backup_path}")
+            logger.info(f"创建备份: {result['path']}")
             
             return {
                 'success': True,
                 'message': '备份创建成功',
-                'backup_path': str(backup_path),
+                'backup_path': result['path'],
                 'backup_name': backup_name,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': result['created'],
+                'stats': {key: result[key] for key in
+                          ('files', 'linked', 'copied', 'databases', 'bytes_copied', 'seconds')}
             }
         except Exception as e:
             logger.error(f"创建备份失败: {e}")
             return {'success': False, 'message': str(e)}
     
+    def prune_backups(self) -> Dict[str, Any]:
+        """按保留策略清理过期备份"""
+        try:
+            removed = self.snapshots.prune()
+            return {'success': True, 'message': f'清理了 {len(removed)} 个备份', 'removed': removed}
+        except Exception as e:
+            logger.error(f"清理备份失败: {e}")
+            return {'success': False, 'message': str(e)}
+    
+    def start_schedule(self, source_dir: str, interval: float = DEFAULT_SNAPSHOT_INTERVAL) -> bool:
+        """
+        启动定时备份（每隔 interval 秒创建备份并清理过期备份）
+        
+        Returns:
+            是否启动了后台线程（interval 为 0 时不启动）
+        """
+        self.stop_schedule()
+        self._scheduler = SnapshotScheduler(self.snapshots, source_dir, interval)
+        return self._scheduler.start()
+    
+    def start_configured_schedule(self, interval: Optional[float] = None,
+                                  source_dir: Optional[str] = None) -> bool:
+        """
+        应用启动时按配置启动定时备份（已在运行时不重复启动）
+        
+        Args:
+            interval: 备份间隔（秒），默认 BILINGUAL_TUTOR_SNAPSHOT_INTERVAL，0 表示不启用
+            source_dir: 源目录，默认 DEFAULT_BACKUP_SOURCE
+        
+        Returns:
+            是否启动了后台线程
+        """
+        interval = DEFAULT_SNAPSHOT_INTERVAL if interval is None else interval
+        if interval <= 0 or (self._scheduler is not None and self._scheduler.running):
+            return False
+        started = self.start_schedule(source_dir or DEFAULT_BACKUP_SOURCE, interval)
+        logger.info(f"定时备份已启动: 每 {interval} 秒备份 {source_dir or DEFAULT_BACKUP_SOURCE}")
+        return started
+    
+    def stop_schedule(self) -> None:
+        """停止定时备份"""
+        if self._scheduler is not None:
+            self._scheduler.stop()
+            self._scheduler = None
+    
+    def get_schedule_status(self) -> Dict[str, Any]:
+        """定时备份状态"""
+        scheduler = self._scheduler
+        if scheduler is None:
+            return {'running': False}
+        return {
+            'running': scheduler.running,
+            'interval': scheduler.interval,
+            'source_dir': scheduler.source_dir,
+            'leader': scheduler.leader,
+            'skipped': scheduler.skipped,
+            'failures': scheduler.failures,
+            'last_backup': scheduler.last_result
+        }
+    
     def list_backups(self) -> List[Dict[str, Any]]:
         """
         列出所有备份
@@ -378,7 +448,8 @@ class BackupManager:
         backups = []
         
         for backup_dir in self.backup_dir.iterdir():
-            if not backup_dir.is_dir():
+            # 以 . 开头的是尚未完成的快照
+            if not backup_dir.is_dir() or backup_dir.name.startswith('.'):
                 continue
             
             stat = backup_dir.stat()
@@ -410,10 +481,14 @@ class BackupManager:
             return {'success': False, 'message': '备份不存在'}
         
         try:
-            if target_path.exists():
-                shutil.rmtree(target_path)
-            
-            shutil.copytree(backup_path, target_path)
+            if (backup_path / MANIFEST_NAME).exists():
+                # 快照备份：正在使用的数据库通过 backup API 写回，不删除目标目录
+                self.snapshots.restore_snapshot(backup_name, str(target_path))
+            else:
+                if target_path.exists():
+                    shutil.rmtree(target_path)
+                
+                shutil.copytree(backup_path, target_path)
             
             logger.info(f"恢复备份: {backup_path} -> {target_path}")
             
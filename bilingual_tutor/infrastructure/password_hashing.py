@@ -0,0 +1,247 @@
+"""
+Password Hashing Service
+密码哈希服务 - 在专用的有界线程池中执行 PBKDF2，避免登录高峰占满请求线程
+
+Features:
+- 哈希参数随哈希值一起保存（pbkdf2_sha256$迭代次数$盐值$哈希），
+  调整迭代次数后旧密码仍可验证，并在下次登录时自动升级
+- 兼容旧格式：64 位十六进制哈希 + users.salt 列，固定 100000 次迭代
+- hashlib.pbkdf2_hmac 计算时释放 GIL，线程池即可并行利用多个 CPU 核心
+- 排队深度有上限，超出时立即抛出 HashingPoolBusy（Web 层返回 503），
+  而不是让请求线程堆积在哈希计算上
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from bilingual_tutor.infrastructure.error_handler import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = 'pbkdf2_sha256'
+# 旧格式哈希（不带参数）使用的迭代次数
+LEGACY_ITERATIONS = 100000
+# 新哈希使用的迭代次数，可按服务器性能调整
+DEFAULT_ITERATIONS = int(os.environ.get('BILINGUAL_TUTOR_PBKDF2_ITERATIONS', str(LEGACY_ITERATIONS)))
+# 哈希线程数（0 表示在调用线程中直接计算）
+DEFAULT_HASH_WORKERS = int(os.environ.get('BILINGUAL_TUTOR_HASH_WORKERS', str(os.cpu_count() or 1)))
+# 排队等待的哈希请求上限（不含正在计算的）
+DEFAULT_HASH_QUEUE = int(os.environ.get('BILINGUAL_TUTOR_HASH_QUEUE', str(max(DEFAULT_HASH_WORKERS, 1) * 16)))
+
+
+class HashingPoolBusy(RateLimitError):
+    """哈希线程池排队已满"""
+
+    def __init__(self, queued: int, retry_after: int = 1):
+        self.queued = queued
+        self.retry_after = retry_after
+        super().__init__(
+            "登录请求过多，请稍后再试",
+            f"Password hashing queue is full ({queued} waiting)",
+        )
+
+
+def pbkdf2_hex(password: str, salt: str, iterations: int) -> str:
+    """PBKDF2-HMAC-SHA256，返回十六进制哈希"""
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations).hex()
+
+
+def encode_hash(password_hash: str, salt: str, iterations: int) -> str:
+    """把哈希和参数编码为一个字符串"""
+    return f"{ALGORITHM}${iterations}${salt}${password_hash}"
+
+
+def parse_hash(stored_hash: str, legacy_salt: str = '') -> Tuple[int, str, str]:
+    """
+    解析存储的哈希
+    Args:
+        stored_hash: 编码后的哈希或旧格式的十六进制哈希
+        legacy_salt: 旧格式哈希对应的盐值（users.salt 列）
+    Returns:
+        (迭代次数, 盐值, 十六进制哈希)
+    Raises:
+        ValueError: 不支持的算法或格式错误
+    """
+    if '$' not in stored_hash:
+        return LEGACY_ITERATIONS, legacy_salt or '', stored_hash
+    algorithm, iterations, salt, password_hash = stored_hash.split('$', 3)
+    if algorithm != ALGORITHM:
+        raise ValueError(f"不支持的加密算法: {algorithm}")
+    return int(iterations), salt, password_hash
+
+
+class PasswordHasher:
+    """密码哈希与验证（同步计算，不涉及线程池）"""
+
+    def __init__(self, iterations: int = DEFAULT_ITERATIONS):
+        self.iterations = iterations
+
+    def hash(self, password: str, salt: Optional[str] = None) -> str:
+        """生成编码后的哈希（未提供盐值时随机生成）"""
+        salt = salt or secrets.token_hex(16)
+        return encode_hash(pbkdf2_hex(password, salt, self.iterations), salt, self.iterations)
+
+    def verify(self, password: str, stored_hash: str, legacy_salt: str = '') -> bool:
+        """使用哈希自带的参数验证密码（恒定时间比较）"""
+        try:
+            iterations, salt, expected = parse_hash(stored_hash or '', legacy_salt)
+        except ValueError:
+            logger.warning("无法识别的密码哈希格式")
+            return False
+        if not expected:
+            return False
+        return secrets.compare_digest(pbkdf2_hex(password, salt, iterations), expected)
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """哈希是否为旧格式或使用了不同的迭代次数"""
+        if '$' not in (stored_hash or ''):
+            return True
+        try:
+            return parse_hash(stored_hash)[0] != self.iterations
+        except ValueError:
+            return True
+
+
+class HashingPool:
+    """
+    有界哈希线程池
+
+    同时计算的哈希数不超过 max_workers，排队数不超过 max_queue；
+    排队已满时 submit 立即抛出 HashingPoolBusy。max_workers 为 0 时在调用线程中计算。
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_HASH_WORKERS, max_queue: int = DEFAULT_HASH_QUEUE,
+                 hasher: Optional[PasswordHasher] = None, timeout: float = 30.0):
+        """
+        初始化哈希线程池
+        Args:
+            max_workers: 哈希线程数
+            max_queue: 最大排队数
+            hasher: 密码哈希器（默认使用 DEFAULT_ITERATIONS）
+            timeout: 同步调用等待结果的超时时间（秒）
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.hasher = hasher or PasswordHasher()
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'peak_pending': 0,
+                       'hash_seconds': 0.0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="bilingual-hash")
+        return self._executor
+
+    def _timed(self, func: Callable[..., Any], *args) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._pending -= 1
+                self._stats['completed'] += 1
+                self._stats['hash_seconds'] += elapsed
+
+    def submit(self, func: Callable[..., Any], *args) -> Future:
+        """
+        提交哈希计算
+        Raises:
+            HashingPoolBusy: 排队数已达上限
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._stats['rejected'] += 1
+                raise HashingPoolBusy(self._pending - self.max_workers)
+            self._pending += 1
+            self._stats['submitted'] += 1
+            self._stats['peak_pending'] = max(self._stats['peak_pending'], self._pending)
+
+        if self.max_workers <= 0:
+            future = Future()
+            try:
+                future.set_result(self._timed(func, *args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        try:
+            return self._get_executor().submit(self._timed, func, *args)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def call(self, func: Callable[..., Any], *args) -> Any:
+        """提交并等待结果"""
+        return self.submit(func, *args).result(timeout=self.timeout)
+
+    def hash(self, password: str, salt: Optional[str] = None) -> str:
+        """生成编码后的哈希"""
+        return self.call(self.hasher.hash, password, salt)
+
+    def verify(self, password: str, stored_hash: str, legacy_salt: str = '') -> bool:
+        """验证密码"""
+        return self.call(self.hasher.verify, password, stored_hash, legacy_salt)
+
+    def pbkdf2(self, password: str, salt: str, iterations: int) -> str:
+        """计算指定参数的十六进制哈希"""
+        return self.call(pbkdf2_hex, password, salt, iterations)
+
+    async def hash_async(self, password: str, salt: Optional[str] = None) -> str:
+        """异步生成哈希（不阻塞事件循环）"""
+        return await asyncio.wrap_future(self.submit(self.hasher.hash, password, salt))
+
+    async def verify_async(self, password: str, stored_hash: str, legacy_salt: str = '') -> bool:
+        """异步验证密码"""
+        return await asyncio.wrap_future(self.submit(self.hasher.verify, password, stored_hash, legacy_salt))
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        return self.hasher.needs_rehash(stored_hash)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """线程池统计"""
+        with self._lock:
+            return {**self._stats, 'pending': self._pending, 'max_workers': self.max_workers,
+                    'max_queue': self.max_queue, 'iterations': self.hasher.iterations}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭线程池（之后的调用会重新创建线程池）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_default_pool: Optional[HashingPool] = None
+_default_lock = threading.Lock()
+
+
+def get_hashing_pool() -> HashingPool:
+    """进程共享的哈希线程池"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_lock:
+            if _default_pool is None:
+                _default_pool = HashingPool()
+    return _default_pool
+
+
+def set_hashing_pool(pool: HashingPool) -> HashingPool:
+    """替换进程共享的哈希线程池（返回原线程池）"""
+    global _default_pool
+    with _default_lock:
+        previous, _default_pool = _default_pool, pool
+    return previous
@@ -8,11 +8,14 @@ import secrets
 import json
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 from pathlib import Path
 import logging
 from functools import wraps
 
+from bilingual_tutor.infrastructure.password_hashing import encode_hash, get_hashing_pool
+from bilingual_tutor.storage.export import csv_chunks, ndjson_chunks
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,42 +41,42 @@ class PasswordSecurity:
             salt = secrets.token_hex(16)
         
         if self.algorithm == 'pbkdf2_sha256':
-            hashed = hashlib.pbkdf2_hmac(
-                'sha256', 
-                password.encode('utf-8'), 
-                salt.encode('utf-8'), 
-                self.iterations
-            ).hex()
+            # 在有界哈希线程池中计算，登录高峰时不会占满请求线程
+            hashed = get_hashing_pool().pbkdf2(password, salt, self.iterations)
         elif self.algorithm == 'sha256':
             hashed = hashlib.sha256(password.encode('utf-8')).hexdigest()
         else:
             raise ValueError(f"不支持的加密算法: {self.algorithm}")
         
-        return {
+        result = {
             'hash': hashed,
             'salt': salt,
             'algorithm': self.algorithm,
             'iterations': self.iterations
         }
+        if self.algorithm == 'pbkdf2_sha256':
+            # 带参数的编码哈希，调整迭代次数后仍可验证
+            result['encoded'] = encode_hash(hashed, salt, self.iterations)
+        return result
     
-    def verify_password(self, password: str, stored_hash: str, salt: str) -> bool:
+    def verify_password(self, password: str, stored_hash: str, salt: str = '',
+                        iterations: Optional[int] = None) -> bool:
         """
         验证密码
         
         Args:
             password: 明文密码
-            stored_hash: 存储的哈希值
-            salt: 使用的盐值
+            stored_hash: 存储的哈希值（十六进制哈希或带参数的编码哈希）
+            salt: 使用的盐值（编码哈希自带盐值）
+            iterations: 生成哈希时的迭代次数（默认使用当前配置）
         
         Returns:
             密码是否匹配
         """
-        hashed = hashlib.pbkdf2_hmac(
-            'sha256', 
-            password.encode('utf-8'), 
-            salt.encode('utf-8'), 
-            self.iterations
-        ).hex()
+        pool = get_hashing_pool()
+        if '$' in stored_hash:
+            return pool.verify(password, stored_hash)
+        hashed = pool.pbkdf2(password, salt, iterations or self.iterations)
         
         return secrets.compare_digest(hashed, stored_hash)
     
@@ -353,6 +356,10 @@ class AccessControl:
         return decorator
 
 
+# 用户数据 CSV 导出的列（每个字段一行）
+USER_EXPORT_CSV_FIELDS = ['Category', 'Key', 'Value', 'Timestamp']
+
+
 class DataPrivacyManager:
     """数据隐私管理器 - 处理数据导出和删除"""
     
@@ -388,6 +395,69 @@ class DataPrivacyManager:
         
         return user_data
     
+    def iter_user_data(self, user_id: str, learning_db=None) -> Iterator[Dict[str, Any]]:
+        """
+        逐条产出用户数据（每条带 record_type），学习记录和复习事件按键集分页读取
+        
+        Args:
+            user_id: 用户ID
+            learning_db: LearningDatabase 实例（None 时只导出档案和设置）
+        """
+        yield {'record_type': 'export', 'user_id': user_id, 'export_time': datetime.now().isoformat()}
+        yield {'record_type': 'profile', **self._get_user_profile(user_id)}
+        yield {'record_type': 'settings', **self._get_user_settings(user_id)}
+        if learning_db is None:
+            return
+        
+        from bilingual_tutor.storage.review_events import iter_events
+        for record in learning_db.iter_learning_records(user_id):
+            yield {'record_type': 'learning_record', **record}
+        for event in iter_events(learning_db, user_id=user_id, page_size=1000):
+            yield {'record_type': 'review_event', 'id': event.id, 'item_id': event.item_id,
+                   'item_type': event.item_type, 'correct': event.correct,
+                   'response_ms': event.response_ms, 'reviewed_ts': event.reviewed_ts}
+    
+    def stream_user_data(self, user_id: str, format: str = 'ndjson', learning_db=None) -> Iterator[bytes]:
+        """
+        流式导出用户数据（NDJSON 每条记录一行；CSV 与 json 导出的 CSV 相同，每个字段一行）
+        
+        Args:
+            user_id: 用户ID
+            format: 导出格式 (ndjson, csv)
+            learning_db: LearningDatabase 实例
+        
+        Returns:
+            字节块生成器，可直接作为分块响应返回
+        """
+        if format not in ('ndjson', 'csv'):
+            raise ValueError(f"不支持的导出格式: {format}")
+        
+        self.audit_logger.log_event(
+            'data_export',
+            user_id,
+            {'format': format, 'streaming': True},
+            success=True
+        )
+        
+        records = self.iter_user_data(user_id, learning_db)
+        if format == 'ndjson':
+            return ndjson_chunks(records)
+        return csv_chunks((row for record in records for row in self._csv_rows(record)),
+                          USER_EXPORT_CSV_FIELDS)
+    
+    @staticmethod
+    def _csv_rows(record: Dict[str, Any]) -> Iterator[Dict[str, str]]:
+        """一条记录展开为 (Category, Key, Value, Timestamp) 行"""
+        category = record['record_type']
+        if category == 'export':
+            for key in ('user_id', 'export_time'):
+                yield {'Category': key, 'Key': '', 'Value': str(record[key]), 'Timestamp': record['export_time']}
+            return
+        prefix = f"{record['item_type']}:{record['item_id']}." if 'item_id' in record else ''
+        for key, value in record.items():
+            if key != 'record_type':
+                yield {'Category': category, 'Key': f"{prefix}{key}", 'Value': str(value), 'Timestamp': ''}
+    
     def delete_user_data(self, user_id: str, confirm: bool = False) -> bool:
         """
         删除用户数据
@@ -468,9 +538,13 @@ class SecurityManager:
         """检查权限"""
         return self.access_control.check_permission(role, permission)
     
-    def export_user_data(self, user_id: str) -> Dict[str, Any]:
+    def export_user_data(self, user_id: str, format: str = 'json') -> Dict[str, Any]:
         """导出用户数据"""
-        return self.privacy_manager.export_user_data(user_id)
+        return self.privacy_manager.export_user_data(user_id, format)
+    
+    def stream_user_data(self, user_id: str, format: str = 'ndjson', learning_db=None) -> Iterator[bytes]:
+        """流式导出用户数据"""
+        return self.privacy_manager.stream_user_data(user_id, format, learning_db)
     
     def delete_user_data(self, user_id: str, confirm: bool = False) -> bool:
         """删除用户数据"""
@@ -0,0 +1,588 @@
+"""
+请求链路追踪 - 进程内的轻量 span 追踪
+Request Tracing - lightweight in-process spans across web, integrator, DB, cache and AI layers
+
+- 当前 span 保存在 contextvars 中：同一线程内的嵌套调用、asyncio 任务、
+  AsyncFacade 线程池（在提交时的上下文中执行）都自动成为当前 span 的子 span
+- 采样在请求开始时决定（BILINGUAL_TUTOR_TRACE_SAMPLE_RATE，默认 0.05）。
+  带 traceparent 头的请求沿用其 trace id，但采样仍按本地采样率决定；只有设置
+  BILINGUAL_TUTOR_TRACE_TRUST_PARENT=1（上游是受信任的网关/服务）时才听从头中的
+  采样标志，避免任意客户端强制追踪每个请求。未采样的请求上 span() / @traced
+  只做一次 ContextVar.get，不创建任何对象
+- 完成的追踪进入环形缓冲区（最近 BILINGUAL_TUTOR_TRACE_BUFFER 个），
+  同时按端点累加到调用栈（火焰图式）分解：每个调用栈路径的次数、总耗时和自身耗时
+- 离线导出为 OTLP-JSON（每行一个 ExportTraceServiceRequest，可由 OpenTelemetry
+  Collector 的 otlpjsonfile 接收器读取）；设置 BILINGUAL_TUTOR_TRACE_EXPORT_PATH
+  后每完成 EXPORT_BATCH 个追踪自动追加写入一次
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = float(os.environ.get('BILINGUAL_TUTOR_TRACE_SAMPLE_RATE', '0.05'))
+BUFFER_SIZE = int(os.environ.get('BILINGUAL_TUTOR_TRACE_BUFFER', '200'))
+# 单个追踪最多记录的 span 数，超出的不再创建（计入 dropped_spans）
+MAX_SPANS = int(os.environ.get('BILINGUAL_TUTOR_TRACE_MAX_SPANS', '256'))
+EXPORT_PATH = os.environ.get('BILINGUAL_TUTOR_TRACE_EXPORT_PATH') or None
+# 是否听从上游 traceparent 头的采样标志（仅在请求来自受信任的上游时开启）
+TRUST_PARENT = os.environ.get('BILINGUAL_TUTOR_TRACE_TRUST_PARENT', '0').lower() in ('1', 'true', 'yes')
+EXPORT_BATCH = 100
+# 调用栈树中每个节点最多的子节点数，超出的并入 OTHER_STACK
+MAX_STACKS = 256
+# 最多分解的端点数（根 span 名称），超出的端点只进入环形缓冲区
+MAX_ENDPOINTS = 256
+OTHER_STACK = '<other>'
+SERVICE_NAME = 'bilingual-tutor'
+
+# OTLP 枚举值
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('bilingual_tutor_current_span', default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+class Trace:
+    """一次请求的追踪：根 span 和按开始顺序排列的全部 span"""
+
+    __slots__ = ('tracer', 'trace_id', 'spans', 'root', 'dropped_spans')
+
+    def __init__(self, tracer: 'Tracer', trace_id: str):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self.dropped_spans = 0
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms if self.root is not None else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """摘要（最近追踪列表用）"""
+        root = self.root
+        return {
+            'trace_id': self.trace_id,
+            'name': root.name,
+            'start_time': root.start_ns / 1e9,
+            'duration_ms': root.duration_ms,
+            'span_count': len(self.spans),
+            'dropped_spans': self.dropped_spans,
+            'error': any(span.status == STATUS_ERROR for span in self.spans),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """完整追踪（span 按开始顺序，时间相对根 span 开始，单位毫秒）"""
+        started = self.root.start_ns
+        result = self.summary()
+        result['spans'] = [{
+            'span_id': span.span_id,
+            'parent_id': span.parent_id,
+            'name': span.name,
+            'kind': span.kind,
+            'offset_ms': (span.start_ns - started) / 1e6,
+            'duration_ms': span.duration_ms,
+            'attributes': dict(span.attributes or {}),
+            'status': span.status,
+            'status_message': span.status_message,
+        } for span in list(self.spans)]
+        return result
+
+
+class Span:
+    """
+    追踪中的一个操作
+    也是上下文管理器：with 块内它是当前 span，退出时结束并恢复上一个 span
+    span ID 在第一次读取时才生成（大多数 span 只参与进程内的分解，不需要 ID）
+    """
+
+    __slots__ = ('trace', 'name', 'parent', 'kind', 'attributes', 'start_ns', 'end_ns',
+                 'status', 'status_message', '_token', '_span_id', 'remote_parent_id')
+
+    def __init__(self, trace: Trace, name: str, parent: Optional['Span'], kind: int,
+                 attributes: Optional[Dict[str, Any]], start_ns: Optional[int] = None):
+        self.trace = trace
+        self.name = name
+        self.parent = parent
+        self.kind = kind
+        self.attributes: Optional[Dict[str, Any]] = dict(attributes) if attributes else None
+        self.start_ns = time.time_ns() if start_ns is None else start_ns
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ''
+        self._token = None
+        self._span_id: Optional[str] = None
+        # 根 span 的上游父 span（来自 traceparent 头）
+        self.remote_parent_id: Optional[str] = None
+
+    @property
+    def span_id(self) -> str:
+        if self._span_id is None:
+            self._span_id = _new_id(64)
+        return self._span_id
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return self.parent.span_id if self.parent is not None else self.remote_parent_id
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.attributes is None:
+            self.attributes = {}
+        self.attributes[key] = value
+
+    def activate(self) -> 'Span':
+        """设为当前 span"""
+        self._token = _current_span.set(self)
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """结束 span；如果是当前 span 则恢复上一个；根 span 结束时整个追踪完成"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status = STATUS_ERROR
+            self.status_message = f"{type(error).__name__}: {error}"[:200]
+        token, self._token = self._token, None
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # 在另一个上下文中结束（如回调线程）：清除该上下文中的当前 span
+                _current_span.set(None)
+        if self.trace.root is self:
+            self.trace.tracer._complete(self.trace)
+
+    def __enter__(self) -> 'Span':
+        if self._token is None:
+            self.activate()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(exc)
+
+
+class _NoopSpan:
+    """未采样时的 span：所有操作都是空操作"""
+
+    __slots__ = ()
+    name = ''
+    span_id = trace = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    """当前 span（不在已采样的追踪中时为 None）"""
+    return _current_span.get()
+
+
+def _child(parent: Span, name: str, kind: int, attributes: Optional[Dict[str, Any]],
+           start_ns: Optional[int] = None) -> Optional[Span]:
+    trace = parent.trace
+    if len(trace.spans) >= trace.tracer.max_spans:
+        trace.dropped_spans += 1
+        return None
+    child = Span(trace, name, parent, kind, attributes, start_ns)
+    trace.spans.append(child)
+    return child
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = SPAN_KIND_INTERNAL):
+    """
+    在当前追踪中开始一个子 span，用作上下文管理器：
+        with span("db.get_due_reviews", {'user_id': user_id}):
+            ...
+    没有进行中的已采样追踪时返回 NOOP_SPAN
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return _child(parent, name, kind, attributes) or NOOP_SPAN
+
+
+def record_span(name: str, seconds: float, attributes: Optional[Dict[str, Any]] = None,
+                kind: int = SPAN_KIND_INTERNAL, error: Optional[str] = None) -> None:
+    """
+    记录一个刚结束、耗时 seconds 的子 span（用于事后才知道耗时的调用，如查询剖析、AI 适配器）
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    child = _child(parent, name, kind, attributes, end_ns - int(seconds * 1e9))
+    if child is not None:
+        child.end_ns = end_ns
+        if error:
+            child.status = STATUS_ERROR
+            child.status_message = error
+
+
+def traced(name: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL):
+    """
+    装饰器：在已采样的追踪中把函数调用记录为子 span（默认名称为函数的 __qualname__）
+    同时支持普通函数和协程函数
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                parent = _current_span.get()
+                if parent is None:
+                    return await func(*args, **kwargs)
+                with _child(parent, span_name, kind, None) or NOOP_SPAN:
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is None:
+                return func(*args, **kwargs)
+            child = _child(parent, span_name, kind, None)
+            if child is None:
+                return func(*args, **kwargs)
+            child._token = _current_span.set(child)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                child.finish(e)
+                raise
+            child.finish()
+            return result
+        return wrapper
+
+    return decorator
+
+
+class _Frame:
+    """调用栈树的一个节点：同一路径上所有 span 的累计值"""
+
+    __slots__ = ('children', 'count', 'total', 'self_total')
+
+    def __init__(self):
+        self.children: Dict[str, _Frame] = {}
+        self.count = 0
+        self.total = 0
+        # 自身耗时 = 总耗时 - 直接子 span 耗时（并发子 span 可能使其为负，读取时按 0 计）
+        self.self_total = 0
+
+
+def _accumulate(profile: _Frame, root: Span, spans: List[Span]) -> None:
+    """把一个完成的追踪累加到端点的调用栈树（调用方持有锁）"""
+    nodes = {root: profile}
+    for item in spans:
+        if item.end_ns is None:
+            # 根结束时仍未结束的子 span（泄漏到其他线程的任务）不计入分解
+            continue
+        duration = item.end_ns - item.start_ns
+        if item is root:
+            node = profile
+        else:
+            parent = nodes.get(item.parent)
+            if parent is None:
+                continue
+            node = parent.children.get(item.name)
+            if node is None:
+                name = item.name if len(parent.children) < MAX_STACKS else OTHER_STACK
+                node = parent.children.get(name) or parent.children.setdefault(name, _Frame())
+            nodes[item] = node
+            parent.self_total -= duration
+        node.count += 1
+        node.total += duration
+        node.self_total += duration
+
+
+def format_traceparent(span: Span) -> str:
+    """W3C traceparent 头"""
+    return f"00-{span.trace.trace_id}-{span.span_id}-01"
+
+
+class Tracer:
+    """
+    追踪器：决定采样、保存最近的追踪、按端点累加调用栈分解
+
+    根 span 由 Web 层（每个请求一个，名称为 "方法 路由规则"）或后台任务通过
+    start_trace / trace 创建；其余各层只用模块级的 span / traced / record_span。
+    """
+
+    def __init__(self, sample_rate: float = None, buffer_size: int = None, max_spans: int = None,
+                 export_path: Optional[str] = EXPORT_PATH, service_name: str = SERVICE_NAME,
+                 trust_parent: bool = None):
+        self.sample_rate = SAMPLE_RATE if sample_rate is None else sample_rate
+        # False 时 traceparent 只提供 trace id 和父 span，采样仍按本地采样率
+        self.trust_parent = TRUST_PARENT if trust_parent is None else trust_parent
+        self.max_spans = max_spans or MAX_SPANS
+        self.export_path = export_path
+        self.service_name = service_name
+        self._traces: deque = deque(maxlen=buffer_size or BUFFER_SIZE)
+        self._lock = threading.Lock()
+        # 端点（根 span 名称）-> 调用栈树
+        self._profiles: Dict[str, _Frame] = {}
+        self._pending_export: List[Trace] = []
+        self.started = 0
+        self.completed = 0
+
+    def start_trace(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                    traceparent: Optional[str] = None, kind: int = SPAN_KIND_SERVER) -> Optional[Span]:
+        """
+        开始一个追踪并把根 span 设为当前 span；未采样时返回 None
+        已经在追踪中时改为开始一个子 span（同样需要调用 finish）
+        """
+        parent = _current_span.get()
+        if parent is not None:
+            child = _child(parent, name, kind, attributes)
+            return child.activate() if child is not None else None
+
+        self.started += 1
+        match = _TRACEPARENT.match(traceparent) if traceparent else None
+        if match is not None and self.trust_parent:
+            sampled = bool(int(match.group(3), 16) & 1)
+        else:
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        if not sampled:
+            return None
+
+        if match is not None:
+            trace_id, remote_parent = match.group(1), match.group(2)
+        else:
+            trace_id, remote_parent = _new_id(128), None
+
+        trace = Trace(self, trace_id)
+        root = trace.root = Span(trace, name, None, kind, attributes)
+        root.remote_parent_id = remote_parent
+        trace.spans.append(root)
+        return root.activate()
+
+    def trace(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+              traceparent: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL):
+        """start_trace 的上下文管理器形式（未采样时返回 NOOP_SPAN）"""
+        return self.start_trace(name, attributes, traceparent, kind) or NOOP_SPAN
+
+    # ---- 完成的追踪 ----
+
+    def _complete(self, trace: Trace) -> None:
+        spans = list(trace.spans)
+        root = trace.root
+        export = None
+        with self._lock:
+            self.completed += 1
+            self._traces.append(trace)
+            profile = self._profiles.get(root.name)
+            if profile is None and len(self._profiles) < MAX_ENDPOINTS:
+                profile = self._profiles[root.name] = _Frame()
+            if profile is not None:
+                _accumulate(profile, root, spans)
+            if self.export_path:
+                self._pending_export.append(trace)
+                if len(self._pending_export) >= EXPORT_BATCH:
+                    export, self._pending_export = self._pending_export, []
+        if export:
+            try:
+                self.export_otlp_json(self.export_path, export)
+            except OSError as e:
+                logger.warning(f"导出追踪失败: {e}")
+
+    def recent_traces(self, limit: int = 50, name: Optional[str] = None,
+                      min_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """最近完成的追踪摘要（新的在前），可按根 span 名称和最短耗时过滤"""
+        result = []
+        for trace in reversed(list(self._traces)):
+            if (name is None or trace.root.name == name) and trace.duration_ms >= min_ms:
+                result.append(trace.summary())
+                if len(result) >= limit:
+                    break
+        return result
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """环形缓冲区中的完整追踪"""
+        for trace in list(self._traces):
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+    def endpoints(self) -> List[Dict[str, Any]]:
+        """已追踪的端点（按总耗时降序）"""
+        with self._lock:
+            roots = [(endpoint, frame.count, frame.total) for endpoint, frame in self._profiles.items()]
+        roots.sort(key=lambda item: item[2], reverse=True)
+        return [{'endpoint': endpoint, 'traces': count, 'avg_ms': total / count / 1e6 if count else 0.0}
+                for endpoint, count, total in roots]
+
+    def _stacks(self, endpoint: str) -> Dict[str, Tuple[int, int, int]]:
+        """端点的调用栈路径 -> (调用次数, 总耗时 ns, 自身耗时 ns)"""
+        stacks = {}
+
+        def walk(path: str, frame: _Frame) -> None:
+            stacks[path] = (frame.count, frame.total, max(frame.self_total, 0))
+            for name, child in list(frame.children.items()):
+                walk(f"{path};{name}", child)
+
+        with self._lock:
+            profile = self._profiles.get(endpoint)
+            if profile is not None:
+                walk(endpoint, profile)
+        return stacks
+
+    def profile(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        """
+        端点的火焰图式分解
+        frames 按调用栈深度优先排列（同层按总耗时降序），offset / share 是在根宽度中的
+        起始位置和占比（0~1），avg_ms / self_avg_ms 是平均每个追踪的耗时
+        """
+        stacks = self._stacks(endpoint)
+        traces, root_total = stacks.get(endpoint, (0, 0, 0))[:2]
+        if not traces:
+            return None
+
+        children: Dict[str, List[str]] = {}
+        for path in stacks:
+            if path != endpoint:
+                children.setdefault(path.rsplit(';', 1)[0], []).append(path)
+
+        frames = []
+
+        def visit(path: str, depth: int, offset: float) -> None:
+            count, total, self_total = stacks[path]
+            frames.append({
+                'stack': path,
+                'name': path.rsplit(';', 1)[-1],
+                'depth': depth,
+                'calls': count,
+                'avg_ms': total / traces / 1e6,
+                'self_avg_ms': self_total / traces / 1e6,
+                'offset': offset,
+                'share': total / root_total if root_total else 0.0,
+            })
+            for child in sorted(children.get(path, ()), key=lambda item: stacks[item][1], reverse=True):
+                visit(child, depth + 1, offset)
+                # 并发的子 span 总和可能超过父 span，限制在父宽度内
+                offset = min(offset + stacks[child][1] / root_total, 1.0)
+
+        visit(endpoint, 0, 0.0)
+        return {'endpoint': endpoint, 'traces': traces, 'avg_ms': root_total / traces / 1e6, 'frames': frames}
+
+    def folded_stacks(self, endpoint: Optional[str] = None) -> str:
+        """折叠调用栈格式（"根;子;孙 自身耗时微秒"，可直接交给 flamegraph.pl 等工具）"""
+        with self._lock:
+            endpoints = [endpoint] if endpoint is not None else list(self._profiles)
+        items = [(path, stats[2]) for name in endpoints for path, stats in self._stacks(name).items()]
+        return ''.join(f"{path} {self_ns // 1000}\n" for path, self_ns in sorted(items))
+
+    def reset(self) -> None:
+        """清空缓冲区和分解"""
+        with self._lock:
+            self._traces.clear()
+            self._profiles.clear()
+            self._pending_export = []
+            self.started = self.completed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sample_rate': self.sample_rate,
+            'started': self.started,
+            'completed': self.completed,
+            'buffered': len(self._traces),
+            'buffer_size': self._traces.maxlen,
+        }
+
+    # ---- OTLP-JSON 导出 ----
+
+    def to_otlp(self, traces: Optional[Iterable[Trace]] = None) -> Dict[str, Any]:
+        """OTLP/JSON ExportTraceServiceRequest（默认为环形缓冲区中的全部追踪）"""
+        traces = list(self._traces) if traces is None else list(traces)
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [_otlp_span(item) for trace in traces for item in list(trace.spans)
+                              if item.end_ns is not None],
+                }],
+            }]
+        }
+
+    def export_otlp_json(self, path: str, traces: Optional[Iterable[Trace]] = None) -> int:
+        """
+        以 OTLP-JSON 追加写入文件（一行一个请求体），返回写入的 span 数
+        """
+        request = self.to_otlp(traces)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(request, ensure_ascii=False, separators=(',', ':')) + '\n')
+        return len(request['resourceSpans'][0]['scopeSpans'][0]['spans'])
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(item: Span) -> Dict[str, Any]:
+    result = {
+        'traceId': item.trace.trace_id,
+        'spanId': item.span_id,
+        'name': item.name,
+        'kind': item.kind,
+        'startTimeUnixNano': str(item.start_ns),
+        'endTimeUnixNano': str(item.end_ns),
+        'attributes': _otlp_attributes(item.attributes or {}),
+        'status': {'code': item.status, 'message': item.status_message} if item.status else {},
+    }
+    if item.parent_id:
+        result['parentSpanId'] = item.parent_id
+    return result
+
+
+tracer = Tracer()
@@ -2,12 +2,16 @@
 Progress Tracker - Monitors learning advancement and performance metrics.
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from ..models import (
     LearningActivity, ActivityResult, ProgressReport, ProgressMetrics,
     Skill, ProgressTrackerInterface, ActivityType
 )
+from ..storage.event_store import (
+    LearningEventStore, BoundedHistory, RingBuffer,
+    activity_result_to_payload, activity_result_from_payload
+)
 
 
 class ProgressTracker(ProgressTrackerInterface):
@@ -15,10 +19,28 @@ class ProgressTracker(ProgressTrackerInterface):
     Monitors learning advancement and performance metrics across all skills.
     """
     
-    def __init__(self):
-        """Initialize the progress tracker with metric storage."""
+    ACTIVITY_STREAM = "activity_result"
+
+    def __init__(self, event_store: LearningEventStore = None, history_limit: int = 500,
+                 max_users: int = 10000):
+        """
+        Initialize the progress tracker with metric storage.
+
+        Args:
+            event_store: Optional persistent event store. When given, activity results
+                are appended to it, windowed metrics are read from it, and
+                activity_history only keeps the most recent results in memory.
+            history_limit: Results kept in memory per user when a store is used
+            max_users: Users kept in memory when a store is used
+        """
+        self.event_store = event_store
         self.user_metrics: Dict[str, ProgressMetrics] = {}
-        self.activity_history: Dict[str, List[ActivityResult]] = {}
+        if event_store is None:
+            self._new_history = list
+            self.activity_history: Dict[str, List[ActivityResult]] = {}
+        else:
+            self._new_history = lambda: RingBuffer(history_limit)
+            self.activity_history = BoundedHistory(self._new_history, max_users)
         self.skill_progress: Dict[str, Dict[Skill, float]] = {}
     
     def record_performance(self, user_id: str, activity: LearningActivity, result: ActivityResult) -> None:
@@ -32,7 +54,7 @@ class ProgressTracker(ProgressTrackerInterface):
         """
         # Initialize user data if not exists
         if user_id not in self.activity_history:
-            self.activity_history[user_id] = []
+            self.activity_history[user_id] = self._new_history()
         if user_id not in self.skill_progress:
             self.skill_progress[user_id] = {}
         if user_id not in self.user_metrics:
@@ -51,6 +73,9 @@ class ProgressTracker(ProgressTrackerInterface):
         
         # Record the activity result
         self.activity_history[user_id].append(result)
+        if self.event_store is not None:
+            self.event_store.append(self.ACTIVITY_STREAM, user_id, activity_result_to_payload(result),
+                                    key=result.activity_id, timestamp=result.completed_at)
         
         # Update skill progress based on activity
         for skill in activity.skills_practiced:
@@ -89,6 +114,23 @@ class ProgressTracker(ProgressTrackerInterface):
         metrics.overall_progress = sum(score for score in all_scores if score > 0) / len([s for s in all_scores if s > 0]) if any(all_scores) else 0.0
         metrics.last_updated = datetime.now()
     
+    def _has_history(self, user_id: str) -> bool:
+        """Check whether any activity has been recorded for the user."""
+        if user_id in self.activity_history:
+            return True
+        return self.event_store is not None and self.event_store.has_events(self.ACTIVITY_STREAM, user_id)
+
+    def _activities_between(self, user_id: str, start: datetime,
+                            end: Optional[datetime] = None) -> List[ActivityResult]:
+        """Get the user's activity results completed within [start, end]."""
+        if self.event_store is not None:
+            events = self.event_store.window(self.ACTIVITY_STREAM, user_id, since=start, until=end)
+            return [activity_result_from_payload(event.payload) for event in events]
+        return [
+            result for result in self.activity_history.get(user_id, [])
+            if result.completed_at >= start and (end is None or result.completed_at <= end)
+        ]
+
     def calculate_learning_velocity(self, user_id: str, timeframe: timedelta) -> float:
         """
         Calculate learning velocity over a specified timeframe.
@@ -100,14 +142,11 @@ class ProgressTracker(ProgressTrackerInterface):
         Returns:
             Learning velocity as progress per unit time
         """
-        if user_id not in self.activity_history:
+        if not self._has_history(user_id):
             return 0.0
         
         cutoff_time = datetime.now() - timeframe
-        recent_activities = [
-            result for result in self.activity_history[user_id]
-            if result.completed_at >= cutoff_time
-        ]
+        recent_activities = self._activities_between(user_id, cutoff_time)
         
         if not recent_activities:
             return 0.0
@@ -133,7 +172,7 @@ class ProgressTracker(ProgressTrackerInterface):
         Returns:
             Detailed progress report
         """
-        if user_id not in self.activity_history:
+        if not self._has_history(user_id):
             # Return empty report for new users
             return ProgressReport(
                 user_id=user_id,
@@ -159,10 +198,7 @@ class ProgressTracker(ProgressTrackerInterface):
         period_end = datetime.now()
         
         # Filter activities for the period
-        period_activities = [
-            result for result in self.activity_history[user_id]
-            if period_start <= result.completed_at <= period_end
-        ]
+        period_activities = self._activities_between(user_id, period_start, period_end)
         
         # Calculate metrics
         activities_completed = len(period_activities)
@@ -261,14 +297,11 @@ class ProgressTracker(ProgressTrackerInterface):
         Returns:
             Achievement rate as percentage
         """
-        if user_id not in self.activity_history:
+        if not self._has_history(user_id):
             return 0.0
         
         cutoff_time = datetime.now() - timeframe
-        recent_activities = [
-            result for result in self.activity_history[user_id]
-            if result.completed_at >= cutoff_time
-        ]
+        recent_activities = self._activities_between(user_id, cutoff_time)
         
         if not recent_activities:
             return 0.0
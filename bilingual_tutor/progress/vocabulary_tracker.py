@@ -2,11 +2,12 @@
 Vocabulary Tracker - Monitors vocabulary acquisition and triggers level progression.
 """
 
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Optional
 from datetime import datetime, timedelta
 from ..models import (
     UserProfile, Content, ActivityResult, LearningActivity, ActivityType, Skill
 )
+from ..storage.event_store import LearningEventStore, BoundedHistory, RingBuffer
 
 
 class VocabularyTracker:
@@ -14,8 +15,28 @@ class VocabularyTracker:
     Monitors vocabulary mastery and triggers level progression.
     """
     
-    def __init__(self):
-        """Initialize the vocabulary tracker."""
+    WORD_REVIEW_STREAM = "word_review"
+    # Retention uses the last 3 scores per word and advancement the last 5
+    RECENT_SCORES = 5
+
+    def __init__(self, event_store: LearningEventStore = None, review_limit: Optional[int] = None,
+                 max_users: int = 10000):
+        """
+        Initialize the vocabulary tracker.
+
+        Args:
+            event_store: Optional persistent event store receiving every word review.
+                When given, word_review_history only keeps recent users in memory
+                and users evicted from it are reloaded from the store.
+            review_limit: Scores kept in memory per word (None keeps all, or
+                RECENT_SCORES when a store is used). Retention and advancement
+                checks only use the last few scores per word.
+            max_users: Users kept in word_review_history when a store is used
+        """
+        self.event_store = event_store
+        if event_store is not None and not review_limit:
+            review_limit = self.RECENT_SCORES
+        self.review_limit = review_limit
         # Track vocabulary mastery per user per language
         self.user_vocabulary: Dict[str, Dict[str, Set[str]]] = {}  # user_id -> language -> set of mastered words
         self.user_levels: Dict[str, Dict[str, str]] = {}  # user_id -> language -> current level
@@ -41,7 +62,11 @@ class VocabularyTracker:
         }
         # Track retention rates
         self.word_learning_dates: Dict[str, Dict[str, Dict[str, datetime]]] = {}  # user_id -> language -> word -> learned_date
-        self.word_review_history: Dict[str, Dict[str, Dict[str, List[float]]]] = {}  # user_id -> language -> word -> [scores]
+        # user_id -> language -> word -> [scores]
+        if event_store is None:
+            self.word_review_history: Dict[str, Dict[str, Dict[str, List[float]]]] = {}
+        else:
+            self.word_review_history = BoundedHistory(dict, max_users)
         # Track level advancement notifications
         self.advancement_notifications: Dict[str, List[Dict[str, any]]] = {}  # user_id -> list of notifications
     
@@ -66,10 +91,7 @@ class VocabularyTracker:
         if language not in self.word_learning_dates[user_id]:
             self.word_learning_dates[user_id][language] = {}
         
-        if user_id not in self.word_review_history:
-            self.word_review_history[user_id] = {}
-        if language not in self.word_review_history[user_id]:
-            self.word_review_history[user_id][language] = {}
+        review_history = self._review_history(user_id).setdefault(language, {})
         
         # Record word as learned if score is high enough
         if score >= 0.8:  # Consider mastered if score >= 80%
@@ -78,9 +100,34 @@ class VocabularyTracker:
                 self.word_learning_dates[user_id][language][word] = datetime.now()
         
         # Track review history
-        if word not in self.word_review_history[user_id][language]:
-            self.word_review_history[user_id][language][word] = []
-        self.word_review_history[user_id][language][word].append(score)
+        if word not in review_history:
+            review_history[word] = self._new_scores()
+        review_history[word].append(score)
+        if self.event_store is not None:
+            self.event_store.append(self.WORD_REVIEW_STREAM, user_id, score, key=f"{language}:{word}")
+
+    def _new_scores(self) -> List[float]:
+        return RingBuffer(self.review_limit) if self.review_limit else []
+
+    def _review_history(self, user_id: str) -> Dict[str, Dict[str, List[float]]]:
+        """
+        Get a user's review scores (language -> word -> scores).
+
+        Users evicted from word_review_history are reloaded from the event store.
+        """
+        if user_id in self.word_review_history:
+            return self.word_review_history[user_id]
+
+        history: Dict[str, Dict[str, List[float]]] = {}
+        if self.event_store is not None:
+            for event in self.event_store.window(self.WORD_REVIEW_STREAM, user_id):
+                language, _, word = (event.key or "").partition(":")
+                words = history.setdefault(language, {})
+                if word not in words:
+                    words[word] = self._new_scores()
+                words[word].append(event.payload)
+        self.word_review_history[user_id] = history
+        return history
     
     def check_level_completion(self, user_id: str, language: str) -> bool:
         """
@@ -133,12 +180,12 @@ class VocabularyTracker:
             return 0.0
         
         # Calculate retention based on recent review performance
+        review_history = self._review_history(user_id).get(language, {})
         retained_words = 0
         for word in words_in_timeframe:
-            if (word in self.word_review_history[user_id][language] and
-                self.word_review_history[user_id][language][word]):
+            if review_history.get(word):
                 # Consider retained if recent average score >= 0.7
-                recent_scores = self.word_review_history[user_id][language][word][-3:]  # Last 3 reviews
+                recent_scores = review_history[word][-3:]  # Last 3 reviews
                 avg_score = sum(recent_scores) / len(recent_scores)
                 if avg_score >= 0.7:
                     retained_words += 1
@@ -166,10 +213,10 @@ class VocabularyTracker:
             return False
         
         # 2. Consistent performance
-        if (user_id in self.word_review_history and 
-            language in self.word_review_history[user_id]):
+        review_history = self._review_history(user_id).get(language)
+        if review_history:
             all_scores = []
-            for word_scores in self.word_review_history[user_id][language].values():
+            for word_scores in review_history.values():
                 all_scores.extend(word_scores[-5:])  # Recent scores
             
             if all_scores:
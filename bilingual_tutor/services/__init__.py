@@ -1,22 +1,33 @@
 """
 AI services for the bilingual tutor system.
 包含大语言模型服务、智能内容生成等AI相关服务。
+按需导入：首次访问某个名称时才加载对应模块（PEP 562），
+导入包本身不会加载 HTTP 客户端。
 """
 
-from .ai_service import (
-    AIModelType,
-    AIResponseQuality,
-    LanguageLevel,
-    AIModelConfig,
-    AIRequest,
-    AIResponse,
-    ModelPerformanceMetrics,
-    BaseAIModelAdapter,
-    DeepSeekAdapter,
-    ZhipuAIAdapter,
-    AIService,
-    get_ai_service
-)
+import importlib
+from typing import TYPE_CHECKING
+
+_SUBMODULE_EXPORTS = {
+    '.ai_service': (
+        'AIModelType',
+        'AIResponseQuality',
+        'LanguageLevel',
+        'AIModelConfig',
+        'AIRequest',
+        'AIResponse',
+        'ModelPerformanceMetrics',
+        'BaseAIModelAdapter',
+        'DeepSeekAdapter',
+        'ZhipuAIAdapter',
+        'AIService',
+        'get_ai_service',
+    ),
+}
+
+_LAZY_ATTRIBUTES = {
+    name: module for module, names in _SUBMODULE_EXPORTS.items() for name in names
+}
 
 __all__ = [
     'AIModelType',
@@ -32,3 +43,33 @@ __all__ = [
     'AIService',
     'get_ai_service'
 ]
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .ai_service import (
+        AIModelType,
+        AIResponseQuality,
+        LanguageLevel,
+        AIModelConfig,
+        AIRequest,
+        AIResponse,
+        ModelPerformanceMetrics,
+        BaseAIModelAdapter,
+        DeepSeekAdapter,
+        ZhipuAIAdapter,
+        AIService,
+        get_ai_service
+    )
@@ -9,7 +9,6 @@ import os
 import json
 import time
 import asyncio
-import aiohttp
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
@@ -24,10 +23,11 @@ from bilingual_tutor.infrastructure.error_handler import (
     RateLimitError,
     handle_errors
 )
-from bilingual_tutor.infrastructure.logging_system import get_logger
+from bilingual_tutor.infrastructure.logging_system import get_logger, get_lazy_logger
+from bilingual_tutor.infrastructure.tracing import SPAN_KIND_CLIENT, record_span, traced
 
 
-logger = get_logger(__name__)
+logger = get_lazy_logger(__name__)
 
 
 class AIModelType(Enum):
@@ -219,8 +219,11 @@ class BaseAIModelAdapter(ABC):
         return self._metrics
     
     def _update_metrics(self, success: bool, duration_ms: float) -> None:
-        """更新性能指标"""
+        """更新性能指标（在已采样的请求追踪中同时记录一个模型调用 span）"""
         self._metrics.update(success, duration_ms)
+        record_span(f"ai.{self.config.model_type.value}", duration_ms / 1000,
+                    {'ai.model': self.config.model_name}, SPAN_KIND_CLIENT,
+                    error=None if success else "request failed")
 
 
 class DeepSeekAdapter(BaseAIModelAdapter):
@@ -261,6 +264,7 @@ class DeepSeekAdapter(BaseAIModelAdapter):
             if request.conversation_history:
                 payload["messages"] = request.conversation_history + payload["messages"]
             
+            import aiohttp  # 首次调用模型 API 时才加载 HTTP 客户端
             async with aiohttp.ClientSession() as session:
                 async with session.post(
                     self.api_url,
@@ -355,6 +359,7 @@ class ZhipuAIAdapter(BaseAIModelAdapter):
             if request.conversation_history:
                 payload["messages"] = request.conversation_history + payload["messages"]
             
+            import aiohttp
             async with aiohttp.ClientSession() as session:
                 async with session.post(
                     self.api_url,
@@ -449,6 +454,7 @@ class BaichuanAIAdapter(BaseAIModelAdapter):
             if request.conversation_history:
                 payload["messages"] = request.conversation_history + payload["messages"]
             
+            import aiohttp
             async with aiohttp.ClientSession() as session:
                 async with session.post(
                     self.api_url,
@@ -566,6 +572,7 @@ class AIService:
         logger.info(f"AI服务初始化完成，加载了{len(self._adapters)}个模型")
         logger.info(f"主模型: {self._primary_model.value if self._primary_model else 'None'}")
     
+    @traced()
     async def generate(self, request: AIRequest, model_type: Optional[AIModelType] = None) -> AIResponse:
         """生成AI响应（带自动切换）"""
         target_model = model_type or self._primary_model
@@ -711,6 +718,7 @@ class AIService:
             'reason': '所有模型性能较差，建议检查配置和网络'
         }
     
+    @traced()
     async def chat(self, messages: List[Dict[str, str]], 
                  model_type: Optional[AIModelType] = None,
                  **kwargs) -> AIResponse:
@@ -20,10 +20,10 @@ from bilingual_tutor.services.ai_service import (
     ExerciseType,
     get_ai_service
 )
-from bilingual_tutor.infrastructure.logging_system import get_logger
+from bilingual_tutor.infrastructure.logging_system import get_logger, get_lazy_logger
 
 
-logger = get_logger(__name__)
+logger = get_lazy_logger(__name__)
 
 
 class ContentQuality(Enum):
@@ -13,10 +13,10 @@ from dataclasses import dataclass, field
 from enum import Enum
 import logging
 
-from bilingual_tutor.infrastructure.logging_system import get_logger
+from bilingual_tutor.infrastructure.logging_system import get_logger, get_lazy_logger
 
 
-logger = get_logger(__name__)
+logger = get_lazy_logger(__name__)
 
 
 class Language(Enum):
@@ -0,0 +1,266 @@
+"""
+词汇批量导入 - 临时暂存表 + UPSERT 合并，可选延迟建索引
+Bulk Vocabulary Ingest - staging table, upsert merge and deferred indexing
+
+INSERT OR REPLACE 在 (word, language, level) 冲突时先删除旧行再插入新行，词汇 id 随之改变，
+learning_records.item_id 和 audio_files.vocabulary_id 指向的旧 id 失效。这里改为：
+
+1. 输入（JSON / NDJSON / CSV）按批流式读入没有索引的 TEMP 暂存表
+2. 在暂存表上用一条 SQL 剔除缺少必填字段的行
+3. INSERT ... SELECT ... ON CONFLICT(word, language, level) DO UPDATE 合并到 vocabulary：
+   新词插入，已有词原地更新（id 不变），内容相同的行不写入（不触发全文索引更新）
+4. 大批量导入时先删除 vocabulary 的二级索引和全文索引，全部合并后一次性重建，
+   避免每行维护索引；UNIQUE(word, language, level) 索引保留（UPSERT 依赖它判断冲突）
+
+整个导入在一个事务中完成，其他连接在提交前看到的仍是导入前的词汇表。
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from bilingual_tutor.storage.search import (
+    SEARCH_SOURCES, create_search_tables, drop_search_index, pin_search_statistics
+)
+
+logger = logging.getLogger(__name__)
+
+# 每批写入暂存表并合并的行数（暂存表在 temp_store=MEMORY 下占用内存，按批清空）
+DEFAULT_BATCH_SIZE = 50000
+# 导入行数达到该值时默认删除并重建二级索引和全文索引
+REBUILD_INDEX_ROWS = int(os.environ.get('BILINGUAL_TUTOR_BULK_REBUILD_ROWS', '100000'))
+
+VOCABULARY_COLUMNS = ('word', 'reading', 'meaning', 'example_sentence', 'example_translation',
+                      'language', 'level', 'category', 'tags', 'audio_url')
+# 合并时比较和更新的列（冲突键之外）
+_UPDATE_COLUMNS = [column for column in VOCABULARY_COLUMNS if column not in ('word', 'language', 'level')]
+# 已有词条原地更新（id 不变，引用它的学习记录、音频和全文索引保持有效），内容未变时不写入
+VOCABULARY_UPSERT = (
+    "ON CONFLICT(word, language, level) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in _UPDATE_COLUMNS)
+    + " WHERE " + " OR ".join(f"{column} IS NOT excluded.{column}" for column in _UPDATE_COLUMNS)
+)
+
+# 输入文件中的别名字段（vocabulary_data/*.json 的格式）
+FIELD_ALIASES = {
+    'phonetic': 'reading',
+    'example': 'example_sentence',
+    'example_cn': 'example_translation',
+    'pos': 'category',
+}
+
+STAGING_TABLE = 'vocabulary_staging'
+
+
+@dataclass
+class BulkLoadResult:
+    """一次导入的统计"""
+    staged: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    indexes_rebuilt: bool = False
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.staged / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {**self.__dict__, 'rows_per_second': round(self.rows_per_second, 1)}
+
+
+def normalize_vocabulary_row(item: Dict, language: str = None, level: str = None) -> Tuple:
+    """
+    词条字典转换为 VOCABULARY_COLUMNS 顺序的元组
+    Args:
+        item: 词条（支持 phonetic/example/example_cn/pos 别名）
+        language: 词条没有 language 字段时使用
+        level: 词条没有 level 字段时使用
+    """
+    values = {FIELD_ALIASES.get(key, key): value for key, value in item.items()}
+    values.setdefault('language', language)
+    values.setdefault('level', level)
+    if values.get('tags') is None and values.get('level'):
+        values['tags'] = str(values['level']).lower()
+    row = []
+    for column in VOCABULARY_COLUMNS:
+        value = values.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        elif value is not None and not isinstance(value, (int, float)):
+            value = json.dumps(value, ensure_ascii=False)
+        row.append(value if value is not None or column in ('word', 'meaning', 'language', 'level') else '')
+    return tuple(row)
+
+
+def iter_vocabulary_file(path: str, language: str = None, level: str = None) -> Iterator[Tuple]:
+    """
+    逐行读取词汇文件
+    - .json：vocabulary_data 格式 {"metadata": {"language", "level"}, "words": [...]} 或词条数组
+      （整个文档需要解析后才能读取，百万行级别的输入请用 NDJSON 或 CSV）
+    - .ndjson / .jsonl：每行一个词条，流式读取
+    - .csv：首行为列名，流式读取
+    Args:
+        path: 文件路径
+        language: 默认语言（JSON 的 metadata 优先）
+        level: 默认级别（JSON 的 metadata 优先）
+    Raises:
+        ValueError: 文件格式不支持或内容无法解析
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number} 不是有效的 JSON: {e}") from e
+                yield normalize_vocabulary_row(item, language, level)
+    elif extension == '.csv':
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for item in csv.DictReader(f):
+                yield normalize_vocabulary_row({key: value for key, value in item.items() if key}, language, level)
+    elif extension == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            metadata = data.get('metadata', {})
+            language = metadata.get('language', language)
+            level = metadata.get('level', level)
+            data = data.get('words', [])
+        if not isinstance(data, list):
+            raise ValueError(f"{path} 不是词条数组")
+        for item in data:
+            yield normalize_vocabulary_row(item, language, level)
+    else:
+        raise ValueError(f"不支持的词汇文件格式: {path}")
+
+
+def _secondary_indexes(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    """vocabulary 上可以删除重建的索引（UNIQUE 约束的自动索引没有 sql，不在其中）"""
+    return conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'vocabulary' "
+                        "AND sql IS NOT NULL ORDER BY name").fetchall()
+
+
+def _merge_staging(conn: sqlite3.Connection, result: BulkLoadResult) -> None:
+    """暂存表剔除无效行后合并到 vocabulary，然后清空"""
+    result.rejected += conn.execute(
+        f"DELETE FROM temp.{STAGING_TABLE} WHERE word IS NULL OR word = '' OR meaning IS NULL "
+        f"OR language IS NULL OR language = '' OR level IS NULL OR level = ''").rowcount
+    staged = conn.execute(f"SELECT COUNT(*) FROM temp.{STAGING_TABLE}").fetchone()[0]
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM vocabulary").fetchone()[0]
+    columns = ', '.join(VOCABULARY_COLUMNS)
+    # WHERE true：消除 INSERT ... SELECT 与 ON CONFLICT 的语法歧义；按暂存顺序合并，同一词条后出现的覆盖先出现的
+    # rowcount 为插入和更新的行数（不含全文索引触发器的写入）
+    written = conn.execute(f"""
+        INSERT INTO vocabulary ({columns})
+        SELECT {columns} FROM temp.{STAGING_TABLE} WHERE true ORDER BY rowid
+        {VOCABULARY_UPSERT}
+    """).rowcount
+    inserted = conn.execute("SELECT COUNT(*) FROM vocabulary WHERE id > ?", (max_id,)).fetchone()[0]
+    result.staged += staged
+    result.inserted += inserted
+    result.updated += written - inserted
+    result.unchanged += staged - written
+    conn.execute(f"DELETE FROM temp.{STAGING_TABLE}")
+
+
+def bulk_load_vocabulary(conn: sqlite3.Connection, rows: Iterable[Sequence],
+                         batch_size: int = DEFAULT_BATCH_SIZE, rebuild_indexes: Optional[bool] = None,
+                         expected_rows: int = None) -> BulkLoadResult:
+    """
+    批量导入词汇（在一个事务中完成，失败时回滚）
+    Args:
+        conn: 目录库连接（调用方负责写锁）
+        rows: VOCABULARY_COLUMNS 顺序的元组（iter_vocabulary_file 的输出）
+        batch_size: 每批暂存和合并的行数
+        rebuild_indexes: 是否删除并在导入后重建二级索引和全文索引；
+                         None 时 expected_rows 达到 REBUILD_INDEX_ROWS 才重建
+        expected_rows: 预计导入行数（用于决定是否重建索引）；None 时取 len(rows)，
+                       rows 是生成器时先读取最多 REBUILD_INDEX_ROWS 行再决定
+    Returns:
+        BulkLoadResult
+    """
+    if rebuild_indexes is None:
+        if expected_rows is None and hasattr(rows, '__len__'):
+            expected_rows = len(rows)
+        if expected_rows is None:
+            # 文件流的行数未知：预读的行数与两批暂存相当，在开始事务之前读取
+            head = list(itertools.islice(rows, REBUILD_INDEX_ROWS))
+            expected_rows = len(head)
+            rows = itertools.chain(head, rows)
+        rebuild_indexes = expected_rows >= REBUILD_INDEX_ROWS
+    result = BulkLoadResult(indexes_rebuilt=bool(rebuild_indexes))
+    started = time.perf_counter()
+    placeholders = ', '.join('?' * len(VOCABULARY_COLUMNS))
+    rows = iter(rows)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+                     f"({', '.join(VOCABULARY_COLUMNS)})")
+        conn.execute(f"DELETE FROM temp.{STAGING_TABLE}")
+        indexes = _secondary_indexes(conn) if rebuild_indexes else []
+        if rebuild_indexes:
+            for name, _ in indexes:
+                conn.execute(f"DROP INDEX {name}")
+            drop_search_index(conn, SEARCH_SOURCES['vocabulary'])
+
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany(f"INSERT INTO temp.{STAGING_TABLE} VALUES ({placeholders})", batch)
+            _merge_staging(conn, result)
+
+        if rebuild_indexes:
+            for _, sql in indexes:
+                conn.execute(sql)
+            # 全文索引表不存在时重新创建并从 vocabulary 填充，触发器一并恢复
+            create_search_tables(conn)
+            pin_search_statistics(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+    result.seconds = time.perf_counter() - started
+    logger.info(f"批量导入词汇: {result.to_dict()}")
+    return result
+
+
+def main(argv: Iterable[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量导入词汇文件（JSON / NDJSON / CSV）")
+    parser.add_argument("db_path", help="学习数据库（learning.db）路径")
+    parser.add_argument("files", nargs="+", help="词汇文件，如 vocabulary_data/custom_english.json")
+    parser.add_argument("--language", help="文件中没有语言信息时使用")
+    parser.add_argument("--level", help="文件中没有级别信息时使用")
+    parser.add_argument("--rebuild-indexes", action="store_true", help="导入前删除索引，导入后重建")
+    args = parser.parse_args(argv)
+
+    from bilingual_tutor.storage.database import LearningDatabase
+    db = LearningDatabase(args.db_path)
+    try:
+        rows = itertools.chain.from_iterable(iter_vocabulary_file(path, args.language, args.level)
+                                             for path in args.files)
+        result = db.bulk_load_vocabulary(rows, rebuild_indexes=args.rebuild_indexes or None)
+    finally:
+        db.close()
+    print(f"导入 {result.staged} 行（新增 {result.inserted}，更新 {result.updated}，未变 {result.unchanged}，"
+          f"无效 {result.rejected}），耗时 {result.seconds:.1f}s，{result.rows_per_second:.0f} 行/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
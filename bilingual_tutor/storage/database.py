@@ -5,11 +5,12 @@ Learning Database - SQLite storage for vocabulary, learning records and content
 
 import sqlite3
 import os
-import shutil
+import sys
 import threading
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime, timedelta
-from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+from dataclasses import dataclass, fields
+import itertools
 import json
 import logging
 import time
@@ -17,6 +18,28 @@ from contextlib import contextmanager
 from queue import Queue, Empty
 import weakref
 
+from bilingual_tutor.infrastructure.tracing import NOOP_SPAN, SPAN_KIND_CLIENT, current_span, span
+from bilingual_tutor.storage.bulk_load import (
+    DEFAULT_BATCH_SIZE, VOCABULARY_COLUMNS, VOCABULARY_UPSERT, BulkLoadResult, bulk_load_vocabulary,
+    iter_vocabulary_file
+)
+from bilingual_tutor.storage.migrate_database import (
+    REVIEW_TIMESTAMP_TRIGGERS, OBSOLETE_REVIEW_INDEXES,
+    add_review_timestamp_columns, backfill_review_timestamps, create_review_timestamp_indexes
+)
+from bilingual_tutor.storage.pagination import Page, clamp_page_size, decode_cursor, make_page
+from bilingual_tutor.storage.query_profiler import PROFILING_ENABLED, ProfiledConnection, QueryProfiler
+from bilingual_tutor.storage.review_events import (
+    PROJECTION_UPSERT, ReviewEvent, append_events, create_review_event_tables, fold_review, write_snapshots
+)
+from bilingual_tutor.storage.search import (
+    create_search_tables, pin_search_statistics, rebuild_search_index, search
+)
+from bilingual_tutor.storage.sharding import (
+    DEFAULT_SHARDS, ShardSet, load_shard_count, save_shard_count, shard_path
+)
+from bilingual_tutor.storage.snapshots import restore_sqlite_snapshot, sqlite_snapshot
+
 
 @dataclass
 class VocabularyItem:
@@ -34,6 +57,10 @@ class VocabularyItem:
     audio_url: str = ""  # 音频文件URL或路径
 
 
+# 词汇流式导出（CSV）的列
+VOCABULARY_EXPORT_FIELDS = [field.name for field in fields(VocabularyItem)]
+
+
 @dataclass
 class LearningRecord:
     """学习记录（艾宾浩斯曲线核心）"""
@@ -64,18 +91,158 @@ class ContentItem:
     created_at: datetime = None
 
 
+# 表结构版本（PRAGMA user_version），修改表结构或索引时递增
+SCHEMA_VERSION = 7
+
+# 流式导出连接的页缓存（KiB）；池中连接的页缓存为 10000 页
+STREAM_CACHE_KIB = int(os.environ.get('BILINGUAL_TUTOR_STREAM_CACHE_KIB', '4096'))
+
+# 待复习查询（整数时间列 + 覆盖索引 idx_records_user_due / idx_records_user_type_due）
+DUE_REVIEWS_QUERY = """
+    SELECT lr.*, v.word, v.meaning, v.reading
+    FROM learning_records lr
+    LEFT JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
+    WHERE lr.user_id = ? AND lr.next_review_ts <= ?
+    ORDER BY lr.next_review_ts ASC, lr.next_review_date ASC, lr.memory_strength ASC
+    LIMIT ?
+"""
+DUE_REVIEWS_BY_TYPE_QUERY = """
+    SELECT lr.*, v.word, v.meaning, v.reading
+    FROM learning_records lr
+    LEFT JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
+    WHERE lr.user_id = ? AND lr.item_type = ? AND lr.next_review_ts <= ?
+    ORDER BY lr.next_review_ts ASC, lr.next_review_date ASC, lr.memory_strength ASC
+    LIMIT ?
+"""
+DUE_COUNT_QUERY = "SELECT COUNT(*) FROM learning_records WHERE user_id = ? AND next_review_ts <= ?"
+RECENT_ACTIVITY_QUERY = "SELECT COUNT(*) FROM learning_records WHERE user_id = ? AND last_review_ts >= ?"
+
+
+def to_epoch(value) -> Optional[int]:
+    """
+    datetime 或 ISO-8601 文本转为 epoch 秒
+    无时区的时间按本地时间处理（与 SQLite 触发器中的 strftime(..., 'utc') 一致）
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp())
+
+
+def create_user_tables(conn: sqlite3.Connection) -> None:
+    """
+    创建按用户存储的表（未分片时在主库中，分片时在每个分片文件中）
+    学习记录和复习事件日志；用户偏好按 users.id 关联，始终在目录库中（create_preference_table）
+    """
+    cursor = conn.cursor()
+    
+    # 学习记录表（艾宾浩斯曲线核心）
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS learning_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            item_type TEXT NOT NULL,
+            learn_count INTEGER DEFAULT 0,
+            correct_count INTEGER DEFAULT 0,
+            consecutive_correct INTEGER DEFAULT 0,
+            last_review_date DATETIME,
+            next_review_date DATETIME,
+            memory_strength REAL DEFAULT 0.0,
+            mastery_level INTEGER DEFAULT 0,
+            easiness_factor REAL DEFAULT 2.5,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_review_ts INTEGER,
+            next_review_ts INTEGER,
+            UNIQUE(user_id, item_id, item_type)
+        )
+    """)
+    
+    # 复习时间的整数列（版本 3，旧数据库添加后按 rowid 分批回填）
+    if add_review_timestamp_columns(conn):
+        conn.commit()
+        backfill_review_timestamps(conn)
+    
+    # 复习事件日志（版本 4，learning_records 为按事件折叠后的投影）
+    create_review_event_tables(conn)
+
+
+def create_user_indexes(conn: sqlite3.Connection) -> None:
+    """创建按用户存储的表的索引和触发器"""
+    cursor = conn.cursor()
+    
+    # 学习记录表索引（性能关键 - 需求21.1, 21.5, 21.6）
+    # 复习查询使用整数时间列上的覆盖索引，文本时间索引不再需要
+    create_review_timestamp_indexes(conn)
+    for ddl in REVIEW_TIMESTAMP_TRIGGERS:
+        cursor.execute(ddl)
+    for index in OBSOLETE_REVIEW_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_user_type ON learning_records(user_id, item_type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_user_mastery ON learning_records(user_id, mastery_level)")
+    
+    # 词汇查询复合索引（需求21.6）
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_vocab_query ON learning_records(user_id, item_type, mastery_level)")
+    
+    # 性能监控索引
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_memory_strength ON learning_records(memory_strength)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_item ON learning_records(item_id, item_type)")
+    
+    # 检查并添加 consecutive_correct 列（向后兼容）
+    try:
+        cursor.execute("SELECT consecutive_correct FROM learning_records LIMIT 1")
+    except sqlite3.OperationalError:
+        # 列不存在，添加它
+        cursor.execute("ALTER TABLE learning_records ADD COLUMN consecutive_correct INTEGER DEFAULT 0")
+        # 为现有记录计算 consecutive_correct 值
+        cursor.execute("""
+            UPDATE learning_records 
+            SET consecutive_correct = CASE 
+                WHEN correct_count = learn_count THEN correct_count
+                ELSE 0
+            END
+        """)
+        conn.commit()
+
+
+
+def create_preference_table(conn: sqlite3.Connection) -> None:
+    """
+    创建用户偏好表及索引（目录库）
+    user_id 是 users.id，与 users 表在同一个文件中，删除用户时级联删除偏好
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            preference_key TEXT NOT NULL,
+            preference_value TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            UNIQUE(user_id, preference_key)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_preferences_user ON user_preferences(user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_preferences_key ON user_preferences(preference_key)")
+
+
 class ConnectionPool:
     """数据库连接池管理器"""
     
-    def __init__(self, db_path: str, max_connections: int = 10):
+    def __init__(self, db_path: str, max_connections: int = 10, profiler: QueryProfiler = None):
         """
         初始化连接池
         Args:
             db_path: 数据库文件路径
             max_connections: 最大连接数
+            profiler: 查询剖析器（None 时连接不计时）
         """
         self.db_path = db_path
         self.max_connections = max_connections
+        self.profiler = profiler
         self._pool = Queue(maxsize=max_connections)
         self._created_connections = 0
         self._lock = threading.Lock()
@@ -86,8 +253,19 @@ class ConnectionPool:
             self._pool.put_nowait(conn)
     
     def _create_connection(self) -> sqlite3.Connection:
-        """创建新的数据库连接"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        """创建新的数据库连接（计入连接数）"""
+        conn = self._connect()
+        with self._lock:
+            self._created_connections += 1
+        return conn
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打开并配置连接"""
+        if self.profiler is not None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=ProfiledConnection)
+            conn.profiler = self.profiler
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
         
         # 优化连接设置
@@ -98,45 +276,74 @@ class ConnectionPool:
         conn.execute("PRAGMA temp_store=MEMORY")
         conn.execute("PRAGMA mmap_size=268435456")  # 256MB
         
-        with self._lock:
-            self._created_connections += 1
-        
         return conn
     
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = None
-        try:
-            # 尝试从池中获取连接
+        """
+        获取数据库连接的上下文管理器
+        在已采样的请求追踪中记录为 db.<调用方法名> span（包含等待连接的时间）
+        """
+        db_span = NOOP_SPAN if current_span() is None else span(
+            f"db.{sys._getframe(2).f_code.co_name}",
+            {'db.system': 'sqlite', 'db.name': os.path.basename(self.db_path)}, SPAN_KIND_CLIENT)
+        with db_span:
+            conn = None
             try:
-                conn = self._pool.get_nowait()
-            except Empty:
-                # 池中没有可用连接，创建新连接
-                with self._lock:
-                    if self._created_connections < self.max_connections:
-                        conn = self._create_connection()
+                # 尝试从池中获取连接
+                try:
+                    conn = self._pool.get_nowait()
+                except Empty:
+                    # 池中没有可用连接：未达上限时创建新连接（在锁外连接，先占用名额）
+                    with self._lock:
+                        can_create = self._created_connections < self.max_connections
+                        if can_create:
+                            self._created_connections += 1
+                    if can_create:
+                        try:
+                            conn = self._connect()
+                        except Exception:
+                            with self._lock:
+                                self._created_connections -= 1
+                            raise
                     else:
-                        # 等待可用连接
+                        # 等待可用连接（不持有锁，其他线程可以归还连接）
                         conn = self._pool.get(timeout=5.0)
             
-            yield conn
+                yield conn
             
-        except Exception as e:
-            logging.error(f"数据库连接错误: {e}")
-            if conn:
-                conn.rollback()
-            raise
+            except Exception as e:
+                logging.error(f"数据库连接错误: {e}")
+                if conn:
+                    conn.rollback()
+                raise
+            finally:
+                if conn:
+                    try:
+                        # 将连接返回池中
+                        self._pool.put_nowait(conn)
+                    except:
+                        # 池已满，关闭连接
+                        conn.close()
+                        with self._lock:
+                            self._created_connections -= 1
+    
+    @contextmanager
+    def streaming_connection(self):
+        """
+        流式导出用的独立只读连接
+        逐页读取整个大表时，池中的连接轮流执行查询，每个连接都会缓存满 10000 页；
+        独立连接只用一个较小的页缓存，不使用内存映射，也不长时间占用池中的连接
+        """
+        conn = self._connect()
+        try:
+            conn.execute(f"PRAGMA cache_size=-{STREAM_CACHE_KIB}")
+            # 顺序读取不需要内存映射，映射的文件页会计入进程 RSS
+            conn.execute("PRAGMA mmap_size=0")
+            conn.execute("PRAGMA query_only=1")
+            yield conn
         finally:
-            if conn:
-                try:
-                    # 将连接返回池中
-                    self._pool.put_nowait(conn)
-                except:
-                    # 池已满，关闭连接
-                    conn.close()
-                    with self._lock:
-                        self._created_connections -= 1
+            conn.close()
     
     def close_all(self):
         """关闭所有连接"""
@@ -151,44 +358,32 @@ class ConnectionPool:
             self._created_connections = 0
 
 
-def _measure_query_time(query_name: str):
-    """查询性能测量装饰器"""
-    def decorator(func):
-        def wrapper(self, *args, **kwargs):
-            start_time = time.time()
-            try:
-                result = func(self, *args, **kwargs)
-                return result
-            finally:
-                end_time = time.time()
-                query_time = end_time - start_time
-                
-                # 记录性能统计
-                self._performance_stats['query_count'] += 1
-                self._performance_stats['total_query_time'] += query_time
-                
-                # 记录慢查询（超过100ms）
-                if query_time > 0.1:
-                    self._performance_stats['slow_queries'].append({
-                        'query': query_name,
-                        'time': query_time,
-                        'timestamp': datetime.now().isoformat()
-                    })
-                    logging.warning(f"慢查询检测: {query_name} 耗时 {query_time:.3f}s")
-        
-        return wrapper
-    return decorator
+class ShardConnectionPool(ConnectionPool):
+    """分片连接池：每个连接 ATTACH 目录库，联表查询中的 vocabulary 等表从目录库读取"""
+    
+    def __init__(self, db_path: str, catalog_path: str, max_connections: int = 10,
+                 profiler: QueryProfiler = None):
+        self.catalog_path = catalog_path
+        super().__init__(db_path, max_connections, profiler)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = super()._connect()
+        conn.execute("ATTACH DATABASE ? AS catalog", (self.catalog_path,))
+        return conn
 
 
 class LearningDatabase:
     """学习数据库管理类 - 支持连接池和性能优化"""
     
-    def __init__(self, db_path: str = None, max_connections: int = 10):
+    def __init__(self, db_path: str = None, max_connections: int = 10, shards: int = None):
         """
         初始化数据库连接
         Args:
             db_path: 数据库文件路径
-            max_connections: 最大连接数
+            max_connections: 最大连接数（每个分片各自计算）
+            shards: 按用户分片数，默认读取 BILINGUAL_TUTOR_DB_SHARDS（0 表示不分片）
+        Raises:
+            ValueError: 分片数与数据库记录的不一致（需先运行 sharding 迁移工具）
         """
         if db_path is None:
             # 默认数据库路径
@@ -196,17 +391,79 @@ class LearningDatabase:
             db_path = os.path.join(base_dir, "learning.db")
         
         self.db_path = db_path
-        self._pool = ConnectionPool(db_path, max_connections)
+        # 目录库和各分片的连接共用一个剖析器（需求21.7）
+        self._profiler = QueryProfiler() if PROFILING_ENABLED else None
+        self._pool = ConnectionPool(db_path, max_connections, self._profiler)
+        shards = DEFAULT_SHARDS if shards is None else shards
+        # 分片模式下 _pool 是目录库，按用户的表在 _shards 的各个分片文件中
+        self._shards = self._open_shards(shards, max_connections) if shards > 0 else None
         self._lock = threading.Lock()  # 线程安全锁
-        self._performance_stats = {
-            'query_count': 0,
-            'total_query_time': 0.0,
-            'slow_queries': []
-        }
         
-        # 初始化数据库结构和索引
-        self._init_database()
-        self._create_performance_indexes()
+        # 初始化数据库结构和索引（已是当前版本时跳过 DDL）
+        self._ensure_schema()
+    
+    def _open_shards(self, shards: int, max_connections: int) -> ShardSet:
+        """为目录库的各分片文件创建连接池"""
+        return ShardSet(
+            self.db_path, shards,
+            lambda path, catalog: ShardConnectionPool(path, catalog, max_connections, self._profiler)
+        )
+    
+    def _ensure_schema(self) -> bool:
+        """
+        按 PRAGMA user_version 应用表结构和索引（目录库和每个分片分别记录版本）
+        已应用的数据库只读取一次版本号，不再执行 CREATE / ANALYZE
+        Returns:
+            bool: 是否执行了 DDL
+        """
+        applied = False
+        # 先核对分片配置，避免在已分片的目录库中重新创建按用户的表
+        self._check_shard_config()
+        with self._pool.get_connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            self._init_database()
+            self._create_performance_indexes()
+            with self._pool.get_connection() as conn:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.commit()
+            applied = True
+        
+        if self._shards is not None:
+            for pool in self._shards.pools:
+                with pool.get_connection() as conn:
+                    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                        continue
+                    create_user_tables(conn)
+                    create_user_indexes(conn)
+                    conn.execute("ANALYZE main")
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                    conn.commit()
+                    applied = True
+            with self._pool.get_connection() as conn:
+                if load_shard_count(conn) is None:
+                    save_shard_count(conn, self._shards.count)
+        return applied
+    
+    def _check_shard_config(self):
+        """分片数与目录库记录的一致（首次打开时由 _ensure_schema 记录）"""
+        shards = self._shards.count if self._shards is not None else 0
+        with self._pool.get_connection() as conn:
+            stored = load_shard_count(conn)
+            if stored is None and shards:
+                stored = 0 if conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'learning_records'").fetchone() else None
+        if stored is not None and stored != shards:
+            raise ValueError(f"{self.db_path} 使用 {stored} 个分片（配置为 {shards}），请先运行 "
+                             f"python -m bilingual_tutor.storage.sharding {self.db_path} {max(shards, 1)}")
+    
+    def _user_pool(self, user_id) -> ConnectionPool:
+        """user_id 的学习记录所在的连接池"""
+        return self._shards.pool_for(user_id) if self._shards is not None else self._pool
+    
+    def _user_pools(self) -> List[ConnectionPool]:
+        """保存学习记录的全部连接池"""
+        return self._shards.pools if self._shards is not None else [self._pool]
     
     def _init_database(self):
         """初始化数据库表结构"""
@@ -261,26 +518,6 @@ class LearningDatabase:
                 )
             """)
             
-            # 学习记录表（艾宾浩斯曲线核心）
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS learning_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    item_id INTEGER NOT NULL,
-                    item_type TEXT NOT NULL,
-                    learn_count INTEGER DEFAULT 0,
-                    correct_count INTEGER DEFAULT 0,
-                    consecutive_correct INTEGER DEFAULT 0,
-                    last_review_date DATETIME,
-                    next_review_date DATETIME,
-                    memory_strength REAL DEFAULT 0.0,
-                    mastery_level INTEGER DEFAULT 0,
-                    easiness_factor REAL DEFAULT 2.5,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user_id, item_id, item_type)
-                )
-            """)
-            
             # 用户表（Web应用支持）
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -296,19 +533,13 @@ class LearningDatabase:
                 )
             """)
             
-            # 用户偏好表
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_preferences (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    preference_key TEXT NOT NULL,
-                    preference_value TEXT NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-                    UNIQUE(user_id, preference_key)
-                )
-            """)
+            # 认证所需的用户列（版本 2，旧数据库按需添加）
+            user_columns = {row[1] for row in cursor.execute("PRAGMA table_info(users)")}
+            for column, definition in (("salt", "TEXT DEFAULT ''"),
+                                       ("last_login", "DATETIME"),
+                                       ("password_changed_at", "DATETIME")):
+                if column not in user_columns:
+                    cursor.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
             
             # 音频文件表
             cursor.execute("""
@@ -331,6 +562,35 @@ class LearningDatabase:
                 )
             """)
             
+            # 服务端会话表（多个 Web worker 共享登录状态）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS web_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_activity REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            
+            # 分片存储的目录库只保存分片数，按用户的表在各分片文件中
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS shard_config (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+            
+            # 词汇、语法、内容的全文索引（触发器同步）
+            create_search_tables(conn)
+            
+            # 用户偏好与 users 表同在目录库（分片时也不拆分）
+            create_preference_table(conn)
+            
+            if self._shards is None:
+                create_user_tables(conn)
+            
             conn.commit()
     
     def _create_performance_indexes(self):
@@ -353,44 +613,10 @@ class LearningDatabase:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_content_type ON content(content_type)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_content_created_at ON content(created_at)")
             
-            # 学习记录表索引（性能关键 - 需求21.1, 21.5, 21.6）
-            # 复习查询优化索引
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_user_review ON learning_records(user_id, next_review_date)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_user_type ON learning_records(user_id, item_type)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_user_mastery ON learning_records(user_id, mastery_level)")
-            
-            # 词汇查询复合索引（需求21.6）
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_vocab_query ON learning_records(user_id, item_type, mastery_level)")
-            
-            # 性能监控索引
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_memory_strength ON learning_records(memory_strength)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_last_review ON learning_records(last_review_date)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_item ON learning_records(item_id, item_type)")
-            
-            # 检查并添加 consecutive_correct 列（向后兼容）
-            try:
-                cursor.execute("SELECT consecutive_correct FROM learning_records LIMIT 1")
-            except sqlite3.OperationalError:
-                # 列不存在，添加它
-                cursor.execute("ALTER TABLE learning_records ADD COLUMN consecutive_correct INTEGER DEFAULT 0")
-                # 为现有记录计算 consecutive_correct 值
-                cursor.execute("""
-                    UPDATE learning_records 
-                    SET consecutive_correct = CASE 
-                        WHEN correct_count = learn_count THEN correct_count
-                        ELSE 0
-                    END
-                """)
-                conn.commit()
-            
             # 用户表索引
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
             
-            # 用户偏好表索引
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_preferences_user ON user_preferences(user_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_preferences_key ON user_preferences(preference_key)")
-            
             # 音频文件表索引
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_word ON audio_files(word)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_word_lang ON audio_files(word, language)")
@@ -400,43 +626,52 @@ class LearningDatabase:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_quality ON audio_files(quality)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_access ON audio_files(access_count)")
             
+            # 会话表索引：过期清理和按用户注销
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON web_sessions(expires_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON web_sessions(user_id)")
+            
+            if self._shards is None:
+                create_user_indexes(conn)
+            
             # 分析查询优化
             cursor.execute("ANALYZE")
+            pin_search_statistics(conn)
             
             conn.commit()
             logging.info("数据库性能索引创建完成")
     
-    def backup_database(self, backup_path: str = None) -> bool:
+    def backup_database(self, backup_path: str = None, compact: bool = False) -> bool:
         """
-        备份数据库
+        在线备份数据库（不持有数据库锁，备份期间写入照常进行）
+        分片模式下各分片文件一并备份到 shard_path(backup_path, i)
         Args:
             backup_path: 备份文件路径，如果为None则使用默认路径
+            compact: 是否使用 VACUUM INTO 生成紧凑备份
         Returns:
             bool: 备份是否成功
         """
         try:
-            with self._lock:
-                if backup_path is None:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    backup_dir = os.path.join(os.path.dirname(self.db_path), "backups")
-                    os.makedirs(backup_dir, exist_ok=True)
-                    backup_path = os.path.join(backup_dir, f"learning_backup_{timestamp}.db")
-                
-                # 使用 SQLite 的 backup API
-                backup_conn = sqlite3.connect(backup_path)
-                with self._pool.get_connection() as conn:
-                    conn.backup(backup_conn)
-                backup_conn.close()
-                
-                logging.info(f"Database backed up to: {backup_path}")
-                return True
+            if backup_path is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                backup_dir = os.path.join(os.path.dirname(self.db_path), "backups")
+                os.makedirs(backup_dir, exist_ok=True)
+                backup_path = os.path.join(backup_dir, f"learning_backup_{timestamp}.db")
+            
+            # 分段调用 SQLite 的 backup API（WAL 读快照 + 步间休眠）
+            sqlite_snapshot(self.db_path, backup_path, compact=compact)
+            if self._shards is not None:
+                for index, path in enumerate(self._shards.paths):
+                    sqlite_snapshot(path, shard_path(backup_path, index), compact=compact)
+            
+            logging.info(f"Database backed up to: {backup_path}")
+            return True
         except Exception as e:
             logging.error(f"Database backup failed: {e}")
             return False
     
     def restore_database(self, backup_path: str) -> bool:
         """
-        从备份恢复数据库
+        从备份恢复数据库（分片模式下同时恢复 backup_database 写出的各分片备份）
         Args:
             backup_path: 备份文件路径
         Returns:
@@ -444,20 +679,30 @@ class LearningDatabase:
         """
         try:
             with self._lock:
-                if not os.path.exists(backup_path):
-                    logging.error(f"Backup file not found: {backup_path}")
-                    return False
+                shard_backups = ([shard_path(backup_path, index) for index in range(self._shards.count)]
+                                 if self._shards is not None else [])
+                for path in [backup_path] + shard_backups:
+                    if not os.path.exists(path):
+                        logging.error(f"Backup file not found: {path}")
+                        return False
                 
                 # 关闭连接池
+                max_connections = self._pool.max_connections
                 self._pool.close_all()
+                if self._shards is not None:
+                    self._shards.close_all()
                 
-                # 复制备份文件到当前数据库位置
-                shutil.copy2(backup_path, self.db_path)
+                # 通过 backup API 写回（经过 SQLite 的锁和 WAL，不直接覆盖数据库文件）
+                restore_sqlite_snapshot(backup_path, self.db_path)
+                if self._shards is not None:
+                    for source, path in zip(shard_backups, self._shards.paths):
+                        restore_sqlite_snapshot(source, path)
                 
                 # 重新初始化连接池和数据库
-                self._pool = ConnectionPool(self.db_path, self._pool.max_connections)
-                self._init_database()
-                self._create_performance_indexes()
+                self._pool = ConnectionPool(self.db_path, max_connections, self._profiler)
+                if self._shards is not None:
+                    self._shards = self._open_shards(self._shards.count, max_connections)
+                self._ensure_schema()
                 
                 logging.info(f"Database restored from: {backup_path}")
                 return True
@@ -477,6 +722,7 @@ class LearningDatabase:
                     cursor = conn.cursor()
                     cursor.execute("VACUUM")
                     cursor.execute("ANALYZE")
+                    pin_search_statistics(conn)
                     conn.commit()
                     logging.info("Database vacuum completed")
                     return True
@@ -495,11 +741,17 @@ class LearningDatabase:
                 cursor = conn.cursor()
                 stats = {}
                 
-                # 获取各表记录数
-                tables = ['vocabulary', 'grammar', 'content', 'learning_records', 'users', 'user_preferences']
-                for table in tables:
+                # 获取各表记录数（按用户的表汇总所有分片）
+                for table in ['vocabulary', 'grammar', 'content', 'users', 'user_preferences']:
                     cursor.execute(f"SELECT COUNT(*) FROM {table}")
                     stats[f"{table}_count"] = cursor.fetchone()[0]
+                stats['learning_records_count'] = 0
+                for pool in self._user_pools():
+                    with pool.get_connection() as user_conn:
+                        stats['learning_records_count'] += user_conn.execute(
+                            "SELECT COUNT(*) FROM main.learning_records").fetchone()[0]
+                if self._shards is not None:
+                    stats['shards'] = self._shards.count
                 
                 # 获取数据库文件大小
                 if os.path.exists(self.db_path):
@@ -521,72 +773,77 @@ class LearningDatabase:
     # ==================== 词汇操作 ====================
     
     def add_vocabulary(self, item: VocabularyItem) -> int:
-        """添加词汇"""
+        """添加词汇（已有的 word/language/level 原地更新，返回的 id 不变）"""
         with self._pool.get_connection() as conn:
             cursor = conn.cursor()
             try:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO vocabulary 
-                    (word, reading, meaning, example_sentence, example_translation, 
-                     language, level, category, tags, audio_url)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                cursor.execute(f"""
+                    INSERT INTO vocabulary ({', '.join(VOCABULARY_COLUMNS)})
+                    VALUES ({', '.join('?' * len(VOCABULARY_COLUMNS))})
+                    {VOCABULARY_UPSERT}
                 """, (item.word, item.reading, item.meaning, item.example_sentence,
                       item.example_translation, item.language, item.level, 
                       item.category, item.tags, item.audio_url))
+                row = cursor.execute(
+                    "SELECT id FROM vocabulary WHERE word = ? AND language = ? AND level = ?",
+                    (item.word, item.language, item.level)).fetchone()
                 conn.commit()
-                return cursor.lastrowid
+                return row[0]
             except Exception as e:
                 print(f"Error adding vocabulary: {e}")
                 return -1
     
     def add_vocabulary_batch(self, items: List[VocabularyItem]) -> int:
-        """批量添加词汇 - 优化版本使用事务"""
+        """
+        批量添加词汇（已有的 word/language/level 原地更新，id 不变）
+        Returns:
+            int: 写入的有效词汇数（含内容未变的行，与原 INSERT OR REPLACE 的计数一致），失败时为 0
+        """
         if not items:
             return 0
-            
+        
+        rows = [(item.word, item.reading, item.meaning, item.example_sentence, item.example_translation,
+                 item.language, item.level, item.category, item.tags, item.audio_url) for item in items]
+        try:
+            result = self.bulk_load_vocabulary(rows)
+        except Exception as e:
+            logging.error(f"Batch vocabulary insert failed: {e}")
+            return 0
+        logging.info(f"Batch inserted {result.inserted} and updated {result.updated} vocabulary items")
+        return result.staged
+    
+    def bulk_load_vocabulary(self, rows: Iterable[Tuple], batch_size: int = DEFAULT_BATCH_SIZE,
+                             rebuild_indexes: bool = None, expected_rows: int = None) -> BulkLoadResult:
+        """
+        批量导入词汇：暂存表 + UPSERT 合并，可选删除并重建索引（见 bulk_load 模块）
+        Args:
+            rows: VOCABULARY_COLUMNS 顺序的元组，可以是生成器
+            batch_size: 每批暂存和合并的行数
+            rebuild_indexes: 是否在导入期间删除二级索引和全文索引（None 时按 expected_rows 决定）
+            expected_rows: 预计导入行数
+        Returns:
+            BulkLoadResult: 新增、更新、未变、无效的行数和耗时
+        """
         with self._lock:
             with self._pool.get_connection() as conn:
-                cursor = conn.cursor()
-                count = 0
-                
-                # 使用事务批量插入以提高性能
-                try:
-                    cursor.execute("BEGIN TRANSACTION")
-                    
-                    # 准备批量插入语句
-                    insert_sql = """
-                        INSERT OR REPLACE INTO vocabulary 
-                        (word, reading, meaning, example_sentence, example_translation, 
-                         language, level, category, tags, audio_url)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """
-                    
-                    # 批量执行
-                    batch_data = []
-                    for item in items:
-                        batch_data.append((
-                            item.word, item.reading, item.meaning, item.example_sentence,
-                            item.example_translation, item.language, item.level, 
-                            item.category, item.tags, item.audio_url
-                        ))
-                    
-                    cursor.executemany(insert_sql, batch_data)
-                    count = cursor.rowcount
-                    
-                    cursor.execute("COMMIT")
-                    logging.info(f"Batch inserted {count} vocabulary items")
-                    
-                except Exception as e:
-                    cursor.execute("ROLLBACK")
-                    logging.error(f"Batch vocabulary insert failed: {e}")
-                    count = 0
-                
-                return count
+                return bulk_load_vocabulary(conn, rows, batch_size, rebuild_indexes, expected_rows)
+    
+    def import_vocabulary_files(self, paths: List[str], language: str = None, level: str = None,
+                                rebuild_indexes: bool = None) -> BulkLoadResult:
+        """
+        导入词汇文件（如 vocabulary_data/custom_*.json，或 NDJSON / CSV），所有文件在一个事务中合并
+        rebuild_indexes 为 None 时按读取到的行数是否达到 BILINGUAL_TUTOR_BULK_REBUILD_ROWS 决定
+        Raises:
+            ValueError: 文件格式不支持或内容无法解析（不会导入任何行）
+        """
+        rows = itertools.chain.from_iterable(iter_vocabulary_file(path, language, level) for path in paths)
+        return self.bulk_load_vocabulary(rows, rebuild_indexes=rebuild_indexes)
     
     def get_vocabulary(self, language: str, level: str, limit: int = 50, 
                       exclude_mastered: bool = False, user_id: str = None) -> List[VocabularyItem]:
         """获取词汇列表 - 优化版本支持排除已掌握词汇"""
-        with self._pool.get_connection() as conn:
+        pool = self._user_pool(user_id) if exclude_mastered and user_id else self._pool
+        with pool.get_connection() as conn:
             cursor = conn.cursor()
             
             if exclude_mastered and user_id:
@@ -609,19 +866,88 @@ class LearningDatabase:
                 """, (language, level, limit))
             
             rows = cursor.fetchall()
-            return [VocabularyItem(
-                id=row['id'],
-                word=row['word'],
-                reading=row['reading'] or "",
-                meaning=row['meaning'],
-                example_sentence=row['example_sentence'] or "",
-                example_translation=row['example_translation'] or "",
-                language=row['language'],
-                level=row['level'],
-                category=row['category'] or "",
-                tags=row['tags'] or "",
-                audio_url=row['audio_url'] or ""
-            ) for row in rows]
+            return [self._row_to_vocabulary(row) for row in rows]
+    
+    def get_vocabulary_page(self, language: str = None, level: str = None, cursor: str = None,
+                            limit: int = None) -> Page:
+        """
+        按 id 键集分页获取词汇（idx_vocab_language_level 隐含 rowid，按语言和级别过滤时直接定位）
+        Args:
+            language: 语言过滤
+            level: 级别过滤
+            cursor: 上一页返回的 next_cursor（None 表示第一页）
+            limit: 每页条数
+        Returns:
+            Page: items 为 VocabularyItem 列表
+        Raises:
+            ValueError: 游标无效
+        """
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor, 1)
+        with self._pool.get_connection() as conn:
+            rows = self._vocabulary_page_rows(conn, language, level, after[0] if after else 0, limit + 1)
+        page = make_page(rows, limit, lambda row: (row['id'],))
+        page.items = [self._row_to_vocabulary(row) for row in page.items]
+        return page
+    
+    @staticmethod
+    def _vocabulary_page_rows(conn: sqlite3.Connection, language: Optional[str], level: Optional[str],
+                              after_id: int, limit: int) -> List[sqlite3.Row]:
+        conditions, params = ["id > ?"], [after_id]
+        if language:
+            conditions.append("language = ?")
+            params.append(language)
+        if level:
+            conditions.append("level = ?")
+            params.append(level)
+        return conn.execute(f"SELECT * FROM vocabulary WHERE {' AND '.join(conditions)} "
+                            f"ORDER BY id LIMIT ?", (*params, limit)).fetchall()
+    
+    def iter_vocabulary(self, language: str = None, level: str = None,
+                        page_size: int = 1000) -> Iterator[Dict]:
+        """逐页读取词汇（用于流式导出，每次只保留一页，使用独立的小缓存连接）"""
+        with self._pool.streaming_connection() as conn:
+            after_id = 0
+            while True:
+                rows = self._vocabulary_page_rows(conn, language, level, after_id, page_size)
+                for row in rows:
+                    yield self._row_to_vocabulary(row).__dict__.copy()
+                if len(rows) < page_size:
+                    return
+                after_id = rows[-1]['id']
+    
+    def get_vocabulary_by_id(self, vocab_id: int) -> Optional[VocabularyItem]:
+        """按ID获取词汇"""
+        items = self.get_vocabulary_by_ids([vocab_id])
+        return items[0] if items else None
+    
+    def get_vocabulary_by_ids(self, vocab_ids: List[int]) -> List[VocabularyItem]:
+        """按ID批量获取词汇，按传入顺序返回（不存在的ID被忽略）"""
+        if not vocab_ids:
+            return []
+        with self._pool.get_connection() as conn:
+            placeholders = ",".join("?" * len(vocab_ids))
+            rows = conn.execute(f"SELECT * FROM vocabulary WHERE id IN ({placeholders})",
+                                list(vocab_ids)).fetchall()
+        by_id = {row['id']: self._row_to_vocabulary(row) for row in rows}
+        return [by_id[vocab_id] for vocab_id in vocab_ids if vocab_id in by_id]
+    
+    @staticmethod
+    def _row_to_vocabulary(row: sqlite3.Row) -> VocabularyItem:
+        """数据库行转换为词汇条目"""
+        return VocabularyItem(
+            id=row['id'],
+            word=row['word'],
+            reading=row['reading'] or "",
+            meaning=row['meaning'],
+            example_sentence=row['example_sentence'] or "",
+            example_translation=row['example_translation'] or "",
+            language=row['language'],
+            level=row['level'],
+            category=row['category'] or "",
+            tags=row['tags'] or "",
+            audio_url=row['audio_url'] or ""
+        )
     
     def get_vocabulary_count(self, language: str = None, level: str = None) -> int:
         """获取词汇数量"""
@@ -726,15 +1052,40 @@ class LearningDatabase:
                 created_at=row['created_at']
             ) for row in rows]
     
+    def search(self, query: str, item_type: str = None, language: str = None, level: str = None,
+               page: int = 1, per_page: int = 20) -> Dict:
+        """
+        全文检索词汇、语法和阅读内容（按 bm25 相关度排序，分页）
+        Args:
+            query: 检索文本，空格分隔的多个检索词需全部匹配
+            item_type: vocabulary / grammar / content，默认全部
+            language: 语言过滤
+            level: 级别过滤
+            page: 页码（从 1 开始）
+            per_page: 每页条数
+        Returns:
+            Dict: {'query', 'page', 'per_page', 'has_more', 'results'}
+        Raises:
+            ValueError: 检索文本为空或类型未知
+        """
+        with self._pool.get_connection() as conn:
+            return search(conn, query, item_type, language, level, page, per_page)
+    
+    def rebuild_search_index(self) -> Dict:
+        """清理并合并全文索引"""
+        with self._pool.get_connection() as conn:
+            return rebuild_search_index(conn)
+    
     # ==================== 学习记录操作 ====================
     
     def record_learning(self, user_id: str, item_id: int, item_type: str, 
-                       correct: bool) -> LearningRecord:
+                       correct: bool, response_ms: int = None) -> LearningRecord:
         """
         记录学习结果，更新艾宾浩斯曲线参数
-        使用 SM-2 算法计算下次复习时间
+        使用 SM-2 算法计算下次复习时间；答题同时追加到 review_events，
+        与 learning_records 投影在同一事务内写入
         """
-        with self._pool.get_connection() as conn:
+        with self._user_pool(user_id).get_connection() as conn:
             cursor = conn.cursor()
             
             # 查找现有记录
@@ -745,85 +1096,23 @@ class LearningDatabase:
             row = cursor.fetchone()
             
             now = datetime.now()
+            state = fold_review(dict(row) if row else None, correct, now)
             
-            if row:
-                # 更新现有记录
-                learn_count = row['learn_count'] + 1
-                correct_count = row['correct_count'] + (1 if correct else 0)
-                ef = row['easiness_factor']
-                
-                # 计算连续正确次数
-                if correct:
-                    consecutive_correct = (row['consecutive_correct'] if row['consecutive_correct'] is not None else 0) + 1
-                else:
-                    consecutive_correct = 0
-                
-                # SM-2 算法：计算新的 easiness factor
-                quality = 5 if correct else 2  # 正确=5分，错误=2分
-                ef = ef + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-                ef = max(1.3, ef)  # EF 最小值为 1.3
-                
-                # 计算下次复习间隔
-                if correct:
-                    if consecutive_correct == 1:
-                        interval = 1
-                    elif consecutive_correct == 2:
-                        interval = 6
-                    else:
-                        # 使用上次预定间隔 * EF (SM-2算法正确实现)
-                        if row['last_review_date'] and row['next_review_date']:
-                            last_date = datetime.fromisoformat(row['last_review_date'])
-                            next_date = datetime.fromisoformat(row['next_review_date'])
-                            previous_intended_interval = (next_date - last_date).days or 1
-                            interval = int(previous_intended_interval * ef)
-                            # 限制最大间隔为365天（1年）
-                            interval = min(interval, 365)
-                        else:
-                            interval = 6
-                else:
-                    interval = 1  # 错误则重新开始
-                
-                next_review = now + timedelta(days=interval)
-                memory_strength = min(1.0, correct_count / learn_count if learn_count > 0 else 0)
-                mastery_level = min(5, correct_count // 2)
-                
-                cursor.execute("""
-                    UPDATE learning_records 
-                    SET learn_count = ?, correct_count = ?, consecutive_correct = ?, last_review_date = ?,
-                        next_review_date = ?, memory_strength = ?, mastery_level = ?,
-                        easiness_factor = ?
-                    WHERE id = ?
-                """, (learn_count, correct_count, consecutive_correct, now.isoformat(), next_review.isoformat(),
-                      memory_strength, mastery_level, ef, row['id']))
-                
-                record = LearningRecord(
-                    id=row['id'], user_id=user_id, item_id=item_id, item_type=item_type,
-                    learn_count=learn_count, correct_count=correct_count, consecutive_correct=consecutive_correct,
-                    last_review_date=now, next_review_date=next_review,
-                    memory_strength=memory_strength, mastery_level=mastery_level,
-                    easiness_factor=ef
-                )
-            else:
-                # 创建新记录
-                consecutive_correct = 1 if correct else 0
-                next_review = now + timedelta(days=1)
-                cursor.execute("""
-                    INSERT INTO learning_records 
-                    (user_id, item_id, item_type, learn_count, correct_count, consecutive_correct,
-                     last_review_date, next_review_date, memory_strength, mastery_level)
-                    VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, 0)
-                """, (user_id, item_id, item_type, 1 if correct else 0, consecutive_correct,
-                      now.isoformat(), next_review.isoformat(), 1.0 if correct else 0.0))
-                
-                record = LearningRecord(
-                    id=cursor.lastrowid, user_id=user_id, item_id=item_id, item_type=item_type,
-                    learn_count=1, correct_count=1 if correct else 0, consecutive_correct=consecutive_correct,
-                    last_review_date=now, next_review_date=next_review,
-                    memory_strength=1.0 if correct else 0.0, mastery_level=0
-                )
-            
+            append_events(cursor, [ReviewEvent(user_id, item_id, item_type, correct,
+                                               reviewed_ts=to_epoch(now), response_ms=response_ms)])
+            cursor.execute(PROJECTION_UPSERT, {'user_id': user_id, 'item_id': item_id,
+                                               'item_type': item_type, **state})
+            record_id = row['id'] if row else cursor.lastrowid
             conn.commit()
-            return record
+            
+            return LearningRecord(
+                id=record_id, user_id=user_id, item_id=item_id, item_type=item_type,
+                learn_count=state['learn_count'], correct_count=state['correct_count'],
+                consecutive_correct=state['consecutive_correct'],
+                last_review_date=now, next_review_date=datetime.fromisoformat(state['next_review_date']),
+                memory_strength=state['memory_strength'], mastery_level=state['mastery_level'],
+                easiness_factor=state['easiness_factor']
+            )
 
     def batch_insert_learning_records(self, records: List[Dict]) -> bool:
         """批量插入学习记录（需求21.2）"""
@@ -870,7 +1159,6 @@ class LearningDatabase:
                 logging.error(f"Error in batch_update_learning_records: {e}")
                 return False
 
-    @_measure_query_time("optimize_vocabulary_queries")
     def optimize_vocabulary_queries(self, user_id: str, language: str, mastery_levels: List[int]) -> List[Dict]:
         """优化的词汇查询（需求21.6 - 复合索引支持）"""
         with self._pool.get_connection() as conn:
@@ -921,50 +1209,18 @@ class LearningDatabase:
                 
             return stats
 
-    def get_performance_stats(self) -> Dict:
-        """获取数据库性能统计信息（需求21.7）"""
-        stats = self._performance_stats.copy()
-        
-        # 计算平均查询耗时
-        if stats['query_count'] > 0:
-            stats['avg_query_time'] = stats['total_query_time'] / stats['query_count']
-        else:
-            stats['avg_query_time'] = 0.0
-            
-        # 添加连接池状态
-        stats['connection_pool_size'] = self._pool._created_connections
-        stats['max_connections'] = self._pool.max_connections
-        stats['slow_queries_count'] = len(stats['slow_queries'])
-        
-        return stats
-    
-    @_measure_query_time("get_due_reviews")
     def get_due_reviews(self, user_id: str, item_type: str = None, 
                        limit: int = 20) -> List[Dict]:
         """获取需要复习的内容（艾宾浩斯曲线核心）- 性能优化版本"""
-        with self._pool.get_connection() as conn:
+        with self._user_pool(user_id).get_connection() as conn:
             cursor = conn.cursor()
-            now = datetime.now().isoformat()
+            now = int(time.time())
             
             if item_type:
-                # 使用优化的复合索引查询（需求21.1, 21.5）
-                cursor.execute("""
-                    SELECT lr.*, v.word, v.meaning, v.reading
-                    FROM learning_records lr
-                    LEFT JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
-                    WHERE lr.user_id = ? AND lr.item_type = ? AND lr.next_review_date <= ?
-                    ORDER BY lr.next_review_date ASC, lr.memory_strength ASC
-                    LIMIT ?
-                """, (user_id, item_type, now, limit))
+                # 覆盖索引按 (next_review_ts, memory_strength) 有序，无需临时排序（需求21.1, 21.5）
+                cursor.execute(DUE_REVIEWS_BY_TYPE_QUERY, (user_id, item_type, now, limit))
             else:
-                cursor.execute("""
-                    SELECT lr.*, v.word, v.meaning, v.reading
-                    FROM learning_records lr
-                    LEFT JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
-                    WHERE lr.user_id = ? AND lr.next_review_date <= ?
-                    ORDER BY lr.next_review_date ASC, lr.memory_strength ASC
-                    LIMIT ?
-                """, (user_id, now, limit))
+                cursor.execute(DUE_REVIEWS_QUERY, (user_id, now, limit))
             
             return [dict(row) for row in cursor.fetchall()]
     
@@ -973,21 +1229,36 @@ class LearningDatabase:
         批量更新学习记录（需求21.2）
         Args:
             updates: 更新数据列表，每个元素为(learn_count, correct_count, memory_strength, 
-                    mastery_level, next_review_date, last_review_date, record_id)
+                    mastery_level, next_review_date, last_review_date, record_id[, user_id])
         Returns:
             bool: 更新是否成功
         """
         try:
-            with self._pool.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.executemany("""
-                    UPDATE learning_records 
-                    SET learn_count = ?, correct_count = ?, memory_strength = ?,
-                        mastery_level = ?, next_review_date = ?, last_review_date = ?
-                    WHERE id = ?
-                """, updates)
-                conn.commit()
-                return True
+            # 分片时记录 id 只在分片内唯一，需要第 8 个元素 user_id 定位分片
+            by_pool = {}
+            for update in updates:
+                if self._shards is not None and len(update) < 8:
+                    raise ValueError("分片数据库的批量更新需要提供 user_id")
+                pool = self._user_pool(update[7]) if len(update) > 7 else self._pool
+                by_pool.setdefault(pool, []).append(update)
+            for pool, pool_updates in by_pool.items():
+                with pool.get_connection() as conn:
+                    cursor = conn.cursor()
+                    states = []
+                    for update in pool_updates:
+                        row = cursor.execute("SELECT * FROM learning_records WHERE id = ?", (update[6],)).fetchone()
+                        if row is None:
+                            continue
+                        state = dict(row)
+                        state.update(
+                            learn_count=update[0], correct_count=update[1], memory_strength=update[2],
+                            mastery_level=update[3], next_review_date=update[4], last_review_date=update[5],
+                            next_review_ts=to_epoch(update[4]), last_review_ts=to_epoch(update[5]))
+                        states.append(state)
+                    # 直接写入的状态同时成为重放基线，从事件日志重建时不会被覆盖
+                    write_snapshots(cursor, states)
+                    conn.commit()
+            return True
         except Exception as e:
             logging.error(f"批量更新学习记录失败: {e}")
             return False
@@ -1001,41 +1272,35 @@ class LearningDatabase:
             bool: 插入是否成功
         """
         try:
-            with self._pool.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 准备批量插入数据
-                insert_data = []
-                for record in records:
-                    insert_data.append((
-                        record['user_id'], record['item_id'], record['item_type'],
-                        record.get('learn_count', 1), record.get('correct_count', 0),
-                        record.get('consecutive_correct', 0),
-                        record.get('last_review_date', datetime.now().isoformat()),
-                        record.get('next_review_date', datetime.now().isoformat()),
-                        record.get('memory_strength', 0.5),
-                        record.get('mastery_level', 1),
-                        record.get('easiness_factor', 2.5)
-                    ))
-                
-                cursor.executemany("""
-                    INSERT OR REPLACE INTO learning_records 
-                    (user_id, item_id, item_type, learn_count, correct_count, 
-                     consecutive_correct, last_review_date, next_review_date, 
-                     memory_strength, mastery_level, easiness_factor)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, insert_data)
-                
-                conn.commit()
-                return True
+            # 准备批量插入数据（分片时按用户所在分片分组）
+            by_pool = {}
+            for record in records:
+                last_review = record.get('last_review_date', datetime.now().isoformat())
+                next_review = record.get('next_review_date', datetime.now().isoformat())
+                by_pool.setdefault(self._user_pool(record['user_id']), []).append({
+                    'user_id': record['user_id'], 'item_id': record['item_id'], 'item_type': record['item_type'],
+                    'learn_count': record.get('learn_count', 1), 'correct_count': record.get('correct_count', 0),
+                    'consecutive_correct': record.get('consecutive_correct', 0),
+                    'last_review_date': last_review, 'next_review_date': next_review,
+                    'last_review_ts': to_epoch(last_review), 'next_review_ts': to_epoch(next_review),
+                    'memory_strength': record.get('memory_strength', 0.5),
+                    'mastery_level': record.get('mastery_level', 1),
+                    'easiness_factor': record.get('easiness_factor', 2.5)
+                })
+            
+            # 已有条目就地更新（id 不变），状态同时写入重放基线
+            for pool, states in by_pool.items():
+                with pool.get_connection() as conn:
+                    write_snapshots(conn.cursor(), states)
+                    conn.commit()
+            return True
         except Exception as e:
             logging.error(f"批量插入学习记录失败: {e}")
             return False
     
-    @_measure_query_time("get_learning_stats")
     def get_learning_stats(self, user_id: str) -> Dict:
         """获取学习统计 - 性能优化版本使用更高效的查询"""
-        with self._pool.get_connection() as conn:
+        with self._user_pool(user_id).get_connection() as conn:
             cursor = conn.cursor()
             
             # 使用单个查询获取基本统计
@@ -1078,20 +1343,13 @@ class LearningDatabase:
                 }
             stats['by_type'] = type_stats
             
-            # 待复习数 - 使用索引优化的查询（需求21.5）
-            now = datetime.now().isoformat()
-            cursor.execute("""
-                SELECT COUNT(*) FROM learning_records 
-                WHERE user_id = ? AND next_review_date <= ?
-            """, (user_id, now))
+            # 待复习数 - 只扫描覆盖索引（需求21.5）
+            now = int(time.time())
+            cursor.execute(DUE_COUNT_QUERY, (user_id, now))
             stats['due_reviews'] = cursor.fetchone()[0]
             
             # 最近7天的学习活动
-            week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-            cursor.execute("""
-                SELECT COUNT(*) FROM learning_records 
-                WHERE user_id = ? AND last_review_date >= ?
-            """, (user_id, week_ago))
+            cursor.execute(RECENT_ACTIVITY_QUERY, (user_id, now - 7 * 86400))
             stats['recent_activity'] = cursor.fetchone()[0]
             
             return stats
@@ -1102,31 +1360,42 @@ class LearningDatabase:
         Returns:
             Dict: 性能统计数据
         """
-        avg_query_time = 0.0
-        if self._performance_stats['query_count'] > 0:
-            avg_query_time = self._performance_stats['total_query_time'] / self._performance_stats['query_count']
+        profiler = self._profiler
+        query_count = profiler.query_count if profiler is not None else 0
+        total_query_time = profiler.total_seconds if profiler is not None else 0.0
         
         return {
-            'query_count': self._performance_stats['query_count'],
-            'total_query_time': round(self._performance_stats['total_query_time'], 3),
-            'avg_query_time': round(avg_query_time, 3),
-            'slow_queries_count': len(self._performance_stats['slow_queries']),
-            'slow_queries': self._performance_stats['slow_queries'][-10:],  # 最近10个慢查询
+            'query_count': query_count,
+            'total_query_time': round(total_query_time, 3),
+            'avg_query_time': round(total_query_time / query_count, 3) if query_count else 0.0,
+            'slow_queries_count': profiler.slow_count if profiler is not None else 0,
+            'slow_queries': profiler.recent_slow_queries(10) if profiler is not None else [],  # 最近10个慢查询
+            'queries': profiler.snapshot(10) if profiler is not None else [],  # 累计耗时最多的指纹
             'connection_pool_size': self._pool._created_connections,
-            'max_connections': self._pool.max_connections
+            'max_connections': self._pool.max_connections,
+            'shards': self._shards.count if self._shards is not None else 0,
+            'shard_connections': [pool._created_connections for pool in self._shards.pools]
+            if self._shards is not None else []
         }
     
-    def optimize_vocabulary_queries(self, user_id: str, language: str, mastery_levels: List[int]) -> List[Dict]:
+    @property
+    def query_profiler(self) -> Optional[QueryProfiler]:
+        """连接池的查询剖析器（BILINGUAL_TUTOR_QUERY_PROFILING=0 时为 None）"""
+        return self._profiler
+    
+    def optimize_vocabulary_queries(self, user_id: str, language: str, mastery_levels: List[int],
+                                    limit: int = None) -> List[Dict]:
         """
         优化的词汇查询（需求21.6 - 复合索引支持）
         Args:
             user_id: 用户ID
             language: 语言
             mastery_levels: 掌握程度列表
+            limit: 最多返回条数（None 表示全部；大结果集请用 get_vocabulary_records_page 分页）
         Returns:
             List[Dict]: 词汇记录列表
         """
-        with self._pool.get_connection() as conn:
+        with self._user_pool(user_id).get_connection() as conn:
             cursor = conn.cursor()
             
             # 使用复合索引优化查询
@@ -1136,34 +1405,94 @@ class LearningDatabase:
                 FROM learning_records lr
                 JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
                 WHERE lr.user_id = ? AND v.language = ? AND lr.mastery_level IN ({placeholders})
-                ORDER BY lr.memory_strength ASC, lr.last_review_date ASC
+                ORDER BY lr.memory_strength ASC, lr.last_review_ts ASC
             """
             
             params = [user_id, language] + mastery_levels
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(limit)
             cursor.execute(query, params)
             
             return [dict(row) for row in cursor.fetchall()]
     
-    @_measure_query_time("optimized_review_query")
+    def get_vocabulary_records_page(self, user_id: str, language: str, mastery_levels: List[int],
+                                    cursor: str = None, limit: int = None) -> Page:
+        """
+        optimize_vocabulary_queries 的键集分页版本
+        排序键 (memory_strength, last_review_ts, id)，未复习过的记录（last_review_ts 为空）排在前面
+        Raises:
+            ValueError: 游标无效
+        """
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor, 3)
+        placeholders = ','.join('?' * len(mastery_levels))
+        seek = "AND (lr.memory_strength, COALESCE(lr.last_review_ts, -1), lr.id) > (?, ?, ?)" if after else ""
+        query = f"""
+            SELECT lr.*, v.word, v.meaning, v.reading, v.level
+            FROM learning_records lr
+            JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
+            WHERE lr.user_id = ? AND v.language = ? AND lr.mastery_level IN ({placeholders}) {seek}
+            ORDER BY lr.memory_strength, COALESCE(lr.last_review_ts, -1), lr.id
+            LIMIT ?
+        """
+        with self._user_pool(user_id).get_connection() as conn:
+            rows = conn.execute(query, [user_id, language, *mastery_levels, *(after or []), limit + 1]).fetchall()
+        return make_page([dict(row) for row in rows], limit,
+                         lambda row: (row['memory_strength'], row['last_review_ts'] if row['last_review_ts']
+                                      is not None else -1, row['id']))
+    
+    def get_learning_records_page(self, user_id: str, item_type: str = None, cursor: str = None,
+                                  limit: int = None) -> Page:
+        """
+        按 (item_id, item_type) 键集分页获取用户的学习记录（沿 UNIQUE(user_id, item_id, item_type) 索引）
+        Raises:
+            ValueError: 游标无效
+        """
+        limit = clamp_page_size(limit)
+        after = decode_cursor(cursor, 2)
+        conditions, params = ["user_id = ?"], [user_id]
+        if item_type:
+            conditions.append("item_type = ?")
+            params.append(item_type)
+        if after:
+            conditions.append("(item_id, item_type) > (?, ?)")
+            params.extend(after)
+        with self._user_pool(user_id).get_connection() as conn:
+            rows = conn.execute(f"SELECT * FROM main.learning_records WHERE {' AND '.join(conditions)} "
+                                f"ORDER BY item_id, item_type LIMIT ?", (*params, limit + 1)).fetchall()
+        return make_page([dict(row) for row in rows], limit, lambda row: (row['item_id'], row['item_type']))
+    
+    def iter_learning_records(self, user_id: str, item_type: str = None,
+                              page_size: int = 1000) -> Iterator[Dict]:
+        """逐页读取用户的学习记录（用于流式导出）"""
+        cursor = None
+        while True:
+            page = self.get_learning_records_page(user_id, item_type, cursor, page_size)
+            yield from page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+    
     def execute_optimized_review_query(self, user_id: str, max_items: int = 50) -> List[Dict]:
         """
         执行优化的复习查询（需求21.1 - 50%性能提升目标）
         使用预编译查询和批量处理
         """
-        with self._pool.get_connection() as conn:
+        with self._user_pool(user_id).get_connection() as conn:
             cursor = conn.cursor()
-            now = datetime.now().isoformat()
+            now = int(time.time())
             
             # 使用优化的查询计划
-            # 简化排序逻辑以强制使用 (user_id, next_review_date) 索引
+            # 按 (user_id, next_review_ts) 索引顺序读取
             cursor.execute("""
                 SELECT lr.id, lr.user_id, lr.item_id, lr.item_type, lr.memory_strength, 
                        lr.mastery_level, lr.next_review_date,
                        v.word, v.meaning, v.reading, v.level
                 FROM learning_records lr
                 LEFT JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
-                WHERE lr.user_id = ? AND lr.next_review_date <= ?
-                ORDER BY lr.next_review_date ASC
+                WHERE lr.user_id = ? AND lr.next_review_ts <= ?
+                ORDER BY lr.next_review_ts ASC
                 LIMIT ?
             """, (user_id, now, max_items))
             
@@ -1173,6 +1502,8 @@ class LearningDatabase:
         """关闭数据库连接池"""
         if hasattr(self, '_pool'):
             self._pool.close_all()
+            if getattr(self, '_shards', None) is not None:
+                self._shards.close_all()
             logging.info("数据库连接池已关闭")
     
     def __enter__(self):
@@ -1215,9 +1546,10 @@ class LearningDatabase:
             Dict: 学习总结数据
         """
         try:
-            with self._pool.get_connection() as conn:
+            with self._user_pool(user_id).get_connection() as conn:
                 cursor = conn.cursor()
-                cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
+                now = int(time.time())
+                cutoff = now - days * 86400
                 
                 # 使用CTE（公共表表达式）优化复杂查询
                 query = """
@@ -1229,14 +1561,14 @@ class LearningDatabase:
                             CAST(correct_count AS REAL) / learn_count ELSE 0 END) as accuracy,
                         COUNT(CASE WHEN mastery_level >= 3 THEN 1 END) as mastered_items
                     FROM learning_records 
-                    WHERE user_id = ? AND last_review_date >= ?
+                    WHERE user_id = ? AND last_review_ts >= ?
                     GROUP BY item_type
                 ),
                 overall_stats AS (
                     SELECT 
                         COUNT(*) as total_items,
                         AVG(memory_strength) as avg_memory_strength,
-                        COUNT(CASE WHEN next_review_date <= datetime('now') THEN 1 END) as due_reviews
+                        COUNT(CASE WHEN next_review_ts <= ? THEN 1 END) as due_reviews
                     FROM learning_records 
                     WHERE user_id = ?
                 )
@@ -1262,7 +1594,7 @@ class LearningDatabase:
                 FROM overall_stats os
                 """
                 
-                cursor.execute(query, (user_id, cutoff_date, user_id))
+                cursor.execute(query, (user_id, cutoff, now, user_id))
                 results = cursor.fetchall()
                 
                 summary = {
@@ -1323,7 +1655,7 @@ class LearningDatabase:
     def get_latest_learning_record(self, user_id: str, item_id: int, item_type: str) -> Optional[LearningRecord]:
         """获取最新的学习记录"""
         try:
-            with self._pool.get_connection() as conn:
+            with self._user_pool(user_id).get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT * FROM learning_records 
@@ -0,0 +1,477 @@
+"""
+学习事件存储 - 分析历史的持久化、有界存储
+Learning Event Store - persistent, bounded storage for analytics histories
+
+所有事件追加写入 SQLite 的 learning_events 表（只追加，不更新），按天分区
+（day 列），分析查询只读取所需的时间窗口。每个 (stream, user_id) 在进程内
+保留一个有界环形缓冲区，用于最近窗口的快速读取；其他进程提交写入后
+（PRAGMA data_version 变化）缓冲区自动失效，因此多个 Web 进程共享同一份历史。
+待写入事件达到 flush_size 或最早的一个等待超过 flush_interval 秒时提交。
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models import ActivityResult
+
+
+SECONDS_PER_DAY = 86400
+
+# 运行时数据目录（默认 ~/.local/share/bilingual_tutor），事件库不写入安装的包目录
+DATA_DIR = os.environ.get("BILINGUAL_TUTOR_DATA_DIR") or os.path.join(
+    os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"),
+    "bilingual_tutor")
+DEFAULT_EVENT_DB_PATH = os.path.join(DATA_DIR, "learning_events.db")
+
+
+@dataclass
+class LearningEvent:
+    """学习事件"""
+    stream: str  # 事件流，如 study_session / activity_result
+    user_id: str
+    timestamp: datetime
+    payload: Any
+    key: Optional[str] = None  # 流内的二级键，如技能、单词、内容ID
+
+
+class RingBuffer(list):
+    """定长列表：超过 maxlen 时丢弃最旧的元素，其余行为与 list 相同"""
+
+    def __init__(self, maxlen: int, iterable=()):
+        super().__init__(iterable)
+        self.maxlen = maxlen
+        self._trim()
+
+    def _trim(self):
+        overflow = len(self) - self.maxlen
+        if overflow > 0:
+            del self[:overflow]
+
+    def append(self, item):
+        super().append(item)
+        self._trim()
+
+    def extend(self, items):
+        super().extend(items)
+        self._trim()
+
+
+class BoundedHistory(OrderedDict):
+    """
+    有界历史映射：按最近使用保留至多 max_keys 个键，缺失键自动创建（类似 defaultdict）
+    被淘汰的键仍保存在事件存储中，只是不再占用进程内存
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_keys: int = 10000):
+        super().__init__()
+        self.factory = factory
+        self.max_keys = max_keys
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __missing__(self, key):
+        value = self.factory()
+        self[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_keys:
+            self.popitem(last=False)
+
+
+class _Ring:
+    """单个 (stream, user_id) 的最近事件缓冲区"""
+
+    __slots__ = ("events", "floor_ts")
+
+    def __init__(self, maxlen: int, events=(), floor_ts: Optional[float] = None):
+        self.events = deque(events, maxlen=maxlen)
+        # 已被淘汰或未加载的最新事件时间戳；None 表示缓冲区包含完整历史
+        self.floor_ts = floor_ts
+
+    def append(self, event: Tuple[float, Optional[str], Any]):
+        if len(self.events) == self.events.maxlen:
+            evicted_ts = self.events[0][0]
+            if self.floor_ts is None or evicted_ts > self.floor_ts:
+                self.floor_ts = evicted_ts
+        self.events.append(event)
+
+    def covers(self, since: Optional[float]) -> bool:
+        if self.floor_ts is None:
+            return True
+        return since is not None and since > self.floor_ts
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"无法序列化类型: {type(value).__name__}")
+
+
+def activity_result_to_payload(result: ActivityResult) -> Dict[str, Any]:
+    """ActivityResult -> 可序列化字典"""
+    payload = asdict(result)
+    payload['completed_at'] = result.completed_at.isoformat()
+    return payload
+
+
+def activity_result_from_payload(payload: Dict[str, Any]) -> ActivityResult:
+    """可序列化字典 -> ActivityResult"""
+    data = dict(payload)
+    data['completed_at'] = datetime.fromisoformat(data['completed_at'])
+    return ActivityResult(**data)
+
+
+class LearningEventStore:
+    """只追加的学习事件存储（SQLite + 进程内环形缓冲区）"""
+
+    def __init__(self, db_path: str = None, ring_size: int = 256, max_rings: int = 10000,
+                 flush_size: int = 200, flush_interval: float = 1.0):
+        """
+        初始化事件存储
+        Args:
+            db_path: 数据库文件路径（默认 DATA_DIR 下的 learning_events.db）
+            ring_size: 每个 (stream, user_id) 在内存中保留的最近事件数
+            max_rings: 内存中保留的环形缓冲区个数上限
+            flush_size: 待写入事件达到该数量时批量提交
+            flush_interval: 待写入事件最长保留时间（秒）
+        """
+        if db_path is None:
+            db_path = DEFAULT_EVENT_DB_PATH
+            os.makedirs(DATA_DIR, exist_ok=True)
+
+        self.db_path = db_path
+        self.ring_size = ring_size
+        self.max_rings = max_rings
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[str, str, Optional[str], float, int, str]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._rings: "OrderedDict[Tuple[str, str], _Ring]" = OrderedDict()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        self._data_version = self._read_data_version()
+
+    def _init_schema(self):
+        """创建事件表和按时间分区的索引"""
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS learning_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    stream TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    event_key TEXT,
+                    ts REAL NOT NULL,
+                    day INTEGER NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            # 窗口查询: stream + 用户 + 时间范围
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_events_stream_user_ts
+                ON learning_events(stream, user_id, ts)
+            """)
+            # 键查询: 某内容/单词/技能的事件
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_events_stream_user_key
+                ON learning_events(stream, user_id, event_key, ts)
+            """)
+            # 日分区: 保留策略按天整段删除
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_events_day
+                ON learning_events(day)
+            """)
+
+    def _read_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_external_writes(self):
+        """其他连接提交过写入时，丢弃全部缓冲区"""
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            self._rings.clear()
+
+    # ==================== 写入 ====================
+
+    def append(self, stream: str, user_id: str, payload: Any, key: Optional[str] = None,
+               timestamp: datetime = None):
+        """
+        追加一个事件
+        Args:
+            stream: 事件流名称
+            user_id: 用户ID
+            payload: 可 JSON 序列化的事件内容
+            key: 流内二级键
+            timestamp: 事件时间（默认当前时间）
+        """
+        timestamp = timestamp or datetime.now()
+        ts = timestamp.timestamp()
+        row = (stream, user_id, key, ts, int(ts // SECONDS_PER_DAY),
+               json.dumps(payload, ensure_ascii=False, default=_json_default))
+
+        with self._lock:
+            self._pending.append(row)
+            ring = self._rings.get((stream, user_id))
+            if ring is not None:
+                ring.append((ts, key, payload))
+            if len(self._pending) >= self.flush_size:
+                self._flush_locked()
+            elif self._timer is None:
+                # 第一个待写入事件启动定时器，之后没有新事件也会按时提交
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"学习事件定时写入失败: {e}")
+
+    def flush(self):
+        """提交所有待写入事件"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending or self._closed:
+            return
+        rows, self._pending = self._pending, []
+        # 先确认期间没有其他进程写入，避免把外部写入误判为自己的写入
+        self._check_external_writes()
+        with self._conn:
+            self._conn.executemany("""
+                INSERT INTO learning_events (stream, user_id, event_key, ts, day, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    # ==================== 查询 ====================
+
+    def window(self, stream: str, user_id: str, since: datetime = None, until: datetime = None,
+               key: Optional[str] = None) -> List[LearningEvent]:
+        """
+        读取某个时间窗口内的事件（按时间升序）
+        Args:
+            stream: 事件流名称
+            user_id: 用户ID
+            since: 窗口起点（含），None 表示从最早开始
+            until: 窗口终点（含），None 表示到最新
+            key: 只返回该二级键的事件
+        Returns:
+            事件列表
+        """
+        since_ts = since.timestamp() if since else None
+        until_ts = until.timestamp() if until else None
+
+        with self._lock:
+            self._flush_locked()
+            self._check_external_writes()
+
+            ring = self._rings.get((stream, user_id))
+            if ring is None:
+                ring = self._load_ring(stream, user_id)
+            else:
+                self._rings.move_to_end((stream, user_id))
+
+            if ring.covers(since_ts):
+                rows = [
+                    (ts, event_key, payload) for ts, event_key, payload in ring.events
+                    if (since_ts is None or ts >= since_ts) and
+                       (until_ts is None or ts <= until_ts) and
+                       (key is None or event_key == key)
+                ]
+                rows.sort(key=lambda row: row[0])
+            else:
+                rows = self._query_rows(stream, user_id, since_ts, until_ts, key)
+
+        return [
+            LearningEvent(stream=stream, user_id=user_id, timestamp=datetime.fromtimestamp(ts),
+                          payload=payload, key=event_key)
+            for ts, event_key, payload in rows
+        ]
+
+    def _load_ring(self, stream: str, user_id: str) -> _Ring:
+        """从数据库加载最近 ring_size 个事件建立缓冲区"""
+        rows = self._conn.execute("""
+            SELECT ts, event_key, payload FROM learning_events
+            WHERE stream = ? AND user_id = ?
+            ORDER BY ts DESC LIMIT ?
+        """, (stream, user_id, self.ring_size + 1)).fetchall()
+
+        floor_ts = None
+        if len(rows) > self.ring_size:
+            floor_ts = rows.pop()[0]
+        events = [(ts, event_key, json.loads(payload)) for ts, event_key, payload in reversed(rows)]
+
+        ring = _Ring(self.ring_size, events, floor_ts)
+        self._rings[(stream, user_id)] = ring
+        while len(self._rings) > self.max_rings:
+            self._rings.popitem(last=False)
+        return ring
+
+    def _query_rows(self, stream: str, user_id: str, since_ts: Optional[float],
+                    until_ts: Optional[float], key: Optional[str]) -> List[Tuple[float, Optional[str], Any]]:
+        conditions = ["stream = ?", "user_id = ?"]
+        params: List[Any] = [stream, user_id]
+        if key is not None:
+            conditions.append("event_key = ?")
+            params.append(key)
+        if since_ts is not None:
+            conditions.append("ts >= ?")
+            params.append(since_ts)
+        if until_ts is not None:
+            conditions.append("ts <= ?")
+            params.append(until_ts)
+
+        rows = self._conn.execute(f"""
+            SELECT ts, event_key, payload FROM learning_events
+            WHERE {' AND '.join(conditions)}
+            ORDER BY ts
+        """, params).fetchall()
+        return [(ts, event_key, json.loads(payload)) for ts, event_key, payload in rows]
+
+    def has_events(self, stream: str, user_id: str) -> bool:
+        """某用户在某事件流中是否有任何事件"""
+        with self._lock:
+            ring = self._rings.get((stream, user_id))
+            if ring is not None and ring.events:
+                return True
+            self._flush_locked()
+            row = self._conn.execute("""
+                SELECT 1 FROM learning_events WHERE stream = ? AND user_id = ? LIMIT 1
+            """, (stream, user_id)).fetchone()
+        return row is not None
+
+    def keys(self, stream: str, user_id: str) -> Set[str]:
+        """某用户在某事件流中出现过的全部二级键"""
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute("""
+                SELECT DISTINCT event_key FROM learning_events
+                WHERE stream = ? AND user_id = ? AND event_key IS NOT NULL
+            """, (stream, user_id)).fetchall()
+        return {row[0] for row in rows}
+
+    # ==================== 维护 ====================
+
+    def purge_before(self, cutoff: datetime) -> int:
+        """
+        按天分区删除 cutoff 所在日期之前的事件
+        Args:
+            cutoff: 保留起点
+        Returns:
+            删除的事件数
+        """
+        cutoff_day = int(cutoff.timestamp() // SECONDS_PER_DAY)
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM learning_events WHERE day < ?", (cutoff_day,))
+            self._rings.clear()
+        logging.info(f"事件存储已清理 {cursor.rowcount} 条早于 {cutoff.date()} 的事件")
+        return cursor.rowcount
+
+    def forget(self, stream: str, user_id: str, keys: Iterable[str]) -> int:
+        """
+        删除某用户指定二级键的全部事件（用于按保留策略清理单条内容）
+        Returns:
+            删除的事件数
+        """
+        keys = list(keys)
+        if not keys:
+            return 0
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                cursor = self._conn.executemany("""
+                    DELETE FROM learning_events WHERE stream = ? AND user_id = ? AND event_key = ?
+                """, [(stream, user_id, key) for key in keys])
+            self._rings.pop((stream, user_id), None)
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计"""
+        with self._lock:
+            self._flush_locked()
+            total, days = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT day) FROM learning_events"
+            ).fetchone()
+            buffered = sum(len(ring.events) for ring in self._rings.values())
+        return {
+            'total_events': total,
+            'day_partitions': days,
+            'buffered_rings': len(self._rings),
+            'buffered_events': buffered
+        }
+
+    def close(self):
+        """提交待写入事件并关闭连接"""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._closed = True
+            self._rings.clear()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_shared_store: Optional[LearningEventStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_event_store(db_path: str = None) -> LearningEventStore:
+    """
+    获取进程内共享的事件存储（懒加载，进程退出时提交剩余事件）
+    Args:
+        db_path: 数据库文件路径（默认 DEFAULT_EVENT_DB_PATH）
+    Returns:
+        共享事件存储实例
+    """
+    global _shared_store
+
+    with _shared_lock:
+        if _shared_store is None or _shared_store.db_path != (db_path or DEFAULT_EVENT_DB_PATH):
+            _shared_store = LearningEventStore(db_path)
+            atexit.register(_shared_store.close)
+        return _shared_store
+
+
+def reset_shared_event_store():
+    """关闭并清除进程内共享的事件存储（测试使用）"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is not None:
+            _shared_store.close()
+        _shared_store = None
@@ -0,0 +1,86 @@
+"""
+流式导出 - NDJSON / CSV 生成器
+Streaming Export - NDJSON and CSV chunk generators
+
+导出不再先把全部记录读入内存再一次性序列化：记录来自按键集分页读取的生成器，
+序列化后按约 64KB 一块产出，Flask（stream_with_context）和 FastAPI（StreamingResponse）
+都可以直接把生成器作为分块响应返回，也可以写入文件。内存占用与导出行数无关。
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Sequence
+
+# 每次产出的块大小
+DEFAULT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def ndjson_chunks(records: Iterable[Dict], chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[bytes]:
+    """每条记录一行 JSON"""
+    buffer, size = [], 0
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False, default=_json_default, separators=(',', ':')) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def csv_chunks(records: Iterable[Dict], fieldnames: Sequence[str],
+               chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[bytes]:
+    """CSV（首行为列名，记录中多余的字段忽略）"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(fieldnames), extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        if output.tell() >= chunk_bytes:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+    if output.tell():
+        yield output.getvalue().encode('utf-8')
+
+
+def export_chunks(records: Iterable[Dict], export_format: str, fieldnames: Sequence[str] = None,
+                  chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    按格式选择序列化方式
+    Raises:
+        ValueError: 不支持的格式，或 CSV 缺少列名
+    """
+    if export_format == 'ndjson':
+        return ndjson_chunks(records, chunk_bytes)
+    if export_format == 'csv':
+        if not fieldnames:
+            raise ValueError("CSV 导出需要列名")
+        return csv_chunks(records, fieldnames, chunk_bytes)
+    raise ValueError(f"不支持的导出格式: {export_format}")
+
+
+def write_export(path: str, chunks: Iterable[bytes]) -> int:
+    """把导出块写入文件，返回字节数"""
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    return written
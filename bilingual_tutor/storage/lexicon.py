@@ -0,0 +1,526 @@
+"""
+共享词汇表 - 紧凑排序、内存映射的 CET/JLPT 词表
+Shared Lexicon - compact, sorted, memory-mapped CET/JLPT word list
+
+文件格式 (小端，按列存储):
+    头部     (32 字节): magic(8) | 条目数 N uint32 | 键区大小 uint32 | 数据源指纹(16)
+    键偏移   uint32 × (N + 1)
+    词频排名 uint32 × N（1 为最常用，0 表示未知）
+    级别码   uint8  × N（见 LEVELS，0xFF 表示无级别）
+    键区     语言码(1 字节) + UTF-8 单词，按字节序排序后首尾相接
+
+条目按键排序，查找为二分查找，不需要把词表加载为 Python 对象；
+多个进程映射同一个文件时共享操作系统页缓存。
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+MAGIC = b"BTLEX\x01\x00\x00"
+HEADER = struct.Struct("<8sII16s")
+
+LEVELS = ("CET-4", "CET-5", "CET-6", "N5", "N4", "N3", "N2", "N1")
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+NO_LEVEL = 0xFF
+NO_RANK = 0
+
+LANGUAGE_CODES = {"english": b"e", "japanese": b"j"}
+LANGUAGES = {code: language for language, code in LANGUAGE_CODES.items()}
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 词表在运行时生成，放在可配置的缓存目录（默认 ~/.cache/bilingual_tutor），不写入安装的包目录
+CACHE_DIR = os.environ.get("BILINGUAL_TUTOR_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "bilingual_tutor")
+DEFAULT_LEXICON_PATH = os.path.join(CACHE_DIR, "lexicon.bin")
+DEFAULT_VOCABULARY_DIR = os.path.join(os.path.dirname(os.path.dirname(_BASE_DIR)), "vocabulary_data")
+DEFAULT_DB_PATH = os.path.join(_BASE_DIR, "learning.db")
+
+
+@dataclass(frozen=True)
+class LexiconEntry:
+    """词表条目"""
+    word: str
+    language: str
+    level: Optional[str]  # CET-4, N5 等；仅有词频信息时为 None
+    rank: int  # 词频排名，1 为最常用；0 表示未知
+
+
+def _make_key(word: str, language: str) -> bytes:
+    """生成排序键: 语言码 + 规范化单词"""
+    word = word.strip()
+    if language == "english":
+        word = word.lower()
+    return LANGUAGE_CODES[language] + word.encode("utf-8")
+
+
+def _load_json_entries(vocabulary_dir: str) -> Iterator[Tuple[str, str, Optional[str], int]]:
+    """读取 vocabulary_data/*.json 中的词条"""
+    for path in sorted(glob.glob(os.path.join(vocabulary_dir, "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"跳过无法读取的词表文件 {path}: {e}")
+            continue
+
+        if not isinstance(data, dict):
+            continue
+        metadata = data.get("metadata", {})
+        language = metadata.get("language")
+        default_level = metadata.get("level")
+        if language not in LANGUAGE_CODES:
+            continue
+
+        for item in data.get("words", []):
+            word = item.get("word")
+            if not word:
+                continue
+            rank = item.get("rank", item.get("frequency_rank", NO_RANK)) or NO_RANK
+            yield word, language, item.get("level", default_level), int(rank)
+
+
+def _load_db_entries(db_path: str) -> Iterator[Tuple[str, str, Optional[str], int]]:
+    """以只读方式读取 vocabulary 表中的词条"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT word, language, level FROM vocabulary ORDER BY id").fetchall()
+    except sqlite3.Error as e:
+        logging.warning(f"读取词汇表失败 {db_path}: {e}")
+        rows = []
+    finally:
+        conn.close()
+
+    for word, language, level in rows:
+        if word and language in LANGUAGE_CODES:
+            yield word, language, level, NO_RANK
+
+
+def compute_source_fingerprint(vocabulary_dir: str = None, db_path: str = None) -> bytes:
+    """
+    计算数据源指纹，用于判断词表文件是否需要重建
+    Args:
+        vocabulary_dir: 词表 JSON 目录
+        db_path: 学习数据库路径
+    Returns:
+        16 字节指纹
+    """
+    digest = hashlib.md5()
+    if vocabulary_dir and os.path.isdir(vocabulary_dir):
+        for path in sorted(glob.glob(os.path.join(vocabulary_dir, "*.json"))):
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    if db_path and os.path.exists(db_path):
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            try:
+                count, max_id = conn.execute("SELECT COUNT(*), MAX(id) FROM vocabulary").fetchone()
+            finally:
+                conn.close()
+            digest.update(f"db:{count}:{max_id};".encode())
+        except sqlite3.Error:
+            pass
+    return digest.digest()
+
+
+def build_lexicon(output_path: str, vocabulary_dir: str = None, db_path: str = None,
+                  extra_entries: Iterable[Tuple[str, str, Optional[str], int]] = None) -> int:
+    """
+    从词表 JSON、数据库 vocabulary 表和附加词条构建词表文件
+    Args:
+        output_path: 输出文件路径
+        vocabulary_dir: vocabulary_data 目录（*.json）
+        db_path: 学习数据库路径（读取 vocabulary 表）
+        extra_entries: 附加的 (word, language, level, rank) 词条，如内置词频表
+    Returns:
+        写入的条目数
+    """
+    sources = []
+    if extra_entries is not None:
+        sources.append(extra_entries)
+    if vocabulary_dir and os.path.isdir(vocabulary_dir):
+        sources.append(_load_json_entries(vocabulary_dir))
+    if db_path and os.path.exists(db_path):
+        sources.append(_load_db_entries(db_path))
+
+    # 合并: 同一个词保留第一个出现的级别和最小的已知排名
+    merged: Dict[bytes, List[int]] = {}
+    for source in sources:
+        for word, language, level, rank in source:
+            if language not in LANGUAGE_CODES or not word.strip():
+                continue
+            key = _make_key(word, language)
+            level_code = LEVEL_CODES.get(level, NO_LEVEL)
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [level_code, rank]
+                continue
+            if entry[0] == NO_LEVEL:
+                entry[0] = level_code
+            if rank and (entry[1] == NO_RANK or rank < entry[1]):
+                entry[1] = rank
+
+    keys = sorted(merged)
+    offsets = array("I", [0])
+    ranks = array("I")
+    level_codes = bytearray()
+    for key in keys:
+        level_code, rank = merged[key]
+        offsets.append(offsets[-1] + len(key))
+        ranks.append(rank)
+        level_codes.append(level_code)
+    key_blob = b"".join(keys)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        ranks.byteswap()
+
+    fingerprint = compute_source_fingerprint(vocabulary_dir, db_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), len(key_blob), fingerprint))
+        f.write(offsets.tobytes())
+        f.write(ranks.tobytes())
+        f.write(bytes(level_codes))
+        f.write(key_blob)
+    # 原子替换，其他进程已映射的旧文件不受影响
+    os.replace(tmp_path, output_path)
+
+    logging.info(f"词表已构建: {output_path} ({len(keys)} 条)")
+    return len(keys)
+
+
+class Lexicon:
+    """内存映射词表，首次查询时才打开文件"""
+
+    def __init__(self, path: str):
+        """
+        初始化词表
+        Args:
+            path: 词表文件路径
+        """
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._count = 0
+        self._offsets = None
+        self._ranks = None
+        self._levels = None
+        self._keys = None
+        self._view: Optional[memoryview] = None
+        self._fingerprint = b""
+        self._level_counts: Optional[Dict[Tuple[str, str], int]] = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """打开并校验词表文件，建立各列的零拷贝视图"""
+        if self._mm is not None:
+            return
+        with self._lock:
+            if self._mm is not None:
+                return
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count, keys_size, fingerprint = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                mm.close()
+                raise ValueError(f"无效的词表文件: {self.path}")
+
+            view = memoryview(mm)
+            offsets_start = HEADER.size
+            ranks_start = offsets_start + 4 * (count + 1)
+            levels_start = ranks_start + 4 * count
+            keys_start = levels_start + count
+            if sys.byteorder == "little":
+                self._offsets = view[offsets_start:ranks_start].cast("I")
+                self._ranks = view[ranks_start:levels_start].cast("I")
+            else:
+                # 大端平台无法直接映射，退化为进程内拷贝
+                self._offsets = array("I", view[offsets_start:ranks_start])
+                self._offsets.byteswap()
+                self._ranks = array("I", view[ranks_start:levels_start])
+                self._ranks.byteswap()
+            self._levels = view[levels_start:keys_start]
+            self._keys = view[keys_start:keys_start + keys_size]
+            self._view = view
+            self._count = count
+            self._fingerprint = fingerprint
+            self._mm = mm
+
+    @property
+    def fingerprint(self) -> bytes:
+        """数据源指纹"""
+        self._open()
+        return self._fingerprint
+
+    def __len__(self) -> int:
+        self._open()
+        return self._count
+
+    def _key_at(self, index: int) -> bytes:
+        """读取第 index 条的键"""
+        offsets = self._offsets
+        return self._keys[offsets[index]:offsets[index + 1]].tobytes()
+
+    def _find(self, key: bytes) -> int:
+        """二分查找键，返回条目下标，不存在时返回 -1"""
+        self._open()
+        offsets = self._offsets
+        keys = self._keys
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            mid_key = keys[offsets[mid]:offsets[mid + 1]].tobytes()
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def _level_at(self, index: int) -> Optional[str]:
+        level_code = self._levels[index]
+        return LEVELS[level_code] if level_code < len(LEVELS) else None
+
+    def lookup(self, word: str, language: str) -> Optional[LexiconEntry]:
+        """
+        查找单词
+        Args:
+            word: 单词
+            language: 语言（english/japanese）
+        Returns:
+            词表条目，不存在时返回 None
+        """
+        if language not in LANGUAGE_CODES or not word:
+            return None
+        index = self._find(_make_key(word, language))
+        if index < 0:
+            return None
+        return LexiconEntry(word=word, language=language,
+                            level=self._level_at(index), rank=self._ranks[index])
+
+    def level_of(self, word: str, language: str) -> Optional[str]:
+        """返回单词所属级别"""
+        if language not in LANGUAGE_CODES or not word:
+            return None
+        index = self._find(_make_key(word, language))
+        return self._level_at(index) if index >= 0 else None
+
+    def frequency_rank(self, word: str, language: str) -> int:
+        """返回单词词频排名（未知为 0）"""
+        entry = self.lookup(word, language)
+        return entry.rank if entry else NO_RANK
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        word, language = item
+        return self.lookup(word, language) is not None
+
+    def iter_entries(self, language: str = None, level: str = None) -> Iterator[LexiconEntry]:
+        """按排序顺序遍历条目，可按语言和级别过滤"""
+        self._open()
+        for index in range(self._count):
+            entry_level = self._level_at(index)
+            if level is not None and entry_level != level:
+                continue
+            key = self._key_at(index)
+            entry_language = LANGUAGES[key[:1]]
+            if language is not None and entry_language != language:
+                continue
+            yield LexiconEntry(word=key[1:].decode("utf-8"), language=entry_language,
+                               level=entry_level, rank=self._ranks[index])
+
+    def count(self, language: str, level: str) -> int:
+        """返回某语言某级别的词数（首次调用时统计一次）"""
+        if self._level_counts is None:
+            counts: Dict[Tuple[str, str], int] = {}
+            for entry in self.iter_entries():
+                counts[(entry.language, entry.level)] = counts.get((entry.language, entry.level), 0) + 1
+            self._level_counts = counts
+        return self._level_counts.get((language, level), 0)
+
+    def close(self):
+        """关闭内存映射"""
+        with self._lock:
+            if self._mm is not None:
+                # 先释放导出的视图，否则 mmap 无法关闭
+                for view in (self._offsets, self._ranks, self._levels, self._keys, self._view):
+                    if isinstance(view, memoryview):
+                        view.release()
+                self._offsets = self._ranks = self._levels = self._keys = self._view = None
+                self._mm.close()
+                self._mm = None
+            self._level_counts = None
+
+
+class LevelWordSet:
+    """
+    某语言某级别的只读词集合视图
+    合并内置种子词和共享词表，支持 in / len / 迭代 / intersection
+    """
+
+    def __init__(self, seed: Iterable[str], language: str, level: str,
+                 lexicon: Optional[Lexicon] = None):
+        self.seed = seed if isinstance(seed, frozenset) else frozenset(seed)
+        self.language = language
+        self.level = level
+        self.lexicon = lexicon
+
+    def __contains__(self, word) -> bool:
+        if word in self.seed:
+            return True
+        if self.lexicon is None or not isinstance(word, str):
+            return False
+        return self.lexicon.level_of(word, self.language) == self.level
+
+    def _lexicon_words(self) -> Iterator[str]:
+        if self.lexicon is None:
+            return iter(())
+        return (entry.word for entry in self.lexicon.iter_entries(self.language, self.level))
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.seed
+        for word in self._lexicon_words():
+            if word not in self.seed:
+                yield word
+
+    def __len__(self) -> int:
+        if self.lexicon is None:
+            return len(self.seed)
+        extra = self.lexicon.count(self.language, self.level)
+        if extra == 0:
+            return len(self.seed)
+        overlap = sum(1 for word in self.seed if self.lexicon.level_of(word, self.language) == self.level)
+        return len(self.seed) + extra - overlap
+
+    def intersection(self, other: Iterable[str]) -> Set[str]:
+        return {word for word in other if word in self}
+
+    def __repr__(self) -> str:
+        return f"LevelWordSet({self.language!r}, {self.level!r}, seed={len(self.seed)})"
+
+
+def rank_to_frequency(rank: int) -> float:
+    """词频排名换算为 (0, 1] 的相对词频（排名 1 为 1.0，按对数递减；未知排名为 0.0）"""
+    return 1.0 / (1.0 + math.log10(rank)) if rank > NO_RANK else 0.0
+
+
+class WordFrequencies(Mapping):
+    """
+    某语言的只读词频映射：word -> 相对词频
+    内置种子词频优先，其余单词按共享词表中的词频排名换算（rank_to_frequency）
+    """
+
+    def __init__(self, seed: Dict[str, float], language: str, lexicon: Optional[Lexicon] = None):
+        self.seed = seed if isinstance(seed, MappingProxyType) else MappingProxyType(dict(seed))
+        self.language = language
+        self.lexicon = lexicon
+        self._length: Optional[int] = None
+
+    def __getitem__(self, word) -> float:
+        if word in self.seed:
+            return self.seed[word]
+        if self.lexicon is not None and isinstance(word, str):
+            rank = self.lexicon.frequency_rank(word, self.language)
+            if rank != NO_RANK:
+                return rank_to_frequency(rank)
+        raise KeyError(word)
+
+    def _lexicon_words(self) -> Iterator[str]:
+        if self.lexicon is None:
+            return iter(())
+        return (entry.word for entry in self.lexicon.iter_entries(self.language)
+                if entry.rank != NO_RANK and entry.word not in self.seed)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.seed
+        yield from self._lexicon_words()
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = len(self.seed) + sum(1 for _ in self._lexicon_words())
+        return self._length
+
+    def __repr__(self) -> str:
+        return f"WordFrequencies({self.language!r}, seed={len(self.seed)})"
+
+
+_shared_lexicon: Optional[Lexicon] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_lexicon(path: str = None, vocabulary_dir: str = None, db_path: str = None,
+                       rebuild: bool = False) -> Optional[Lexicon]:
+    """
+    获取进程内共享的词表（懒加载）
+    数据源指纹变化或文件不存在时重新构建；构建失败时返回 None，调用方回退到内置词表。
+    Args:
+        path: 词表文件路径
+        vocabulary_dir: vocabulary_data 目录
+        db_path: 学习数据库路径
+        rebuild: 是否强制重建
+    Returns:
+        共享词表实例
+    """
+    global _shared_lexicon
+
+    path = path or DEFAULT_LEXICON_PATH
+    vocabulary_dir = vocabulary_dir or DEFAULT_VOCABULARY_DIR
+    db_path = db_path or DEFAULT_DB_PATH
+
+    with _shared_lock:
+        if _shared_lexicon is not None and _shared_lexicon.path == path and not rebuild:
+            return _shared_lexicon
+
+        try:
+            stale = rebuild or not os.path.exists(path)
+            if not stale:
+                with open(path, "rb") as f:
+                    header = f.read(HEADER.size)
+                stale = (len(header) < HEADER.size or
+                         HEADER.unpack(header)[0] != MAGIC or
+                         HEADER.unpack(header)[3] != compute_source_fingerprint(vocabulary_dir, db_path))
+            if stale:
+                build_lexicon(path, vocabulary_dir, db_path)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"共享词表不可用，使用内置词表: {e}")
+            return None
+
+        # 旧实例不主动关闭，仍在使用它的调用方可以继续查询
+        _shared_lexicon = Lexicon(path)
+        return _shared_lexicon
+
+
+def reset_shared_lexicon():
+    """关闭并清除进程内共享词表（测试或数据源更新后使用）"""
+    global _shared_lexicon
+    with _shared_lock:
+        if _shared_lexicon is not None:
+            _shared_lexicon.close()
+        _shared_lexicon = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="构建共享词表文件")
+    parser.add_argument("--output", default=DEFAULT_LEXICON_PATH)
+    parser.add_argument("--vocabulary-dir", default=DEFAULT_VOCABULARY_DIR)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    count = build_lexicon(args.output, args.vocabulary_dir, args.db)
+    print(f"已写入 {count} 条词目到 {args.output}")
@@ -0,0 +1,200 @@
+"""
+Audio Store Migration - 音频存储迁移
+Migrates per-record audio files into the content-addressed blob store
+将按 (单词, 级别, 来源) 保存的音频文件迁移到内容寻址存储
+"""
+
+import os
+import shutil
+import sqlite3
+import logging
+from typing import Dict
+
+from bilingual_tutor.audio.audio_storage import AudioStorage
+
+
+def migrate_to_content_addressed(storage_path: str, db_path: str = None,
+                                 remove_originals: bool = True) -> Dict[str, int]:
+    """
+    将现有音频文件迁移到内容寻址存储
+    Args:
+        storage_path: 音频存储路径
+        db_path: 音频索引数据库路径（默认 storage_path/audio_index.db）
+        remove_originals: 迁移后删除原文件
+    Returns:
+        Dict: 迁移统计（可重复执行，已迁移的记录会被跳过）
+    """
+    logger = logging.getLogger(__name__)
+    stats = {
+        "records_migrated": 0,
+        "records_skipped": 0,
+        "missing_files": 0,
+        "unique_blobs": 0,
+        "bytes_before": 0,
+        "bytes_after": 0
+    }
+
+    # 以内容寻址模式打开会自动升级表结构
+    storage = AudioStorage(storage_path, db_path, content_addressed=True)
+    try:
+        with storage._lock:
+            conn = storage._conn
+            rows = conn.execute("""
+                SELECT id, file_path FROM audio_records WHERE blob_hash IS NULL
+            """).fetchall()
+            stats["records_skipped"] = conn.execute(
+                "SELECT COUNT(*) FROM audio_records WHERE blob_hash IS NOT NULL").fetchone()[0]
+
+            logger.info(f"开始音频存储迁移，待迁移记录: {len(rows)}")
+            migrated_paths = set()
+
+            for row in rows:
+                file_path = row['file_path']
+                if not os.path.exists(file_path):
+                    logger.warning(f"音频文件不存在，跳过: {file_path}")
+                    stats["missing_files"] += 1
+                    continue
+
+                stats["bytes_before"] += os.path.getsize(file_path)
+                sha256, blob_path, file_size, _ = storage.blob_store.put(file_path)
+                conn.execute("""
+                    INSERT INTO audio_blobs (sha256, file_path, file_size, ref_count)
+                    VALUES (?, ?, ?, 0)
+                    ON CONFLICT(sha256) DO NOTHING
+                """, (sha256, blob_path, file_size))
+                conn.execute("""
+                    UPDATE audio_records SET file_path = ?, file_size = ?, blob_hash = ? WHERE id = ?
+                """, (blob_path, file_size, sha256, row['id']))
+                storage._adjust_blob_references(sha256, 1)
+                migrated_paths.add(file_path)
+                stats["records_migrated"] += 1
+
+            # 先提交数据库，再删除原文件：中断时原文件仍然可用
+            conn.commit()
+            storage._lookup_cache.clear()
+
+            if remove_originals:
+                for file_path in migrated_paths:
+                    try:
+                        os.remove(file_path)
+                    except OSError as e:
+                        logger.warning(f"删除原文件失败: {file_path}: {e}")
+
+            row = conn.execute("SELECT COUNT(*), SUM(file_size) FROM audio_blobs").fetchone()
+            stats["unique_blobs"] = row[0] or 0
+            stats["bytes_after"] = row[1] or 0
+
+        storage.recount_blob_references()
+        logger.info(f"音频存储迁移完成: {stats}")
+        return stats
+
+    except Exception:
+        # 未提交的记录更新回滚，原文件保持不变
+        storage._conn.rollback()
+        raise
+    finally:
+        storage.close()
+
+
+def rollback_content_addressed(storage_path: str, db_path: str = None) -> bool:
+    """
+    回滚内容寻址迁移：为每条记录恢复独立文件，删除 blob 存储
+    Args:
+        storage_path: 音频存储路径
+        db_path: 音频索引数据库路径
+    Returns:
+        bool: 回滚是否成功
+    """
+    logger = logging.getLogger(__name__)
+    storage = AudioStorage(storage_path, db_path, content_addressed=True)
+
+    try:
+        with storage._lock:
+            conn = storage._conn
+            rows = conn.execute("""
+                SELECT id, word, language, level, source, file_path FROM audio_records
+                WHERE blob_hash IS NOT NULL
+            """).fetchall()
+
+            logger.info(f"开始回滚音频存储迁移，记录数: {len(rows)}")
+            for row in rows:
+                target_path = storage._generate_storage_path(
+                    row['word'], row['language'], row['level'], row['source'] or "")
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                shutil.copy2(row['file_path'], target_path)
+                conn.execute("UPDATE audio_records SET file_path = ?, blob_hash = NULL WHERE id = ?",
+                             (target_path, row['id']))
+
+            conn.execute("DROP TABLE IF EXISTS audio_blobs")
+            conn.commit()
+
+        shutil.rmtree(storage.blob_store.root, ignore_errors=True)
+        logger.info("音频存储迁移回滚完成")
+        return True
+
+    except Exception as e:
+        storage._conn.rollback()
+        logger.error(f"音频存储迁移回滚失败: {e}")
+        return False
+    finally:
+        storage.close()
+
+
+def check_content_addressed_status(storage_path: str, db_path: str = None) -> Dict[str, int]:
+    """
+    检查内容寻址迁移状态
+    Args:
+        storage_path: 音频存储路径
+        db_path: 音频索引数据库路径
+    Returns:
+        Dict: 已迁移/未迁移记录数和 blob 统计
+    """
+    if db_path is None:
+        db_path = os.path.join(storage_path, "audio_index.db")
+
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(audio_records)")}
+            total = conn.execute("SELECT COUNT(*) FROM audio_records").fetchone()[0]
+            if "blob_hash" not in columns:
+                return {"content_addressed_schema": 0, "migrated_records": 0,
+                        "pending_records": total, "unique_blobs": 0}
+
+            migrated = conn.execute(
+                "SELECT COUNT(*) FROM audio_records WHERE blob_hash IS NOT NULL").fetchone()[0]
+            blobs = conn.execute("SELECT COUNT(*) FROM audio_blobs").fetchone()[0]
+            return {"content_addressed_schema": 1, "migrated_records": migrated,
+                    "pending_records": total - migrated, "unique_blobs": blobs}
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logging.error(f"检查音频存储迁移状态失败: {e}")
+        return {}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("用法: python migrate_audio_store.py <storage_path> [rollback|status|gc]")
+        sys.exit(1)
+
+    storage_path = sys.argv[1]
+    action = sys.argv[2] if len(sys.argv) > 2 else "migrate"
+
+    logging.basicConfig(level=logging.INFO)
+
+    if action == "rollback":
+        success = rollback_content_addressed(storage_path)
+        print(f"音频存储迁移回滚: {'成功' if success else '失败'}")
+    elif action == "status":
+        print("迁移状态:", check_content_addressed_status(storage_path))
+    elif action == "gc":
+        with AudioStorage(storage_path, content_addressed=True) as storage:
+            print("垃圾回收:", storage.collect_garbage(grace_seconds=0, scan=True))
+    else:
+        result = migrate_to_content_addressed(storage_path)
+        print("音频存储迁移:", result)
+        print("迁移状态:", check_content_addressed_status(storage_path))
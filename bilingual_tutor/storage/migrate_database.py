@@ -9,6 +9,148 @@ import os
 import logging
 from datetime import datetime
 
+from bilingual_tutor.storage.search import pin_search_statistics
+
+
+# 复习时间的整数列（epoch 秒）与对应的 ISO-8601 文本列
+REVIEW_TIMESTAMP_COLUMNS = {
+    'last_review_ts': 'last_review_date',
+    'next_review_ts': 'next_review_date',
+}
+
+# 文本时间按本地时间解释（与 datetime.timestamp() 对无时区时间的处理一致）
+_EPOCH_EXPR = "CAST(strftime('%s', {column}, 'utc') AS INTEGER)"
+
+# 只写文本列的旧代码（或手工 SQL）由触发器补齐整数列；同时写两列的路径不会触发
+REVIEW_TIMESTAMP_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_records_review_ts_insert
+    AFTER INSERT ON learning_records
+    WHEN (NEW.last_review_ts IS NULL AND NEW.last_review_date IS NOT NULL)
+      OR (NEW.next_review_ts IS NULL AND NEW.next_review_date IS NOT NULL)
+    BEGIN
+        UPDATE learning_records SET
+            last_review_ts = {_EPOCH_EXPR.format(column='NEW.last_review_date')},
+            next_review_ts = {_EPOCH_EXPR.format(column='NEW.next_review_date')}
+        WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_records_review_ts_update
+    AFTER UPDATE OF last_review_date, next_review_date ON learning_records
+    WHEN (NEW.last_review_date IS NOT OLD.last_review_date AND NEW.last_review_ts IS OLD.last_review_ts)
+      OR (NEW.next_review_date IS NOT OLD.next_review_date AND NEW.next_review_ts IS OLD.next_review_ts)
+    BEGIN
+        UPDATE learning_records SET
+            last_review_ts = {_EPOCH_EXPR.format(column='NEW.last_review_date')},
+            next_review_ts = {_EPOCH_EXPR.format(column='NEW.next_review_date')}
+        WHERE id = NEW.id;
+    END
+    """,
+]
+
+# 复习查询的覆盖索引（取代 next_review_date / last_review_date 文本索引）
+# next_review_date 只用于同一秒内的排序，保持与原来按文本时间排序的顺序一致
+REVIEW_TIMESTAMP_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_records_user_due "
+    "ON learning_records(user_id, next_review_ts, next_review_date, memory_strength)",
+    "CREATE INDEX IF NOT EXISTS idx_records_user_type_due "
+    "ON learning_records(user_id, item_type, next_review_ts, next_review_date, memory_strength)",
+    "CREATE INDEX IF NOT EXISTS idx_records_user_last_review ON learning_records(user_id, last_review_ts)",
+]
+OBSOLETE_REVIEW_INDEXES = ['idx_records_user_review', 'idx_records_last_review', 'idx_records_next_review']
+
+
+def add_review_timestamp_columns(conn: sqlite3.Connection) -> bool:
+    """
+    为 learning_records 添加整数时间列
+    Returns:
+        bool: 是否添加了新列（需要回填）
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(learning_records)")}
+    missing = [column for column in REVIEW_TIMESTAMP_COLUMNS if column not in columns]
+    for column in missing:
+        conn.execute(f"ALTER TABLE learning_records ADD COLUMN {column} INTEGER")
+    return bool(missing)
+
+
+def backfill_review_timestamps(conn: sqlite3.Connection, batch_size: int = 50000, progress=None) -> int:
+    """
+    按 rowid 区间分批把文本时间回填到整数列
+    每批单独提交，写锁只持有一批的时间，大表迁移时其他连接仍可写入
+    Args:
+        conn: 数据库连接
+        batch_size: 每批的 rowid 区间大小
+        progress: 可选回调 progress(已处理的最大 rowid, 最大 rowid)
+    Returns:
+        int: 回填的行数
+    """
+    row = conn.execute("SELECT MIN(id), MAX(id) FROM learning_records").fetchone()
+    if row[0] is None:
+        return 0
+    low, high = row
+    assignments = ', '.join(f"{ts} = {_EPOCH_EXPR.format(column=text)}"
+                            for ts, text in REVIEW_TIMESTAMP_COLUMNS.items())
+    pending = ' OR '.join(f"({ts} IS NULL AND {text} IS NOT NULL)"
+                          for ts, text in REVIEW_TIMESTAMP_COLUMNS.items())
+    updated = 0
+    for start in range(low, high + 1, batch_size):
+        cursor = conn.execute(
+            f"UPDATE learning_records SET {assignments} WHERE id BETWEEN ? AND ? AND ({pending})",
+            (start, start + batch_size - 1))
+        conn.commit()
+        updated += cursor.rowcount
+        if progress:
+            progress(min(start + batch_size - 1, high), high)
+    return updated
+
+
+def create_review_timestamp_indexes(conn: sqlite3.Connection) -> None:
+    """创建覆盖索引，同名但定义不同的旧索引先删除再重建"""
+    for ddl in REVIEW_TIMESTAMP_INDEXES:
+        name = ddl.split()[5]
+        existing = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?",
+                                (name,)).fetchone()
+        if existing and existing[0] != ddl.replace("IF NOT EXISTS ", ""):
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute(ddl)
+
+
+def apply_review_timestamp_schema(conn: sqlite3.Connection) -> None:
+    """创建触发器和覆盖索引，删除被取代的文本时间索引"""
+    for ddl in REVIEW_TIMESTAMP_TRIGGERS:
+        conn.execute(ddl)
+    create_review_timestamp_indexes(conn)
+    for index in OBSOLETE_REVIEW_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index}")
+    conn.commit()
+
+
+def migrate_review_timestamps(db_path: str, batch_size: int = 50000, progress=None) -> int:
+    """
+    把已有数据库的复习时间迁移到整数列（可重复执行）
+    Args:
+        db_path: 数据库文件路径
+        batch_size: 每批的 rowid 区间大小
+        progress: 可选进度回调，见 backfill_review_timestamps
+    Returns:
+        int: 回填的行数
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        add_review_timestamp_columns(conn)
+        conn.commit()
+        # 先建触发器，回填期间其他进程写入的行也会带上整数时间
+        for ddl in REVIEW_TIMESTAMP_TRIGGERS:
+            conn.execute(ddl)
+        conn.commit()
+        updated = backfill_review_timestamps(conn, batch_size, progress)
+        apply_review_timestamp_schema(conn)
+        return updated
+    finally:
+        conn.close()
+
 
 def migrate_database(db_path: str = None):
     """
@@ -95,7 +237,6 @@ def migrate_database(db_path: str = None):
             
             # 学习记录表索引（性能关键）
             "CREATE INDEX IF NOT EXISTS idx_records_user ON learning_records(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_records_next_review ON learning_records(next_review_date)",
             "CREATE INDEX IF NOT EXISTS idx_records_user_type ON learning_records(user_id, item_type)",
             "CREATE INDEX IF NOT EXISTS idx_records_item ON learning_records(item_id, item_type)",
             "CREATE INDEX IF NOT EXISTS idx_records_mastery ON learning_records(mastery_level)",
@@ -113,10 +254,24 @@ def migrate_database(db_path: str = None):
         for index_sql in indexes:
             cursor.execute(index_sql)
             print(f"  创建索引: {index_sql.split('idx_')[1].split(' ')[0] if 'idx_' in index_sql else '未知'}")
+        conn.commit()
+        
+        # 复习时间迁移到整数列（epoch 秒）并建立覆盖索引
+        print("迁移复习时间到整数列...")
+        if add_review_timestamp_columns(conn):
+            conn.commit()
+        for ddl in REVIEW_TIMESTAMP_TRIGGERS:
+            cursor.execute(ddl)
+        conn.commit()
+        updated = backfill_review_timestamps(
+            conn, progress=lambda done, total: print(f"  回填进度: {done}/{total}", end='\r'))
+        apply_review_timestamp_schema(conn)
+        print(f"\n  回填 {updated} 条学习记录")
         
         # 更新统计信息
         print("更新数据库统计信息...")
         cursor.execute("ANALYZE")
+        pin_search_statistics(conn)
         
         # 清理数据库
         print("清理数据库...")
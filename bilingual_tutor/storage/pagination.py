@@ -0,0 +1,78 @@
+"""
+键集分页 - 不透明游标
+Keyset Pagination - opaque cursors for seek-based paging
+
+OFFSET 分页要先扫描并丢弃前面的所有行，越往后越慢；键集分页记住上一页最后一行的
+排序键，下一页用 (排序键) > (上一页最后的键) 直接从索引定位，每页的代价与页码无关，
+翻页期间插入或删除的行也不会导致重复或遗漏。
+
+游标是排序键的 JSON 经 base64url 编码后的字符串，对客户端不透明。
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence
+
+# 默认每页条数与上限
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+@dataclass
+class Page:
+    """一页结果；next_cursor 为 None 表示没有下一页"""
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    def to_dict(self, serialize=None) -> dict:
+        items = [serialize(item) for item in self.items] if serialize else self.items
+        return {'items': items, 'next_cursor': self.next_cursor}
+
+
+def encode_cursor(key: Sequence) -> str:
+    """排序键编码为游标"""
+    data = json.dumps(list(key), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List]:
+    """
+    游标解码为排序键
+    Args:
+        cursor: 游标（None 或空字符串表示第一页）
+        size: 排序键的列数
+    Raises:
+        ValueError: 游标格式错误
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return key
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """每页条数限制在 1..MAX_PAGE_SIZE"""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def make_page(rows: List, limit: int, key_of) -> Page:
+    """
+    由多取一行的查询结果生成一页
+    Args:
+        rows: 查询结果（LIMIT limit + 1）
+        limit: 每页条数
+        key_of: 行 -> 排序键
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, encode_cursor(key_of(rows[-1])))
+    return Page(rows, None)
@@ -0,0 +1,358 @@
+"""
+查询性能剖析 - SQL 指纹、有界延迟直方图和慢查询执行计划
+Query Profiler - SQL fingerprints, bounded latency histograms and slow-query plans
+
+连接池中的连接使用 ProfiledConnection（sqlite3.connect 的 factory）。每条语句从
+execute 开始计时，累加之后 fetch* 的耗时，到游标读完、重新执行、关闭或被回收时记录一次：
+
+- SQL 按指纹归类（字面量替换为 ?，IN (...) 列表折叠，空白归一），
+  同一条查询不同参数的执行落在同一个指纹下
+- 每个指纹一个 HDR 风格直方图：按 2 的幂分段、每段 16 个子桶，相对误差约 6%，
+  桶数固定，内存与执行次数无关；指纹数达到上限后新指纹归入 OTHER_FINGERPRINT
+- 超过慢查询阈值的指纹在同一连接上执行一次 EXPLAIN QUERY PLAN 并保存计划，
+  最近的慢查询保存在定长队列中
+- 在已采样的请求追踪中，每条语句同时记录为一个 sql 子 span（db.statement 为指纹）
+
+sqlite3 的 trace 回调只在语句开始时调用，没有结束事件，无法得到耗时，所以在连接和游标的
+execute / fetch 上计时；用 `for row in cursor` 迭代读取的时间不计入。
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from bilingual_tutor.infrastructure.tracing import SPAN_KIND_CLIENT, current_span, record_span
+
+logger = logging.getLogger(__name__)
+
+# 是否剖析连接池中的连接（0 关闭，连接池使用普通 sqlite3.Connection）
+PROFILING_ENABLED = os.environ.get('BILINGUAL_TUTOR_QUERY_PROFILING', '1') != '0'
+# 慢查询阈值（毫秒）
+SLOW_QUERY_MS = float(os.environ.get('BILINGUAL_TUTOR_SLOW_QUERY_MS', '100'))
+# 最多跟踪的指纹数
+MAX_FINGERPRINTS = int(os.environ.get('BILINGUAL_TUTOR_PROFILER_FINGERPRINTS', '256'))
+# 保留的最近慢查询条数
+SLOW_LOG_SIZE = 100
+
+OTHER_FINGERPRINT = '<other>'
+
+# 直方图：2 ** SUB_BUCKET_BITS 个子桶，值以微秒计，上限约 71 分钟
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_MAX_MICROS = (1 << 32) - 1
+
+# 不需要执行计划的语句
+_NO_PLAN_PREFIXES = ('PRAGMA', 'BEGIN', 'COMMIT', 'END', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'CREATE',
+                     'DROP', 'ALTER', 'ANALYZE', 'VACUUM', 'ATTACH', 'DETACH', 'EXPLAIN', 'REINDEX')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+# SQL 文本 -> 指纹的缓存（同一条查询文本只做一次正则替换）
+_FINGERPRINT_CACHE_SIZE = 1024
+_fingerprint_cache: Dict[str, str] = {}
+
+
+def fingerprint(sql: str) -> str:
+    """
+    SQL 指纹：去掉注释，字面量替换为 ?，IN 列表和多行 VALUES 折叠，空白归一
+    例如 "SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'" -> "SELECT * FROM t WHERE id IN (...) AND name = ?"
+    """
+    cached = _fingerprint_cache.get(sql)
+    if cached is not None:
+        return cached
+    text = _COMMENT.sub(' ', sql)
+    text = _STRING_LITERAL.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _IN_LIST.sub('IN (...)', text)
+    text = _VALUES_LIST.sub('(...)', text)
+    text = _WHITESPACE.sub(' ', text).strip().rstrip(';').strip()
+    if len(_fingerprint_cache) >= _FINGERPRINT_CACHE_SIZE:
+        _fingerprint_cache.clear()
+    _fingerprint_cache[sql] = text
+    return text
+
+
+def _bucket_index(micros: int) -> int:
+    """微秒值所在的桶：小于 2 * 子桶数时每微秒一个桶，之后每个 2 的幂区间分 16 个子桶"""
+    if micros < 2 * _SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift << SUB_BUCKET_BITS) + (micros >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    """桶的上界（微秒，不含）"""
+    if index < 2 * _SUB_BUCKETS:
+        return index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    return (index - (shift << SUB_BUCKET_BITS) + 1) << shift
+
+
+_BUCKET_COUNT = _bucket_index(_MAX_MICROS) + 1
+
+
+class QueryHistogram:
+    """
+    HDR 风格延迟直方图 - 固定 464 个桶，记录 O(1)，分位数 O(桶数)
+    HDR-style latency histogram with log-linear buckets
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * _BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """记录一次耗时（秒）"""
+        self.counts[_bucket_index(min(int(seconds * 1e6), _MAX_MICROS))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """分位数（毫秒，取所在桶的上界，不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(fraction * self.count + 0.5))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(_bucket_upper(index) / 1000.0, self.max * 1000.0)
+        return self.max * 1000.0
+
+    def snapshot(self) -> Dict:
+        """直方图摘要（毫秒）"""
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000.0, 3),
+            'avg_ms': round(self.total * 1000.0 / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'p99_ms': round(self.percentile(0.99), 3),
+            'max_ms': round(self.max * 1000.0, 3),
+        }
+
+
+class _FingerprintStats:
+    __slots__ = ('histogram', 'slow_count', 'plan')
+
+    def __init__(self):
+        self.histogram = QueryHistogram()
+        self.slow_count = 0
+        self.plan: Optional[List[str]] = None
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, parameters: Sequence = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN 的各行 detail（不经过剖析，不计入统计）"""
+    return [row[3] for row in sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters)]
+
+
+class QueryProfiler:
+    """
+    按指纹汇总的查询耗时统计（线程安全，内存有界）
+    Thread-safe, bounded per-fingerprint query statistics
+    """
+
+    def __init__(self, slow_ms: float = None, max_fingerprints: int = None, slow_log_size: int = SLOW_LOG_SIZE):
+        """
+        Args:
+            slow_ms: 慢查询阈值（毫秒），默认 BILINGUAL_TUTOR_SLOW_QUERY_MS
+            max_fingerprints: 最多跟踪的指纹数，默认 BILINGUAL_TUTOR_PROFILER_FINGERPRINTS
+            slow_log_size: 保留的最近慢查询条数
+        """
+        self.slow_seconds = (SLOW_QUERY_MS if slow_ms is None else slow_ms) / 1000.0
+        self.max_fingerprints = MAX_FINGERPRINTS if max_fingerprints is None else max_fingerprints
+        self._stats: Dict[str, _FingerprintStats] = {}
+        self._slow_log = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        self.query_count = 0
+        self.total_seconds = 0.0
+        self.slow_count = 0
+
+    def observe(self, sql: str, seconds: float, conn: sqlite3.Connection = None,
+                parameters: Sequence = None) -> None:
+        """
+        记录一条语句的耗时；慢查询且该指纹还没有执行计划时在 conn 上取计划
+        Args:
+            sql: 执行的 SQL
+            seconds: 耗时
+            conn: 执行语句的连接（取执行计划用）
+            parameters: 执行参数（executemany 时为 None，不取计划）
+        """
+        key = fingerprint(sql)
+        if current_span() is not None:
+            record_span('sql', seconds, {'db.system': 'sqlite', 'db.statement': key}, SPAN_KIND_CLIENT)
+        slow = seconds >= self.slow_seconds
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    key = OTHER_FINGERPRINT
+                    stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = _FingerprintStats()
+            stats.histogram.record(seconds)
+            self.query_count += 1
+            self.total_seconds += seconds
+            if not slow:
+                return
+            stats.slow_count += 1
+            self.slow_count += 1
+            self._slow_log.append({
+                'query': key,
+                'time': seconds,
+                'timestamp': datetime.now().isoformat()
+            })
+            need_plan = stats.plan is None and key != OTHER_FINGERPRINT
+        logger.warning(f"慢查询检测: {key[:200]} 耗时 {seconds:.3f}s")
+
+        if need_plan and conn is not None and parameters is not None \
+                and not sql.lstrip().upper().startswith(_NO_PLAN_PREFIXES):
+            try:
+                plan = explain_query_plan(conn, sql, parameters)
+            except (sqlite3.Error, ValueError) as e:
+                logger.debug(f"获取执行计划失败: {e}")
+                return
+            with self._lock:
+                stats.plan = plan
+
+    def plan(self, sql_or_fingerprint: str) -> Optional[List[str]]:
+        """指纹（或原始 SQL）保存的执行计划"""
+        with self._lock:
+            stats = self._stats.get(sql_or_fingerprint) or self._stats.get(fingerprint(sql_or_fingerprint))
+            return list(stats.plan) if stats is not None and stats.plan is not None else None
+
+    def histogram(self, sql_or_fingerprint: str) -> Optional[Dict]:
+        """指纹（或原始 SQL）的直方图摘要"""
+        with self._lock:
+            stats = self._stats.get(sql_or_fingerprint) or self._stats.get(fingerprint(sql_or_fingerprint))
+            return stats.histogram.snapshot() if stats is not None else None
+
+    def recent_slow_queries(self, limit: int = 10) -> List[Dict]:
+        """最近的慢查询（最新的在最后）"""
+        with self._lock:
+            return list(self._slow_log)[-limit:] if limit else []
+
+    def snapshot(self, top: int = 20) -> List[Dict]:
+        """
+        按累计耗时排序的指纹统计
+        Returns:
+            List[Dict]: 每项包含 fingerprint、直方图摘要、slow_count 和 plan
+        """
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1].histogram.total, reverse=True)[:top]
+            return [{'fingerprint': key, **stats.histogram.snapshot(), 'slow_count': stats.slow_count,
+                     'plan': list(stats.plan) if stats.plan is not None else None}
+                    for key, stats in items]
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+            self._slow_log.clear()
+            self.query_count = 0
+            self.total_seconds = 0.0
+            self.slow_count = 0
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """execute 开始计时，累加 fetch* 耗时，读完 / 重新执行 / 关闭 / 回收时记录"""
+
+    _pending = None
+
+    def _record(self) -> None:
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            profiler = getattr(self.connection, 'profiler', None)
+            if profiler is not None:
+                profiler.observe(pending[0], pending[2], self.connection, pending[1])
+
+    def execute(self, sql, parameters=()):
+        self._record()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, time.perf_counter() - started]
+
+    def executemany(self, sql, seq_of_parameters):
+        self._record()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = [sql, None, time.perf_counter() - started]
+            self._record()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - started
+            if row is None:
+                self._record()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - started
+            if len(rows) < size:
+                self._record()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - started
+            self._record()
+        return rows
+
+    def close(self):
+        self._record()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._record()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """
+    剖析连接（sqlite3.connect(..., factory=ProfiledConnection)）
+    conn.execute / executemany / cursor() 返回 ProfiledCursor，耗时记入 profiler
+    """
+
+    profiler: Optional[QueryProfiler] = None
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,563 @@
+"""
+复习事件日志 - 只追加的答题记录
+Review Event Log - append-only answers with learning_records as a compacted projection
+
+每次答题写入 review_events（只追加，不修改），learning_records 只保存按 SM-2
+折叠后的最新状态，可以随时从日志重建。
+
+Features:
+- SM-2 折叠函数 fold_answer 同时用于在线写入和离线重放，两者结果一致
+- ReviewEventLog 批量写入：一批答题在一个事务内追加事件并更新投影，
+  相同条目的多次答题只写一次投影行
+- 按天记录事件的 rowid 区间（review_event_ranges），时间范围查询转换为主键区间扫描，
+  事件表不需要额外的二级索引
+- rebuild_learning_records 流式重放：由 SQLite 外部排序按条目分组，内存占用与事件数无关
+- 批量导入等直接写入的条目状态（不是答题）通过 write_snapshots 追加 SNAPSHOT 事件，
+  状态保存在重放基线中，重建时不会被事件折叠的结果覆盖
+"""
+
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 事件区间的时间桶大小（秒）
+RANGE_BUCKET_SECONDS = 86400
+
+# correct 列的特殊值：直接写入条目状态（批量导入等，不是答题），状态保存在 review_baseline
+SNAPSHOT = -1
+
+REVIEW_EVENT_TABLES = [
+    # 答题事件（只追加）
+    """
+    CREATE TABLE IF NOT EXISTS review_events (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        item_type TEXT NOT NULL,
+        correct INTEGER NOT NULL,
+        response_ms INTEGER,
+        reviewed_ts INTEGER NOT NULL
+    )
+    """,
+    # 每天事件的 rowid 区间（时间范围 -> 主键区间）
+    """
+    CREATE TABLE IF NOT EXISTS review_event_ranges (
+        bucket INTEGER PRIMARY KEY,
+        first_id INTEGER NOT NULL,
+        last_id INTEGER NOT NULL,
+        event_count INTEGER NOT NULL
+    )
+    """,
+    # 启用日志时已有的学习记录，以及 SNAPSHOT 事件直接写入的最新条目状态
+    """
+    CREATE TABLE IF NOT EXISTS review_baseline (
+        user_id TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        item_type TEXT NOT NULL,
+        learn_count INTEGER,
+        correct_count INTEGER,
+        consecutive_correct INTEGER,
+        last_review_ts INTEGER,
+        next_review_ts INTEGER,
+        memory_strength REAL,
+        mastery_level INTEGER,
+        easiness_factor REAL,
+        PRIMARY KEY (user_id, item_id, item_type)
+    ) WITHOUT ROWID
+    """,
+]
+
+# 投影写入：新条目插入，已有条目就地更新（保留 id）
+PROJECTION_UPSERT = """
+    INSERT INTO learning_records
+    (user_id, item_id, item_type, learn_count, correct_count, consecutive_correct,
+     last_review_date, next_review_date, last_review_ts, next_review_ts,
+     memory_strength, mastery_level, easiness_factor)
+    VALUES (:user_id, :item_id, :item_type, :learn_count, :correct_count, :consecutive_correct,
+            :last_review_date, :next_review_date, :last_review_ts, :next_review_ts,
+            :memory_strength, :mastery_level, :easiness_factor)
+    ON CONFLICT(user_id, item_id, item_type) DO UPDATE SET
+        learn_count = excluded.learn_count,
+        correct_count = excluded.correct_count,
+        consecutive_correct = excluded.consecutive_correct,
+        last_review_date = excluded.last_review_date,
+        next_review_date = excluded.next_review_date,
+        last_review_ts = excluded.last_review_ts,
+        next_review_ts = excluded.next_review_ts,
+        memory_strength = excluded.memory_strength,
+        mastery_level = excluded.mastery_level,
+        easiness_factor = excluded.easiness_factor
+"""
+
+EVENT_INSERT = """
+    INSERT INTO review_events (user_id, item_id, item_type, correct, response_ms, reviewed_ts)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+RANGE_UPSERT = """
+    INSERT INTO review_event_ranges (bucket, first_id, last_id, event_count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(bucket) DO UPDATE SET
+        first_id = MIN(first_id, excluded.first_id),
+        last_id = MAX(last_id, excluded.last_id),
+        event_count = event_count + excluded.event_count
+"""
+
+# 与重放结果比较的投影列（文本时间只精确到秒，不参与比较）
+PROJECTION_FIELDS = ('learn_count', 'correct_count', 'consecutive_correct', 'last_review_ts',
+                     'next_review_ts', 'memory_strength', 'mastery_level', 'easiness_factor')
+
+# 直接写入的条目状态保存为重放基线（覆盖之前的基线）
+BASELINE_UPSERT = f"""
+    INSERT OR REPLACE INTO review_baseline (user_id, item_id, item_type, {', '.join(PROJECTION_FIELDS)})
+    VALUES (:user_id, :item_id, :item_type, {', '.join(f':{name}' for name in PROJECTION_FIELDS)})
+"""
+
+
+@dataclass
+class ReviewEvent:
+    """一次答题（correct 为 None 时是 SNAPSHOT 事件）"""
+    user_id: str
+    item_id: int
+    item_type: str
+    correct: Optional[bool]
+    reviewed_ts: int = field(default_factory=lambda: int(time.time()))
+    response_ms: Optional[int] = None
+    id: Optional[int] = None
+
+    @property
+    def key(self) -> Tuple[str, int, str]:
+        return self.user_id, self.item_id, self.item_type
+
+
+def fold_answer(state: Optional[Dict], correct: bool, reviewed_ts: int) -> Dict:
+    """
+    把一次答题折叠到条目状态上（SM-2，只计算 PROJECTION_FIELDS）
+    Args:
+        state: 当前投影状态（learning_records 行的字段），新条目为 None
+        correct: 是否答对
+        reviewed_ts: 答题时间（epoch 秒）
+    Returns:
+        Dict: 新状态
+    """
+    if state is None:
+        # 新条目：首次答题 1 天后复习
+        learn_count, correct_count = 1, 1 if correct else 0
+        consecutive_correct = correct_count
+        ef = 2.5
+        interval = 1
+        memory_strength = 1.0 if correct else 0.0
+        mastery_level = 0
+    else:
+        learn_count = state['learn_count'] + 1
+        correct_count = state['correct_count'] + (1 if correct else 0)
+        consecutive_correct = ((state.get('consecutive_correct') or 0) + 1) if correct else 0
+
+        # SM-2 算法：计算新的 easiness factor（正确=5分，错误=2分），最小值 1.3
+        quality = 5 if correct else 2
+        ef = state['easiness_factor'] + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        ef = max(1.3, ef)
+
+        # 计算下次复习间隔
+        if not correct:
+            interval = 1  # 错误则重新开始
+        elif consecutive_correct == 1:
+            interval = 1
+        elif consecutive_correct == 2:
+            interval = 6
+        elif state.get('last_review_ts') is not None and state.get('next_review_ts') is not None:
+            # 上次预定间隔 * EF，最大间隔为365天（1年）
+            previous_interval = (state['next_review_ts'] - state['last_review_ts']) // 86400 or 1
+            interval = min(int(previous_interval * ef), 365)
+        else:
+            interval = 6
+        memory_strength = min(1.0, correct_count / learn_count if learn_count > 0 else 0)
+        mastery_level = min(5, correct_count // 2)
+
+    return {
+        'learn_count': learn_count,
+        'correct_count': correct_count,
+        'consecutive_correct': consecutive_correct,
+        'last_review_ts': reviewed_ts,
+        'next_review_ts': reviewed_ts + interval * 86400,
+        'memory_strength': memory_strength,
+        'mastery_level': mastery_level,
+        'easiness_factor': ef,
+    }
+
+
+def fold_review(state: Optional[Dict], correct: bool, reviewed_at: datetime) -> Dict:
+    """
+    折叠一次答题并生成文本时间列（在线写入使用，文本时间保留微秒）
+    Returns:
+        Dict: 新状态（PROJECTION_FIELDS + last_review_date / next_review_date）
+    """
+    state = fold_answer(state, correct, int(reviewed_at.timestamp()))
+    interval = timedelta(seconds=state['next_review_ts'] - state['last_review_ts'])
+    state['last_review_date'] = reviewed_at.isoformat()
+    state['next_review_date'] = (reviewed_at + interval).isoformat()
+    return state
+
+
+def with_review_dates(state: Dict) -> Dict:
+    """按整数时间列补上文本时间列（重放使用）"""
+    state['last_review_date'] = datetime.fromtimestamp(state['last_review_ts']).isoformat()
+    state['next_review_date'] = datetime.fromtimestamp(state['next_review_ts']).isoformat()
+    return state
+
+
+def create_review_event_tables(conn: sqlite3.Connection) -> bool:
+    """
+    创建事件日志表（调用方负责提交）
+    首次创建时把已有的 learning_records 保存为重放基线
+    Returns:
+        bool: 是否首次创建
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'review_events'").fetchone()
+    for statement in REVIEW_EVENT_TABLES:
+        conn.execute(statement)
+    if exists:
+        return False
+    conn.execute(f"""
+        INSERT OR IGNORE INTO review_baseline (user_id, item_id, item_type, {', '.join(PROJECTION_FIELDS)})
+        SELECT user_id, item_id, item_type, {', '.join(PROJECTION_FIELDS)} FROM learning_records
+    """)
+    return True
+
+
+def write_snapshots(cursor: sqlite3.Cursor, states: List[Dict]) -> None:
+    """
+    直接写入条目状态（批量导入、管理修改等不是答题的写入；调用方负责提交）
+    每个条目追加一个 SNAPSHOT 事件并把状态保存为重放基线，投影按 PROJECTION_UPSERT 写入（保留 id）；
+    重放到 SNAPSHOT 事件时重置为该状态，之后的答题继续折叠，重建结果与直接写入一致
+    Args:
+        states: 含 user_id / item_id / item_type、PROJECTION_FIELDS 和文本时间列的字典
+    """
+    now = int(time.time())
+    append_events(cursor, [ReviewEvent(state['user_id'], state['item_id'], state['item_type'], None,
+                                       reviewed_ts=now) for state in states])
+    cursor.executemany(PROJECTION_UPSERT, states)
+    cursor.executemany(BASELINE_UPSERT, states)
+
+
+def append_events(cursor: sqlite3.Cursor, events: List[ReviewEvent]) -> None:
+    """
+    在当前事务中追加事件并更新 rowid 区间（调用方负责提交）
+    事件 id 写回 event.id
+    """
+    ranges: Dict[int, List[int]] = {}
+    for event in events:
+        correct = SNAPSHOT if event.correct is None else int(bool(event.correct))
+        cursor.execute(EVENT_INSERT, (event.user_id, event.item_id, event.item_type, correct,
+                                      event.response_ms, event.reviewed_ts))
+        event.id = cursor.lastrowid
+        bucket = ranges.setdefault(event.reviewed_ts // RANGE_BUCKET_SECONDS, [event.id, event.id, 0])
+        bucket[0] = min(bucket[0], event.id)
+        bucket[1] = max(bucket[1], event.id)
+        bucket[2] += 1
+    cursor.executemany(RANGE_UPSERT, [(bucket, *values) for bucket, values in ranges.items()])
+
+
+class ReviewEventLog:
+    """
+    批量写入的复习事件日志
+
+    append 只把事件放入缓冲区，达到 batch_size 时立即写入；缓冲区中的第一个事件
+    启动一个 flush_interval 秒的定时器，之后没有新的答题也会按时写入。
+    在一个事务内追加全部事件并把它们折叠进 learning_records；写入失败的事件放回缓冲区，
+    下次 flush 重试。进程退出前调用 close() 写入剩余事件。
+    """
+
+    def __init__(self, database, batch_size: int = 500, flush_interval: float = 1.0):
+        """
+        Args:
+            database: LearningDatabase 实例
+            batch_size: 每批事件数
+            flush_interval: 缓冲区最长保留时间（秒）
+        """
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[ReviewEvent] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._stats = {'appended': 0, 'flushed': 0, 'batches': 0, 'projection_writes': 0, 'failed': 0}
+
+    def append(self, event: ReviewEvent) -> None:
+        """追加一次答题（可能触发批量写入）"""
+        with self._lock:
+            self._buffer.append(event)
+            self._stats['appended'] += 1
+            due = len(self._buffer) >= self.batch_size
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def record(self, user_id: str, item_id: int, item_type: str, correct: bool,
+               response_ms: int = None) -> None:
+        """按字段追加一次答题"""
+        self.append(ReviewEvent(user_id, item_id, item_type, correct, response_ms=response_ms))
+
+    def _flush_on_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"复习事件定时写入失败: {e}")
+
+    def flush(self) -> int:
+        """
+        写入缓冲区中的事件
+        Returns:
+            int: 写入的事件数
+        Raises:
+            写入数据库的异常（未写入的事件已放回缓冲区）
+        """
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+                timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            if not events:
+                return 0
+
+            # 分片时每个分片各写一个事务
+            by_pool = {}
+            for event in events:
+                by_pool.setdefault(self.database._user_pool(event.user_id), []).append(event)
+            projection_writes = written = 0
+            committed = set()
+            try:
+                for pool, pool_events in by_pool.items():
+                    projection_writes += self._write(pool, pool_events)
+                    written += len(pool_events)
+                    committed.add(pool)
+            except Exception:
+                # 已提交的分片不重写；其余事件按原顺序放回缓冲区最前面
+                pending = [event for event in events
+                           if self.database._user_pool(event.user_id) not in committed]
+                for event in pending:
+                    event.id = None
+                with self._lock:
+                    self._buffer[:0] = pending
+                    self._stats['failed'] += 1
+                raise
+            finally:
+                with self._lock:
+                    self._stats['flushed'] += written
+                    self._stats['batches'] += 1
+                    self._stats['projection_writes'] += projection_writes
+            return written
+
+    @staticmethod
+    def _write(pool, events: List[ReviewEvent]) -> int:
+        """在一个事务内追加事件并更新投影，返回投影写入数"""
+        with pool.get_connection() as conn:
+            cursor = conn.cursor()
+            states = {}
+            for event in events:
+                if event.key not in states:
+                    row = cursor.execute(
+                        "SELECT * FROM learning_records WHERE user_id = ? AND item_id = ? AND item_type = ?",
+                        event.key).fetchone()
+                    states[event.key] = dict(row) if row else None
+                states[event.key] = fold_answer(states[event.key], event.correct, event.reviewed_ts)
+
+            append_events(cursor, events)
+            cursor.executemany(PROJECTION_UPSERT, [
+                {'user_id': key[0], 'item_id': key[1], 'item_type': key[2], **with_review_dates(state)}
+                for key, state in states.items()])
+            conn.commit()
+        return len(states)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, 'buffered': len(self._buffer)}
+
+    def close(self) -> None:
+        """写入剩余事件（进程退出前调用）"""
+        self.flush()
+
+
+def _event_from_row(row) -> ReviewEvent:
+    return ReviewEvent(row[1], row[2], row[3], bool(row[4]), row[6], row[5], row[0])
+
+
+def iter_events(database, start_ts: int = None, end_ts: int = None, user_id: str = None,
+                page_size: int = 10000) -> Iterator[ReviewEvent]:
+    """
+    按 id 顺序分页读取答题事件（不含 SNAPSHOT 事件）
+    时间范围先通过 review_event_ranges 转换为 rowid 区间，只扫描主键区间；
+    分片时依次读取每个分片（id 只在分片内有序），指定 user_id 时只读取其所在分片
+    Args:
+        database: LearningDatabase 实例
+        start_ts: 起始时间（epoch 秒，含）
+        end_ts: 结束时间（epoch 秒，不含）
+        user_id: 只读取某个用户的事件
+        page_size: 每页行数
+    """
+    pools = [database._user_pool(user_id)] if user_id is not None else database._user_pools()
+    for pool in pools:
+        yield from _iter_pool_events(pool, start_ts, end_ts, user_id, page_size)
+
+
+def _iter_pool_events(pool, start_ts: int, end_ts: int, user_id: str, page_size: int) -> Iterator[ReviewEvent]:
+    low, high = 0, None
+    if start_ts is not None or end_ts is not None:
+        with pool.get_connection() as conn:
+            row = conn.execute(
+                "SELECT MIN(first_id), MAX(last_id) FROM review_event_ranges WHERE bucket >= ? AND bucket <= ?",
+                ((start_ts or 0) // RANGE_BUCKET_SECONDS,
+                 (end_ts // RANGE_BUCKET_SECONDS) if end_ts is not None else 2 ** 62)).fetchone()
+        if row[0] is None:
+            return
+        low, high = row[0] - 1, row[1]
+
+    # SNAPSHOT 事件不是答题，不返回
+    conditions, params = ["id > ?", f"correct != {SNAPSHOT}"], []
+    if high is not None:
+        conditions.append("id <= ?")
+        params.append(high)
+    if start_ts is not None:
+        conditions.append("reviewed_ts >= ?")
+        params.append(start_ts)
+    if end_ts is not None:
+        conditions.append("reviewed_ts < ?")
+        params.append(end_ts)
+    if user_id is not None:
+        conditions.append("user_id = ?")
+        params.append(user_id)
+    query = (f"SELECT id, user_id, item_id, item_type, correct, response_ms, reviewed_ts FROM main.review_events "
+             f"WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?")
+
+    while True:
+        with pool.get_connection() as conn:
+            rows = conn.execute(query, (low, *params, page_size)).fetchall()
+        for row in rows:
+            yield _event_from_row(row)
+        if len(rows) < page_size:
+            return
+        low = rows[-1][0]
+
+
+def _replay_connection(db_path: str, cache_kb: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # 外部排序溢出到临时文件而不是内存，内存上限由 cache_size 决定
+    conn.execute("PRAGMA temp_store=FILE")
+    conn.execute(f"PRAGMA cache_size=-{cache_kb}")
+    return conn
+
+
+def replay_projection(db_path: str, cache_kb: int = 16384) -> Iterator[Tuple[Tuple[str, int, str], Dict]]:
+    """
+    流式重放日志，按条目依次产出 (key, 折叠后的状态)
+    SQLite 按 (user_id, item_type, item_id, id) 外部排序，同一时间只在内存中保留一个条目的状态；
+    启用日志前已有的条目从 review_baseline 中的状态开始折叠；遇到 SNAPSHOT 事件时
+    重置为基线中直接写入的状态
+    """
+    reader = _replay_connection(db_path, cache_kb)
+    baseline = sqlite3.connect(db_path)
+    baseline.row_factory = sqlite3.Row
+    try:
+        cursor = reader.execute("""
+            SELECT user_id, item_id, item_type, correct, reviewed_ts FROM review_events
+            ORDER BY user_id, item_type, item_id, id
+        """)
+        current_key, state, baseline_state = None, None, None
+        for user_id, item_id, item_type, correct, reviewed_ts in cursor:
+            key = (user_id, item_id, item_type)
+            if key != current_key:
+                if current_key is not None:
+                    yield current_key, state
+                row = baseline.execute(
+                    "SELECT * FROM review_baseline WHERE user_id = ? AND item_id = ? AND item_type = ?",
+                    key).fetchone()
+                current_key, baseline_state = key, dict(row) if row else None
+                state = baseline_state
+            if correct == SNAPSHOT:
+                # 直接写入的状态：之前的答题已包含在其中（基线保存的是最后一次写入的状态）
+                state = dict(baseline_state)
+                continue
+            state = fold_answer(state, correct, reviewed_ts)
+        if current_key is not None:
+            yield current_key, state
+    finally:
+        reader.close()
+        baseline.close()
+
+
+def rebuild_learning_records(db_path: str, write: bool = True, batch_size: int = 5000,
+                             cache_kb: int = 16384) -> Dict[str, int]:
+    """
+    从事件日志重建 learning_records
+    有事件的条目按重放结果覆盖（保留原 id），没有事件的条目保持不变。
+    Args:
+        db_path: 数据库文件路径
+        write: False 时只比较重放结果与当前投影，不写入
+        batch_size: 每批写入的投影行数
+        cache_kb: 重放连接的页缓存大小（KB），决定外部排序的内存上限
+    Returns:
+        Dict: {'items': 条目数, 'written': 写入行数, 'mismatched': 与当前投影不一致的条目数}
+    """
+    writer = _replay_connection(db_path, cache_kb)
+    stats = {'items': 0, 'written': 0, 'mismatched': 0}
+    batch = []
+
+    def write_batch():
+        writer.executemany(PROJECTION_UPSERT, batch)
+        writer.commit()
+        stats['written'] += len(batch)
+        batch.clear()
+
+    try:
+        for key, state in replay_projection(db_path, cache_kb):
+            stats['items'] += 1
+            row = writer.execute(
+                f"SELECT {', '.join(PROJECTION_FIELDS)} FROM learning_records "
+                "WHERE user_id = ? AND item_id = ? AND item_type = ?", key).fetchone()
+            if row is None or any(
+                    abs(current - state[name]) > 1e-9 if isinstance(current, float) else current != state[name]
+                    for name, current in zip(PROJECTION_FIELDS, row)):
+                stats['mismatched'] += 1
+                if write:
+                    batch.append({'user_id': key[0], 'item_id': key[1], 'item_type': key[2],
+                                  **with_review_dates(state)})
+                    if len(batch) >= batch_size:
+                        write_batch()
+        if batch:
+            write_batch()
+    finally:
+        writer.close()
+    logging.info(f"复习日志重放完成: {stats}")
+    return stats
+
+
+def main(argv: Iterable[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="从复习事件日志重建 learning_records")
+    parser.add_argument("db_path", help="learning.db 路径")
+    parser.add_argument("--verify", action="store_true", help="只比较，不写入")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--cache-kb", type=int, default=16384)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = rebuild_learning_records(args.db_path, write=not args.verify, batch_size=args.batch_size,
+                                     cache_kb=args.cache_kb)
+    print(f"条目 {stats['items']}, 不一致 {stats['mismatched']}, 写入 {stats['written']}, "
+          f"耗时 {time.perf_counter() - started:.1f}s")
+    return 1 if args.verify and stats['mismatched'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,280 @@
+"""
+全文检索 - 词汇、语法与阅读内容的 FTS5 索引
+Full-Text Search - FTS5 index over vocabulary, grammar and reading content
+
+每个目录表有一个对应的 FTS5 表（rowid 与源表 id 相同），由触发器在插入、更新、删除时同步。
+分词使用 trigram：日文假名/汉字没有空格分词，trigram 对任意 3 个字符以上的子串都能走索引，
+英文同样按子串匹配（不区分大小写）。
+
+Features:
+- bm25 排序，列权重（词形 > 读音 > 释义 > 例句）
+- 少于 3 个字符的检索词（如单个汉字「猫」）无法使用 trigram 索引，改为在源表上 LIKE 扫描
+- 按语言、级别过滤，分页返回；超过 MAX_OFFSET 的页返回空结果
+- 不区分类型检索时各类型按各自的相关度排序后轮流交错合并（不同 FTS 表的 bm25 分数、
+  LIKE 扫描的分数之间不可比较）
+- REPLACE 覆盖源表行时不会触发删除触发器，留下的孤立索引行在查询时通过与源表联结过滤，
+  rebuild_search_index 清理
+"""
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from itertools import chain, zip_longest
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# trigram 索引可用的最短检索词
+MIN_TRIGRAM_TERM = 3
+# 单次检索最多使用的检索词数
+MAX_QUERY_TERMS = 8
+# 分页上限（bm25 排序需要对全部匹配行排序，过深的分页没有意义）
+MAX_PER_PAGE = 50
+MAX_OFFSET = 1000
+# 写入 sqlite_stat1 的 FTS5 影子表行数估计
+SHADOW_TABLE_ROWS = 1000000
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    """一个可检索的目录表"""
+    item_type: str
+    table: str
+    columns: Tuple[str, ...]
+    weights: Tuple[float, ...]
+    title_column: str
+    detail_column: str
+
+
+SEARCH_SOURCES = {
+    'vocabulary': SearchSource('vocabulary', 'vocabulary',
+                               ('word', 'reading', 'meaning', 'example_sentence'),
+                               (10.0, 6.0, 4.0, 1.0), 'word', 'meaning'),
+    'grammar': SearchSource('grammar', 'grammar', ('name', 'pattern', 'explanation'),
+                            (10.0, 6.0, 2.0), 'name', 'pattern'),
+    'content': SearchSource('content', 'content', ('title', 'body'), (6.0, 1.0), 'title', 'content_type'),
+}
+
+
+def fts_table(source: SearchSource) -> str:
+    return f"{source.table}_fts"
+
+
+def _trigger_ddl(source: SearchSource) -> List[str]:
+    fts = fts_table(source)
+    columns = ', '.join(source.columns)
+    new_values = ', '.join(f"NEW.{column}" for column in source.columns)
+    insert = f"INSERT INTO {fts} (rowid, {columns}) VALUES (NEW.id, {new_values});"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {source.table}
+        BEGIN
+            {insert}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {source.table}
+        BEGIN
+            DELETE FROM {fts} WHERE rowid = OLD.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF id, {columns} ON {source.table}
+        BEGIN
+            DELETE FROM {fts} WHERE rowid = OLD.id;
+            {insert}
+        END
+        """,
+    ]
+
+
+def create_search_tables(conn: sqlite3.Connection) -> None:
+    """
+    创建 FTS5 表和同步触发器；新建的索引从源表填充
+    Args:
+        conn: 目录库连接（源表已存在）
+    """
+    for source in SEARCH_SOURCES.values():
+        fts = fts_table(source)
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                              (fts,)).fetchone()
+        if not exists:
+            conn.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                         f"{', '.join(source.columns)}, tokenize = 'trigram')")
+            columns = ', '.join(source.columns)
+            conn.execute(f"INSERT INTO {fts} (rowid, {columns}) SELECT id, {columns} FROM {source.table}")
+        for ddl in _trigger_ddl(source):
+            conn.execute(ddl)
+
+
+def drop_search_index(conn: sqlite3.Connection, source: SearchSource) -> None:
+    """
+    删除一个源表的 FTS5 表和同步触发器（大批量导入前），
+    导入后由 create_search_tables 重新创建并一次性从源表填充
+    """
+    fts = fts_table(source)
+    for action in ('insert', 'delete', 'update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{fts}_{action}")
+    conn.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def pin_search_statistics(conn: sqlite3.Connection) -> None:
+    """
+    把 FTS5 影子表的统计信息固定为大表
+    ANALYZE 在空库上收集的统计让规划器以为影子表很小，FTS5 内部查询改为全表扫描，
+    之后每次写入索引的耗时随索引大小线性增长。只删除这些统计行不够：执行 ANALYZE 的连接
+    重新加载统计信息时不会重置表的行数估计，这个连接仍然按小表规划，所以写入固定的行数
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is None:
+        return
+    shadow_tables = [f"{fts_table(source)}_{suffix}" for source in SEARCH_SOURCES.values()
+                     for suffix in ('data', 'idx', 'content', 'docsize', 'config')]
+    conn.execute(f"DELETE FROM sqlite_stat1 WHERE tbl IN ({', '.join('?' * len(shadow_tables))})", shadow_tables)
+    conn.executemany("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, NULL, ?)",
+                     [(table, str(SHADOW_TABLE_ROWS)) for table in shadow_tables])
+    # 重新加载统计信息
+    conn.execute("ANALYZE sqlite_master")
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    清理孤立索引行、补齐缺失的行并合并 FTS5 段
+    Returns:
+        Dict: 每个表删除和补充的行数
+    """
+    stats = {}
+    for source in SEARCH_SOURCES.values():
+        fts = fts_table(source)
+        columns = ', '.join(source.columns)
+        removed = conn.execute(f"DELETE FROM {fts} WHERE rowid NOT IN (SELECT id FROM {source.table})").rowcount
+        added = conn.execute(f"INSERT INTO {fts} (rowid, {columns}) SELECT id, {columns} FROM {source.table} "
+                             f"WHERE id NOT IN (SELECT rowid FROM {fts})").rowcount
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+        stats[source.item_type] = {'removed': removed, 'added': added}
+    conn.commit()
+    return stats
+
+
+def parse_query(text: str) -> Tuple[List[str], List[str]]:
+    """
+    把检索文本拆分为 trigram 检索词和短检索词
+    Returns:
+        (长度 >= 3 的检索词, 更短的检索词)
+    Raises:
+        ValueError: 检索文本为空
+    """
+    terms = [term for term in (text or '').split() if term][:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError("检索内容不能为空")
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_TERM]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_TERM]
+    return long_terms, short_terms
+
+
+def match_expression(terms: List[str]) -> str:
+    """检索词转换为 FTS5 MATCH 表达式（每个词作为短语，词之间为 AND）"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _search_source(conn: sqlite3.Connection, source: SearchSource, long_terms: List[str],
+                   short_terms: List[str], language: Optional[str], level: Optional[str],
+                   limit: int, offset: int) -> List[Dict]:
+    fts = fts_table(source)
+    conditions, params = [], []
+    for term in short_terms:
+        # 短检索词在源表上扫描（trigram 索引至少需要 3 个字符）
+        conditions.append('(' + ' OR '.join(f"s.{column} LIKE ? ESCAPE '\\'" for column in source.columns) + ')')
+        params.extend([_like_pattern(term)] * len(source.columns))
+    if language:
+        conditions.append("s.language = ?")
+        params.append(language)
+    if level:
+        conditions.append("s.level = ?")
+        params.append(level)
+
+    if long_terms:
+        weights = ', '.join(str(weight) for weight in source.weights)
+        query = f"""
+            SELECT s.id, s.{source.title_column} AS title, s.{source.detail_column} AS detail,
+                   s.language, s.level, snippet({fts}, -1, '[', ']', '…', 12) AS snippet,
+                   -bm25({fts}, {weights}) AS score
+            FROM {fts} JOIN {source.table} s ON s.id = {fts}.rowid
+            WHERE {fts} MATCH ? {''.join(' AND ' + condition for condition in conditions)}
+            ORDER BY bm25({fts}, {weights})
+            LIMIT ? OFFSET ?
+        """
+        params = [match_expression(long_terms), *params]
+    else:
+        # 只有短检索词：完全匹配优先，其次标题越短越相关
+        title = f"s.{source.title_column}"
+        query = f"""
+            SELECT s.id, {title} AS title, s.{source.detail_column} AS detail,
+                   s.language, s.level, NULL AS snippet,
+                   (CASE WHEN {title} = ? THEN 2.0 ELSE 1.0 END) / (1 + length({title})) AS score
+            FROM {source.table} s
+            WHERE {' AND '.join(conditions)}
+            ORDER BY score DESC, s.id
+            LIMIT ? OFFSET ?
+        """
+        params = [short_terms[0], *params]
+
+    rows = conn.execute(query, (*params, limit, offset)).fetchall()
+    return [{'type': source.item_type, 'id': row[0], 'title': row[1], 'detail': row[2],
+             'language': row[3], 'level': row[4], 'snippet': row[5] or row[1], 'score': row[6]}
+            for row in rows]
+
+
+def search(conn: sqlite3.Connection, text: str, item_type: str = None, language: str = None,
+           level: str = None, page: int = 1, per_page: int = 20) -> Dict:
+    """
+    检索词汇、语法和阅读内容
+    Args:
+        conn: 目录库连接
+        text: 检索文本（空格分隔多个检索词，全部匹配）
+        item_type: vocabulary / grammar / content，None 或 'all' 表示全部
+        language: 语言过滤
+        level: 级别过滤
+        page: 页码（从 1 开始）
+        per_page: 每页条数（最多 MAX_PER_PAGE）
+    Returns:
+        Dict: {'query', 'page', 'per_page', 'has_more', 'results'}。单一类型时 results 按相关度降序；
+        全部类型时各类型按相关度排序后轮流交错，score 只在同一类型内可比较
+    Raises:
+        ValueError: 检索文本为空或类型未知
+    """
+    if item_type in (None, '', 'all'):
+        sources = list(SEARCH_SOURCES.values())
+    elif item_type in SEARCH_SOURCES:
+        sources = [SEARCH_SOURCES[item_type]]
+    else:
+        raise ValueError(f"未知的检索类型: {item_type}")
+    long_terms, short_terms = parse_query(text)
+    per_page = max(1, min(int(per_page), MAX_PER_PAGE))
+    page = max(1, int(page))
+    offset = (page - 1) * per_page
+    if offset >= MAX_OFFSET:
+        return {'query': text, 'page': page, 'per_page': per_page, 'has_more': False, 'results': []}
+
+    if len(sources) == 1:
+        results = _search_source(conn, sources[0], long_terms, short_terms, language, level,
+                                 per_page + 1, offset)
+    else:
+        # 各类型分别取前 offset + per_page + 1 条，按类型内名次交错合并
+        ranked = [_search_source(conn, source, long_terms, short_terms, language, level,
+                                 offset + per_page + 1, 0)
+                  for source in sources]
+        results = [result for result in chain.from_iterable(zip_longest(*ranked)) if result is not None]
+        results = results[offset:]
+
+    return {
+        'query': text,
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(results) > per_page and offset + per_page < MAX_OFFSET,
+        'results': results[:per_page],
+    }
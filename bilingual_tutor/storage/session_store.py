@@ -0,0 +1,105 @@
+"""
+会话存储 - 服务端 Web 会话
+Session Store - server-side web sessions shared by all worker processes
+
+会话数据以 JSON 保存在学习数据库的 web_sessions 表中，Cookie 只携带随机会话 ID，
+请求落到任何 worker 都能读到同一份登录状态，也不依赖各进程使用相同的 SECRET_KEY。
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+
+class SQLiteSessionStore:
+    """基于 SQLite 的会话存储"""
+
+    def __init__(self, database):
+        """
+        初始化会话存储
+        Args:
+            database: LearningDatabase 实例（web_sessions 表由其表结构创建）
+        """
+        self.database = database
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取未过期的会话
+        Returns:
+            {'data': 会话数据, 'user_id', 'created_at', 'last_activity', 'expires_at'}，不存在或已过期时为 None
+        """
+        with self.database._pool.get_connection() as conn:
+            row = conn.execute(
+                "SELECT user_id, data, created_at, last_activity, expires_at "
+                "FROM web_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None or row['expires_at'] <= time.time():
+            return None
+        try:
+            data = json.loads(row['data'])
+        except ValueError:
+            logging.error(f"会话数据损坏: {session_id[:8]}")
+            return None
+        return {
+            'data': data,
+            'user_id': row['user_id'],
+            'created_at': row['created_at'],
+            'last_activity': row['last_activity'],
+            'expires_at': row['expires_at'],
+        }
+
+    def save(self, session_id: str, data: Dict[str, Any], lifetime: float, user_id: str = None) -> None:
+        """写入会话（UPSERT），lifetime 为有效期秒数"""
+        now = time.time()
+        with self.database._pool.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO web_sessions (session_id, user_id, data, created_at, last_activity, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    user_id = excluded.user_id,
+                    data = excluded.data,
+                    last_activity = excluded.last_activity,
+                    expires_at = excluded.expires_at
+            """, (session_id, user_id, json.dumps(data, ensure_ascii=False, default=str),
+                  now, now, now + lifetime))
+            conn.commit()
+
+    def touch(self, session_id: str, lifetime: float) -> None:
+        """刷新最近活动时间和过期时间"""
+        now = time.time()
+        with self.database._pool.get_connection() as conn:
+            conn.execute("UPDATE web_sessions SET last_activity = ?, expires_at = ? WHERE session_id = ?",
+                         (now, now + lifetime, session_id))
+            conn.commit()
+
+    def delete(self, session_id: str) -> bool:
+        """删除会话"""
+        with self.database._pool.get_connection() as conn:
+            cursor = conn.execute("DELETE FROM web_sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+        return cursor.rowcount > 0
+
+    def delete_user_sessions(self, user_id: str) -> int:
+        """删除某个用户的全部会话（修改密码后强制其他设备重新登录）"""
+        with self.database._pool.get_connection() as conn:
+            cursor = conn.execute("DELETE FROM web_sessions WHERE user_id = ?", (user_id,))
+            conn.commit()
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """清理过期会话"""
+        with self.database._pool.get_connection() as conn:
+            cursor = conn.execute("DELETE FROM web_sessions WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+        return cursor.rowcount
+
+    def count_active(self, user_id: str = None) -> int:
+        """未过期的会话数"""
+        query = "SELECT COUNT(*) FROM web_sessions WHERE expires_at > ?"
+        params = [time.time()]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        with self.database._pool.get_connection() as conn:
+            return conn.execute(query, params).fetchone()[0]
@@ -0,0 +1,247 @@
+"""
+学习数据库分片 - 按用户一致性哈希拆分到多个 SQLite 文件
+Learning Database Sharding - per-user tables split across SQLite files by consistent hashing
+
+SQLite 同一文件同一时间只有一个写入者。按用户的表（learning_records、复习事件日志）
+按 user_id 的一致性哈希分布到 N 个分片文件，每个分片有自己的连接池和写锁；词汇、语法、
+内容、音频等读多写少的目录表，以及 users 和按 users.id 关联的 user_preferences，
+留在主库（目录库）中。
+
+Features:
+- 一致性哈希环（虚拟节点），分片数从 N 变为 M 时只有约 |M-N|/max(M,N) 的用户需要迁移
+- 分片连接 ATTACH 目录库为 catalog，learning_records 与 vocabulary 的联表查询无需修改
+- 分片数保存在目录库 shard_config 表中，所有进程使用相同的路由
+- rebalance_shards 迁移工具：逐用户在一个事务内复制到新分片并从旧分片删除，可中断后重新执行
+"""
+
+import argparse
+import bisect
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 分片数（0 表示不分片，所有表在同一个文件中）
+DEFAULT_SHARDS = int(os.environ.get('BILINGUAL_TUTOR_DB_SHARDS', '0'))
+# 每个分片在哈希环上的虚拟节点数
+DEFAULT_VNODES = 64
+
+# 按用户存储的表（迁移顺序）
+USER_TABLES = ['learning_records', 'review_events', 'review_baseline']
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """一致性哈希环"""
+
+    def __init__(self, nodes: Iterable[int], vnodes: int = DEFAULT_VNODES):
+        points = sorted((_hash(f"shard-{node}#{replica}"), node)
+                        for node in nodes for replica in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key) -> int:
+        """返回 key 所在的节点"""
+        index = bisect.bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._nodes[index]
+
+
+def shard_path(db_path: str, index: int) -> str:
+    """第 index 个分片的文件路径（learning.db -> learning.shard00.db）"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.shard{index:02d}{ext or '.db'}"
+
+
+def load_shard_count(conn: sqlite3.Connection) -> Optional[int]:
+    """读取目录库记录的分片数（未记录时返回 None）"""
+    try:
+        row = conn.execute("SELECT value FROM shard_config WHERE key = 'shards'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return int(row[0]) if row else None
+
+
+def save_shard_count(conn: sqlite3.Connection, shards: int) -> None:
+    conn.execute("INSERT INTO shard_config (key, value) VALUES ('shards', ?) "
+                 "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (str(shards),))
+    conn.commit()
+
+
+class ShardSet:
+    """分片连接池集合：按 user_id 路由到分片"""
+
+    def __init__(self, db_path: str, shards: int, pool_factory: Callable[[str, str], object]):
+        """
+        Args:
+            db_path: 目录库路径
+            shards: 分片数
+            pool_factory: pool_factory(分片路径, 目录库路径) 创建分片连接池
+        """
+        self.db_path = db_path
+        self.count = shards
+        self.paths = [shard_path(db_path, index) for index in range(shards)]
+        self.pools = [pool_factory(path, db_path) for path in self.paths]
+        self.ring = HashRing(range(shards))
+
+    def index_for(self, user_id) -> int:
+        return self.ring.node_for(user_id)
+
+    def pool_for(self, user_id):
+        """user_id 所在分片的连接池"""
+        return self.pools[self.ring.node_for(user_id)]
+
+    def close_all(self) -> None:
+        for pool in self.pools:
+            pool.close_all()
+
+
+def _user_columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})") if row[1] != 'id']
+
+
+def _has_table(conn: sqlite3.Connection, schema: str, table: str) -> bool:
+    return conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+                        (table,)).fetchone() is not None
+
+
+def _move_user(conn: sqlite3.Connection, user_id: str, tables: List[str]) -> int:
+    """在一个事务内把用户的行从 main 复制到 target 并删除（id 由目标分片重新分配）"""
+    moved = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table in tables:
+            # 事件按原顺序写入，保持同一条目内的答题顺序
+            order = "" if table == 'review_baseline' else " ORDER BY id"
+            column_list = ', '.join(_user_columns(conn, 'main', table))
+            moved += conn.execute(f"INSERT OR REPLACE INTO target.{table} ({column_list}) "
+                                  f"SELECT {column_list} FROM main.{table} WHERE user_id = ?{order}",
+                                  (user_id,)).rowcount
+            conn.execute(f"DELETE FROM main.{table} WHERE user_id = ?", (user_id,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return moved
+
+
+def _rebuild_event_ranges(path: str) -> None:
+    """迁移后重新计算分片的事件 rowid 区间"""
+    conn = sqlite3.connect(path)
+    try:
+        if _has_table(conn, 'main', 'review_event_ranges'):
+            conn.execute("DELETE FROM review_event_ranges")
+            conn.execute("""
+                INSERT INTO review_event_ranges (bucket, first_id, last_id, event_count)
+                SELECT reviewed_ts / 86400, MIN(id), MAX(id), COUNT(*) FROM review_events GROUP BY 1
+            """)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def rebalance_shards(db_path: str, shards: int, progress: Callable[[Dict], None] = None) -> Dict[str, int]:
+    """
+    把按用户的数据迁移到新的分片数（可从未分片的单文件开始）
+    逐用户迁移，每个用户一个事务；中断后重新执行会继续迁移剩余用户。
+    迁移期间应停止写入；learning_records 的 id 在新分片中重新分配。
+    Args:
+        db_path: 目录库路径
+        shards: 新的分片数（>= 1）
+        progress: 可选回调，每个源文件处理完成后调用
+    Returns:
+        Dict: {'users_moved', 'rows_moved', 'seconds'}
+    """
+    from bilingual_tutor.storage.database import SCHEMA_VERSION, create_user_indexes, create_user_tables
+
+    if shards < 1:
+        raise ValueError("分片数至少为 1；合并回单文件请使用 1 个分片")
+    started = time.perf_counter()
+    catalog = sqlite3.connect(db_path)
+    current = load_shard_count(catalog)
+    if current is None and not _has_table(catalog, 'main', 'shard_config'):
+        catalog.close()
+        raise ValueError(f"{db_path} 不是学习数据库或表结构版本过旧，请先用 LearningDatabase 打开一次")
+
+    # 目标分片文件的表结构
+    targets = [shard_path(db_path, index) for index in range(shards)]
+    for path in targets:
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        create_user_tables(conn)
+        create_user_indexes(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        conn.close()
+
+    # 源文件：当前分片（含缩容后多出的分片），未分片时是目录库本身
+    sources = [db_path] if not current else [shard_path(db_path, index) for index in range(current)]
+    ring = HashRing(range(shards))
+    stats = {'users_moved': 0, 'rows_moved': 0}
+
+    for source in sources:
+        if not os.path.exists(source):
+            continue
+        conn = sqlite3.connect(source, isolation_level=None)
+        tables = [table for table in USER_TABLES if _has_table(conn, 'main', table)]
+        if not tables:
+            conn.close()
+            continue
+        users = [row[0] for row in conn.execute(
+            " UNION ".join(f"SELECT DISTINCT user_id FROM {table}" for table in tables))]
+        by_target: Dict[str, List] = {}
+        for user_id in users:
+            target = targets[ring.node_for(user_id)]
+            if target != source:
+                by_target.setdefault(target, []).append(user_id)
+        for target, user_ids in by_target.items():
+            conn.execute("ATTACH DATABASE ? AS target", (target,))
+            for user_id in user_ids:
+                stats['rows_moved'] += _move_user(conn, user_id, tables)
+                stats['users_moved'] += 1
+            conn.execute("DETACH DATABASE target")
+        if source == db_path:
+            # 从单文件迁出后，目录库不再保存按用户的表
+            for table in tables + ['review_event_ranges']:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.close()
+        if progress:
+            progress({'source': source, **stats})
+
+    for path in targets:
+        _rebuild_event_ranges(path)
+    save_shard_count(catalog, shards)
+    catalog.close()
+
+    # 缩容后多出的分片文件已清空
+    for index in range(shards, current or 0):
+        for suffix in ('', '-wal', '-shm'):
+            path = shard_path(db_path, index) + suffix
+            if os.path.exists(path):
+                os.remove(path)
+
+    stats['seconds'] = time.perf_counter() - started
+    logger.info(f"分片迁移完成: {current or 0} -> {shards} ({stats})")
+    return stats
+
+
+def main(argv: Iterable[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="调整学习数据库的分片数")
+    parser.add_argument("db_path", help="目录库（learning.db）路径")
+    parser.add_argument("shards", type=int, help="新的分片数")
+    args = parser.parse_args(argv)
+
+    stats = rebalance_shards(args.db_path, args.shards,
+                             progress=lambda p: print(f"{p['source']}: 已迁移 {p['users_moved']} 个用户"))
+    print(f"迁移 {stats['users_moved']} 个用户 / {stats['rows_moved']} 行，耗时 {stats['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,455 @@
+"""
+在线快照 - 不阻塞写入的数据库备份与增量目录快照
+Online Snapshots - non-blocking SQLite backups and incremental directory snapshots
+
+Features:
+- SQLite 在线备份：按页分段调用 backup API（pages=N，步间休眠），WAL 模式下备份连接
+  持有一个读事务，整个备份是同一时间点的一致快照，写入者不受阻塞，也不会因写入而重新开始
+- VACUUM INTO 生成紧凑快照（去除空闲页，适合归档）
+- 目录快照按内容哈希去重：与上一个快照内容相同的文件（如音频）使用硬链接，
+  大小和修改时间未变的文件不重新计算哈希
+- 保留策略（最近 N 个 + 每日 + 每周）与后台定时快照
+- 多进程部署时每个进程都可以启动定时快照，backup_dir 下的文件锁保证只有一个进程
+  执行定时快照，并且创建快照和清理在进程之间串行进行
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有 flock，按单进程部署处理
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 每步复制的页数（4KB 页时约 4MB）
+DEFAULT_BACKUP_PAGES = int(os.environ.get('BILINGUAL_TUTOR_BACKUP_PAGES', '1024'))
+# 每步之间的休眠时间（秒），让出磁盘带宽给在线写入
+DEFAULT_BACKUP_SLEEP = float(os.environ.get('BILINGUAL_TUTOR_BACKUP_SLEEP', '0.005'))
+# 定时快照间隔（秒，0 表示不启用）
+DEFAULT_SNAPSHOT_INTERVAL = int(os.environ.get('BILINGUAL_TUTOR_SNAPSHOT_INTERVAL', '0'))
+
+MANIFEST_NAME = '.manifest.json'
+# backup_dir 下的锁文件：定时快照的执行进程 / 单次快照与清理
+SCHEDULE_LOCK_NAME = '.schedule.lock'
+RUN_LOCK_NAME = '.snapshot.lock'
+SQLITE_HEADER = b'SQLite format 3\x00'
+# SQLite 的附属文件由快照本身包含，不单独复制
+SQLITE_SIDE_SUFFIXES = ('-wal', '-shm', '-journal')
+
+_HASH_CHUNK = 1024 * 1024
+
+
+class FileLock:
+    """基于 flock 的进程间互斥锁（进程退出时由操作系统自动释放）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """获取锁；非阻塞模式下被其他进程持有时返回 False"""
+        if self._file is not None:
+            return True
+        handle = open(self.path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                handle.close()
+                return False
+        self._file = handle
+        return True
+
+    def release(self) -> None:
+        handle, self._file = self._file, None
+        if handle is not None:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            handle.close()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def is_sqlite_file(path: str) -> bool:
+    """按文件头判断是否为 SQLite 数据库"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def file_sha256(path: str) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sqlite_snapshot(source_path: str, dest_path: str, compact: bool = False,
+                    pages: int = DEFAULT_BACKUP_PAGES, sleep: float = DEFAULT_BACKUP_SLEEP,
+                    progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    生成数据库的一致快照（先写入临时文件，完成后原子替换）
+    Args:
+        source_path: 源数据库路径
+        dest_path: 快照路径
+        compact: True 使用 VACUUM INTO（紧凑），False 使用分段 backup API
+        pages: 每步复制的页数（compact=False 时）
+        sleep: 每步之间的休眠秒数（compact=False 时）
+        progress: 可选进度回调 progress(剩余页数, 总页数)
+    Returns:
+        Dict: {'method', 'pages', 'steps', 'seconds', 'size'}
+    """
+    started = time.perf_counter()
+    dest_dir = os.path.dirname(os.path.abspath(dest_path))
+    os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = f"{dest_path}.partial"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    stats = {'method': 'vacuum_into' if compact else 'backup', 'pages': 0, 'steps': 0}
+    source = sqlite3.connect(source_path, isolation_level=None, check_same_thread=False)
+    try:
+        source.execute("PRAGMA busy_timeout = 30000")
+        if compact:
+            source.execute("VACUUM INTO ?", (tmp_path,))
+        else:
+            wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+            if wal:
+                # WAL 模式下持有读事务：备份期间读取固定的快照，其他连接照常写入
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+            def on_step(status, remaining, total):
+                stats['steps'] += 1
+                stats['pages'] = total
+                if progress:
+                    progress(remaining, total)
+
+            dest = sqlite3.connect(tmp_path)
+            try:
+                source.backup(dest, pages=pages, progress=on_step, sleep=sleep)
+            finally:
+                dest.close()
+                if wal:
+                    source.execute("COMMIT")
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        source.close()
+
+    os.replace(tmp_path, dest_path)
+    stats['seconds'] = time.perf_counter() - started
+    stats['size'] = os.path.getsize(dest_path)
+    logger.info(f"数据库快照完成: {source_path} -> {dest_path} ({stats})")
+    return stats
+
+
+def restore_sqlite_snapshot(snapshot_path: str, dest_path: str,
+                            pages: int = DEFAULT_BACKUP_PAGES) -> None:
+    """
+    通过 backup API 把快照写回数据库（经过 SQLite 的锁和 WAL，不直接覆盖正在使用的文件）
+    """
+    source = sqlite3.connect(snapshot_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        dest.execute("PRAGMA busy_timeout = 30000")
+        source.backup(dest, pages=pages)
+    finally:
+        source.close()
+        dest.close()
+
+
+@dataclass
+class RetentionPolicy:
+    """快照保留策略：最近 keep_last 个，另外每天和每周各保留最新的一个"""
+    keep_last: int = 3
+    keep_daily: int = 7
+    keep_weekly: int = 4
+
+    def select(self, snapshots: List[Dict[str, Any]]) -> List[str]:
+        """
+        选出需要保留的快照
+        Args:
+            snapshots: [{'name', 'created'(datetime)}]
+        Returns:
+            List[str]: 保留的快照名称
+        """
+        ordered = sorted(snapshots, key=lambda s: s['created'], reverse=True)
+        keep = {s['name'] for s in ordered[:self.keep_last]}
+        for limit, bucket_of in ((self.keep_daily, lambda d: d.date()),
+                                 (self.keep_weekly, lambda d: d.isocalendar()[:2])):
+            seen = set()
+            for snapshot in ordered:
+                bucket = bucket_of(snapshot['created'])
+                if bucket in seen:
+                    continue
+                if len(seen) >= limit:
+                    break
+                seen.add(bucket)
+                keep.add(snapshot['name'])
+        return [s['name'] for s in ordered if s['name'] in keep]
+
+
+class SnapshotManager:
+    """
+    目录快照管理器
+
+    每个快照是 backup_dir 下的一个完整目录（可直接浏览和复制恢复），
+    SQLite 文件通过在线快照生成，其他文件与上一个快照按内容哈希去重（硬链接）。
+    """
+
+    def __init__(self, backup_dir: str, retention: Optional[RetentionPolicy] = None,
+                 compact: bool = False, pages: int = DEFAULT_BACKUP_PAGES,
+                 sleep: float = DEFAULT_BACKUP_SLEEP):
+        """
+        Args:
+            backup_dir: 快照根目录
+            retention: 保留策略
+            compact: 数据库快照是否使用 VACUUM INTO
+            pages: 分段备份每步的页数
+            sleep: 分段备份每步之间的休眠秒数
+        """
+        self.backup_dir = Path(backup_dir)
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.retention = retention or RetentionPolicy()
+        self.compact = compact
+        self.pages = pages
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    def _load_manifest(self, snapshot_dir: Path) -> Dict[str, Any]:
+        try:
+            with open(snapshot_dir / MANIFEST_NAME, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """列出带清单的快照（按创建时间倒序）"""
+        snapshots = []
+        for path in self.backup_dir.iterdir():
+            manifest = self._load_manifest(path) if path.is_dir() else {}
+            if 'created' in manifest:
+                snapshots.append({'name': path.name, 'path': str(path),
+                                  'created': datetime.fromisoformat(manifest['created']),
+                                  'files': len(manifest.get('files', {}))})
+        return sorted(snapshots, key=lambda s: s['created'], reverse=True)
+
+    def create_snapshot(self, source_dir: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        创建目录快照
+        Args:
+            source_dir: 源目录
+            name: 快照名称（默认按时间生成）
+        Returns:
+            Dict: 快照统计（files / linked / copied / databases / bytes_copied / seconds）
+        """
+        started = time.perf_counter()
+        source = Path(source_dir)
+        name = name or f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        with self._lock:
+            previous = self.list_snapshots()
+            previous = next((s for s in previous if s['name'] != name), None)
+            previous_dir = Path(previous['path']) if previous else None
+            previous_files = self._load_manifest(previous_dir).get('files', {}) if previous_dir else {}
+            by_hash = {entry['sha256']: path for path, entry in previous_files.items() if entry.get('sha256')}
+
+            target = self.backup_dir / name
+            partial = self.backup_dir / f".{name}.partial"
+            for path in (target, partial):
+                if path.exists():
+                    shutil.rmtree(path)
+            partial.mkdir(parents=True)
+
+            files: Dict[str, Dict[str, Any]] = {}
+            stats = {'files': 0, 'linked': 0, 'copied': 0, 'databases': 0, 'bytes_copied': 0}
+            try:
+                for root, dirs, names in os.walk(source):
+                    # 不把快照目录本身包含进快照
+                    dirs[:] = [d for d in dirs if (Path(root) / d).resolve() != self.backup_dir.resolve()]
+                    for filename in names:
+                        if filename.endswith(SQLITE_SIDE_SUFFIXES):
+                            continue
+                        src = Path(root) / filename
+                        rel = src.relative_to(source).as_posix()
+                        dest = partial / rel
+                        dest.parent.mkdir(parents=True, exist_ok=True)
+                        stats['files'] += 1
+
+                        if is_sqlite_file(str(src)):
+                            db_stats = sqlite_snapshot(str(src), str(dest), compact=self.compact,
+                                                       pages=self.pages, sleep=self.sleep)
+                            stats['databases'] += 1
+                            stats['bytes_copied'] += db_stats['size']
+                            files[rel] = {'sqlite': True, 'size': db_stats['size']}
+                            continue
+
+                        entry = self._store_file(src, dest, previous_files.get(rel), by_hash, previous_dir)
+                        stats['linked' if entry.pop('linked') else 'copied'] += 1
+                        stats['bytes_copied'] += entry.pop('copied_bytes', 0)
+                        files[rel] = entry
+
+                created = datetime.now()
+                with open(partial / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+                    json.dump({'created': created.isoformat(), 'source': str(source), 'files': files}, f)
+                os.replace(partial, target)
+            except Exception:
+                shutil.rmtree(partial, ignore_errors=True)
+                raise
+
+        stats['seconds'] = time.perf_counter() - started
+        logger.info(f"创建快照: {target} ({stats})")
+        return {'name': name, 'path': str(target), 'created': created.isoformat(), **stats}
+
+    def _store_file(self, src: Path, dest: Path, previous_entry: Optional[Dict[str, Any]],
+                    by_hash: Dict[str, str], previous_dir: Optional[Path]) -> Dict[str, Any]:
+        """复制或硬链接单个文件，返回清单条目"""
+        stat = src.stat()
+        if (previous_entry and previous_entry.get('size') == stat.st_size
+                and previous_entry.get('mtime_ns') == stat.st_mtime_ns):
+            # 大小和修改时间都未变，沿用上次的哈希
+            digest = previous_entry['sha256']
+        else:
+            digest = file_sha256(str(src))
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest, 'linked': False}
+
+        existing = previous_dir / by_hash[digest] if digest in by_hash else None
+        if existing is not None and existing.exists():
+            try:
+                os.link(existing, dest)
+                entry['linked'] = True
+                return entry
+            except OSError:
+                pass  # 跨文件系统等情况，退回复制
+        shutil.copy2(src, dest)
+        entry['copied_bytes'] = stat.st_size
+        return entry
+
+    def restore_snapshot(self, name: str, target_dir: str) -> Dict[str, Any]:
+        """
+        恢复快照到目标目录
+        目标目录中正在使用的 SQLite 数据库通过 backup API 写回，其他文件直接复制
+        """
+        snapshot = self.backup_dir / name
+        files = self._load_manifest(snapshot).get('files', {})
+        target = Path(target_dir)
+        restored = 0
+        for rel, entry in files.items():
+            src, dest = snapshot / rel, target / rel
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if entry.get('sqlite') and dest.exists():
+                restore_sqlite_snapshot(str(src), str(dest), pages=self.pages)
+            else:
+                shutil.copy2(src, dest)
+            restored += 1
+        logger.info(f"恢复快照: {snapshot} -> {target} ({restored} 个文件)")
+        return {'name': name, 'target_path': str(target), 'files': restored}
+
+    def prune(self) -> List[str]:
+        """
+        按保留策略删除过期快照（硬链接的文件在最后一个引用删除后才释放空间）
+        Returns:
+            List[str]: 删除的快照名称
+        """
+        with self._lock:
+            snapshots = self.list_snapshots()
+            keep = set(self.retention.select(snapshots))
+            removed = [s['name'] for s in snapshots if s['name'] not in keep]
+            for name in removed:
+                shutil.rmtree(self.backup_dir / name, ignore_errors=True)
+        if removed:
+            logger.info(f"清理过期快照: {removed}")
+        return removed
+
+
+class SnapshotScheduler:
+    """
+    后台定时快照：每隔 interval 秒创建一次快照并按保留策略清理
+
+    同一个 backup_dir 上多个进程各自启动调度器时，只有持有 SCHEDULE_LOCK_NAME 的进程
+    执行定时快照，其他进程每个周期尝试接管（持有者退出后锁由操作系统释放）
+    """
+
+    def __init__(self, manager: SnapshotManager, source_dir: str,
+                 interval: float = DEFAULT_SNAPSHOT_INTERVAL):
+        self.manager = manager
+        self.source_dir = source_dir
+        self.interval = interval
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.failures = 0
+        self.skipped = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._schedule_lock = FileLock(str(manager.backup_dir / SCHEDULE_LOCK_NAME))
+
+    @property
+    def leader(self) -> bool:
+        """本进程是否负责执行定时快照"""
+        return self._schedule_lock.held
+
+    def run_once(self) -> Dict[str, Any]:
+        """立即创建一次快照并清理（与其他进程的快照串行执行，避免并发清理和去重基准竞争）"""
+        with FileLock(str(self.manager.backup_dir / RUN_LOCK_NAME)):
+            result = self.manager.create_snapshot(self.source_dir)
+            result['pruned'] = self.manager.prune()
+        self.last_result = result
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self._schedule_lock.acquire(blocking=False):
+                self.skipped += 1
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"定时快照失败: {e}")
+        self._schedule_lock.release()
+
+    def start(self) -> bool:
+        """启动后台线程（interval 为 0 时不启动）"""
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bilingual-snapshots", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
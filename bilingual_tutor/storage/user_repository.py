@@ -0,0 +1,483 @@
+"""
+用户仓库 - 用户、偏好和学习档案的持久化存储
+User Repository - persistent users, preferences and learner profiles
+
+用户保存在 LearningDatabase 的 users 表，学习档案（目标、偏好、薄弱环节）以 JSON
+保存在 user_preferences 表，因此多个 Web worker 进程看到同一份数据。每个进程保留
+一个短期读穿缓存（TTL 默认 2 秒，BILINGUAL_TUTOR_USER_CACHE_TTL 可配置）：
+本进程的写入立即生效，其他进程的写入最多延迟一个 TTL 可见。
+
+UserMapping / ProfileMapping 提供与原模块级字典相同的映射接口，
+路由代码和测试中的 users[...] / user_profiles[...] 用法保持不变。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..models import ContentType, Goals, Preferences, Skill, UserProfile, WeakArea
+
+
+DEFAULT_CACHE_TTL = float(os.environ.get('BILINGUAL_TUTOR_USER_CACHE_TTL', '2'))
+
+# 只有学习档案、没有注册过的用户使用的密码哈希（不可能与任何哈希值相等）
+UNUSABLE_PASSWORD = "!"
+
+# users 表中可写的列
+USER_COLUMNS = ('password_hash', 'salt', 'email', 'english_level', 'japanese_level',
+                'daily_study_time', 'last_login', 'password_changed_at', 'created_at', 'updated_at')
+
+# 学习档案在 user_preferences 表中的键
+PROFILE_KEYS = ('target_goals', 'learning_preferences', 'weak_areas')
+
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _parse_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return datetime.now()
+    return datetime.fromisoformat(value)
+
+
+def profile_to_preferences(profile: UserProfile) -> Dict[str, Any]:
+    """学习档案 → user_preferences 键值（JSON 可序列化）"""
+    goals = profile.target_goals
+    preferences = profile.learning_preferences
+    return {
+        'target_goals': {
+            'target_english_level': goals.target_english_level,
+            'target_japanese_level': goals.target_japanese_level,
+            'target_completion_date': _isoformat(goals.target_completion_date),
+            'priority_skills': [skill.value for skill in goals.priority_skills],
+            'custom_objectives': list(goals.custom_objectives),
+        },
+        'learning_preferences': {
+            'preferred_study_times': list(preferences.preferred_study_times),
+            'content_preferences': [content.value for content in preferences.content_preferences],
+            'difficulty_preference': preferences.difficulty_preference,
+            'language_balance': dict(preferences.language_balance),
+        },
+        'weak_areas': [
+            {
+                'area_id': area.area_id,
+                'skill': area.skill.value,
+                'language': area.language,
+                'severity': area.severity,
+                'error_patterns': list(area.error_patterns),
+                'improvement_suggestions': list(area.improvement_suggestions),
+                'identified_at': _isoformat(area.identified_at),
+            }
+            for area in profile.weak_areas
+        ],
+    }
+
+
+def profile_from_record(user_id: str, user: Dict[str, Any], preferences: Dict[str, Any]) -> UserProfile:
+    """users 行 + user_preferences 键值 → 学习档案"""
+    goals = preferences['target_goals']
+    learning = preferences['learning_preferences']
+    return UserProfile(
+        user_id=user_id,
+        english_level=user['english_level'],
+        japanese_level=user['japanese_level'],
+        daily_study_time=user['daily_study_time'],
+        target_goals=Goals(
+            target_english_level=goals['target_english_level'],
+            target_japanese_level=goals['target_japanese_level'],
+            target_completion_date=_parse_datetime(goals['target_completion_date']),
+            priority_skills=[Skill(value) for value in goals['priority_skills']],
+            custom_objectives=goals['custom_objectives'],
+        ),
+        learning_preferences=Preferences(
+            preferred_study_times=learning['preferred_study_times'],
+            content_preferences=[ContentType(value) for value in learning['content_preferences']],
+            difficulty_preference=learning['difficulty_preference'],
+            language_balance=learning['language_balance'],
+        ),
+        weak_areas=[
+            WeakArea(
+                area_id=area['area_id'],
+                skill=Skill(area['skill']),
+                language=area['language'],
+                severity=area['severity'],
+                error_patterns=area['error_patterns'],
+                improvement_suggestions=area['improvement_suggestions'],
+                identified_at=_parse_datetime(area['identified_at']),
+            )
+            for area in preferences.get('weak_areas', [])
+        ],
+        created_at=_parse_datetime(user['created_at']),
+        updated_at=_parse_datetime(user['updated_at']),
+    )
+
+
+class UserRepository:
+    """用户与学习档案仓库（SQLite + 每进程读穿缓存）"""
+
+    def __init__(self, database=None, cache_ttl: float = DEFAULT_CACHE_TTL,
+                 seed_users: Dict[str, Dict[str, Any]] = None):
+        """
+        初始化仓库
+        Args:
+            database: LearningDatabase 实例（默认在首次使用时打开默认数据库）
+            cache_ttl: 读穿缓存有效期（秒），0 表示不缓存
+            seed_users: 打开默认数据库时确保存在的用户（用户名 → users 列）
+        """
+        self._database = database
+        self.seed_users = seed_users or {}
+        self._sessions = None
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+        self.users = UserMapping(self)
+        self.profiles = ProfileMapping(self)
+
+    @property
+    def database(self):
+        """学习数据库（延迟打开）"""
+        if self._database is None:
+            with self._lock:
+                opened = self._database is None
+                if opened:
+                    from .database import LearningDatabase
+                    self._database = LearningDatabase()
+            if opened:
+                for username, fields in self.seed_users.items():
+                    self.create_user(username, **fields)
+        return self._database
+
+    @property
+    def sessions(self):
+        """同一数据库上的服务端会话存储"""
+        if self._sessions is None:
+            from .session_store import SQLiteSessionStore
+            self._sessions = SQLiteSessionStore(self.database)
+        return self._sessions
+
+    def bind(self, database) -> None:
+        """切换到另一个数据库（测试或多租户部署），清空缓存"""
+        with self._lock:
+            self._database = database
+            self._sessions = None
+            self._cache.clear()
+
+    # ==================== 缓存 ====================
+
+    def _cache_get(self, key: tuple):
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._stats['hits'] += 1
+            return entry[1]
+        self._stats['misses'] += 1
+        return None
+
+    def _cache_put(self, key: tuple, value) -> None:
+        # 只缓存存在的记录：其他进程刚注册的用户不会因为缓存的“不存在”而无法登录
+        if self.cache_ttl > 0 and value is not None:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+
+    def invalidate(self, username: str = None) -> None:
+        """使本进程缓存失效"""
+        with self._lock:
+            if username is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(('user', username), None)
+                self._cache.pop(('profile', username), None)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        total = self._stats['hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'entries': len(self._cache),
+            'hit_rate': self._stats['hits'] / total if total else 0.0,
+        }
+
+    # ==================== 用户 ====================
+
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """获取用户记录（users 表的一行）"""
+        cached = self._cache_get(('user', username))
+        if cached is not None:
+            return dict(cached)
+
+        with self.database._pool.get_connection() as conn:
+            row = conn.execute(
+                f"SELECT username, {', '.join(USER_COLUMNS)} FROM users WHERE username = ?",
+                (username,)
+            ).fetchone()
+        record = dict(row) if row else None
+        self._cache_put(('user', username), record)
+        return dict(record) if record else None
+
+    def create_user(self, username: str, password_hash: str, **fields) -> bool:
+        """
+        创建用户
+        Returns:
+            bool: 用户名已存在时返回 False
+        """
+        now = datetime.now().isoformat()
+        values = {'created_at': now, 'updated_at': now, **fields, 'password_hash': password_hash}
+        columns = [column for column in USER_COLUMNS if column in values]
+        try:
+            with self.database._pool.get_connection() as conn:
+                conn.execute(
+                    f"INSERT INTO users (username, {', '.join(columns)}) "
+                    f"VALUES (?, {', '.join('?' for _ in columns)})",
+                    (username, *(values[column] for column in columns))
+                )
+                conn.commit()
+        except sqlite3.IntegrityError:
+            return False
+        self.invalidate(username)
+        return True
+
+    def save_user(self, username: str, **fields) -> None:
+        """创建或整体更新用户（UPSERT）"""
+        now = datetime.now().isoformat()
+        values = {'created_at': now, 'password_hash': UNUSABLE_PASSWORD, **fields, 'updated_at': now}
+        columns = [column for column in USER_COLUMNS if column in values]
+        updates = [column for column in columns if column != 'created_at' or 'created_at' in fields]
+        with self.database._pool.get_connection() as conn:
+            conn.execute(
+                f"INSERT INTO users (username, {', '.join(columns)}) "
+                f"VALUES (?, {', '.join('?' for _ in columns)}) "
+                f"ON CONFLICT(username) DO UPDATE SET "
+                f"{', '.join(f'{column} = excluded.{column}' for column in updates)}",
+                (username, *(values[column] for column in columns))
+            )
+            conn.commit()
+        self.invalidate(username)
+
+    def update_user(self, username: str, **fields) -> bool:
+        """
+        更新用户的部分字段
+        Returns:
+            bool: 用户是否存在
+        """
+        unknown = set(fields) - set(USER_COLUMNS)
+        if unknown:
+            raise ValueError(f"未知的用户字段: {', '.join(sorted(unknown))}")
+        fields.setdefault('updated_at', datetime.now().isoformat())
+        with self.database._pool.get_connection() as conn:
+            cursor = conn.execute(
+                f"UPDATE users SET {', '.join(f'{column} = ?' for column in fields)} WHERE username = ?",
+                (*fields.values(), username)
+            )
+            conn.commit()
+        self.invalidate(username)
+        return cursor.rowcount > 0
+
+    def delete_user(self, username: str) -> bool:
+        """删除用户（偏好和学习档案级联删除）"""
+        with self.database._pool.get_connection() as conn:
+            cursor = conn.execute("DELETE FROM users WHERE username = ?", (username,))
+            conn.commit()
+        self.invalidate(username)
+        return cursor.rowcount > 0
+
+    def list_usernames(self, registered_only: bool = False) -> List[str]:
+        """所有用户名"""
+        query = "SELECT username FROM users"
+        if registered_only:
+            query += f" WHERE password_hash != '{UNUSABLE_PASSWORD}'"
+        with self.database._pool.get_connection() as conn:
+            return [row[0] for row in conn.execute(query + " ORDER BY id")]
+
+    def clear(self) -> None:
+        """删除所有用户"""
+        with self.database._pool.get_connection() as conn:
+            conn.execute("DELETE FROM users")
+            conn.commit()
+        self.invalidate()
+
+    # ==================== 偏好 ====================
+
+    def get_preferences(self, username: str) -> Dict[str, Any]:
+        """用户的全部偏好（值为 JSON 解码后的对象）"""
+        with self.database._pool.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT p.preference_key, p.preference_value
+                FROM user_preferences p JOIN users u ON u.id = p.user_id
+                WHERE u.username = ?
+            """, (username,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def set_preferences(self, username: str, preferences: Dict[str, Any]) -> bool:
+        """
+        写入偏好（按键 UPSERT）
+        Returns:
+            bool: 用户是否存在
+        """
+        with self.database._pool.get_connection() as conn:
+            written = 0
+            for key, value in preferences.items():
+                cursor = conn.execute("""
+                    INSERT INTO user_preferences (user_id, preference_key, preference_value)
+                    SELECT id, ?, ? FROM users WHERE username = ?
+                    ON CONFLICT(user_id, preference_key) DO UPDATE SET
+                        preference_value = excluded.preference_value,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (key, json.dumps(value, ensure_ascii=False), username))
+                written += cursor.rowcount
+            conn.commit()
+        self.invalidate(username)
+        return written > 0 or not preferences
+
+    # ==================== 学习档案 ====================
+
+    def get_profile(self, username: str) -> Optional[UserProfile]:
+        """
+        获取学习档案
+        本进程内重复读取返回同一个对象（缓存有效期内），对它的修改需要 save_profile 才会持久化
+        """
+        cached = self._cache_get(('profile', username))
+        if cached is not None:
+            return cached
+
+        user = self.get_user(username)
+        if user is None:
+            return None
+        preferences = self.get_preferences(username)
+        if 'learning_preferences' not in preferences or 'target_goals' not in preferences:
+            return None
+        try:
+            profile = profile_from_record(username, user, preferences)
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"学习档案数据损坏 {username}: {e}")
+            return None
+        self._cache_put(('profile', username), profile)
+        return profile
+
+    def save_profile(self, profile: UserProfile) -> None:
+        """保存学习档案（用户不存在时创建一个不可登录的档案用户）"""
+        fields = {
+            'english_level': profile.english_level,
+            'japanese_level': profile.japanese_level,
+            'daily_study_time': profile.daily_study_time,
+            'created_at': _isoformat(profile.created_at),
+        }
+        if self.get_user(profile.user_id) is None:
+            self.save_user(profile.user_id, **fields)
+        else:
+            self.update_user(profile.user_id, updated_at=_isoformat(profile.updated_at), **fields)
+        self.set_preferences(profile.user_id, profile_to_preferences(profile))
+        self._cache_put(('profile', profile.user_id), profile)
+
+    def delete_profile(self, username: str) -> bool:
+        """删除学习档案（只有档案、没有注册的用户一并删除）"""
+        with self.database._pool.get_connection() as conn:
+            cursor = conn.execute(f"""
+                DELETE FROM user_preferences
+                WHERE preference_key IN ({', '.join('?' for _ in PROFILE_KEYS)})
+                  AND user_id = (SELECT id FROM users WHERE username = ?)
+            """, (*PROFILE_KEYS, username))
+            conn.execute("DELETE FROM users WHERE username = ? AND password_hash = ?",
+                         (username, UNUSABLE_PASSWORD))
+            conn.commit()
+        self.invalidate(username)
+        return cursor.rowcount > 0
+
+    def list_profile_ids(self) -> List[str]:
+        """有学习档案的用户名"""
+        with self.database._pool.get_connection() as conn:
+            return [row[0] for row in conn.execute("""
+                SELECT u.username FROM users u JOIN user_preferences p ON p.user_id = u.id
+                WHERE p.preference_key = 'learning_preferences' ORDER BY u.id
+            """)]
+
+    def clear_profiles(self) -> None:
+        """删除所有学习档案"""
+        with self.database._pool.get_connection() as conn:
+            conn.execute(f"DELETE FROM user_preferences WHERE preference_key IN "
+                         f"({', '.join('?' for _ in PROFILE_KEYS)})", PROFILE_KEYS)
+            conn.execute("DELETE FROM users WHERE password_hash = ?", (UNUSABLE_PASSWORD,))
+            conn.commit()
+        self.invalidate()
+
+
+class UserMapping(MutableMapping):
+    """
+    users 字典视图：用户名 → 认证路由使用的用户记录
+    记录格式与原模块级字典相同（daily_time 对应 users.daily_study_time 列）
+    """
+
+    def __init__(self, repository: UserRepository):
+        self._repository = repository
+
+    def __getitem__(self, username: str) -> Dict[str, Any]:
+        user = self._repository.get_user(username) if isinstance(username, str) else None
+        if user is None:
+            raise KeyError(username)
+        user['daily_time'] = user.pop('daily_study_time')
+        user['salt'] = user['salt'] or ''
+        del user['username']
+        return user
+
+    def __setitem__(self, username: str, record: Dict[str, Any]) -> None:
+        fields = {key: _isoformat(value) for key, value in record.items() if key in USER_COLUMNS}
+        if 'daily_time' in record:
+            fields['daily_study_time'] = record['daily_time']
+        self._repository.save_user(username, **fields)
+
+    def __delitem__(self, username: str) -> None:
+        if not self._repository.delete_user(username):
+            raise KeyError(username)
+
+    def __contains__(self, username) -> bool:
+        return isinstance(username, str) and self._repository.get_user(username) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._repository.list_usernames())
+
+    def __len__(self) -> int:
+        return len(self._repository.list_usernames())
+
+    def clear(self) -> None:
+        self._repository.clear()
+
+
+class ProfileMapping(MutableMapping):
+    """user_profiles 字典视图：用户名 → UserProfile"""
+
+    def __init__(self, repository: UserRepository):
+        self._repository = repository
+
+    def __getitem__(self, username: str) -> UserProfile:
+        profile = self._repository.get_profile(username) if isinstance(username, str) else None
+        if profile is None:
+            raise KeyError(username)
+        return profile
+
+    def __setitem__(self, username: str, profile: UserProfile) -> None:
+        if profile.user_id != username:
+            raise ValueError(f"档案用户不匹配: {profile.user_id} != {username}")
+        self._repository.save_profile(profile)
+
+    def __delitem__(self, username: str) -> None:
+        if not self._repository.delete_profile(username):
+            raise KeyError(username)
+
+    def __contains__(self, username) -> bool:
+        return isinstance(username, str) and self._repository.get_profile(username) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._repository.list_profile_ids())
+
+    def __len__(self) -> int:
+        return len(self._repository.list_profile_ids())
+
+    def clear(self) -> None:
+        self._repository.clear_profiles()
@@ -10,15 +10,28 @@ Features:
 - Graceful rollback mechanism
 - Performance metrics and monitoring
 - Health checks and circuit breakers
+- In-process ASGI dispatch: FastAPI directly, Flask through a WSGI adapter
+- Streaming responses: WSGI chunks are forwarded as ASGI more_body messages
+- Optional shadow traffic comparison (bodies hashed incrementally, not buffered)
+
+兼容性层本身是一个 ASGI 应用，可以直接交给 ASGI 服务器运行：
+
+    layer = APICompatibilityLayer(config, flask_app=create_app(), fastapi_app=app)
+    uvicorn.run(layer)
 """
 
 import asyncio
+import bisect
+import io
+import sys
 import time
-import random
+import zlib
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Callable, Optional, Dict, Any, List, Tuple
 from enum import Enum
 from dataclasses import dataclass, field
+from urllib.parse import urlencode
 import hashlib
 import json
 
@@ -58,6 +71,8 @@ class CompatibilityConfig:
     circuit_breaker_threshold: int = 10
     circuit_breaker_timeout: int = 300
     enable_logging: bool = True
+    shadow_traffic: bool = False
+    shadow_methods: Tuple[str, ...] = ("GET", "HEAD")
 
 
 @dataclass
@@ -85,25 +100,329 @@ class HealthStatus:
     last_check: str = field(default_factory=lambda: datetime.now().isoformat())
 
 
+# 延迟直方图桶上界（毫秒），最后一个桶收集所有更慢的请求
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 平均响应时间的滑动窗口大小
+RESPONSE_TIME_WINDOW = 1000
+
+# 影子比较按 JSON 内容比较的最大响应体；更大的响应（音频、导出）只比较原始字节的哈希
+SHADOW_JSON_LIMIT = 256 * 1024
+
+
+class LatencyHistogram:
+    """
+    流式延迟直方图 - 固定桶，记录 O(log 桶数)，分位数 O(桶数)
+    Streaming latency histogram with fixed buckets
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        """记录一次请求耗时"""
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, fraction: float) -> float:
+        """分位数估计（在所在桶内线性插值）"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """直方图摘要"""
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max, 3),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1]
+            }
+        }
+
+
+class BodyDigest:
+    """
+    增量计算响应体摘要：不超过 limit 字节时保留内容，按 JSON 键排序后比较；
+    超过时丢弃已保留的内容，只累计原始字节的 SHA-256
+    """
+
+    def __init__(self, limit: int = SHADOW_JSON_LIMIT):
+        self.limit = limit
+        self.size = 0
+        self._raw = hashlib.sha256()
+        self._chunks: Optional[List[bytes]] = []
+
+    def update(self, chunk: bytes) -> None:
+        self._raw.update(chunk)
+        self.size += len(chunk)
+        if self._chunks is not None:
+            if self.size > self.limit:
+                self._chunks = None
+            else:
+                self._chunks.append(chunk)
+
+    def hexdigest(self) -> str:
+        if self._chunks is not None:
+            try:
+                normalized = json.dumps(json.loads(b"".join(self._chunks)), sort_keys=True)
+                return hashlib.sha256(normalized.encode()).hexdigest()
+            except ValueError:
+                pass
+        return self._raw.hexdigest()
+
+
+def traffic_bucket(key: str) -> float:
+    """把路由键稳定地映射到 [0, 1)，跨进程一致且不改动全局随机数状态"""
+    return zlib.crc32(key.encode("utf-8")) / 0x100000000
+
+
+def build_scope(
+    method: str,
+    endpoint: str,
+    query_string: bytes = b"",
+    headers: Optional[Dict[str, str]] = None,
+    port: int = 80
+) -> Dict[str, Any]:
+    """构造进程内调用使用的 ASGI HTTP scope"""
+    path, _, query = endpoint.partition("?")
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method.upper(),
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query_string or query.encode("latin-1"),
+        "root_path": "",
+        "headers": [(key.lower().encode("latin-1"), str(value).encode("latin-1"))
+                    for key, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", port),
+    }
+
+
+async def call_asgi(
+    app,
+    scope: Dict[str, Any],
+    body: bytes = b"",
+    on_body: Optional[Callable[[bytes], None]] = None
+) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """
+    在进程内调用 ASGI 应用
+    Args:
+        on_body: 逐块接收响应体；给出时响应体不在内存中拼接，返回的响应体为空
+    Returns:
+        (状态码, 响应头, 响应体)
+    """
+    request_messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response_done = asyncio.Event()
+    response = {"status": 500, "headers": []}
+    chunks: List[bytes] = []
+
+    async def receive():
+        if request_messages:
+            return request_messages.pop()
+        # 请求体已读完：等响应结束后再报告断开（流式响应会监听断开事件）
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            if on_body is not None:
+                on_body(chunk)
+            else:
+                chunks.append(chunk)
+            if not message.get("more_body", False):
+                response_done.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        response_done.set()
+    return response["status"], response["headers"], b"".join(chunks)
+
+
+class _WSGIResponse:
+    """一次 WSGI 调用的响应：状态和响应头，以及逐块读取的响应体（均在工作线程中调用）"""
+
+    def __init__(self, wsgi_app, environ: Dict[str, Any]):
+        self.status = 500
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self._started = False
+        self._written: deque = deque()
+        self._iterable = wsgi_app(environ, self.start_response)
+        self._iterator = iter(self._iterable)
+
+    def start_response(self, status, response_headers, exc_info=None):
+        if exc_info and self._started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self._started = True
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in response_headers]
+        return self._written.append
+
+    def next_chunk(self) -> Optional[bytes]:
+        """下一个非空数据块（包括经 write() 写入的），读完返回 None"""
+        while True:
+            if self._written:
+                return self._written.popleft()
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                return None
+            if chunk:
+                return chunk
+
+    def close(self) -> None:
+        if hasattr(self._iterable, "close"):
+            self._iterable.close()
+
+
+class WSGIAdapter:
+    """
+    WSGI → ASGI 适配器
+    WSGI-to-ASGI adapter so the Flask app can be mounted next to FastAPI
+
+    WSGI 应用在有界线程池中执行（见 async_facade），不阻塞事件循环。
+    响应体按 WSGI 应用产生的数据块逐块发送（more_body），流式响应不在内存中拼接。
+    """
+
+    def __init__(self, wsgi_app, executor=None):
+        self.wsgi_app = wsgi_app
+        self._executor = executor
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            from bilingual_tutor.web.async_facade import get_blocking_executor
+            self._executor = get_blocking_executor()
+        return self._executor
+
+    @staticmethod
+    def build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+        """ASGI scope → WSGI environ（PEP 3333）"""
+        server_name, server_port = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("127.0.0.1", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": str(server_port),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for raw_name, raw_value in scope.get("headers", []):
+            name = raw_name.decode("latin-1").upper().replace("-", "_")
+            value = raw_value.decode("latin-1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[name] = value
+                continue
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        response = await self.executor.run(_WSGIResponse, self.wsgi_app, self.build_environ(scope, body))
+        try:
+            # 生成器形式的应用可能在产生第一个数据块时才调用 start_response
+            chunk = await self.executor.run(response.next_chunk)
+            await send({"type": "http.response.start", "status": response.status, "headers": response.headers})
+            while chunk is not None:
+                if scope["method"] != "HEAD":
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await self.executor.run(response.next_chunk)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await self.executor.run(response.close)
+
+
 class APICompatibilityLayer:
-    """API兼容性层"""
+    """
+    API兼容性层
+
+    按配置的流量比例把请求分发到 FastAPI 或（经 WSGIAdapter 挂载的）Flask，
+    记录每个后端的延迟直方图，并可选地把安全方法的请求影子发送到另一个后端比较响应。
+    只有实例本身作为 ASGI 应用运行时才会分流；fastapi_app 的 lifespan 中构造的实例
+    不挂载 Flask，只提供 /compatibility/* 端点和 validate_token。
+    """
     
     def __init__(
         self,
         config: CompatibilityConfig,
         flask_app: Optional[Flask] = None,
-        fastapi_app: Optional[FastAPI] = None
+        fastapi_app: Optional[FastAPI] = None,
+        session_store=None
     ):
         self.config = config
         self.flask_app = flask_app
         self.fastapi_app = fastapi_app
+        # 服务端会话存储（SQLiteSessionStore），validate_token 用它解析令牌
+        self.session_store = session_store
         self.metrics = APIMetrics()
         self.health_status = HealthStatus()
         self._circuit_breaker_trips = 0
         self._circuit_breaker_open_until: Optional[datetime] = None
-        self._request_times: List[float] = []
+        self._request_times: deque = deque(maxlen=RESPONSE_TIME_WINDOW)
+        self._request_time_sum = 0.0
+        self._latency = {"flask": LatencyHistogram(), "fastapi": LatencyHistogram()}
+        self._shadow_stats = {"compared": 0, "matched": 0, "mismatched": 0, "errors": 0}
+        self._shadow_mismatches: deque = deque(maxlen=20)
+        self._shadow_tasks: set = set()
         self._last_health_check: Optional[datetime] = None
         self._initialized = False
+        self._backends: Dict[str, Any] = {}
+        if fastapi_app is not None:
+            self._backends["fastapi"] = fastapi_app
+        if flask_app is not None:
+            self._backends["flask"] = WSGIAdapter(flask_app)
         
         if self.config.enable_logging:
             self._log(f"API兼容性层初始化 - 模式: {config.deployment_mode.value}")
@@ -204,6 +523,7 @@ class APICompatibilityLayer:
             "fastapi_port": self.config.fastapi_port,
             "initialized": self._initialized,
             "circuit_breaker_open": self._is_circuit_breaker_open(),
+            "shadow_traffic": self.config.shadow_traffic,
             "metrics": {
                 "total_requests": self.metrics.total_requests,
                 "flask_requests": self.metrics.flask_requests,
@@ -224,6 +544,117 @@ class APICompatibilityLayer:
                 self._log("熔断器已恢复")
         return False
     
+    def _choose_target(self, endpoint: str, method: str) -> str:
+        """根据熔断器、部署模式和流量比例选择后端"""
+        if self._is_circuit_breaker_open():
+            return "flask"
+        return self._select_backend(endpoint, method)
+    
+    async def __call__(self, scope, receive, send) -> None:
+        """ASGI 入口：按流量比例把请求分发到 FastAPI 或 Flask"""
+        if scope["type"] != "http":
+            # lifespan / websocket 交给 FastAPI 处理
+            if "fastapi" in self._backends:
+                await self._backends["fastapi"](scope, receive, send)
+            return
+        
+        method = scope["method"]
+        target = self._choose_target(scope["path"], method)
+        if target not in self._backends:
+            target = "fastapi" if target == "flask" else "flask"
+        app = self._backends.get(target)
+        if app is None:
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body",
+                        "body": json.dumps({"success": False, "message": "没有可用的后端"}).encode()})
+            return
+        
+        shadow = (self.config.shadow_traffic and method in self.config.shadow_methods
+                  and len(self._backends) == 2)
+        body = b""
+        if shadow:
+            # 影子请求需要重放请求体，先完整读取
+            while True:
+                message = await receive()
+                body += message.get("body", b"")
+                if message["type"] != "http.request" or not message.get("more_body", False):
+                    break
+            receive = self._replay(body)
+        
+        response = {"status": 500}
+        digest = BodyDigest() if shadow else None
+        
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif shadow and message["type"] == "http.response.body":
+                digest.update(message.get("body", b""))
+            await send(message)
+        
+        start_time = time.perf_counter()
+        try:
+            await app(scope, receive, capture)
+        except Exception as e:
+            response["status"] = 500
+            self._log(f"请求路由失败: {e}")
+            raise
+        finally:
+            self._record(target, (time.perf_counter() - start_time) * 1000, response["status"] < 500)
+        
+        if shadow:
+            other = "flask" if target == "fastapi" else "fastapi"
+            task = asyncio.ensure_future(self._shadow_compare(
+                scope, body, other, response["status"], digest.hexdigest()))
+            self._shadow_tasks.add(task)
+            task.add_done_callback(self._shadow_tasks.discard)
+    
+    @staticmethod
+    def _replay(body: bytes):
+        """重放已读取的请求体"""
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+        return receive
+    
+    async def _shadow_compare(
+        self,
+        scope: Dict[str, Any],
+        body: bytes,
+        backend: str,
+        primary_status: int,
+        primary_digest: str
+    ) -> None:
+        """把请求影子发送到另一个后端并比较响应（结果不返回给客户端，响应体只计算摘要）"""
+        digest = BodyDigest()
+        try:
+            status_code, _, _ = await call_asgi(self._backends[backend], scope, body, digest.update)
+        except Exception as e:
+            self._shadow_stats["errors"] += 1
+            self._log(f"影子请求失败: {e}")
+            return
+        
+        self._shadow_stats["compared"] += 1
+        if status_code == primary_status and digest.hexdigest() == primary_digest:
+            self._shadow_stats["matched"] += 1
+        else:
+            self._shadow_stats["mismatched"] += 1
+            self._shadow_mismatches.append({
+                "method": scope["method"],
+                "endpoint": scope["path"],
+                "shadow_backend": backend,
+                "status": [primary_status, status_code],
+                "timestamp": datetime.now().isoformat()
+            })
+    
+    async def drain_shadow_traffic(self) -> None:
+        """等待进行中的影子请求完成"""
+        if self._shadow_tasks:
+            await asyncio.gather(*list(self._shadow_tasks), return_exceptions=True)
+    
     async def route_request(
         self,
         endpoint: str,
@@ -232,20 +663,11 @@ class APICompatibilityLayer:
         headers: Optional[Dict[str, str]] = None
     ) -> Tuple[Dict[str, Any], int]:
         """路由请求到Flask或FastAPI"""
-        start_time = time.time()
+        start_time = time.perf_counter()
+        target = "flask"
         
         try:
-            if self._is_circuit_breaker_open():
-                self._log("熔断器打开，路由到Flask")
-                target = "flask"
-            elif self.config.deployment_mode == DeploymentMode.FULL:
-                target = "fastapi"
-            elif self.config.deployment_mode == DeploymentMode.ROLLED_BACK:
-                target = "flask"
-            else:
-                target = self._select_backend(endpoint, method)
-            
-            self._log(f"路由请求 {method} {endpoint} 到 {target}")
+            target = self._choose_target(endpoint, method)
             
             if target == "fastapi":
                 response, status_code = await self._route_to_fastapi(
@@ -258,15 +680,16 @@ class APICompatibilityLayer:
                 )
                 self.metrics.flask_requests += 1
             
-            duration_ms = (time.time() - start_time) * 1000
-            self._update_metrics(duration_ms, status_code < 400)
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            self._latency[target].observe(duration_ms)
+            self._update_metrics(duration_ms, status_code < 500)
             
             return response, status_code
             
         except Exception as e:
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            self._latency[target].observe(duration_ms)
             self._update_metrics(duration_ms, False)
-            self.metrics.error_count += 1
             
             self._log(f"请求路由失败: {e}")
             return {
@@ -277,20 +700,49 @@ class APICompatibilityLayer:
     
     def _select_backend(self, endpoint: str, method: str) -> str:
         """选择后端（Flask或FastAPI）"""
-        if self.config.deployment_mode == DeploymentMode.OFFLINE:
+        if self.config.deployment_mode in (DeploymentMode.OFFLINE, DeploymentMode.ROLLED_BACK):
             return "flask"
         
         if self.config.deployment_mode == DeploymentMode.FULL:
             return "fastapi"
         
-        if self.config.deployment_mode == DeploymentMode.ROLLED_BACK:
-            return "flask"
-        
-        random.seed(endpoint + method)
-        if random.random() < self.config.traffic_percentage:
+        # 同一端点和方法总是落在同一个桶里，调整流量比例时只有边界附近的端点会切换后端
+        if traffic_bucket(f"{method} {endpoint}") < self.config.traffic_percentage:
             return "fastapi"
         return "flask"
     
+    async def _dispatch(
+        self,
+        backend: str,
+        endpoint: str,
+        method: str,
+        data: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]]
+    ) -> Tuple[Dict[str, Any], int]:
+        """在进程内把请求发送到指定后端，解析 JSON 响应"""
+        headers = dict(headers or {})
+        query_string = b""
+        body = b""
+        if data:
+            if method.upper() in ("GET", "HEAD", "DELETE"):
+                query_string = urlencode(data, doseq=True).encode("latin-1")
+            else:
+                body = json.dumps(data).encode("utf-8")
+                headers.setdefault("content-type", "application/json")
+                headers["content-length"] = str(len(body))
+        
+        port = self.config.fastapi_port if backend == "fastapi" else self.config.flask_port
+        scope = build_scope(method, endpoint, query_string, headers, port)
+        status_code, response_headers, content = await call_asgi(self._backends[backend], scope, body)
+        
+        try:
+            payload = json.loads(content) if content else {}
+        except ValueError:
+            payload = {"content": content.decode("utf-8", "replace")}
+        if not isinstance(payload, dict):
+            payload = {"data": payload}
+        return payload, status_code
+    
     async def _route_to_fastapi(
         self,
         endpoint: str,
@@ -302,7 +754,7 @@ class APICompatibilityLayer:
         if not self.fastapi_app:
             raise HTTPException(status_code=503, detail="FastAPI未初始化")
         
-        return {"success": True, "backend": "fastapi", "data": data or {}}, 200
+        return await self._dispatch("fastapi", endpoint, method, data, headers)
     
     async def _route_to_flask(
         self,
@@ -315,17 +767,28 @@ class APICompatibilityLayer:
         if not self.flask_app:
             raise HTTPException(status_code=503, detail="Flask未初始化")
         
-        return {"success": True, "backend": "flask", "data": data or {}}, 200
+        return await self._dispatch("flask", endpoint, method, data, headers)
+    
+    def _record(self, backend: str, duration_ms: float, success: bool) -> None:
+        """记录一次经 ASGI 入口分发的请求"""
+        if backend == "fastapi":
+            self.metrics.fastapi_requests += 1
+        else:
+            self.metrics.flask_requests += 1
+        self._latency[backend].observe(duration_ms)
+        self._update_metrics(duration_ms, success)
     
     def _update_metrics(self, response_time_ms: float, success: bool) -> None:
         """更新指标"""
         self.metrics.total_requests += 1
-        self._request_times.append(response_time_ms)
         
-        if len(self._request_times) > 1000:
-            self._request_times = self._request_times[-1000:]
+        # 滑动窗口均值：增量维护窗口内的总和，不再每次重新求和
+        if len(self._request_times) == self._request_times.maxlen:
+            self._request_time_sum -= self._request_times[0]
+        self._request_times.append(response_time_ms)
+        self._request_time_sum += response_time_ms
         
-        self.metrics.avg_response_time_ms = sum(self._request_times) / len(self._request_times)
+        self.metrics.avg_response_time_ms = self._request_time_sum / len(self._request_times)
         self.metrics.last_updated = datetime.now().isoformat()
         
         if not success:
@@ -394,6 +857,8 @@ class APICompatibilityLayer:
                 "trips": self._circuit_breaker_trips,
                 "threshold": self.config.circuit_breaker_threshold
             },
+            "latency": {backend: histogram.snapshot() for backend, histogram in self._latency.items()},
+            "shadow": {**self._shadow_stats, "recent_mismatches": list(self._shadow_mismatches)},
             "last_updated": self.metrics.last_updated
         }
     
@@ -522,15 +987,21 @@ class APICompatibilityLayer:
         }
     
     async def validate_token(self, token: str) -> Optional[str]:
-        """验证令牌（占位符）"""
-        if not token:
+        """
+        验证令牌（令牌为服务端会话 ID）
+        需要先设置 session_store；未设置时一律视为无效，不会接受任意令牌
+        """
+        if not token or self.session_store is None:
             return None
         
         try:
             if token.startswith("Bearer "):
                 token = token[7:]
             
-            return "user_id_from_token"
+            record = self.session_store.load(token)
+            if record is None:
+                return None
+            return record['user_id'] or record['data'].get('user_id')
             
         except Exception:
             return None
@@ -68,9 +68,25 @@ def create_app():
     from bilingual_tutor.web.routes import register_routes
     register_routes(app)
     
+    # 服务端会话：会话数据与用户保存在同一个数据库中，多个 worker 进程共享登录状态
+    # （SESSION_BACKEND=cookie 时使用 Flask 默认的签名 Cookie 会话）
+    if os.environ.get('SESSION_BACKEND', 'server') != 'cookie':
+        from bilingual_tutor.web.routes.auth import user_repository
+        from bilingual_tutor.web.sessions import ServerSideSessionInterface
+        app.session_interface = ServerSideSessionInterface(lambda: user_repository.sessions)
+    
     # 注册错误处理器
     register_error_handlers(app)
     
+    # 请求链路追踪（按采样率为请求创建根 span）
+    register_tracing(app)
+    
+    # 定时备份（BILINGUAL_TUTOR_SNAPSHOT_INTERVAL > 0 时随应用启动）
+    from bilingual_tutor.storage.snapshots import DEFAULT_SNAPSHOT_INTERVAL
+    if DEFAULT_SNAPSHOT_INTERVAL > 0:
+        from bilingual_tutor.infrastructure.operations_manager import operations_manager
+        operations_manager.backup_manager.start_configured_schedule(DEFAULT_SNAPSHOT_INTERVAL)
+    
     # 注册健康检查 API
     @app.route('/api/health')
     def health_check():
@@ -84,6 +100,39 @@ def create_app():
     return app
 
 
+def register_tracing(app, request_tracer=None):
+    """
+    注册请求链路追踪
+    每个采样的请求一个根 span，名称为 "方法 路由规则"（如 GET /api/learning/plan），
+    带 traceparent 头时沿用其 trace id（是否采样见 tracing.TRUST_PARENT）；响应头 X-Trace-Id 返回追踪 ID
+    """
+    from flask import g
+    from bilingual_tutor.infrastructure.tracing import tracer as default_tracer
+    request_tracer = request_tracer or default_tracer
+    
+    @app.before_request
+    def start_request_trace():
+        rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        g.trace_span = request_tracer.start_trace(
+            f"{request.method} {rule}",
+            {'http.method': request.method, 'http.target': request.path},
+            traceparent=request.headers.get('traceparent'))
+    
+    @app.after_request
+    def tag_request_trace(response):
+        trace_span = g.get('trace_span')
+        if trace_span is not None:
+            trace_span.set_attribute('http.status_code', response.status_code)
+            response.headers['X-Trace-Id'] = trace_span.trace.trace_id
+        return response
+    
+    @app.teardown_request
+    def finish_request_trace(error=None):
+        trace_span = g.pop('trace_span', None)
+        if trace_span is not None:
+            trace_span.finish(error)
+
+
 def register_error_handlers(app):
     """注册错误处理器"""
     
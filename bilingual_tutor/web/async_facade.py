@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+异步外观 - 在有界线程池中执行同步的存储与集成器调用
+Async Facade - offloads blocking storage and integrator calls to a bounded thread pool
+
+Features:
+- 专用的有界线程池，SQLite 查询和音频查找不再阻塞事件循环
+- 并发提交数受信号量限制，过载时请求在事件循环中排队而不是堆积在线程池队列里
+- 调用在提交时的 contextvars 上下文中执行（与 asyncio.to_thread 相同）
+- AsyncFacade 把同步对象的方法包装为可 await 的协程
+- iterate 在同一线程池中逐项推进同步生成器（流式导出），不占用 anyio 的默认线程池
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# iterate 中 next() 的结束标记
+_EXHAUSTED = object()
+
+# 默认工作线程数：与 LearningDatabase 连接池大小（10）保持在同一量级
+DEFAULT_IO_WORKERS = int(os.environ.get('BILINGUAL_TUTOR_IO_WORKERS', '8'))
+
+
+class BlockingExecutor:
+    """
+    阻塞调用的有界执行器
+
+    线程池在第一次调用时才创建；同时在线程池中执行或排队的调用数
+    不超过 max_pending，超出部分在事件循环中等待信号量。
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_IO_WORKERS, max_pending: int = None,
+                 thread_name_prefix: str = "bilingual-io"):
+        """
+        初始化执行器
+        Args:
+            max_workers: 工作线程数
+            max_pending: 同时提交到线程池的最大调用数（默认 max_workers 的 4 倍）
+            thread_name_prefix: 线程名前缀
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 4
+        self.thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # 信号量绑定到创建它的事件循环，按循环分别创建
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._stats = {'calls': 0, 'in_flight': 0, 'peak_in_flight': 0, 'waited': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix)
+        return self._executor
+
+    def _get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            # 清理已关闭的事件循环（测试客户端每次会创建新的循环）
+            for stale in [known for known in self._semaphores if known.is_closed()]:
+                del self._semaphores[stale]
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+        return semaphore
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        在线程池中执行同步调用
+        Args:
+            func: 同步函数
+            *args, **kwargs: 调用参数
+        Returns:
+            函数返回值（异常原样抛出）
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._get_semaphore(loop)
+        if semaphore.locked():
+            self._stats['waited'] += 1
+
+        async with semaphore:
+            self._stats['calls'] += 1
+            self._stats['in_flight'] += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._stats['in_flight'])
+            try:
+                context = contextvars.copy_context()
+                call = functools.partial(context.run, func, *args, **kwargs)
+                return await loop.run_in_executor(self._get_executor(), call)
+            finally:
+                self._stats['in_flight'] -= 1
+
+    async def iterate(self, iterable: Iterable[T]) -> AsyncIterator[T]:
+        """
+        异步迭代同步可迭代对象，每次 next() 都在线程池中执行
+        迭代结束、出错或客户端断开（异步生成器被关闭）时关闭同步生成器，释放它持有的连接
+        Args:
+            iterable: 同步可迭代对象（如 export_chunks 返回的生成器）
+        """
+        iterator = iter(iterable)
+        try:
+            while True:
+                item = await self.run(next, iterator, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                await self.run(close)
+
+    def get_stats(self) -> Dict[str, int]:
+        """调用统计"""
+        return {**self._stats, 'max_workers': self.max_workers, 'max_pending': self.max_pending}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭线程池（之后的调用会重新创建线程池）"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+class AsyncFacade:
+    """
+    同步对象的异步外观
+
+    方法调用在 BlockingExecutor 中执行，例如
+    ``await AsyncFacade(learning_db, executor).get_vocabulary_count('english')``。
+    非可调用属性直接返回。
+    """
+
+    def __init__(self, target: Any, executor: BlockingExecutor):
+        self._target = target
+        self._executor = executor
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await self._executor.run(attribute, *args, **kwargs)
+        return call
+
+    def __repr__(self) -> str:
+        return f"AsyncFacade({self._target!r})"
+
+
+_default_executor: Optional[BlockingExecutor] = None
+_default_lock = threading.Lock()
+
+
+def get_blocking_executor() -> BlockingExecutor:
+    """进程共享的默认执行器"""
+    global _default_executor
+    if _default_executor is None:
+        with _default_lock:
+            if _default_executor is None:
+                _default_executor = BlockingExecutor()
+    return _default_executor
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """在默认执行器中执行同步调用"""
+    return await get_blocking_executor().run(func, *args, **kwargs)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+音频分发 - Flask 与 FastAPI 共用的音频文件解析与缓存校验
+Audio Delivery - shared audio resolution and cache validation for Flask and FastAPI
+
+Features:
+- 词汇ID到本地音频文件的解析（单个或整页批量）
+- 基于文件大小和修改时间的强 ETag
+- If-None-Match 校验和统一的 Cache-Control 策略
+- 批量音频清单（下载地址 + ETag），客户端一次请求即可预取整页发音
+- 按 (语言, 级别) 打包的离线音频包，一次下载整个级别
+"""
+
+import mimetypes
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 音频内容由 ETag 标识，客户端可以缓存一天，之后用条件请求重新验证
+CACHE_CONTROL = "private, max-age=86400"
+
+# 单次清单请求最多包含的词汇数量
+MAX_MANIFEST_ITEMS = 200
+
+# 离线音频包（格式见 bilingual_tutor.audio.audio_bundle）
+BUNDLE_MEDIA_TYPE = "application/octet-stream"
+
+
+@dataclass
+class AudioFileInfo:
+    """已解析的词汇音频文件"""
+    vocab_id: int
+    word: str
+    language: str
+    level: str
+    path: str
+    size: int
+    mtime_ns: int
+    stat_result: os.stat_result
+
+    @property
+    def etag(self) -> str:
+        """强 ETag（不含引号）"""
+        return make_etag(self.stat_result)
+
+    @property
+    def media_type(self) -> str:
+        return mimetypes.guess_type(self.path)[0] or "audio/mpeg"
+
+
+@dataclass
+class LevelBundle:
+    """待发送的离线音频包"""
+    path: str  # 按内容指纹命名的版本文件，不会被重建替换
+    download_name: str
+    stat_result: os.stat_result
+    entries: int
+
+    @property
+    def etag(self) -> str:
+        """强 ETag（不含引号）"""
+        return make_etag(self.stat_result)
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """
+    由文件大小和纳秒级修改时间生成强 ETag（不含引号）
+    Args:
+        stat_result: os.stat 结果
+    Returns:
+        str: ETag 值
+    """
+    return f"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match 校验（按 RFC 7232 使用弱比较）
+    Args:
+        if_none_match: 请求头的值
+        etag: 当前资源的 ETag（不含引号）
+    Returns:
+        bool: 客户端缓存仍然有效时返回 True
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def stat_audio_file(vocab_item, path: Optional[str]) -> Optional[AudioFileInfo]:
+    """
+    读取音频文件状态
+    Args:
+        vocab_item: 词汇条目
+        path: 音频文件路径
+    Returns:
+        AudioFileInfo: 文件不存在时返回 None
+    """
+    if not path:
+        return None
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return AudioFileInfo(
+        vocab_id=vocab_item.id,
+        word=vocab_item.word,
+        language=vocab_item.language,
+        level=vocab_item.level,
+        path=path,
+        size=stat_result.st_size,
+        mtime_ns=stat_result.st_mtime_ns,
+        stat_result=stat_result
+    )
+
+
+def resolve_vocabulary_audio(learning_db, pronunciation_manager,
+                             vocab_ids: List[int]) -> List[Tuple[Any, Optional[AudioFileInfo]]]:
+    """
+    批量解析词汇的音频文件
+    Args:
+        learning_db: 学习数据库
+        pronunciation_manager: 发音管理器
+        vocab_ids: 词汇ID列表
+    Returns:
+        List: (词汇条目, 音频文件信息或 None)，按传入顺序，不存在的词汇被忽略
+    """
+    resolved = []
+    for vocab_item in learning_db.get_vocabulary_by_ids(vocab_ids):
+        path = pronunciation_manager.get_pronunciation_audio(
+            vocab_item.word, vocab_item.language, vocab_item.level
+        )
+        resolved.append((vocab_item, stat_audio_file(vocab_item, path)))
+    return resolved
+
+
+def parse_vocab_ids(raw: Optional[str]) -> List[int]:
+    """
+    解析逗号分隔的词汇ID参数
+    Raises:
+        ValueError: 参数为空、格式错误或超过 MAX_MANIFEST_ITEMS
+    """
+    if not raw:
+        raise ValueError("缺少词汇ID")
+    vocab_ids = [int(part) for part in raw.split(",") if part.strip()]
+    if not vocab_ids:
+        raise ValueError("缺少词汇ID")
+    if len(vocab_ids) > MAX_MANIFEST_ITEMS:
+        raise ValueError(f"一次最多请求 {MAX_MANIFEST_ITEMS} 个词汇")
+    return list(dict.fromkeys(vocab_ids))
+
+
+def build_audio_manifest(resolved: List[Tuple[Any, Optional[AudioFileInfo]]],
+                         url_for_vocab: Callable[[int], str]) -> List[Dict[str, Any]]:
+    """
+    生成批量音频清单
+    Args:
+        resolved: resolve_vocabulary_audio 的结果
+        url_for_vocab: 词汇ID到音频下载地址的映射
+    Returns:
+        List[Dict]: 每个词汇的音频下载地址、大小和 ETag（不暴露服务器上的文件路径）
+    """
+    manifest = []
+    for vocab_item, info in resolved:
+        entry = {
+            'vocab_id': vocab_item.id,
+            'word': vocab_item.word,
+            'language': vocab_item.language,
+            'level': vocab_item.level,
+            'audio_available': info is not None
+        }
+        if info is not None:
+            entry.update({
+                'audio_url': url_for_vocab(vocab_item.id),
+                'size': info.size,
+                'etag': f'"{info.etag}"',
+                'media_type': info.media_type
+            })
+        manifest.append(entry)
+    return manifest
+
+
+def prepare_level_bundle(pronunciation_manager, language: str, level: str) -> Optional[LevelBundle]:
+    """
+    获取某个级别的离线音频包（音频索引没有变化时直接复用上次的构建结果）
+    Args:
+        pronunciation_manager: 发音管理器
+        language: 语言
+        level: 级别
+    Returns:
+        LevelBundle: 该级别没有音频时返回 None
+    Raises:
+        ValueError: 语言或级别无效
+    """
+    result = pronunciation_manager.bundles.current(language, level)
+    if result.entries == 0:
+        return None
+    return LevelBundle(
+        path=result.version_path,
+        download_name=os.path.basename(result.path),
+        stat_result=os.stat(result.version_path),
+        entries=result.entries
+    )
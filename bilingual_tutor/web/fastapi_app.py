@@ -7,6 +7,7 @@ Bilingual Tutor System - FastAPI Web Application
 Features:
 - Flask to FastAPI migration support with compatibility layer
 - Async processing and performance optimization
+- Blocking storage/integrator calls offloaded to a bounded thread pool
 - Graceful deployment with rollback mechanism
 - API versioning and standardization
 """
@@ -17,35 +18,65 @@ from datetime import datetime
 from typing import Optional, Dict, Any, List
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Response, Depends, HTTPException, status
+from fastapi import FastAPI, Request, Response, Depends, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
-import uvicorn
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.infrastructure.tracing import tracer
+from bilingual_tutor.storage.database import VOCABULARY_EXPORT_FIELDS, LearningDatabase
+from bilingual_tutor.storage.export import EXPORT_MEDIA_TYPES, export_chunks
+from bilingual_tutor.storage.session_store import SQLiteSessionStore
+from bilingual_tutor.storage.snapshots import DEFAULT_SNAPSHOT_INTERVAL
 from bilingual_tutor.core.system_integrator import SystemIntegrator
 from bilingual_tutor.web.api_compatibility import (
     APICompatibilityLayer,
     CompatibilityConfig,
     DeploymentMode
 )
+from bilingual_tutor.web.async_facade import AsyncFacade, BlockingExecutor
+from bilingual_tutor.web.audio_delivery import (
+    BUNDLE_MEDIA_TYPE,
+    CACHE_CONTROL,
+    build_audio_manifest,
+    etag_matches,
+    parse_vocab_ids,
+    prepare_level_bundle,
+    resolve_vocabulary_audio
+)
 
 security = HTTPBearer(auto_error=False)
+# Flask 会话 Cookie 的名称（SESSION_COOKIE_NAME 默认值），Cookie 值即服务端会话 ID
+SESSION_COOKIE = "session"
 
 system_integrator: Optional[SystemIntegrator] = None
 learning_db: Optional[LearningDatabase] = None
 compatibility_layer: Optional[APICompatibilityLayer] = None
 
+# SQLite 查询、音频查找和组件构建都是同步的，统一在这个有界线程池中执行，
+# 事件循环只负责调度，慢查询不会阻塞 /health 等其他请求
+io_executor = BlockingExecutor()
+
+
+def storage() -> AsyncFacade:
+    """学习数据库的异步外观"""
+    return AsyncFacade(learning_db, io_executor)
+
+
+def integrator() -> AsyncFacade:
+    """系统集成器的异步外观"""
+    return AsyncFacade(system_integrator, io_executor)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     global system_integrator, learning_db, compatibility_layer
+    backup_manager = None
     
     print("\n" + "=" * 60)
     print("        双语导师系统 FastAPI 服务启动")
@@ -53,8 +84,9 @@ async def lifespan(app: FastAPI):
     print("=" * 60)
     
     try:
-        system_integrator = SystemIntegrator()
-        learning_db = system_integrator.learning_db
+        system_integrator = await io_executor.run(SystemIntegrator)
+        # 首次访问会构建数据库组件（打开连接池、检查表结构），放到线程池中
+        learning_db = await io_executor.run(lambda: system_integrator.learning_db)
         
         compatibility_config = CompatibilityConfig(
             deployment_mode=DeploymentMode.GRADUAL,
@@ -65,19 +97,31 @@ async def lifespan(app: FastAPI):
             enable_health_check=True
         )
         
+        # 这里的兼容性层没有挂载 Flask，也不是服务入口：它只注册 /compatibility/* 端点并解析令牌，
+        # 请求不经过它的分流路径。按比例分流需要把兼容性层本身交给 ASGI 服务器运行
+        # （见 api_compatibility 模块说明）
         compatibility_layer = APICompatibilityLayer(
             config=compatibility_config,
             flask_app=None,
-            fastapi_app=app
+            fastapi_app=app,
+            session_store=SQLiteSessionStore(learning_db)
         )
         
         await compatibility_layer.initialize()
         
+        # 定时备份（BILINGUAL_TUTOR_SNAPSHOT_INTERVAL > 0 时随应用启动）
+        if DEFAULT_SNAPSHOT_INTERVAL > 0:
+            from bilingual_tutor.infrastructure.operations_manager import operations_manager
+            if operations_manager.backup_manager.start_configured_schedule(DEFAULT_SNAPSHOT_INTERVAL):
+                backup_manager = operations_manager.backup_manager
+                print(f"🗄️  定时备份: 每 {DEFAULT_SNAPSHOT_INTERVAL} 秒")
+        
         print("\n📊 数据库状态:")
-        print(f"   英语词汇: {learning_db.get_vocabulary_count('english')} 个")
-        print(f"   日语词汇: {learning_db.get_vocabulary_count('japanese')} 个")
+        print(f"   英语词汇: {await storage().get_vocabulary_count('english')} 个")
+        print(f"   日语词汇: {await storage().get_vocabulary_count('japanese')} 个")
         
-        audio_stats = system_integrator.pronunciation_manager.get_pronunciation_statistics()
+        audio_stats = await io_executor.run(
+            lambda: system_integrator.pronunciation_manager.get_pronunciation_statistics())
         print("🔊 音频系统状态:")
         print(f"   音频文件: {audio_stats.get('summary', {}).get('total_stored_files', 0)} 个")
         
@@ -91,8 +135,11 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         print("\n🛑 正在关闭系统...")
+        if backup_manager is not None:
+            await io_executor.run(backup_manager.stop_schedule)
         if system_integrator:
-            system_integrator.close()
+            await integrator().close()
+        io_executor.shutdown(wait=True)
         print("✅ 系统已安全关闭")
 
 
@@ -182,7 +229,7 @@ async def get_deployment_status():
 
 
 @app.post("/deployment/adjust-traffic", tags=["System"])
-async def adjust_traffic(percentage: float = Field(..., ge=0, le=1)):
+async def adjust_traffic(percentage: float = Query(..., ge=0, le=1)):
     """Adjust traffic split between Flask and FastAPI"""
     if not compatibility_layer:
         raise HTTPException(status_code=503, detail="Compatibility layer not initialized")
@@ -201,6 +248,143 @@ async def trigger_rollback():
     return result
 
 
+async def get_current_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> Optional[str]:
+    """
+    当前登录用户：Bearer 令牌或会话 Cookie 中的会话 ID
+    与 Flask 共用服务端会话存储，只有登录后签发且未过期的会话才有效
+    """
+    session_id = credentials.credentials if credentials else request.cookies.get(SESSION_COOKIE)
+    if not session_id or learning_db is None:
+        return None
+    record = await io_executor.run(lambda: SQLiteSessionStore(learning_db).load(session_id))
+    if record is None:
+        return None
+    return record['user_id'] or record['data'].get('user_id')
+
+
+async def require_user(user_id: Optional[str] = Depends(get_current_user)) -> str:
+    """Authenticated user or 401 (counterpart of the Flask @require_auth decorator)"""
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="请先登录")
+    return user_id
+
+
+def _resolve_audio(vocab_ids: List[int]):
+    """查找词汇音频（在线程池中执行：包含数据库查询和文件 stat）"""
+    return resolve_vocabulary_audio(learning_db, system_integrator.pronunciation_manager, vocab_ids)
+
+
+@app.api_route("/api/audio/file/{vocab_id}", methods=["GET", "HEAD"], tags=["Audio"])
+async def stream_vocabulary_audio(vocab_id: int, request: Request, user_id: str = Depends(require_user)):
+    """
+    Serve a vocabulary pronunciation file.
+    
+    Supports Range requests, strong ETags (304 on If-None-Match) and
+    Cache-Control; FileResponse uses zero-copy pathsend when the server offers it.
+    """
+    if not system_integrator:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    
+    resolved = await io_executor.run(_resolve_audio, [vocab_id])
+    if not resolved:
+        raise HTTPException(status_code=404, detail="词汇未找到")
+    
+    _, info = resolved[0]
+    if info is None:
+        raise HTTPException(status_code=404, detail="音频未找到")
+    
+    headers = {"ETag": f'"{info.etag}"', "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), info.etag):
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(info.path, media_type=info.media_type, headers=headers,
+                        stat_result=info.stat_result)
+
+
+@app.get("/api/audio/manifest", tags=["Audio"])
+async def get_audio_manifest(ids: str, user_id: str = Depends(require_user)):
+    """Audio URLs and ETags for a page of vocabulary (?ids=1,2,3)"""
+    if not system_integrator:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    
+    try:
+        vocab_ids = parse_vocab_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    resolved = await io_executor.run(_resolve_audio, vocab_ids)
+    manifest = build_audio_manifest(
+        resolved, lambda vocab_id: app.url_path_for("stream_vocabulary_audio", vocab_id=str(vocab_id))
+    )
+    return {"success": True, "audio": manifest}
+
+
+@app.api_route("/api/audio/bundle/{language}/{level}", methods=["GET", "HEAD"], tags=["Audio"])
+async def download_audio_bundle(language: str, level: str, request: Request,
+                                user_id: str = Depends(require_user)):
+    """
+    Download the offline audio bundle for one level.
+    
+    A single indexed file with every pronunciation of the level; supports
+    Range (resumable downloads) and ETag revalidation.
+    """
+    if not system_integrator:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    
+    try:
+        bundle = await io_executor.run(
+            lambda: prepare_level_bundle(system_integrator.pronunciation_manager, language, level))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if bundle is None:
+        raise HTTPException(status_code=404, detail="该级别没有音频")
+    
+    headers = {"ETag": f'"{bundle.etag}"', "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), bundle.etag):
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(bundle.path, media_type=BUNDLE_MEDIA_TYPE, headers=headers,
+                        filename=bundle.download_name, stat_result=bundle.stat_result)
+
+
+@app.get("/api/vocabulary", tags=["Vocabulary"])
+async def list_vocabulary(language: Optional[str] = None, level: Optional[str] = None,
+                          cursor: Optional[str] = None, limit: Optional[int] = None,
+                          user_id: str = Depends(require_user)):
+    """Keyset-paginated vocabulary; pass next_cursor back as cursor for the next page"""
+    if not learning_db:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    
+    try:
+        page = await storage().get_vocabulary_page(language, level, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, **page.to_dict(lambda item: item.__dict__)}
+
+
+@app.get("/api/vocabulary/export", tags=["Vocabulary"])
+async def export_vocabulary(format: str = "ndjson", language: Optional[str] = None,
+                            level: Optional[str] = None, user_id: str = Depends(require_user)):
+    """
+    Stream the vocabulary as NDJSON or CSV.
+    
+    Rows are read one keyset page at a time and each chunk is produced on
+    io_executor, so memory stays flat, the event loop is never blocked and
+    exports share the same bounded pool as every other storage call.
+    """
+    if not learning_db:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="不支持的导出格式")
+    
+    chunks = export_chunks(learning_db.iter_vocabulary(language, level), format, VOCABULARY_EXPORT_FIELDS)
+    return StreamingResponse(io_executor.iterate(chunks), media_type=EXPORT_MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f"attachment; filename=vocabulary.{format}"})
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Custom HTTP exception handler"""
@@ -241,14 +425,29 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
-async def get_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
-) -> Optional[str]:
-    """Get current user from credentials (placeholder)"""
-    if credentials and compatibility_layer:
-        user_id = await compatibility_layer.validate_token(credentials.credentials)
-        return user_id
-    return None
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Request tracing: one root span per sampled request, renamed to the matched route path"""
+    trace_span = tracer.start_trace(
+        f"{request.method} {request.url.path}",
+        {'http.method': request.method, 'http.target': request.url.path},
+        traceparent=request.headers.get('traceparent'))
+    if trace_span is None:
+        return await call_next(request)
+    
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        trace_span.finish(e)
+        raise
+    
+    route = request.scope.get('route')
+    if route is not None:
+        trace_span.name = f"{request.method} {route.path}"
+    trace_span.set_attribute('http.status_code', response.status_code)
+    response.headers["X-Trace-Id"] = trace_span.trace.trace_id
+    trace_span.finish()
+    return response
 
 
 if __name__ == "__main__":
@@ -263,6 +462,7 @@ if __name__ == "__main__":
     print("\n  按 Ctrl+C 停止服务器")
     print("=" * 60 + "\n")
     
+    import uvicorn
     uvicorn.run(
         "bilingual_tutor.web.fastapi_app:app",
         host="0.0.0.0",
@@ -8,16 +8,19 @@ import sys
 import uuid
 import random
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, send_file, stream_with_context, url_for
+from werkzeug.exceptions import HTTPException
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
-from bilingual_tutor.core.engine import CoreLearningEngine
-from bilingual_tutor.core.system_integrator import SystemIntegrator
 from bilingual_tutor.models import UserProfile, Goals, Preferences, Skill, ContentType, WeakArea
 from bilingual_tutor.content.learning_content import get_all_content
-from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.web.audio_delivery import (
+    BUNDLE_MEDIA_TYPE, CACHE_CONTROL, build_audio_manifest, parse_vocab_ids,
+    prepare_level_bundle, resolve_vocabulary_audio
+)
+from bilingual_tutor.web.routes.auth import user_repository, users
 
 api_bp = Blueprint('api', __name__)
 
@@ -49,8 +52,9 @@ def get_learning_content_cache():
         _learning_content = get_all_content()
     return _learning_content
 
-# In-memory storage for user profiles and sessions
-user_profiles = {}
+# User profiles are stored with the users in the learning database (see auth.user_repository);
+# `user_profiles` keeps the original dict interface with a short per-worker read-through cache
+user_profiles = user_repository.profiles
 user_learning_sessions = {}
 
 def require_auth(f):
@@ -64,12 +68,10 @@ def require_auth(f):
 
 def get_or_create_user_profile(user_id):
     """Get existing user profile or create a new one."""
-    if user_id not in user_profiles:
-        # Import users from auth module to get registration data
-        from bilingual_tutor.web.routes.auth import users
-        
+    profile = user_profiles.get(user_id)
+    if profile is None:
         # Get user data from registration if available
-        user_data = users.get(user_id, {})
+        user_data = users.get(user_id) or {}
         english_level = user_data.get('english_level', 'CET-4')
         japanese_level = user_data.get('japanese_level', 'N5')
         daily_time = user_data.get('daily_time', 60)
@@ -87,7 +89,7 @@ def get_or_create_user_profile(user_id):
             difficulty_preference="适中",
             language_balance={"english": 0.6, "japanese": 0.4}
         )
-        user_profiles[user_id] = UserProfile(
+        profile = UserProfile(
             user_id=user_id,
             english_level=english_level,
             japanese_level=japanese_level,
@@ -98,7 +100,8 @@ def get_or_create_user_profile(user_id):
             created_at=datetime.now(),
             updated_at=datetime.now()
         )
-    return user_profiles[user_id]
+        user_profiles[user_id] = profile
+    return profile
 
 def get_learning_content_from_db(language: str, content_type: str, level: str):
     """从数据库获取学习内容"""
@@ -158,8 +161,8 @@ def get_learning_content_from_db(language: str, content_type: str, level: str):
 def get_learning_content(language: str, content_type: str):
     """获取指定语言和类型的学习内容（优先从数据库）"""
     user_id = session.get('user_id')
-    if user_id and user_id in user_profiles:
-        profile = user_profiles[user_id]
+    profile = user_profiles.get(user_id) if user_id else None
+    if profile:
         level = profile.english_level if language == "english" else profile.japanese_level
     else:
         level = "CET-4" if language == "english" else "N5"
@@ -256,6 +259,7 @@ def update_profile():
                 return jsonify({'success': False, 'message': '每日学习时间格式错误'}), 400
         
         profile.updated_at = datetime.now()
+        user_profiles[user_id] = profile
         
         return jsonify({'success': True, 'message': '设置已更新'})
         
@@ -424,12 +428,13 @@ def record_learning():
         item_id = data.get('item_id')
         item_type = data.get('item_type', 'vocabulary')
         correct = data.get('correct', True)
+        response_ms = data.get('response_ms')
         
         if not item_id:
             return jsonify({'success': False, 'message': '缺少 item_id'}), 400
         
         # 记录学习结果
-        record = get_learning_db().record_learning(user_id, item_id, item_type, correct)
+        record = get_learning_db().record_learning(user_id, item_id, item_type, correct, response_ms)
         
         return jsonify({
             'success': True,
@@ -507,6 +512,62 @@ def database_status():
     except Exception as e:
         return jsonify({'success': False, 'message': '获取数据库状态失败'}), 500
 
+@api_bp.route('/search', methods=['GET'])
+@require_auth
+def search_catalog():
+    """全文检索词汇、语法和阅读内容（按相关度排序，分页）"""
+    try:
+        result = get_learning_db().search(
+            request.args.get('q', ''),
+            item_type=request.args.get('type'),
+            language=request.args.get('language'),
+            level=request.args.get('level'),
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 20, type=int)
+        )
+        return jsonify({'success': True, **result})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': '检索失败'}), 500
+
+@api_bp.route('/vocabulary', methods=['GET'])
+@require_auth
+def list_vocabulary():
+    """分页获取词汇（键集分页，next_cursor 传回 cursor 获取下一页）"""
+    try:
+        page = get_learning_db().get_vocabulary_page(
+            language=request.args.get('language'),
+            level=request.args.get('level'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify({'success': True, **page.to_dict(lambda item: item.__dict__)})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': '获取词汇失败'}), 500
+
+@api_bp.route('/vocabulary/export', methods=['GET'])
+@require_auth
+def export_vocabulary():
+    """流式导出词汇（format=ndjson|csv，分块响应，内存占用与词汇量无关）"""
+    from bilingual_tutor.storage.database import VOCABULARY_EXPORT_FIELDS
+    from bilingual_tutor.storage.export import EXPORT_MEDIA_TYPES, export_chunks
+    
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_MEDIA_TYPES:
+        return jsonify({'success': False, 'message': '不支持的导出格式'}), 400
+    
+    records = get_learning_db().iter_vocabulary(request.args.get('language'), request.args.get('level'))
+    return Response(
+        stream_with_context(export_chunks(records, export_format, VOCABULARY_EXPORT_FIELDS)),
+        mimetype=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename=vocabulary.{export_format}'}
+    )
+
 # ==================== Audio System API ====================
 
 @api_bp.route('/audio/vocabulary/<int:vocab_id>', methods=['GET'])
@@ -532,6 +593,7 @@ def get_vocabulary_audio(vocab_id):
                     'language': vocab_item.language,
                     'level': vocab_item.level,
                     'audio_path': audio_path,
+                    'audio_url': url_for('api.stream_vocabulary_audio', vocab_id=vocab_id),
                     'audio_available': True
                 }
             })
@@ -549,6 +611,89 @@ def get_vocabulary_audio(vocab_id):
     except Exception as e:
         return jsonify({'success': False, 'message': '获取音频失败'}), 500
 
+@api_bp.route('/audio/file/<int:vocab_id>', methods=['GET'])
+@require_auth
+def stream_vocabulary_audio(vocab_id):
+    """
+    下载词汇发音音频
+    支持 Range 断点/分段请求、强 ETag 条件请求（304）和 Cache-Control；
+    文件交给 WSGI 服务器的 file_wrapper 发送（gunicorn 等使用 sendfile 零拷贝）
+    """
+    try:
+        system = get_system_integrator()
+        resolved = resolve_vocabulary_audio(system.learning_db, system.pronunciation_manager, [vocab_id])
+        if not resolved:
+            return jsonify({'success': False, 'message': '词汇未找到'}), 404
+        
+        _, info = resolved[0]
+        if info is None:
+            return jsonify({'success': False, 'message': '音频未找到'}), 404
+        
+        response = send_file(info.path, mimetype=info.media_type, conditional=True,
+                             etag=info.etag, last_modified=info.stat_result.st_mtime, max_age=None)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+        
+    except HTTPException:
+        # 416 Range Not Satisfiable 等由 werkzeug 生成的响应
+        raise
+    except Exception as e:
+        return jsonify({'success': False, 'message': '获取音频失败'}), 500
+
+@api_bp.route('/audio/manifest', methods=['GET'])
+@require_auth
+def get_audio_manifest():
+    """批量获取一页词汇的音频地址和 ETag（?ids=1,2,3）"""
+    try:
+        vocab_ids = parse_vocab_ids(request.args.get('ids'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        system = get_system_integrator()
+        resolved = resolve_vocabulary_audio(system.learning_db, system.pronunciation_manager, vocab_ids)
+        manifest = build_audio_manifest(
+            resolved, lambda vocab_id: url_for('api.stream_vocabulary_audio', vocab_id=vocab_id)
+        )
+        
+        return jsonify({
+            'success': True,
+            'audio': manifest
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': '获取音频清单失败'}), 500
+
+@api_bp.route('/audio/bundle/<language>/<level>', methods=['GET'])
+@require_auth
+def download_audio_bundle(language, level):
+    """
+    下载某个级别的离线音频包
+    单个文件包含整个级别的发音和索引，支持 Range 断点续传和 ETag 条件请求
+    """
+    try:
+        bundle = prepare_level_bundle(get_system_integrator().pronunciation_manager, language, level)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': '生成音频包失败'}), 500
+    
+    if bundle is None:
+        return jsonify({'success': False, 'message': '该级别没有音频'}), 404
+    
+    try:
+        response = send_file(bundle.path, mimetype=BUNDLE_MEDIA_TYPE, conditional=True,
+                             etag=bundle.etag, last_modified=bundle.stat_result.st_mtime,
+                             max_age=None, as_attachment=True,
+                             download_name=bundle.download_name)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'success': False, 'message': '下载音频包失败'}), 500
+
 @api_bp.route('/audio/batch-crawl', methods=['POST'])
 @require_auth
 def batch_crawl_audio():
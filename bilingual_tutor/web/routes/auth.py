@@ -5,35 +5,69 @@ Authentication routes
 
 from flask import Blueprint, request, jsonify, session, redirect, url_for
 from datetime import datetime
-import hashlib
 import secrets
 
+from bilingual_tutor.infrastructure.password_hashing import (
+    LEGACY_ITERATIONS, HashingPoolBusy, get_hashing_pool
+)
 from bilingual_tutor.infrastructure.security_manager import security_manager
+from bilingual_tutor.storage.user_repository import UserRepository
 
 auth_bp = Blueprint('auth', __name__)
 
-# In-memory user storage (for local use)
-users = {
+# Local demo account, created the first time the user store is opened
+DEMO_USERS = {
     "test_user": {
         "password_hash": "d0a69ef790021a27960c8afd4d110da0672c6ed34e75240327c75b3528c8b8ac", # hash_password("test_password_123", "fixed_salt_for_testing")
         "salt": "fixed_salt_for_testing",
         "english_level": "CET-4",
         "japanese_level": "N5",
-        "daily_time": 60,
-        "created_at": datetime.now().isoformat(),
-        "last_login": None
+        "daily_study_time": 60
     }
 }
+
+# Users live in the learning database (users table) so every worker process sees them;
+# `users` keeps the original dict interface on top of the repository
+user_repository = UserRepository(seed_users=DEMO_USERS)
+users = user_repository.users
+
+# Login activity seen by this worker (the authoritative session state is in the session store)
 user_sessions = {}
 
-def hash_password(password: str, salt: str) -> str:
-    """Hash password with salt for security"""
-    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000).hex()
+def hash_password(password: str, salt: str, iterations: int = LEGACY_ITERATIONS) -> str:
+    """Hash password with salt for security (legacy hex format, computed on the hashing pool)"""
+    return get_hashing_pool().pbkdf2(password, salt, iterations)
 
 def generate_salt() -> str:
     """Generate random salt for password hashing"""
     return secrets.token_hex(16)
 
+def make_password_hash(password: str, salt: str) -> str:
+    """Hash a new password; the iteration count is stored with the hash"""
+    return get_hashing_pool().hash(password, salt)
+
+def check_password(password: str, user_data: dict) -> bool:
+    """Verify a password against a stored hash in either format"""
+    return get_hashing_pool().verify(password, user_data['password_hash'], user_data['salt'])
+
+def rehash_if_needed(username: str, password: str, user_data: dict) -> None:
+    """Upgrade legacy hashes or changed iteration counts after a successful login"""
+    pool = get_hashing_pool()
+    if not pool.needs_rehash(user_data['password_hash']):
+        return
+    try:
+        salt = generate_salt()
+        user_repository.update_user(username, password_hash=pool.hash(password, salt), salt=salt)
+    except HashingPoolBusy:
+        pass  # try again on a quieter login
+
+def hashing_busy_response(error: HashingPoolBusy):
+    """Fail fast when the hashing queue is full instead of tying up the worker"""
+    response = jsonify({'success': False, 'message': error.message_cn})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 def validate_password(password: str) -> tuple[bool, str]:
     """Validate password strength"""
     return security_manager.validate_password_strength(password)
@@ -72,14 +106,12 @@ def login():
             return jsonify({'success': False, 'message': '请输入用户名和密码'}), 400
         
         # Check if user exists
-        if username not in users:
+        user_data = users.get(username)
+        if user_data is None:
             return jsonify({'success': False, 'message': '用户不存在，请先注册'}), 401
         
-        user_data = users[username]
-        
         # Verify password
-        hashed_password = hash_password(password, user_data['salt'])
-        if hashed_password != user_data['password_hash']:
+        if not check_password(password, user_data):
             security_manager.log_security_event(
                 'login_failed',
                 username,
@@ -88,24 +120,28 @@ def login():
                 success=False
             )
             return jsonify({'success': False, 'message': '密码错误'}), 401
+        rehash_if_needed(username, password, user_data)
         
-        # Create session
+        # Create session (new session id on login to prevent session fixation)
+        if hasattr(session, 'regenerate'):
+            session.regenerate()
         session['user_id'] = username
         session['login_time'] = datetime.now().isoformat()
         session.permanent = True
+        user_repository.update_user(username, last_login=session['login_time'])
         
         # Track user session
         user_sessions[username] = {
             'login_time': datetime.now(),
             'last_activity': datetime.now(),
-            'session_id': session.get('_id', secrets.token_hex(16))
+            'session_id': getattr(session, 'sid', None) or secrets.token_hex(16)
         }
         
         # Log successful login
         security_manager.log_security_event(
             'login_success',
             username,
-            {'session_id': session.get('_id')},
+            {'session_id': user_sessions[username]['session_id'][:8]},
             get_client_ip(),
             success=True
         )
@@ -117,6 +153,8 @@ def login():
             'login_time': session['login_time']
         })
         
+    except HashingPoolBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'success': False, 'message': '服务器内部错误'}), 500
 
@@ -168,19 +206,23 @@ def register():
         
         # Create user with hashed password
         salt = generate_salt()
-        password_hash = hash_password(password, salt)
-        
-        users[username] = {
-            'password_hash': password_hash,
-            'salt': salt,
-            'english_level': english_level,
-            'japanese_level': japanese_level,
-            'daily_time': daily_time,
-            'created_at': datetime.now().isoformat(),
-            'last_login': None
-        }
+        password_hash = make_password_hash(password, salt)
+        
+        # The unique username constraint makes concurrent registrations on different workers safe
+        created = user_repository.create_user(
+            username,
+            password_hash,
+            salt=salt,
+            english_level=english_level,
+            japanese_level=japanese_level,
+            daily_study_time=daily_time
+        )
+        if not created:
+            return jsonify({'success': False, 'message': '用户名已存在'}), 400
         
         # Auto-login after registration
+        if hasattr(session, 'regenerate'):
+            session.regenerate()
         session['user_id'] = username
         session['login_time'] = datetime.now().isoformat()
         session.permanent = True
@@ -189,7 +231,7 @@ def register():
         user_sessions[username] = {
             'login_time': datetime.now(),
             'last_activity': datetime.now(),
-            'session_id': session.get('_id', secrets.token_hex(16))
+            'session_id': getattr(session, 'sid', None) or secrets.token_hex(16)
         }
         
         return jsonify({
@@ -203,6 +245,8 @@ def register():
             }
         })
         
+    except HashingPoolBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'success': False, 'message': '服务器内部错误'}), 500
 
@@ -275,19 +319,28 @@ def change_password():
         if not user_data:
             return jsonify({'success': False, 'message': '用户不存在'}), 404
         
-        current_hash = hash_password(current_password, user_data['salt'])
-        if current_hash != user_data['password_hash']:
+        if not check_password(current_password, user_data):
             return jsonify({'success': False, 'message': '当前密码错误'}), 401
         
         # Update password
         new_salt = generate_salt()
-        new_hash = hash_password(new_password, new_salt)
+        new_hash = make_password_hash(new_password, new_salt)
+        
+        user_repository.update_user(
+            user_id,
+            password_hash=new_hash,
+            salt=new_salt,
+            password_changed_at=datetime.now().isoformat()
+        )
         
-        users[user_id]['password_hash'] = new_hash
-        users[user_id]['salt'] = new_salt
-        users[user_id]['password_changed_at'] = datetime.now().isoformat()
+        # Sign out the user's other sessions
+        if hasattr(session, 'regenerate'):
+            session.regenerate()
+            user_repository.sessions.delete_user_sessions(user_id)
         
         return jsonify({'success': True, 'message': '密码修改成功'})
         
+    except HashingPoolBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'success': False, 'message': '服务器内部错误'}), 500
\ No newline at end of file
@@ -3,7 +3,7 @@ Data Privacy Routes
 数据隐私路由 - 处理数据导出、删除和访问控制
 """
 
-from flask import Blueprint, request, jsonify, session, send_file
+from flask import Blueprint, Response, request, jsonify, session, send_file, stream_with_context
 from datetime import datetime
 import json
 import csv
@@ -11,6 +11,7 @@ import io
 from pathlib import Path
 
 from bilingual_tutor.infrastructure.security_manager import security_manager, AccessControl
+from bilingual_tutor.storage.export import EXPORT_MEDIA_TYPES
 
 data_privacy_bp = Blueprint('data_privacy', __name__)
 
@@ -22,7 +23,7 @@ def export_data():
     """
     导出用户数据
     
-    支持格式: json, csv
+    支持格式: json, ndjson, csv（ndjson 和 csv 为流式分块响应）
     """
     try:
         user_id = session.get('user_id')
@@ -48,47 +49,27 @@ def export_data():
         else:
             export_format = request.args.get('format', 'json').lower()
         
-        if export_format not in ['json', 'csv']:
+        if export_format not in ['json', 'ndjson', 'csv']:
             return jsonify({'success': False, 'message': '不支持的导出格式'}), 400
         
-        # Export user data
-        user_data = security_manager.export_user_data(user_id, export_format)
-        
         if export_format == 'json':
+            user_data = security_manager.export_user_data(user_id, export_format)
             return jsonify({
                 'success': True,
                 'message': '数据导出成功',
                 'data': user_data,
                 'export_time': datetime.now().isoformat()
             })
-        elif export_format == 'csv':
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write CSV data
-            writer.writerow(['Category', 'Key', 'Value', 'Timestamp'])
-            
-            for category, items in user_data.items():
-                if category in ['user_id', 'export_time']:
-                    writer.writerow([category, '', str(items), user_data['export_time']])
-                elif isinstance(items, dict):
-                    for key, value in items.items():
-                        writer.writerow([category, key, str(value), ''])
-                elif isinstance(items, list):
-                    for i, item in enumerate(items):
-                        if isinstance(item, dict):
-                            for key, value in item.items():
-                                writer.writerow([category, f'{i}.{key}', str(value), ''])
-                        else:
-                            writer.writerow([category, str(i), str(item), ''])
-            
-            output.seek(0)
-            return send_file(
-                io.BytesIO(output.getvalue().encode('utf-8')),
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name=f'user_data_{user_id}_{datetime.now().strftime("%Y%m%d")}.csv'
-            )
+        
+        # NDJSON / CSV: stream the learning records page by page, constant memory
+        from bilingual_tutor.web.routes.api import get_learning_db
+        chunks = security_manager.stream_user_data(user_id, export_format, get_learning_db())
+        filename = f'user_data_{user_id}_{datetime.now().strftime("%Y%m%d")}.{export_format}'
+        return Response(
+            stream_with_context(chunks),
+            mimetype=EXPORT_MEDIA_TYPES[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'数据导出失败: {str(e)}'}), 500
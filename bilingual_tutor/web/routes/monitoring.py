@@ -3,10 +3,15 @@ Monitoring Routes
 监控路由 - 提供性能监控仪表板、健康检查和告警API
 """
 
-from flask import Blueprint, request, jsonify, render_template
+import json
+
+from flask import Blueprint, Response, request, jsonify, render_template
 from datetime import datetime, timedelta
 
+from bilingual_tutor.infrastructure.logging_system import peek_logging_system
+from bilingual_tutor.infrastructure.metrics import PROMETHEUS_CONTENT_TYPE
 from bilingual_tutor.infrastructure.monitoring_manager import monitoring_manager
+from bilingual_tutor.infrastructure.tracing import tracer
 
 monitoring_bp = Blueprint('monitoring', __name__)
 
@@ -105,6 +110,88 @@ def get_metrics():
         }), 500
 
 
+@monitoring_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Prometheus 文本格式指标
+    
+    监控管理器的指标前缀为 bilingual_tutor_，日志系统性能记录器的指标前缀为
+    bilingual_tutor_log_（日志系统尚未初始化时不导出，也不会因此触发初始化）
+    """
+    body = monitoring_manager.performance_monitor.render_prometheus('bilingual_tutor_')
+    logging_system = peek_logging_system()
+    if logging_system is not None and logging_system.performance_logger is not None:
+        body += logging_system.performance_logger.registry.render_prometheus('bilingual_tutor_log_')
+    return Response(body, mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@monitoring_bp.route('/api/monitoring/traces', methods=['GET'])
+def get_recent_traces():
+    """
+    最近的请求追踪
+    
+    Query参数:
+        - name: 根 span 名称筛选，如 "GET /api/learning/plan"(可选)
+        - min_ms: 最短耗时(可选)
+        - limit: 条数(默认50)
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+        min_ms = float(request.args.get('min_ms', 0))
+        
+        return jsonify({
+            'success': True,
+            'traces': tracer.recent_traces(limit, request.args.get('name'), min_ms),
+            'endpoints': tracer.endpoints(),
+            'stats': tracer.stats()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取追踪列表失败: {str(e)}'
+        }), 500
+
+
+@monitoring_bp.route('/api/monitoring/traces/profile', methods=['GET'])
+def get_trace_profile():
+    """
+    端点的火焰图式耗时分解
+    
+    Query参数:
+        - endpoint: 根 span 名称
+        - format: json(默认) 或 folded(折叠调用栈文本，可交给 flamegraph.pl)
+    """
+    endpoint = request.args.get('endpoint')
+    if request.args.get('format') == 'folded':
+        return Response(tracer.folded_stacks(endpoint), mimetype='text/plain')
+    
+    if not endpoint:
+        return jsonify({'success': False, 'message': '缺少 endpoint 参数'}), 400
+    profile = tracer.profile(endpoint)
+    if profile is None:
+        return jsonify({'success': False, 'message': '该端点还没有追踪数据'}), 404
+    return jsonify({'success': True, 'profile': profile})
+
+
+@monitoring_bp.route('/api/monitoring/traces/export', methods=['GET'])
+def export_traces():
+    """以 OTLP-JSON 下载环形缓冲区中的全部追踪"""
+    body = json.dumps(tracer.to_otlp(), ensure_ascii=False, separators=(',', ':'))
+    return Response(body, mimetype='application/json', headers={
+        'Content-Disposition': f'attachment; filename=traces-{datetime.now():%Y%m%d%H%M%S}.json'
+    })
+
+
+@monitoring_bp.route('/api/monitoring/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id: str):
+    """单个追踪的全部 span"""
+    trace = tracer.get_trace(trace_id)
+    if trace is None:
+        return jsonify({'success': False, 'message': '追踪不存在或已移出缓冲区'}), 404
+    return jsonify({'success': True, 'trace': trace})
+
+
 @monitoring_bp.route('/api/monitoring/alerts', methods=['GET'])
 def get_alerts():
     """
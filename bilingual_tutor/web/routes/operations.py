@@ -394,3 +394,38 @@ def delete_backup(backup_name: str):
             'success': False,
             'message': f'删除备份失败: {str(e)}'
         }), 500
+
+
+@operations_bp.route('/api/operations/backups/prune', methods=['POST'])
+def prune_backups():
+    """
+    按保留策略清理过期备份
+    """
+    try:
+        result = operations_manager.backup_manager.prune_backups()
+        
+        if result.get('success'):
+            return jsonify({
+                'success': True,
+                'message': result['message'],
+                'data': result['removed']
+            })
+        else:
+            return jsonify(result), 500
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'清理备份失败: {str(e)}'
+        }), 500
+
+
+@operations_bp.route('/api/operations/backups/schedule', methods=['GET'])
+def get_backup_schedule():
+    """
+    获取定时备份状态
+    """
+    return jsonify({
+        'success': True,
+        'data': operations_manager.backup_manager.get_schedule_status()
+    })
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+服务端会话 - Flask SessionInterface 实现
+Server-side Sessions - Flask session interface backed by the session store
+
+Features:
+- Cookie 只保存随机会话 ID（256 位），会话数据保存在共享存储中
+- 任意 worker 进程都能读取同一会话，水平扩展时请求不会因为落到其他进程而掉线
+- 只在会话被修改时写入，未修改的会话最多每 TOUCH_INTERVAL 秒刷新一次过期时间
+- 登录时调用 session.regenerate() 更换会话 ID，防止会话固定攻击
+- 每保存 PURGE_EVERY 次会话清理一次过期会话，会话表不会无限增长
+"""
+
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, Optional
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+# 未修改的会话刷新过期时间的最小间隔（秒）
+TOUCH_INTERVAL = 60
+
+# 每个进程每保存这么多次会话清理一次过期会话
+PURGE_EVERY = 500
+
+
+def new_session_id() -> str:
+    """生成会话 ID"""
+    return secrets.token_urlsafe(32)
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """服务端会话（字典内容在响应结束时写回存储）"""
+
+    def __init__(self, initial=None, sid: str = None, new: bool = False, last_activity: float = 0.0):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid or new_session_id()
+        self.new = new
+        self.modified = False
+        self.last_activity = last_activity
+        self.previous_sid: Optional[str] = None
+
+    def regenerate(self) -> None:
+        """更换会话 ID（保留数据，旧 ID 在保存时删除）"""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = new_session_id()
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """把 Flask 会话保存到服务端会话存储"""
+
+    def __init__(self, store_provider: Callable[[], object], purge_every: int = PURGE_EVERY):
+        """
+        Args:
+            store_provider: 返回会话存储（SQLiteSessionStore）的函数，首次请求时才调用
+            purge_every: 每保存多少次会话清理一次过期会话（0 表示不清理）
+        """
+        self._store_provider = store_provider
+        self._store = None
+        self.purge_every = purge_every
+        self._saves = 0
+        self._saves_lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = self._store_provider()
+        return self._store
+
+    def open_session(self, app, request) -> ServerSideSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            record = self.store.load(sid)
+            if record is not None:
+                return ServerSideSession(record['data'], sid=sid, last_activity=record['last_activity'])
+        return ServerSideSession(new=True)
+
+    def save_session(self, app, session: ServerSideSession, response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        lifetime = app.permanent_session_lifetime.total_seconds()
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+            session.previous_sid = None
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified or session.new:
+            self.store.save(session.sid, dict(session), lifetime, user_id=session.get('user_id'))
+            self._purge_when_due()
+        elif time.time() - session.last_activity >= TOUCH_INTERVAL:
+            self.store.touch(session.sid, lifetime)
+        else:
+            return
+
+        response.vary.add("Cookie")
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def _purge_when_due(self) -> None:
+        """每 purge_every 次保存清理一次过期会话（失败只记录日志，不影响本次响应）"""
+        if self.purge_every <= 0:
+            return
+        with self._saves_lock:
+            self._saves += 1
+            due = self._saves >= self.purge_every
+            if due:
+                self._saves = 0
+        if due:
+            try:
+                self.store.purge_expired()
+            except Exception as e:
+                logging.warning(f"清理过期会话失败: {e}")
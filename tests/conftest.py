@@ -2,6 +2,12 @@
 Pytest configuration and shared fixtures for the bilingual tutor system.
 """
 
+import os
+import tempfile
+
+# 共享学习事件存储写入临时数据目录，测试之间不读到上次运行留下的历史
+os.environ.setdefault("BILINGUAL_TUTOR_DATA_DIR", tempfile.mkdtemp(prefix="bilingual_tutor_data_"))
+
 import pytest
 from datetime import datetime, timedelta
 from hypothesis import strategies as st
@@ -0,0 +1,329 @@
+"""
+学习事件存储测试
+
+验证事件的追加、时间窗口查询、环形缓冲区覆盖规则、跨连接失效和按天清理，
+分析组件接入事件存储后的结果与内存模式一致，并报告长期运行时的内存增长。
+"""
+
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+
+from bilingual_tutor.storage.event_store import (
+    LearningEventStore, BoundedHistory, RingBuffer,
+    activity_result_to_payload, activity_result_from_payload
+)
+from bilingual_tutor.analysis.learning_analytics import LearningAnalyticsEnhancer
+from bilingual_tutor.analysis.weakness_analyzer import WeaknessAnalyzer
+from bilingual_tutor.content.memory_manager import MemoryManager
+from bilingual_tutor.progress.tracker import ProgressTracker
+from bilingual_tutor.progress.vocabulary_tracker import VocabularyTracker
+from bilingual_tutor.models import (
+    ActivityResult, ActivityType, Content, ContentType, LearningActivity, Skill
+)
+
+
+def make_result(index: int, completed_at: datetime, score: float = 0.8) -> ActivityResult:
+    return ActivityResult(
+        activity_id=f"activity_{index}",
+        user_id="user",
+        score=score,
+        time_spent=10,
+        errors_made=["grammar_particle"] if score < 0.6 else [],
+        completed_at=completed_at,
+        feedback="ok"
+    )
+
+
+def make_content(content_id: str) -> Content:
+    return Content(
+        content_id=content_id,
+        title="Test",
+        body="Test body",
+        language="english",
+        difficulty_level="CET-4",
+        content_type=ContentType.ARTICLE,
+        source_url="https://test.com",
+        quality_score=0.8,
+        created_at=datetime.now(),
+        tags=[]
+    )
+
+
+def make_activity() -> LearningActivity:
+    return LearningActivity(
+        activity_id="activity",
+        activity_type=ActivityType.VOCABULARY,
+        language="english",
+        content=make_content("content"),
+        estimated_duration=10,
+        difficulty_level="CET-4",
+        skills_practiced=[Skill.VOCABULARY]
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    event_store = LearningEventStore(str(tmp_path / "events.db"), ring_size=5, flush_size=10)
+    yield event_store
+    event_store.close()
+
+
+class TestBoundedContainers:
+    """有界容器"""
+
+    def test_ring_buffer_keeps_latest(self):
+        buffer = RingBuffer(3, [1, 2])
+        buffer.append(3)
+        buffer.extend([4, 5])
+        assert buffer == [3, 4, 5]
+        assert buffer[-2:] == [4, 5]
+
+    def test_bounded_history_evicts_least_recently_used(self):
+        history = BoundedHistory(list, max_keys=2)
+        history["a"].append(1)
+        history["b"].append(2)
+        history["a"].append(3)  # a 变为最近使用
+        history["c"].append(4)
+
+        assert list(history) == ["a", "c"]
+        assert history["a"] == [1, 3]
+        assert "b" not in history
+
+
+class TestLearningEventStore:
+    """事件存储"""
+
+    def test_window_queries(self, store):
+        base = datetime.now() - timedelta(days=20)
+        for day in range(20):
+            store.append("activity_result", "u1", {"day": day}, key=f"k{day % 2}",
+                         timestamp=base + timedelta(days=day))
+        store.append("activity_result", "u2", {"day": 0}, timestamp=base)
+
+        recent = store.window("activity_result", "u1", since=base + timedelta(days=17))
+        assert [event.payload["day"] for event in recent] == [17, 18, 19]
+
+        # 早于环形缓冲区的窗口从数据库读取
+        everything = store.window("activity_result", "u1")
+        assert [event.payload["day"] for event in everything] == list(range(20))
+
+        bounded = store.window("activity_result", "u1", since=base + timedelta(days=2),
+                               until=base + timedelta(days=6), key="k0")
+        assert [event.payload["day"] for event in bounded] == [2, 4, 6]
+        assert store.has_events("activity_result", "u2")
+        assert not store.has_events("activity_result", "u3")
+        assert store.keys("activity_result", "u1") == {"k0", "k1"}
+
+    def test_ring_serves_appends_after_load(self, store):
+        now = datetime.now()
+        store.append("s", "u", 1, timestamp=now - timedelta(minutes=2))
+        assert len(store.window("s", "u")) == 1
+        store.append("s", "u", 2, timestamp=now - timedelta(minutes=1))
+
+        assert [event.payload for event in store.window("s", "u")] == [1, 2]
+        assert store.get_stats()["buffered_events"] == 2
+
+    def test_external_writes_invalidate_buffers(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        reader = LearningEventStore(path)
+        writer = LearningEventStore(path)
+        try:
+            assert reader.window("s", "u") == []
+            writer.append("s", "u", {"n": 1})
+            writer.flush()
+            assert [event.payload for event in reader.window("s", "u")] == [{"n": 1}]
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_pending_events_flush_on_timer(self, tmp_path):
+        path = str(tmp_path / "timer.db")
+        writer = LearningEventStore(path, flush_size=1000, flush_interval=0.05)
+        reader = LearningEventStore(path)
+        try:
+            writer.append("s", "u", 1)
+            deadline = time.time() + 5
+            while not reader.window("s", "u") and time.time() < deadline:
+                time.sleep(0.02)
+            assert [event.payload for event in reader.window("s", "u")] == [1]
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_purge_and_forget(self, store):
+        now = datetime.now()
+        store.append("s", "u", 1, key="old", timestamp=now - timedelta(days=100))
+        store.append("s", "u", 2, key="new", timestamp=now)
+        store.append("s", "u", 3, key="drop", timestamp=now)
+
+        assert store.purge_before(now - timedelta(days=90)) == 1
+        assert store.forget("s", "u", ["drop"]) == 1
+        assert [event.payload for event in store.window("s", "u")] == [2]
+        assert store.get_stats()["day_partitions"] == 1
+
+    def test_activity_result_payload_round_trip(self):
+        result = make_result(1, datetime(2026, 1, 2, 3, 4, 5), score=0.5)
+        assert activity_result_from_payload(activity_result_to_payload(result)) == result
+
+
+class TestComponentsWithEventStore:
+    """分析组件接入事件存储"""
+
+    def test_integrator_engine_shares_one_store(self, tmp_path):
+        from bilingual_tutor.core.system_integrator import SystemIntegrator
+        from bilingual_tutor.storage.event_store import DATA_DIR, get_shared_event_store
+
+        engine = SystemIntegrator().core_engine
+        store = engine.event_store
+        assert store is get_shared_event_store()
+        assert os.path.dirname(store.db_path) == DATA_DIR
+        for component in (engine.memory_manager, engine.progress_tracker,
+                          engine.vocabulary_tracker, engine.weakness_analyzer):
+            assert component.event_store is store
+
+    def test_progress_tracker_history_survives_restart(self, tmp_path):
+        path = str(tmp_path / "events.db")
+        store = LearningEventStore(path)
+        tracker = ProgressTracker(event_store=store, history_limit=3)
+        plain = ProgressTracker()
+        now = datetime.now()
+        for i in range(10):
+            result = make_result(i, now - timedelta(days=i), score=0.5 + i * 0.05)
+            tracker.record_performance("user", make_activity(), result)
+            plain.record_performance("user", make_activity(), result)
+
+        assert len(tracker.activity_history["user"]) == 3
+        for days in (1, 5, 30):
+            assert tracker.calculate_learning_velocity("user", timedelta(days=days)) == \
+                pytest.approx(plain.calculate_learning_velocity("user", timedelta(days=days)))
+            assert tracker.calculate_achievement_rate("user", timedelta(days=days)) == \
+                pytest.approx(plain.calculate_achievement_rate("user", timedelta(days=days)))
+        store.close()
+
+        # 新进程只依赖持久化的事件
+        restarted = ProgressTracker(event_store=LearningEventStore(path))
+        assert restarted.calculate_achievement_rate("user", timedelta(days=30)) == \
+            pytest.approx(plain.calculate_achievement_rate("user", timedelta(days=30)))
+        assert restarted.generate_progress_report("user", "monthly").activities_completed == 10
+        restarted.event_store.close()
+
+    def test_learning_analytics_reads_from_store(self, store):
+        enhancer = LearningAnalyticsEnhancer(event_store=store, history_limit=2)
+        plain = LearningAnalyticsEnhancer()
+        for hour in (9, 9, 20, 21):
+            session = {
+                'start_time': datetime.now().replace(hour=hour).isoformat(),
+                'duration_minutes': 30,
+                'performance_score': 0.9 if hour == 9 else 0.4,
+                'activities': ['vocabulary']
+            }
+            enhancer.add_study_session("user", dict(session))
+            plain.add_study_session("user", dict(session))
+        for level in (0.2, 0.3, 0.5):
+            enhancer.add_skill_measurement("user", Skill.READING, "english", level)
+
+        assert len(enhancer.study_history["user"]) == 2
+        assert enhancer.analyze_study_pattern("user").best_time_slot == \
+            plain.analyze_study_pattern("user").best_time_slot
+        trajectory = enhancer.predict_skill_trajectory("user", Skill.READING, "english")
+        assert trajectory.initial_level == 0.2 and trajectory.current_level == 0.5
+
+    def test_weakness_analyzer_matches_in_memory(self, store):
+        analyzer = WeaknessAnalyzer(event_store=store, history_limit=2)
+        plain = WeaknessAnalyzer()
+        now = datetime.now()
+        for i in range(8):
+            result = make_result(i, now - timedelta(hours=i), score=0.3 if i % 2 else 0.9)
+            analyzer.record_activity_result("user", result)
+            plain.record_activity_result("user", result)
+
+        assert len(analyzer.error_patterns["user"]) == 2
+        ours = analyzer.analyze_error_patterns("user", timedelta(days=1))
+        theirs = plain.analyze_error_patterns("user", timedelta(days=1))
+        assert [(w.skill, w.severity) for w in ours] == [(w.skill, w.severity) for w in theirs]
+
+    def test_memory_manager_reloads_evicted_users(self, store):
+        manager = MemoryManager(event_store=store, max_users=1)
+        manager.record_learned_content("alice", make_content("c1"))
+        manager.record_learned_content("bob", make_content("c2"))
+
+        assert "alice" not in manager.user_content_history
+        assert manager.check_content_seen("alice", make_content("c1"))
+        assert manager.get_content_history_count("alice") == 1
+
+        manager.clear_old_content_history("alice", timedelta(seconds=-1))
+        manager.user_content_history.clear()
+        assert not manager.check_content_seen("alice", make_content("c1"))
+
+    def test_vocabulary_tracker_bounds_review_scores(self, store):
+        tracker = VocabularyTracker(event_store=store, review_limit=5)
+        for i in range(20):
+            tracker.record_word_learned("user", "apple", "english", score=1.0 - i * 0.01)
+
+        assert len(tracker.word_review_history["user"]["english"]["apple"]) == 5
+        assert len(store.window(VocabularyTracker.WORD_REVIEW_STREAM, "user", key="english:apple")) == 20
+
+    def test_vocabulary_tracker_reloads_evicted_users(self, store):
+        tracker = VocabularyTracker(event_store=store, max_users=1)
+        plain = VocabularyTracker()
+        for target in (tracker, plain):
+            for i in range(8):
+                target.record_word_learned("alice", "apple", "english", score=0.5 if i < 5 else 0.9)
+            for score in (0.9, 0.3, 0.3):
+                target.record_word_learned("alice", "pear", "english", score=score)
+            target.record_word_learned("bob", "apple", "english", score=1.0)
+
+        assert list(tracker.word_review_history) == ["bob"]
+        assert tracker.calculate_retention_rate("alice", "english", timedelta(days=1)) == \
+            plain.calculate_retention_rate("alice", "english", timedelta(days=1)) == 50.0
+        # 重新加载时每个单词只保留最近的分数
+        assert tracker.word_review_history["alice"]["english"]["apple"] == [0.5, 0.5, 0.9, 0.9, 0.9]
+        assert list(tracker.word_review_history) == ["alice"]
+
+
+class TestEventStoreBenchmark:
+    """长期运行内存增长基准"""
+
+    def test_memory_growth_bounded(self, tmp_path):
+        # 默认规模较小; 完整基准: EVENT_STORE_BENCH_USERS=10000
+        users = int(os.environ.get("EVENT_STORE_BENCH_USERS", "300"))
+        days = int(os.environ.get("EVENT_STORE_BENCH_DAYS", "90"))
+        start_day = datetime.now() - timedelta(days=days)
+
+        def simulate(tracker):
+            tracemalloc.start()
+            started = time.perf_counter()
+            for day in range(days):
+                for user in range(users):
+                    result = make_result(day, start_day + timedelta(days=day, minutes=user % 600))
+                    result.user_id = f"user_{user}"
+                    tracker.record_performance(result.user_id, make_activity(), result)
+            elapsed = time.perf_counter() - started
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return current, elapsed
+
+        legacy_bytes, legacy_time = simulate(ProgressTracker())
+
+        store = LearningEventStore(str(tmp_path / "bench.db"), ring_size=16, max_rings=users // 10,
+                                   flush_size=1000)
+        bounded = ProgressTracker(event_store=store, history_limit=16, max_users=users // 10)
+        bounded_bytes, bounded_time = simulate(bounded)
+
+        started = time.perf_counter()
+        rate = bounded.calculate_achievement_rate("user_1", timedelta(days=30))
+        query_ms = (time.perf_counter() - started) * 1000
+        store.close()
+
+        events = users * days
+        print(f"\n{users} 用户 x {days} 天 = {events} 条活动记录")
+        print(f"内存字典: {legacy_bytes / 1024 / 1024:.1f} MB, {events / legacy_time:.0f} 条/秒")
+        print(f"事件存储: {bounded_bytes / 1024 / 1024:.1f} MB, {events / bounded_time:.0f} 条/秒, "
+              f"30天窗口查询 {query_ms:.1f} ms")
+
+        assert rate == 100.0
+        assert bounded_bytes < legacy_bytes / 2
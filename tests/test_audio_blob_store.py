@@ -0,0 +1,208 @@
+"""
+内容寻址音频存储测试
+
+验证 SHA-256 去重、两级分片目录、引用计数与垃圾回收、旧存储迁移与回滚，
+并报告去重后的磁盘占用和清理耗时。
+"""
+
+import os
+import time
+
+import pytest
+
+from bilingual_tutor.audio.audio_storage import AudioStorage
+from bilingual_tutor.audio.blob_store import BlobStore
+from bilingual_tutor.storage.migrate_audio_store import (
+    check_content_addressed_status, migrate_to_content_addressed, rollback_content_addressed
+)
+
+
+def write_source(directory, name: str, content: bytes) -> str:
+    path = os.path.join(str(directory), name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+@pytest.fixture
+def storage(tmp_path):
+    audio_storage = AudioStorage(str(tmp_path / "audio"), content_addressed=True)
+    yield audio_storage
+    audio_storage.close()
+
+
+class TestBlobStore:
+    """分片文件存储"""
+
+    def test_put_deduplicates_and_shards(self, tmp_path):
+        store = BlobStore(str(tmp_path / "blobs"))
+        first = store.put(write_source(tmp_path, "a.mp3", b"same"))
+        second = store.put(write_source(tmp_path, "b.mp3", b"same"))
+
+        sha256, path, size, created = first
+        assert second == (sha256, path, size, False) and created
+        assert size == 4
+        relative = os.path.relpath(path, store.root).split(os.sep)
+        assert relative == [sha256[:2], sha256[2:4], sha256 + ".mp3"]
+
+    def test_move_and_remove_prune_directories(self, tmp_path):
+        store = BlobStore(str(tmp_path / "blobs"))
+        source = write_source(tmp_path, "a.mp3", b"data")
+        _, path, _, _ = store.put(source, move=True)
+
+        assert not os.path.exists(source)
+        assert store.remove(path)
+        assert os.listdir(store.root) == []
+        assert list(store.iter_blobs()) == []
+
+
+class TestContentAddressedStorage:
+    """内容寻址模式的 AudioStorage"""
+
+    def test_same_audio_across_levels_stored_once(self, storage, tmp_path):
+        source = write_source(tmp_path, "apple.mp3", b"apple audio")
+        cet4 = storage.store_audio_file("apple", "english", "CET-4", source, source="oxford")
+        cet6 = storage.store_audio_file("apple", "english", "CET-6", source, source="oxford")
+
+        assert cet4.file_path == cet6.file_path
+        assert cet4.blob_hash == cet6.blob_hash
+        assert storage.get_audio_file("apple", "english", "CET-6").file_path == cet4.file_path
+
+        stats = storage.get_storage_statistics()
+        assert stats["total_files"] == 2
+        assert stats["unique_blobs"] == 1
+        assert stats["dedup_ratio"] == 2.0
+
+    def test_reference_counting_and_gc(self, storage, tmp_path):
+        source = write_source(tmp_path, "cat.mp3", b"cat audio")
+        first = storage.store_audio_file("cat", "english", "CET-4", source)
+        second = storage.store_audio_file("cat", "english", "CET-6", source)
+
+        assert storage.delete_audio_file(first.id)
+        assert storage.collect_garbage(grace_seconds=0)["blobs_removed"] == 0
+        assert os.path.exists(second.file_path)
+
+        assert storage.delete_audio_file(second.id)
+        # 宽限期内不回收
+        assert storage.collect_garbage(grace_seconds=3600)["blobs_removed"] == 0
+        result = storage.collect_garbage(grace_seconds=0)
+        assert result == {"blobs_removed": 1, "bytes_freed": 9, "stray_files_removed": 0}
+        assert not os.path.exists(second.file_path)
+
+    def test_replacing_record_releases_old_blob(self, storage, tmp_path):
+        old = storage.store_audio_file("dog", "english", "CET-4", write_source(tmp_path, "d1.mp3", b"v1"))
+        new = storage.store_audio_file("dog", "english", "CET-4", write_source(tmp_path, "d2.mp3", b"v2"))
+
+        assert old.blob_hash != new.blob_hash
+        assert storage.get_storage_statistics()["unreferenced_blobs"] == 1
+        assert storage.collect_garbage(grace_seconds=0)["blobs_removed"] == 1
+        assert os.path.exists(new.file_path) and not os.path.exists(old.file_path)
+
+    def test_remove_source_and_stray_cleanup(self, storage, tmp_path):
+        crawled = write_source(tmp_path, "crawled.mp3", b"crawled")
+        storage.store_audio_file("egg", "english", "CET-4", crawled, source="crawler", remove_source=True)
+        assert not os.path.exists(crawled)
+
+        # 写入文件后、登记前中断留下的残留文件
+        stray = storage.blob_store.blob_path("f" * 64)
+        os.makedirs(os.path.dirname(stray), exist_ok=True)
+        write_source(os.path.dirname(stray), os.path.basename(stray), b"stray")
+
+        assert storage.cleanup_orphaned_files() == 1
+        assert not os.path.exists(stray)
+        assert storage.get_audio_file("egg", "english") is not None
+
+    def test_recount_repairs_reference_counts(self, storage, tmp_path):
+        record = storage.store_audio_file("fig", "english", "CET-4", write_source(tmp_path, "f.mp3", b"fig"))
+        storage._conn.execute("UPDATE audio_blobs SET ref_count = 5")
+        storage._conn.commit()
+
+        assert storage.recount_blob_references() == 1
+        count = storage._conn.execute("SELECT ref_count FROM audio_blobs WHERE sha256 = ?",
+                                      (record.blob_hash,)).fetchone()[0]
+        assert count == 1
+
+
+class TestAudioStoreMigration:
+    """旧存储迁移"""
+
+    def build_legacy_store(self, tmp_path, words: int, levels=("CET-4", "CET-5", "CET-6")):
+        storage_path = str(tmp_path / "audio")
+        with AudioStorage(storage_path) as legacy:
+            for i in range(words):
+                source = write_source(tmp_path, f"w{i}.mp3", f"audio-{i}".encode() * 512)
+                for level in levels:
+                    legacy.store_audio_file(f"word{i}", "english", level, source, source="oxford")
+        return storage_path
+
+    def test_migrate_and_rollback(self, tmp_path):
+        storage_path = self.build_legacy_store(tmp_path, 5)
+        assert check_content_addressed_status(storage_path)["pending_records"] == 15
+
+        result = migrate_to_content_addressed(storage_path)
+
+        assert result["records_migrated"] == 15
+        assert result["unique_blobs"] == 5
+        assert result["bytes_after"] * 3 == result["bytes_before"]
+        assert check_content_addressed_status(storage_path) == {
+            "content_addressed_schema": 1, "migrated_records": 15, "pending_records": 0, "unique_blobs": 5
+        }
+        assert not os.listdir(os.path.join(storage_path, "english", "CET-4"))
+
+        # 可重复执行
+        assert migrate_to_content_addressed(storage_path)["records_skipped"] == 15
+
+        with AudioStorage(storage_path, content_addressed=True) as storage:
+            record = storage.get_audio_file("word3", "english", "CET-5")
+            with open(record.file_path, 'rb') as f:
+                assert f.read() == b"audio-3" * 512
+
+        assert rollback_content_addressed(storage_path)
+        with AudioStorage(storage_path) as legacy:
+            record = legacy.get_audio_file("word3", "english", "CET-5")
+            assert record.blob_hash is None
+            assert os.path.basename(os.path.dirname(record.file_path)) == "CET-5"
+            with open(record.file_path, 'rb') as f:
+                assert f.read() == b"audio-3" * 512
+        assert not os.path.exists(os.path.join(storage_path, "blobs"))
+
+    def test_migration_skips_missing_files(self, tmp_path):
+        storage_path = self.build_legacy_store(tmp_path, 2, levels=("CET-4",))
+        os.remove(os.path.join(storage_path, "english", "CET-4", "oxford_word0.mp3"))
+
+        result = migrate_to_content_addressed(storage_path)
+
+        assert result["missing_files"] == 1
+        assert result["records_migrated"] == 1
+
+
+class TestBlobStoreBenchmark:
+    """去重效果与清理耗时"""
+
+    def test_dedup_and_cleanup_cost(self, tmp_path):
+        words = int(os.environ.get("AUDIO_BLOB_BENCH_WORDS", "300"))
+        storage_path = TestAudioStoreMigration().build_legacy_store(tmp_path, words)
+
+        with AudioStorage(storage_path) as legacy:
+            legacy_size = legacy.get_storage_statistics()["total_size"]
+            started = time.perf_counter()
+            legacy.cleanup_orphaned_files()
+            legacy_cleanup = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = migrate_to_content_addressed(storage_path)
+        migrate_time = time.perf_counter() - started
+
+        with AudioStorage(storage_path, content_addressed=True) as storage:
+            started = time.perf_counter()
+            storage.collect_garbage(grace_seconds=0)
+            gc_time = time.perf_counter() - started
+            stats = storage.get_storage_statistics()
+
+        print(f"\n{words} 个单词 x 3 个级别")
+        print(f"旧存储: {legacy_size / 1024:.0f} KB, 孤立文件扫描 {legacy_cleanup * 1000:.1f} ms")
+        print(f"内容寻址: {stats['stored_size'] / 1024:.0f} KB ({stats['dedup_ratio']:.1f}x 去重), "
+              f"迁移 {migrate_time:.2f}s, 垃圾回收 {gc_time * 1000:.1f} ms")
+
+        assert result["unique_blobs"] == words
+        assert stats["stored_size"] * 3 == legacy_size
@@ -0,0 +1,288 @@
+"""
+离线音频包测试
+
+验证音频包的索引与 mmap 读取、内容未变化时跳过重建、增量重建只读取变化的源文件、
+Flask 与 FastAPI 下载接口的 Range / ETag，并比较整级别冷下载与逐个文件下载的耗时。
+"""
+
+import http.client
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from bilingual_tutor.audio.audio_bundle import AudioBundle, AudioBundleBuilder
+from bilingual_tutor.audio.pronunciation_manager import PronunciationManager
+from bilingual_tutor.storage.database import LearningDatabase, VocabularyItem
+from bilingual_tutor.web import audio_delivery
+from bilingual_tutor.web.app import create_app
+from bilingual_tutor.web.routes import api as api_routes
+
+from tests.test_audio_streaming import body_of, serve_flask
+
+
+def store_word(manager, tmp_path, word: str, content: bytes, level: str = "CET-4"):
+    source = tmp_path / f"src_{word}.mp3"
+    source.write_bytes(content)
+    return manager.storage.store_audio_file(word, "english", level, str(source))
+
+
+@pytest.fixture
+def manager(tmp_path):
+    pronunciation_manager = PronunciationManager(str(tmp_path / "audio"))
+    yield pronunciation_manager
+    pronunciation_manager.close()
+
+
+class TestAudioBundle:
+    """音频包格式与构建"""
+
+    def test_round_trip(self, manager, tmp_path):
+        words = {"zebra": b"z" * 300, "apple": b"a" * 100, "日本": b"\x00\x01" * 50}
+        for word, content in words.items():
+            store_word(manager, tmp_path, word, content)
+        store_word(manager, tmp_path, "other", b"o", level="CET-6")
+
+        result = manager.bundles.build("english", "CET-4")
+        assert result.rebuilt and result.entries == 3 and result.added == 3
+
+        with AudioBundle(result.path) as bundle:
+            assert len(bundle) == 3
+            assert list(bundle.words()) == sorted(words, key=lambda w: w.encode('utf-8'))
+            for word, content in words.items():
+                assert word in bundle
+                assert bundle.read(word) == content
+            assert "other" not in bundle and bundle.read("other") is None
+
+            # 索引中的偏移可直接用于 Range 请求
+            offset, length = bundle.index()["apple"]
+            with open(result.path, 'rb') as f:
+                f.seek(offset)
+                assert f.read(length) == words["apple"]
+
+    def test_unchanged_level_is_not_rebuilt(self, manager, tmp_path):
+        store_word(manager, tmp_path, "cat", b"cat")
+        first = manager.bundles.build("english", "CET-4")
+        mtime = os.stat(first.path).st_mtime_ns
+
+        second = manager.bundles.build("english", "CET-4")
+        assert not second.rebuilt
+        assert os.stat(second.path).st_mtime_ns == mtime
+
+    def test_incremental_rebuild_reads_only_changed_sources(self, manager, tmp_path):
+        for i in range(5):
+            store_word(manager, tmp_path, f"word{i}", f"audio-{i}".encode() * 10)
+        manager.bundles.build("english", "CET-4")
+        bundle = manager.bundles.open_bundle("english", "CET-4")
+
+        store_word(manager, tmp_path, "word2", b"changed")
+        store_word(manager, tmp_path, "word9", b"new")
+        result = manager.bundles.build("english", "CET-4")
+
+        assert (result.entries, result.reused, result.added) == (6, 4, 2)
+        reopened = manager.bundles.open_bundle("english", "CET-4")
+        assert reopened is not bundle
+        assert reopened.read("word2") == b"changed"
+        assert reopened.read("word9") == b"new"
+        assert reopened.read("word4") == b"audio-4" * 10
+        # 旧映射在替换后仍然可读
+        assert bundle.read("word2") == b"audio-2" * 10
+
+    def test_invalid_level_rejected(self, manager):
+        with pytest.raises(ValueError):
+            manager.bundles.bundle_path("english", "../secret")
+        with pytest.raises(ValueError):
+            manager.bundles.bundle_path("klingon", "CET-4")
+
+    def test_corrupt_bundle_is_rebuilt(self, manager, tmp_path):
+        store_word(manager, tmp_path, "dog", b"dog")
+        path = manager.bundles.bundle_path("english", "CET-4")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b"not a bundle" * 10)
+
+        result = manager.bundles.build("english", "CET-4")
+        assert result.rebuilt and result.added == 1
+        with pytest.raises(ValueError):
+            AudioBundle(str(tmp_path / "src_dog.mp3"))
+
+    def test_current_skips_scan_until_index_changes(self, manager, tmp_path, monkeypatch):
+        store_word(manager, tmp_path, "cat", b"cat")
+        scans = []
+        collect_sources = manager.bundles.collect_sources
+        monkeypatch.setattr(manager.bundles, "collect_sources",
+                            lambda *args: scans.append(args) or collect_sources(*args))
+
+        first = manager.bundles.current("english", "CET-4")
+        assert manager.bundles.current("english", "CET-4") is first
+        assert len(scans) == 1
+
+        # 同一进程的其他实例写入也会触发重建
+        other = PronunciationManager(manager.storage.storage_path)
+        try:
+            store_word(other, tmp_path, "dog", b"dog")
+        finally:
+            other.close()
+        second = manager.bundles.current("english", "CET-4")
+        assert len(scans) == 2 and second.entries == 2
+
+    def test_version_file_is_not_replaced_by_rebuild(self, manager, tmp_path):
+        store_word(manager, tmp_path, "cat", b"cat")
+        first = manager.bundles.current("english", "CET-4")
+        assert os.path.samefile(first.version_path, first.path)
+        with open(first.version_path, 'rb') as f:
+            first_content = f.read()
+
+        store_word(manager, tmp_path, "cat", b"meow")
+        second = manager.bundles.current("english", "CET-4")
+        assert second.version_path != first.version_path
+        # 正在下载上一版的请求仍然读到上一版的完整内容
+        with open(first.version_path, 'rb') as f:
+            assert f.read() == first_content
+        with AudioBundle(second.version_path) as bundle:
+            assert bundle.read("cat") == b"meow"
+
+        store_word(manager, tmp_path, "cat", b"purr")
+        third = manager.bundles.current("english", "CET-4")
+        assert not os.path.exists(first.version_path)
+        assert os.path.exists(second.version_path) and os.path.exists(third.version_path)
+
+
+@pytest.fixture
+def system(tmp_path, manager):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    for i in range(3):
+        store_word(manager, tmp_path, f"word{i}", bytes([i]) * 4096)
+    yield SimpleNamespace(learning_db=learning_db, pronunciation_manager=manager)
+    learning_db.close()
+
+
+@pytest.fixture
+def flask_client(system, monkeypatch):
+    monkeypatch.setattr(api_routes, "_system_integrator", system)
+    app = create_app()
+    app.config['TESTING'] = True
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = 'tester'
+    return client
+
+
+@pytest.fixture
+def fastapi_client(system, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from bilingual_tutor.web import fastapi_app
+
+    monkeypatch.setattr(fastapi_app, "system_integrator", system)
+    monkeypatch.setattr(fastapi_app, "learning_db", system.learning_db)
+    monkeypatch.setitem(fastapi_app.app.dependency_overrides, fastapi_app.require_user, lambda: "tester")
+    return TestClient(fastapi_app.app)
+
+
+@pytest.mark.parametrize("client_fixture", ["flask_client", "fastapi_client"])
+class TestAudioBundleEndpoint:
+    """Flask 与 FastAPI 音频包下载"""
+
+    def test_download_range_and_revalidate(self, client_fixture, request, tmp_path):
+        client = request.getfixturevalue(client_fixture)
+        url = "/api/audio/bundle/english/CET-4"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == audio_delivery.CACHE_CONTROL
+        assert response.headers["Accept-Ranges"] == "bytes"
+        content = body_of(response)
+
+        downloaded = tmp_path / "downloaded.bundle"
+        downloaded.write_bytes(content)
+        with AudioBundle(str(downloaded)) as bundle:
+            assert bundle.read("word1") == bytes([1]) * 4096
+            offset, length = bundle.entry("word2")
+
+        partial = client.get(url, headers={"Range": f"bytes={offset}-{offset + length - 1}"})
+        assert partial.status_code == 206
+        assert body_of(partial) == bytes([2]) * 4096
+
+        assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    def test_invalid_and_empty_levels(self, client_fixture, request):
+        client = request.getfixturevalue(client_fixture)
+        assert client.get("/api/audio/bundle/english/CET-6").status_code == 404
+        assert client.get("/api/audio/bundle/klingon/CET-4").status_code == 400
+
+
+def test_fastapi_bundle_requires_login(system, monkeypatch):
+    """FastAPI 与 Flask 一样，未登录时音频包接口返回 401"""
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from bilingual_tutor.web import fastapi_app
+
+    monkeypatch.setattr(fastapi_app, "system_integrator", system)
+    monkeypatch.setattr(fastapi_app, "learning_db", system.learning_db)
+    monkeypatch.setattr(fastapi_app, "compatibility_layer", None)
+    client = TestClient(fastapi_app.app)
+    assert client.get("/api/audio/bundle/english/CET-4").status_code == 401
+    assert client.get("/api/audio/bundle/english/CET-4",
+                      headers={"Authorization": "Bearer x"}).status_code == 401
+
+
+class TestAudioBundleBenchmark:
+    """构建耗时与整级别冷下载"""
+
+    def test_build_and_cold_download(self, tmp_path, manager, monkeypatch):
+        words = int(os.environ.get("AUDIO_BUNDLE_BENCH_WORDS", "300"))
+        size_kb = int(os.environ.get("AUDIO_BUNDLE_BENCH_KB", "8"))
+        learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+        vocab_ids = []
+        for i in range(words):
+            store_word(manager, tmp_path, f"word{i}", os.urandom(size_kb * 1024))
+            vocab_ids.append(learning_db.add_vocabulary(VocabularyItem(
+                word=f"word{i}", meaning="-", language="english", level="CET-4")))
+
+        full = manager.bundles.build("english", "CET-4")
+        for i in range(0, words, 10):
+            store_word(manager, tmp_path, f"word{i}", os.urandom(size_kb * 1024))
+        incremental = manager.bundles.build("english", "CET-4")
+        unchanged = manager.bundles.build("english", "CET-4")
+
+        monkeypatch.setattr(api_routes, "_system_integrator",
+                            SimpleNamespace(learning_db=learning_db, pronunciation_manager=manager))
+        port, headers, stop = serve_flask()
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+
+        def fetch(url):
+            conn.request("GET", url, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+
+        try:
+            started = time.perf_counter()
+            per_file_bytes = 0
+            for vocab_id in vocab_ids:
+                status, body = fetch(f"/api/audio/file/{vocab_id}")
+                assert status == 200
+                per_file_bytes += len(body)
+            per_file_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            status, body = fetch("/api/audio/bundle/english/CET-4")
+            bundle_time = time.perf_counter() - started
+            assert status == 200
+        finally:
+            conn.close()
+            stop()
+            learning_db.close()
+
+        print(f"\n{words} 个单词, 每个 {size_kb} KB")
+        print(f"完整构建: {full.seconds * 1000:.0f} ms ({full.size / 1024:.0f} KB)")
+        print(f"增量重建 ({incremental.added} 个变化): {incremental.seconds * 1000:.0f} ms, "
+              f"未变化: {unchanged.seconds * 1000:.0f} ms")
+        print(f"冷下载 逐个文件: {per_file_time * 1000:.0f} ms ({words} 次请求)")
+        print(f"冷下载 音频包: {bundle_time * 1000:.0f} ms (1 次请求, "
+              f"{per_file_time / bundle_time:.1f}x)")
+
+        assert incremental.added == len(range(0, words, 10))
+        assert not unchanged.rebuilt
+        assert len(body) >= per_file_bytes
@@ -0,0 +1,211 @@
+"""
+音频存储查找缓存测试
+
+验证持久连接、(word, language, level) 查找缓存与负缓存、写入/删除后的缓存失效、
+访问统计的批量写入，并报告热词查找延迟。
+"""
+
+import gc
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+import pytest
+
+from bilingual_tutor.audio.audio_storage import AudioStorage, access_db_path
+
+
+def write_source(directory, name: str) -> str:
+    path = os.path.join(str(directory), name)
+    with open(path, 'wb') as f:
+        f.write(b'ID3' + os.urandom(256))
+    return path
+
+
+def access_counts(db_path: str):
+    """各单词已写入的访问次数（访问统计保存在单独的数据库文件中）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS access", (access_db_path(db_path),))
+        return dict(conn.execute("""
+            SELECT r.word, COALESCE(a.access_count, 0)
+            FROM audio_records r LEFT JOIN access.audio_access a ON a.record_id = r.id
+        """).fetchall())
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    audio_storage = AudioStorage(str(tmp_path / "audio"), access_flush_interval=60)
+    yield audio_storage
+    audio_storage.close()
+
+
+class TestAudioLookupCache:
+    """查找缓存"""
+
+    def test_repeated_lookup_served_from_cache(self, storage, tmp_path):
+        stored = storage.store_audio_file("apple", "english", "CET-4", write_source(tmp_path, "a.mp3"))
+
+        first = storage.get_audio_file("apple", "english", "CET-4")
+        storage._conn.execute("DELETE FROM audio_records")  # 绕过 API，缓存不受影响
+        second = storage.get_audio_file("apple", "english", "CET-4")
+
+        assert first.file_path == stored.file_path
+        assert second is first
+
+    def test_negative_cache_invalidated_by_store(self, storage, tmp_path):
+        assert storage.get_audio_file("banana", "english", "CET-4") is None
+        assert storage.get_audio_file("banana", "english") is None
+
+        storage.store_audio_file("banana", "english", "CET-4", write_source(tmp_path, "b.mp3"))
+
+        assert storage.get_audio_file("banana", "english", "CET-4") is not None
+        assert storage.get_audio_file("banana", "english") is not None
+
+    def test_delete_invalidates_cache(self, storage, tmp_path):
+        record = storage.store_audio_file("cat", "english", "CET-4", write_source(tmp_path, "c.mp3"))
+        assert storage.get_audio_file("cat", "english") is not None
+
+        assert storage.delete_audio_file(record.id)
+
+        assert storage.get_audio_file("cat", "english") is None
+        assert storage.get_audio_file("cat", "english", "CET-4") is None
+
+    def test_writes_from_other_instance_invalidate_cache(self, storage, tmp_path):
+        other = AudioStorage(storage.storage_path)
+        try:
+            assert storage.get_audio_file("grape", "english") is None
+            other.store_audio_file("grape", "english", "CET-4", write_source(tmp_path, "h.mp3"))
+            assert storage.get_audio_file("grape", "english") is not None
+        finally:
+            other.close()
+
+    def test_writes_from_other_process_seen_after_check_interval(self, storage):
+        storage.version_check_interval = 0.05
+        assert storage.get_audio_file("melon", "english") is None
+        # 其他进程的写入（另一个连接，不经过本进程的 AudioStorage）
+        conn = sqlite3.connect(storage.db_path)
+        conn.execute("INSERT INTO audio_records (word, language, level, file_path) "
+                     "VALUES ('melon', 'english', 'CET-4', '/tmp/melon.mp3')")
+        conn.commit()
+        conn.close()
+        time.sleep(0.06)
+        assert storage.get_audio_file("melon", "english") is not None
+
+    def test_cache_is_bounded(self, tmp_path):
+        with AudioStorage(str(tmp_path / "audio"), cache_size=3) as storage:
+            for i in range(10):
+                storage.get_audio_file(f"word_{i}", "english")
+            assert len(storage._lookup_cache) == 3
+            assert ("word_9", "english", None) in storage._lookup_cache
+
+
+class TestAccessStatistics:
+    """访问统计聚合"""
+
+    def test_access_counts_aggregated_and_flushed(self, storage, tmp_path):
+        storage.store_audio_file("dog", "english", "CET-4", write_source(tmp_path, "d.mp3"))
+        storage.store_audio_file("いぬ", "japanese", "N5", write_source(tmp_path, "e.mp3"))
+        for _ in range(5):
+            storage.get_audio_file("dog", "english", "CET-4")
+        storage.get_audio_file("いぬ", "japanese")
+
+        assert access_counts(storage.db_path) == {"dog": 0, "いぬ": 0}
+        assert storage.flush_access_stats() == 2
+        assert access_counts(storage.db_path) == {"dog": 5, "いぬ": 1}
+
+    def test_flush_does_not_invalidate_other_instances(self, tmp_path):
+        with AudioStorage(str(tmp_path / "audio"), access_flush_interval=60) as writer, \
+                AudioStorage(str(tmp_path / "audio"), access_flush_interval=60,
+                             version_check_interval=0) as reader:
+            writer.store_audio_file("goat", "english", "CET-4", write_source(tmp_path, "h.mp3"))
+            cached = reader.get_audio_file("goat", "english")
+            token = reader.change_token()
+
+            writer.get_audio_file("goat", "english")
+            assert writer.flush_access_stats() == 1
+            # 索引库的 data_version 不变：其他实例的缓存和音频包的变化标识保持有效
+            assert reader.change_token() == token
+            assert reader.get_audio_file("goat", "english") is cached
+            # 读取时合并两个实例写入的访问次数
+            assert reader.search_audio_files(language="english")[0].access_count == 3
+
+    def test_search_and_close_flush_pending_counts(self, tmp_path):
+        storage = AudioStorage(str(tmp_path / "audio"), access_flush_interval=60)
+        storage.store_audio_file("egg", "english", "CET-4", write_source(tmp_path, "f.mp3"))
+        storage.get_audio_file("egg", "english")
+
+        assert storage.search_audio_files(language="english")[0].access_count == 1
+        storage.get_audio_file("egg", "english")
+        storage.close()
+
+        assert access_counts(storage.db_path) == {"egg": 2}
+
+    def test_background_flush(self, tmp_path):
+        with AudioStorage(str(tmp_path / "audio"), access_flush_interval=0.05) as storage:
+            storage.store_audio_file("fish", "english", "CET-4", write_source(tmp_path, "g.mp3"))
+            storage.get_audio_file("fish", "english")
+            deadline = time.time() + 5
+            while access_counts(storage.db_path)["fish"] == 0 and time.time() < deadline:
+                time.sleep(0.02)
+            assert access_counts(storage.db_path) == {"fish": 1}
+
+    def test_shared_flush_thread_does_not_pin_instances(self, tmp_path):
+        source = write_source(tmp_path, "i.mp3")
+        refs = []
+        for i in range(5):
+            storage = AudioStorage(str(tmp_path / f"audio{i}"), access_flush_interval=60)
+            storage.store_audio_file("kiwi", "english", "CET-4", source)
+            storage.get_audio_file("kiwi", "english")
+            refs.append(weakref.ref(storage))
+            del storage
+        gc.collect()
+        assert all(ref() is None for ref in refs)
+        # 所有实例共用一个写入线程
+        assert [thread.name for thread in threading.enumerate()].count("audio-access-flush") == 1
+
+
+class TestAudioLookupBenchmark:
+    """热词查找延迟基准"""
+
+    def test_warm_lookup_latency(self, tmp_path):
+        words = int(os.environ.get("AUDIO_CACHE_BENCH_WORDS", "200"))
+        lookups = int(os.environ.get("AUDIO_CACHE_BENCH_LOOKUPS", "20000"))
+        source = write_source(tmp_path, "source.mp3")
+
+        with AudioStorage(str(tmp_path / "audio"), access_flush_interval=60) as storage:
+            for i in range(words):
+                storage.store_audio_file(f"word_{i}", "english", "CET-4", source)
+
+            # 旧实现：每次查找各打开一次查询连接和统计连接
+            started = time.perf_counter()
+            for i in range(min(lookups, 500)):
+                conn = sqlite3.connect(storage.db_path)
+                conn.execute("SELECT * FROM audio_records WHERE word = ? AND language = ? "
+                             "ORDER BY quality DESC, access_count DESC LIMIT 1",
+                             (f"word_{i % words}", "english")).fetchone()
+                conn.close()
+                conn = sqlite3.connect(storage.db_path)
+                conn.execute("UPDATE audio_records SET access_count = access_count + 1 WHERE word = ?",
+                             (f"word_{i % words}",))
+                conn.commit()
+                conn.close()
+            legacy_us = (time.perf_counter() - started) / min(lookups, 500) * 1e6
+
+            for i in range(words):
+                storage.get_audio_file(f"word_{i}", "english")
+            started = time.perf_counter()
+            for i in range(lookups):
+                storage.get_audio_file(f"word_{i % words}", "english")
+            warm_us = (time.perf_counter() - started) / lookups * 1e6
+
+        print(f"\n{words} 个单词, {lookups} 次热词查找")
+        print(f"每次新建连接: {legacy_us:.1f} us/次")
+        print(f"缓存命中: {warm_us:.2f} us/次 ({legacy_us / warm_us:.0f}x)")
+
+        assert access_counts(storage.db_path)["word_1"] >= lookups // words
+        assert warm_us < legacy_us / 10
@@ -0,0 +1,280 @@
+"""
+音频分发接口测试
+
+验证 Flask 与 FastAPI 音频下载接口的 Range 请求、强 ETag / 304、Cache-Control
+和批量音频清单，并在本地 werkzeug / uvicorn 服务器上测量整文件、Range 和 304 的吞吐量。
+"""
+
+import http.client
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from bilingual_tutor.audio.pronunciation_manager import PronunciationManager
+from bilingual_tutor.storage.database import LearningDatabase, VocabularyItem
+from bilingual_tutor.storage.session_store import SQLiteSessionStore
+from bilingual_tutor.web import audio_delivery
+from bilingual_tutor.web.app import create_app
+from bilingual_tutor.web.routes import api as api_routes
+
+
+AUDIO_BYTES = bytes(range(256)) * 64  # 16 KB
+
+
+def body_of(response) -> bytes:
+    """Flask 测试响应用 data，httpx 响应用 content"""
+    return response.content if hasattr(response, "content") else response.data
+
+
+def json_of(response):
+    return response.get_json() if hasattr(response, "get_json") else response.json()
+
+
+@pytest.fixture
+def system(tmp_path):
+    """带有两个词汇（一个有音频）的最小系统集成器"""
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    manager = PronunciationManager(str(tmp_path / "audio"))
+    with_audio = learning_db.add_vocabulary(VocabularyItem(
+        word="apple", meaning="苹果", language="english", level="CET-4"))
+    without_audio = learning_db.add_vocabulary(VocabularyItem(
+        word="ねこ", meaning="猫", language="japanese", level="N5"))
+
+    source = tmp_path / "apple.mp3"
+    source.write_bytes(AUDIO_BYTES)
+    manager.storage.store_audio_file("apple", "english", "CET-4", str(source))
+
+    yield SimpleNamespace(learning_db=learning_db, pronunciation_manager=manager,
+                          with_audio=with_audio, without_audio=without_audio)
+    manager.close()
+    learning_db.close()
+
+
+@pytest.fixture
+def flask_client(system, monkeypatch):
+    monkeypatch.setattr(api_routes, "_system_integrator", system)
+    app = create_app()
+    app.config['TESTING'] = True
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = 'tester'
+    return client
+
+
+@pytest.fixture
+def fastapi_client(system, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from bilingual_tutor.web import fastapi_app
+
+    monkeypatch.setattr(fastapi_app, "system_integrator", system)
+    monkeypatch.setattr(fastapi_app, "learning_db", system.learning_db)
+    monkeypatch.setitem(fastapi_app.app.dependency_overrides, fastapi_app.require_user, lambda: "tester")
+    # 不进入 lifespan，避免初始化完整系统
+    return TestClient(fastapi_app.app)
+
+
+class TestAudioDeliveryHelpers:
+    """共用的 ETag 与清单逻辑"""
+
+    def test_etag_changes_with_file(self, tmp_path):
+        path = tmp_path / "a.mp3"
+        path.write_bytes(b"abc")
+        first = audio_delivery.make_etag(os.stat(path))
+        path.write_bytes(b"abcd")
+        assert audio_delivery.make_etag(os.stat(path)) != first
+
+    def test_etag_matches(self):
+        assert audio_delivery.etag_matches('"x", W/"abc"', "abc")
+        assert audio_delivery.etag_matches("*", "abc")
+        assert not audio_delivery.etag_matches('"abd"', "abc")
+        assert not audio_delivery.etag_matches(None, "abc")
+
+    def test_parse_vocab_ids(self):
+        assert audio_delivery.parse_vocab_ids("3,1,3,") == [3, 1]
+        with pytest.raises(ValueError):
+            audio_delivery.parse_vocab_ids("")
+        with pytest.raises(ValueError):
+            audio_delivery.parse_vocab_ids(",".join(["1"] * (audio_delivery.MAX_MANIFEST_ITEMS + 1)))
+
+
+@pytest.mark.parametrize("client_fixture", ["flask_client", "fastapi_client"])
+class TestAudioEndpoints:
+    """Flask 与 FastAPI 接口行为一致"""
+
+    def test_full_download_with_cache_headers(self, client_fixture, system, request):
+        client = request.getfixturevalue(client_fixture)
+        response = client.get(f"/api/audio/file/{system.with_audio}")
+
+        assert response.status_code == 200
+        assert body_of(response) == AUDIO_BYTES
+        assert response.headers["Cache-Control"] == audio_delivery.CACHE_CONTROL
+        assert response.headers["Accept-Ranges"] == "bytes"
+        etag = response.headers["ETag"]
+        assert etag.startswith('"') and not etag.startswith('W/')
+
+        cached = client.get(f"/api/audio/file/{system.with_audio}", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+
+    def test_range_requests(self, client_fixture, system, request):
+        client = request.getfixturevalue(client_fixture)
+        url = f"/api/audio/file/{system.with_audio}"
+
+        partial = client.get(url, headers={"Range": "bytes=100-199"})
+        assert partial.status_code == 206
+        assert body_of(partial) == AUDIO_BYTES[100:200]
+        assert partial.headers["Content-Range"] == f"bytes 100-199/{len(AUDIO_BYTES)}"
+
+        suffix = client.get(url, headers={"Range": "bytes=-10"})
+        assert suffix.status_code == 206
+        assert body_of(suffix) == AUDIO_BYTES[-10:]
+
+        assert client.get(url, headers={"Range": f"bytes={len(AUDIO_BYTES)}-"}).status_code == 416
+
+        # If-Range 不匹配时返回完整文件
+        stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert stale.status_code == 200
+
+    def test_missing_audio_and_vocabulary(self, client_fixture, system, request):
+        client = request.getfixturevalue(client_fixture)
+        assert client.get(f"/api/audio/file/{system.without_audio}").status_code == 404
+        assert client.get("/api/audio/file/999999").status_code == 404
+
+    def test_manifest(self, client_fixture, system, request):
+        client = request.getfixturevalue(client_fixture)
+        response = client.get(f"/api/audio/manifest?ids={system.without_audio},{system.with_audio},999999")
+        manifest = json_of(response)
+
+        assert response.status_code == 200
+        entries = manifest["audio"]
+        assert [entry["vocab_id"] for entry in entries] == [system.without_audio, system.with_audio]
+        assert not entries[0]["audio_available"]
+        assert entries[1]["audio_url"] == f"/api/audio/file/{system.with_audio}"
+        assert entries[1]["size"] == len(AUDIO_BYTES)
+        assert "audio_path" not in entries[1]
+
+        file_response = client.get(entries[1]["audio_url"])
+        assert file_response.headers["ETag"] == entries[1]["etag"]
+        assert client.get("/api/audio/manifest?ids=abc").status_code in (400, 422)
+
+
+def test_audio_endpoints_require_login(system, monkeypatch):
+    """FastAPI 与 Flask 一样，未登录时音频接口返回 401"""
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from bilingual_tutor.web import fastapi_app
+
+    monkeypatch.setattr(fastapi_app, "system_integrator", system)
+    monkeypatch.setattr(fastapi_app, "learning_db", system.learning_db)
+    monkeypatch.setattr(fastapi_app, "compatibility_layer", None)
+    client = TestClient(fastapi_app.app)
+    urls = [f"/api/audio/file/{system.with_audio}", f"/api/audio/manifest?ids={system.with_audio}"]
+    for url in urls:
+        assert client.get(url).status_code == 401
+        # 任意编造的令牌无效
+        assert client.get(url, headers={"Authorization": "Bearer x"}).status_code == 401
+
+    # 登录后签发的服务端会话 ID 可作为 Bearer 令牌或会话 Cookie
+    sessions = SQLiteSessionStore(system.learning_db)
+    sessions.save("valid-session", {"user_id": "tester"}, 3600, user_id="tester")
+    sessions.save("expired-session", {"user_id": "tester"}, -1, user_id="tester")
+    for url in urls:
+        assert client.get(url, headers={"Authorization": "Bearer valid-session"}).status_code == 200
+        assert client.get(url, headers={"Authorization": "Bearer expired-session"}).status_code == 401
+    client.cookies.set(fastapi_app.SESSION_COOKIE, "valid-session")
+    assert client.get(urls[1]).status_code == 200
+
+
+def serve_flask():
+    """在后台线程启动 werkzeug 服务器，返回 (端口, 请求头, 停止函数)"""
+    from werkzeug.serving import make_server
+
+    app = create_app()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = 'bench'
+    headers = {"Cookie": f"session={client.get_cookie('session').value}"}
+    return server.server_port, headers, server.shutdown
+
+
+def serve_fastapi():
+    """在后台线程启动 uvicorn 服务器，返回 (端口, 请求头, 停止函数)"""
+    uvicorn = pytest.importorskip("uvicorn")
+    from bilingual_tutor.web import fastapi_app
+
+    config = uvicorn.Config(fastapi_app.app, host="127.0.0.1", port=0, lifespan="off",
+                            log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=5)
+    return port, {}, stop
+
+
+class TestAudioStreamingBenchmark:
+    """本地服务器吞吐量基准"""
+
+    @pytest.mark.parametrize("backend", ["flask", "fastapi"])
+    def test_local_server_throughput(self, backend, system, tmp_path, monkeypatch):
+        requests_count = int(os.environ.get("AUDIO_STREAM_BENCH_REQUESTS", "200"))
+        size_kb = int(os.environ.get("AUDIO_STREAM_BENCH_KB", "256"))
+        payload = os.urandom(size_kb * 1024)
+        source = tmp_path / "large.mp3"
+        source.write_bytes(payload)
+        system.pronunciation_manager.storage.store_audio_file("apple", "english", "CET-4", str(source))
+
+        if backend == "flask":
+            monkeypatch.setattr(api_routes, "_system_integrator", system)
+            port, headers, stop = serve_flask()
+        else:
+            from bilingual_tutor.web import fastapi_app
+            monkeypatch.setattr(fastapi_app, "system_integrator", system)
+            monkeypatch.setattr(fastapi_app, "learning_db", system.learning_db)
+            monkeypatch.setitem(fastapi_app.app.dependency_overrides, fastapi_app.require_user, lambda: "bench")
+            port, headers, stop = serve_fastapi()
+
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+
+        def fetch(extra_headers=None):
+            conn.request("GET", f"/api/audio/file/{system.with_audio}",
+                         headers={**headers, **(extra_headers or {})})
+            response = conn.getresponse()
+            return response, response.read()
+
+        def rate(extra_headers=None):
+            started = time.perf_counter()
+            for _ in range(requests_count):
+                response, body = fetch(extra_headers)
+            return requests_count / (time.perf_counter() - started), response, body
+
+        try:
+            full_rate, response, body = rate()
+            assert body == payload
+            etag = response.getheader("ETag")
+            range_rate, response, body = rate({"Range": "bytes=0-16383"})
+            assert response.status == 206 and body == payload[:16384]
+            revalidate_rate, response, _ = rate({"If-None-Match": etag})
+            assert response.status == 304
+        finally:
+            conn.close()
+            stop()
+
+        print(f"\n[{backend}] {requests_count} 次请求, 文件 {size_kb} KB")
+        print(f"整文件下载: {full_rate:.0f} 次/秒 ({full_rate * size_kb / 1024:.1f} MB/s)")
+        print(f"Range 16 KB: {range_rate:.0f} 次/秒")
+        print(f"ETag 重新验证 (304): {revalidate_rate:.0f} 次/秒")
+
+        assert revalidate_rate > 0
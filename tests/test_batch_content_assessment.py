@@ -0,0 +1,163 @@
+"""
+批量内容评估测试
+
+验证进程池批量评估与逐条评估结果一致，结果按完成顺序流式返回，
+并给出批量分级吞吐量基准。
+"""
+
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from bilingual_tutor.content.batch_assessment import BatchAssessmentResult, batch_assess
+from bilingual_tutor.content.content_quality_assessor import ContentQualityAssessor
+from bilingual_tutor.content.level_content_integration import LevelContentIntegration
+from bilingual_tutor.content.memory_manager import MemoryManager
+from bilingual_tutor.models import Content, ContentType, UserProfile, Goals, Preferences, Skill
+
+
+ENGLISH_BODY = (
+    "Students learn many useful skills at school. The teacher explains how knowledge "
+    "develops when we study with friends. Comprehensive analytical perspectives would "
+    "necessitate nuanced considerations of theoretical paradigms. "
+)
+JAPANESE_BODY = "私は毎日学校で日本語を勉強します。先生はとても親切で、友達と一緒に本を読んでいます。"
+
+
+def make_contents(count: int):
+    """Create a mixed English/Japanese corpus for assessment."""
+    contents = []
+    for i in range(count):
+        english = i % 2 == 0
+        contents.append(Content(
+            content_id=f"batch_{i}",
+            title=f"Article {i}" if english else f"記事 {i}",
+            body=(ENGLISH_BODY if english else JAPANESE_BODY) * (1 + i % 4),
+            language="english" if english else "japanese",
+            difficulty_level=["CET-4", "CET-5", "CET-6"][i % 3] if english else ["N5", "N4", "N3", "N2", "N1"][i % 5],
+            content_type=ContentType.ARTICLE,
+            source_url="https://www.bbc.com/learning" if i % 3 == 0 else "https://example.com/a",
+            quality_score=0.0,
+            created_at=datetime.now(),
+            tags=[]
+        ))
+    return contents
+
+
+class TestBatchAssessment:
+    """批量评估功能测试"""
+
+    def test_inline_results_match_sequential(self):
+        """单进程模式结果应与逐条调用一致"""
+        assessor = ContentQualityAssessor()
+        contents = make_contents(20)
+
+        results = sorted(assessor.batch_assess(contents, workers=1, chunk_size=3), key=lambda r: r.index)
+
+        assert [r.index for r in results] == list(range(20))
+        for content, result in zip(contents, results):
+            assert isinstance(result, BatchAssessmentResult)
+            assert result.success
+            assert result.content_id == content.content_id
+            assert result.quality_score == assessor.assess_content_quality(content)
+            assert result.level_grading == assessor.grade_content_level(content)
+
+    def test_process_pool_results_match_sequential(self):
+        """进程池模式结果应与逐条调用一致"""
+        assessor = ContentQualityAssessor()
+        contents = make_contents(40)
+
+        results = sorted(batch_assess(contents, workers=2, chunk_size=4), key=lambda r: r.index)
+
+        assert len(results) == len(contents)
+        for content, result in zip(contents, results):
+            assert result.success
+            assert result.quality_score == assessor.assess_content_quality(content)
+            assert result.level_grading.assigned_level == assessor.grade_content_level(content).assigned_level
+
+    def test_streams_lazily_from_generator(self):
+        """输入迭代器应被增量消费，结果流式返回"""
+        consumed = []
+
+        def source():
+            for content in make_contents(50):
+                consumed.append(content.content_id)
+                yield content
+
+        stream = batch_assess(source(), workers=2, chunk_size=5, max_pending_chunks=2)
+        first = next(stream)
+
+        assert isinstance(first, BatchAssessmentResult)
+        assert len(consumed) < 50
+        assert len(list(stream)) == 49
+
+    def test_item_errors_are_reported_per_item(self):
+        """单条内容出错时不影响其他内容"""
+        contents = make_contents(3)
+        contents[1].body = None
+
+        results = sorted(batch_assess(contents, workers=1), key=lambda r: r.index)
+
+        assert results[0].success and results[2].success
+        assert not results[1].success
+        assert results[1].quality_score is None
+
+    def test_batch_process_content_with_workers(self):
+        """LevelContentIntegration 批量处理在多进程模式下分类一致"""
+        integration = LevelContentIntegration(MemoryManager())
+        profile = UserProfile(
+            user_id="batch_user",
+            english_level="CET-4",
+            japanese_level="N5",
+            daily_study_time=60,
+            target_goals=Goals(
+                target_english_level="CET-6",
+                target_japanese_level="N1",
+                target_completion_date=datetime.now(),
+                priority_skills=[Skill.READING],
+                custom_objectives=[]
+            ),
+            learning_preferences=Preferences(
+                preferred_study_times=["evening"],
+                content_preferences=[ContentType.ARTICLE],
+                difficulty_preference="moderate",
+                language_balance={"english": 0.5, "japanese": 0.5}
+            ),
+            weak_areas=[],
+            created_at=datetime.now(),
+            updated_at=datetime.now()
+        )
+        contents = make_contents(24)
+
+        sequential = integration.batch_process_content(contents, profile)
+        parallel = integration.batch_process_content(contents, profile, workers=2)
+
+        for category in sequential:
+            assert [c.content_id for c in sequential[category]] == \
+                [c.content_id for c in parallel[category]]
+
+
+class TestBatchAssessmentBenchmark:
+    """批量分级吞吐量基准"""
+
+    def test_batch_grading_throughput(self):
+        """比较单进程与多进程的批量分级吞吐量"""
+        article_count = int(os.environ.get("BATCH_ASSESS_BENCH_ARTICLES", "2000"))
+        contents = make_contents(article_count)
+        workers = os.cpu_count() or 1
+
+        start = time.perf_counter()
+        inline_count = sum(1 for _ in batch_assess(contents, workers=1))
+        inline_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pool_count = sum(1 for _ in batch_assess(contents, workers=max(2, workers), chunk_size=128))
+        pool_time = time.perf_counter() - start
+
+        print(f"单进程: {article_count / inline_time:.0f} 篇/秒")
+        print(f"{max(2, workers)} 进程: {article_count / pool_time:.0f} 篇/秒 "
+              f"(加速比 {inline_time / pool_time:.2f}x, CPU核数 {workers})")
+
+        assert inline_count == pool_count == article_count
@@ -0,0 +1,225 @@
+"""
+词汇批量导入测试
+
+验证 JSON（vocabulary_data 格式）/ NDJSON / CSV 输入的解析、UPSERT 合并保持词汇 id 不变
+（学习记录和音频链接不失效）、内容未变的行不写入、无效行被剔除、失败时整体回滚、
+删除并重建索引后索引定义和全文检索与导入前一致，
+并测量大批量导入的速度（BULK_BENCH_ROWS=1000000 为完整规模）。
+"""
+
+import csv
+import json
+import os
+import time
+
+import pytest
+
+from bilingual_tutor.storage.bulk_load import (
+    VOCABULARY_COLUMNS, bulk_load_vocabulary, iter_vocabulary_file, main, normalize_vocabulary_row
+)
+from bilingual_tutor.storage.database import LearningDatabase, VocabularyItem
+
+VOCABULARY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vocabulary_data")
+
+
+@pytest.fixture
+def db(tmp_path):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    yield learning_db
+    learning_db.close()
+
+
+def vocabulary_ids(db):
+    with db._pool.get_connection() as conn:
+        return {(row[1], row[2], row[3]): row[0] for row in conn.execute(
+            "SELECT id, word, language, level FROM vocabulary")}
+
+
+def index_definitions(db):
+    with db._pool.get_connection() as conn:
+        return sorted(tuple(row) for row in conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE tbl_name IN ('vocabulary', 'vocabulary_fts') "
+            "AND type IN ('index', 'trigger')"))
+
+
+def make_rows(count, start=0, meaning="释义"):
+    return [normalize_vocabulary_row({'word': f"word{i}", 'meaning': f"{meaning}{i}",
+                                      'example': f"an example of word{i}"},
+                                     "english" if i % 2 else "japanese", "CET-4" if i % 3 else "N5")
+            for i in range(start, start + count)]
+
+
+class TestVocabularyFiles:
+    """输入文件解析"""
+
+    def test_custom_vocabulary_json(self):
+        rows = list(iter_vocabulary_file(os.path.join(VOCABULARY_DIR, "custom_english.json")))
+        assert rows
+        record = dict(zip(VOCABULARY_COLUMNS, rows[0]))
+        assert record['word'] == "abandon" and record['reading'] == "/əˈbændən/"
+        assert record['language'] == "english" and record['level'] == "CET-4" and record['category'] == "verb"
+        assert record['example_translation'] == "我们不得不放弃这辆车。" and record['tags'] == "cet-4"
+
+    def test_ndjson_and_csv(self, tmp_path):
+        ndjson_path = tmp_path / "words.ndjson"
+        ndjson_path.write_text('{"word": "猫", "reading": "ねこ", "meaning": "猫", "level": "N5"}\n\n'
+                               '{"word": "犬", "meaning": "狗", "level": "N4", "language": "japanese"}\n',
+                               encoding="utf-8")
+        rows = [dict(zip(VOCABULARY_COLUMNS, row)) for row in iter_vocabulary_file(str(ndjson_path), "japanese")]
+        assert [(row['word'], row['language'], row['level']) for row in rows] == [
+            ("猫", "japanese", "N5"), ("犬", "japanese", "N4")]
+
+        csv_path = tmp_path / "words.csv"
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["word", "phonetic", "meaning", "pos"])
+            writer.writerow(["apple", "/ˈæpl/", "n. 苹果", "noun"])
+        rows = [dict(zip(VOCABULARY_COLUMNS, row)) for row in iter_vocabulary_file(str(csv_path), "english", "CET-4")]
+        assert rows[0]['reading'] == "/ˈæpl/" and rows[0]['category'] == "noun" and rows[0]['level'] == "CET-4"
+
+        bad_path = tmp_path / "words.ndjson"
+        bad_path.write_text('{"word": "x"}\nnot json\n', encoding="utf-8")
+        with pytest.raises(ValueError):
+            list(iter_vocabulary_file(str(bad_path)))
+        with pytest.raises(ValueError):
+            list(iter_vocabulary_file(str(tmp_path / "words.xml")))
+
+
+class TestBulkLoad:
+    """UPSERT 合并"""
+
+    def test_reload_keeps_ids_and_links(self, db):
+        result = db.bulk_load_vocabulary(make_rows(500))
+        assert (result.staged, result.inserted, result.updated, result.unchanged) == (500, 500, 0, 0)
+        ids = vocabulary_ids(db)
+        word = ids[("word7", "english", "CET-4")]
+        db.record_learning("alice", word, "vocabulary", True)
+        with db._pool.get_connection() as conn:
+            conn.execute("INSERT INTO audio_files (word, language, level, file_path, vocabulary_id) "
+                         "VALUES ('word7', 'english', 'CET-4', '/audio/word7.mp3', ?)", (word,))
+            conn.commit()
+
+        # 重新导入：前 100 个释义改变，其余相同，另有 50 个新词
+        rows = make_rows(100, meaning="新释义") + make_rows(400, start=100) + make_rows(50, start=500)
+        result = db.bulk_load_vocabulary(rows, batch_size=120)
+        assert (result.inserted, result.updated, result.unchanged) == (50, 100, 400)
+        after = vocabulary_ids(db)
+        assert {key: after[key] for key in ids} == ids
+        assert db.get_vocabulary_by_id(word).meaning == "新释义7"
+        assert db.get_latest_learning_record("alice", word, "vocabulary").learn_count == 1
+        with db._pool.get_connection() as conn:
+            assert conn.execute("SELECT v.word FROM audio_files a JOIN vocabulary v ON v.id = a.vocabulary_id"
+                                ).fetchone()[0] == "word7"
+
+        # 全文索引随更新同步，没有孤立行
+        assert [item['title'] for item in db.search("新释义99", item_type="vocabulary")["results"]] == ["word99"]
+        assert db.rebuild_search_index()['vocabulary'] == {'removed': 0, 'added': 0}
+
+    def test_add_vocabulary_batch_updates_in_place(self, db):
+        item = VocabularyItem(word="study", meaning="学习", language="english", level="CET-4")
+        assert db.add_vocabulary_batch([item]) == 1
+        first = vocabulary_ids(db)[("study", "english", "CET-4")]
+        item.meaning = "研究"
+        assert db.add_vocabulary_batch([item, VocabularyItem(word="learn", meaning="学", language="english",
+                                                             level="CET-4")]) == 2
+        assert vocabulary_ids(db)[("study", "english", "CET-4")] == first
+        assert db.get_vocabulary_by_id(first).meaning == "研究"
+        # 内容未变的行也计入（爬虫据此报告添加数量）
+        assert db.add_vocabulary_batch([item]) == 1
+
+    def test_add_vocabulary_updates_in_place(self, db):
+        item = VocabularyItem(word="answer", meaning="回答", language="english", level="CET-4")
+        first = db.add_vocabulary(item)
+        db.record_learning("alice", first, "vocabulary", True)
+
+        item.meaning = "答案"
+        assert db.add_vocabulary(item) == first
+        assert db.add_vocabulary(item) == first  # 内容未变
+        assert db.get_vocabulary_by_id(first).meaning == "答案"
+        assert db.get_latest_learning_record("alice", first, "vocabulary").learn_count == 1
+        assert [r['title'] for r in db.search("答案", item_type="vocabulary")["results"]] == ["answer"]
+        assert db.rebuild_search_index()['vocabulary'] == {'removed': 0, 'added': 0}
+
+    def test_file_import_rebuilds_indexes_above_threshold(self, db, tmp_path, monkeypatch):
+        path = tmp_path / "words.ndjson"
+        path.write_text("".join(json.dumps({'word': f"w{i}", 'meaning': f"m{i}"}) + "\n" for i in range(30)),
+                        encoding="utf-8")
+        monkeypatch.setattr("bilingual_tutor.storage.bulk_load.REBUILD_INDEX_ROWS", 50)
+        result = db.import_vocabulary_files([str(path)], "english", "CET-4")
+        assert result.staged == 30 and not result.indexes_rebuilt
+        monkeypatch.setattr("bilingual_tutor.storage.bulk_load.REBUILD_INDEX_ROWS", 20)
+        result = db.import_vocabulary_files([str(path)], "english", "CET-4")
+        assert result.unchanged == 30 and result.indexes_rebuilt
+
+    def test_invalid_rows_and_rollback(self, db):
+        rows = make_rows(10) + [normalize_vocabulary_row({'word': "", 'meaning': "空"}, "english", "CET-4"),
+                                normalize_vocabulary_row({'word': "nolevel", 'meaning': "无级别"}, "english")]
+        result = db.bulk_load_vocabulary(rows)
+        assert result.rejected == 2 and result.inserted == 10
+
+        def failing():
+            yield from make_rows(5, start=100)
+            raise RuntimeError("输入中断")
+
+        before = index_definitions(db)
+        with pytest.raises(RuntimeError):
+            db.bulk_load_vocabulary(failing(), batch_size=2, rebuild_indexes=True)
+        assert len(vocabulary_ids(db)) == 10
+        assert index_definitions(db) == before
+
+    def test_rebuild_indexes_restores_schema(self, db):
+        db.bulk_load_vocabulary(make_rows(200))
+        before = index_definitions(db)
+        result = db.bulk_load_vocabulary(make_rows(300, start=100, meaning="改"), rebuild_indexes=True)
+        assert result.indexes_rebuilt and (result.inserted, result.updated) == (200, 100)
+        assert index_definitions(db) == before
+        assert [item['title'] for item in db.search("改250", item_type="vocabulary")['results']] == ["word250"]
+        with db._pool.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM vocabulary_fts").fetchone()[0] == 400
+            plan = " ".join(row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM vocabulary WHERE language = 'english' AND level = 'N5'"))
+        assert "idx_vocab_language_level" in plan
+
+        # 新词触发器在重建后照常工作
+        db.add_vocabulary(VocabularyItem(word="afterwards", meaning="之后", language="english", level="CET-4"))
+        assert db.search("afterwards")['results']
+
+    def test_command_line(self, tmp_path, capsys):
+        path = str(tmp_path / "learning.db")
+        assert main([path, os.path.join(VOCABULARY_DIR, "custom_english.json"),
+                     os.path.join(VOCABULARY_DIR, "custom_japanese.json")]) == 0
+        assert "行/s" in capsys.readouterr().out
+        db = LearningDatabase(path)
+        try:
+            assert db.get_vocabulary_count("english") > 0 and db.get_vocabulary_count("japanese") > 0
+        finally:
+            db.close()
+
+
+class TestBulkLoadBenchmark:
+    """大批量导入速度（BULK_BENCH_ROWS 调整规模）"""
+
+    def test_ingest_rate(self, tmp_path):
+        rows = int(os.environ.get("BULK_BENCH_ROWS", "200000"))
+        path = tmp_path / "words.ndjson"
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(rows):
+                f.write(json.dumps({'word': f"word{i}", 'meaning': f"释义{i}", 'example': f"an example of word{i}",
+                                    'language': "english" if i % 2 else "japanese",
+                                    'level': "CET-4" if i % 3 else "N5"}, ensure_ascii=False) + "\n")
+
+        print(f"\n导入 {rows} 行词汇（NDJSON）:")
+        for label, rebuild in (("逐行维护索引", False), ("删除并重建索引", True)):
+            db = LearningDatabase(str(tmp_path / f"bench_{rebuild}.db"))
+            try:
+                result = db.bulk_load_vocabulary(iter_vocabulary_file(str(path)), rebuild_indexes=rebuild)
+                assert result.inserted == rows
+                print(f"  {label}: {result.seconds:.1f}s, {result.rows_per_second:.0f} 行/s")
+
+                started = time.perf_counter()
+                result = db.bulk_load_vocabulary(iter_vocabulary_file(str(path)), rebuild_indexes=rebuild)
+                assert result.unchanged == rows
+                print(f"  {label}（重复导入，内容未变）: {time.perf_counter() - started:.1f}s, "
+                      f"{result.rows_per_second:.0f} 行/s")
+            finally:
+                db.close()
@@ -0,0 +1,200 @@
+"""
+Tests for the NumPy columnar analytics path.
+
+Checks that the vectorized study-pattern and bottleneck analyses match the
+row-by-row implementation, that trajectories use a least-squares fit, that
+batch reports match single-user reports, and benchmarks batch report
+generation.
+"""
+
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bilingual_tutor.analysis import columnar_analytics
+from bilingual_tutor.analysis.learning_analytics import LearningAnalyticsEnhancer
+from bilingual_tutor.models import ActivityType, Skill
+
+
+ACTIVITIES = [activity.value for activity in ActivityType]
+
+
+def make_sessions(rng: random.Random, days: int, start: datetime = None):
+    """Generate one session per day with random time, score and activities."""
+    start = start or datetime.now() - timedelta(days=days)
+    sessions = []
+    for day in range(days):
+        session = {
+            'start_time': (start + timedelta(days=day, hours=rng.randrange(24),
+                                             minutes=rng.randrange(60))).isoformat(),
+            'performance_score': round(rng.random(), 2),
+            'activities': rng.sample(ACTIVITIES, rng.randint(1, 3)),
+            'language': rng.choice(['english', 'japanese'])
+        }
+        if rng.random() < 0.9:
+            session['duration_minutes'] = rng.randint(10, 90)
+        if rng.random() < 0.05:
+            del session['start_time']
+        sessions.append(session)
+    return sessions
+
+
+def load_enhancers(sessions_by_user, **kwargs):
+    """Build a vectorized and a row-by-row enhancer with the same history."""
+    vectorized = LearningAnalyticsEnhancer(vectorized=True, **kwargs)
+    rowwise = LearningAnalyticsEnhancer(vectorized=False, **kwargs)
+    for user_id, sessions in sessions_by_user.items():
+        vectorized.study_history[user_id] = sessions
+        rowwise.study_history[user_id] = sessions
+    return vectorized, rowwise
+
+
+class TestColumnarKernels:
+    """Tests for the grouped NumPy kernels."""
+
+    def test_best_bucket_prefers_first_seen_on_ties(self):
+        keys = np.array([1, 0, 2, 3])
+        means, counts = columnar_analytics.grouped_mean(keys, np.array([0.5, 0.5, 0.0, 0.2]), 4)
+        first = columnar_analytics.first_index(keys, 4)
+
+        best = columnar_analytics.best_bucket(means, counts, first, 2)
+
+        assert best.tolist() == [1, 1]
+
+    def test_best_bucket_requires_positive_mean(self):
+        means, counts = columnar_analytics.grouped_mean(np.array([0]), np.array([0.0]), 2)
+        assert columnar_analytics.best_bucket(means, counts, np.zeros(2, dtype=np.int64), 2).tolist() == [-1]
+
+    def test_grouped_tail_mean_uses_last_values(self):
+        keys = np.array([0, 1, 0, 0, 0, 0, 0, 0])
+        values = np.array([0.0, 1.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6])
+
+        means, counts = columnar_analytics.grouped_tail_mean(keys, values, 2, 5)
+
+        assert counts.tolist() == [7, 1]
+        assert means[0] == pytest.approx(0.4)
+        assert means[1] == 1.0
+
+    def test_grouped_linear_fit_recovers_lines(self):
+        keys = np.array([0, 0, 0, 1, 1, 1, 1])
+        x = np.array([2.0, 0.0, 1.0, 10.0, 11.0, 12.0, 13.0])
+        y = np.array([0.5, 0.1, 0.3, 1.0, 0.9, 0.8, 0.7])
+
+        fit = columnar_analytics.grouped_linear_fit(keys, x, y, 3)
+
+        assert fit.slope[:2] == pytest.approx([0.2, -0.1])
+        assert fit.intercept[:2] == pytest.approx([0.1, 1.0])
+        assert fit.first_y[:2].tolist() == [0.1, 1.0]
+        assert fit.last_y[:2].tolist() == [0.5, 0.7]
+        assert fit.counts[2] == 0
+
+    def test_timestamps_with_offsets_keep_wall_clock_hour(self):
+        columns = columnar_analytics.SessionColumns.from_sessions(
+            [[{'start_time': '2026-03-02T09:30:00+09:00'}, {'start_time': '2026-03-02T21:00:00'}]],
+            LearningAnalyticsEnhancer()._activity_to_skill
+        )
+        assert columns.hour.tolist() == [9, 21]
+        assert columns.weekday.tolist() == [0, 0]
+
+
+class TestColumnarAnalytics:
+    """Vectorized analytics must match the row-by-row implementation."""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_study_pattern_matches_rowwise(self, seed):
+        rng = random.Random(seed)
+        vectorized, rowwise = load_enhancers({"user": make_sessions(rng, 60)})
+
+        assert vectorized.analyze_study_pattern("user") == rowwise.analyze_study_pattern("user")
+
+    @pytest.mark.parametrize("seed", [4, 5])
+    def test_bottlenecks_match_rowwise(self, seed):
+        rng = random.Random(seed)
+        sessions = make_sessions(rng, 40)
+        for session in sessions[-10:]:
+            session['performance_score'] = 0.2
+        vectorized, rowwise = load_enhancers({"user": sessions})
+
+        ours = vectorized.identify_bottlenecks("user")
+        theirs = rowwise.identify_bottlenecks("user")
+
+        assert ours
+        assert [(b.skill, b.language, b.severity, b.breakthrough_suggestions) for b in ours] == \
+            [(b.skill, b.language, b.severity, b.breakthrough_suggestions) for b in theirs]
+
+    def test_trajectory_uses_least_squares(self):
+        enhancer = LearningAnalyticsEnhancer(vectorized=True)
+        start = datetime.now() - timedelta(days=40)
+        # Noisy first and last points: a first/last slope would be 0.0
+        levels = [0.5, 0.3, 0.4, 0.5, 0.3]
+        enhancer.skill_history["user_reading_english"] = [
+            (start + timedelta(days=10 * i), level) for i, level in enumerate(levels)
+        ]
+
+        trajectory = enhancer.predict_skill_trajectory("user", Skill.READING, "english")
+
+        expected = np.polyfit(np.arange(5) * 10.0, levels, 1)[0]
+        assert trajectory.growth_rate == pytest.approx(expected)
+        assert trajectory.initial_level == 0.5 and trajectory.current_level == 0.3
+        assert trajectory.predicted_level == pytest.approx(max(0.0, 0.3 + expected * 30))
+        assert len(trajectory.trajectory_points) == 5
+
+    def test_batch_reports_match_single_reports(self):
+        rng = random.Random(7)
+        sessions_by_user = {f"user_{i}": make_sessions(rng, 30) for i in range(5)}
+        sessions_by_user["new_user"] = []
+        enhancer, _ = load_enhancers(sessions_by_user)
+        enhancer.add_skill_measurement("user_0", Skill.VOCABULARY, "english", 0.4)
+        enhancer.add_skill_measurement("user_0", Skill.VOCABULARY, "english", 0.6)
+
+        reports = enhancer.generate_analytics_reports(list(sessions_by_user), "CET-6")
+
+        assert set(reports) == set(sessions_by_user)
+        for user_id, report in reports.items():
+            single = enhancer.generate_analytics_report(user_id, "CET-6")
+            assert report.study_pattern == single.study_pattern
+            assert report.recommendations == single.recommendations
+            assert [t.current_level for t in report.skill_trajectories] == \
+                [t.current_level for t in single.skill_trajectories]
+            assert len(report.skill_trajectories) == 8
+        assert reports["user_0"].skill_trajectories[0].current_level == 0.6
+
+
+class TestColumnarAnalyticsBenchmark:
+    """Benchmark batch report generation."""
+
+    def test_batch_report_throughput(self):
+        # Full benchmark: COLUMNAR_BENCH_USERS=1000
+        user_count = int(os.environ.get("COLUMNAR_BENCH_USERS", "200"))
+        days = int(os.environ.get("COLUMNAR_BENCH_DAYS", "365"))
+        rng = random.Random(42)
+        sessions_by_user = {f"user_{i}": make_sessions(rng, days) for i in range(user_count)}
+        vectorized, rowwise = load_enhancers(sessions_by_user)
+        for user_id in sessions_by_user:
+            for day in range(0, days, 30):
+                level = min(1.0, 0.2 + day / days / 2)
+                vectorized.skill_history[f"{user_id}_vocabulary_english"].append(
+                    (datetime.now() - timedelta(days=days - day), level))
+        user_ids = list(sessions_by_user)
+
+        start = time.perf_counter()
+        batch = vectorized.generate_analytics_reports(user_ids, "CET-6")
+        batch_time = time.perf_counter() - start
+
+        sample = user_ids[:max(1, user_count // 10)]
+        start = time.perf_counter()
+        for user_id in sample:
+            rowwise.generate_analytics_report(user_id, "CET-6")
+        rowwise_time = (time.perf_counter() - start) * user_count / len(sample)
+
+        print(f"\n{user_count} users x {days} days of sessions")
+        print(f"Row-by-row reports: {rowwise_time:.2f}s (extrapolated from {len(sample)} users)")
+        print(f"Columnar batch reports: {batch_time:.2f}s ({rowwise_time / batch_time:.1f}x)")
+
+        assert len(batch) == user_count
+        assert batch[user_ids[0]].study_pattern == rowwise.analyze_study_pattern(user_ids[0])
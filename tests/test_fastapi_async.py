@@ -0,0 +1,209 @@
+"""
+FastAPI 异步数据路径测试
+
+验证 BlockingExecutor / AsyncFacade 的行为（有界并发、contextvars 传递、异常传递），
+并用本地 ASGI 客户端并发发送请求，比较同步调用在事件循环中执行（原行为）
+与卸载到有界线程池时的 p99 延迟。
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+
+from bilingual_tutor.web import fastapi_app
+from bilingual_tutor.web.async_facade import AsyncFacade, BlockingExecutor
+
+
+class InlineExecutor:
+    """在事件循环线程中直接执行（卸载前的阻塞行为）"""
+
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+class SlowStorage:
+    """每次调用都阻塞的存储，模拟慢 SQLite 查询"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.threads = set()
+
+    def get_vocabulary_count(self, language=None):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return 42
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class TestBlockingExecutor:
+    """有界线程池执行器"""
+
+    def test_runs_off_loop_with_bounded_concurrency(self):
+        executor = BlockingExecutor(max_workers=3, max_pending=4)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+            return threading.get_ident()
+
+        async def main():
+            loop_thread = threading.get_ident()
+            threads = await asyncio.gather(*(executor.run(work) for _ in range(12)))
+            return loop_thread, threads
+
+        loop_thread, threads = asyncio.run(main())
+        executor.shutdown()
+
+        assert loop_thread not in threads
+        assert max(peak) <= 3
+        stats = executor.get_stats()
+        assert stats["calls"] == 12
+        assert stats["peak_in_flight"] <= 4
+        assert stats["waited"] > 0
+
+    def test_context_and_exceptions_propagate(self):
+        request_id = contextvars.ContextVar("request_id")
+        executor = BlockingExecutor(max_workers=2)
+
+        def fail():
+            raise KeyError("missing")
+
+        async def main():
+            request_id.set("req-1")
+            seen = await executor.run(request_id.get)
+            with pytest.raises(KeyError):
+                await executor.run(fail)
+            return seen
+
+        assert asyncio.run(main()) == "req-1"
+        executor.shutdown()
+
+    def test_iterate_runs_generator_off_loop(self):
+        executor = BlockingExecutor(max_workers=2)
+        threads, closed = [], []
+
+        def chunks():
+            try:
+                for i in range(5):
+                    threads.append(threading.get_ident())
+                    yield i
+            finally:
+                closed.append(True)
+
+        async def main():
+            seen = [item async for item in executor.iterate(chunks())]
+            partial = executor.iterate(chunks())
+            first = await partial.__anext__()
+            await partial.aclose()
+            return seen, first
+
+        seen, first = asyncio.run(main())
+        executor.shutdown()
+        assert seen == [0, 1, 2, 3, 4] and first == 0
+        assert threading.get_ident() not in threads
+        assert closed == [True, True]
+
+    def test_facade_wraps_methods(self):
+        storage = SlowStorage(delay=0)
+        storage.path = "learning.db"
+        executor = BlockingExecutor(max_workers=2)
+        facade = AsyncFacade(storage, executor)
+
+        async def main():
+            return await facade.get_vocabulary_count("english")
+
+        assert asyncio.run(main()) == 42
+        assert threading.get_ident() not in storage.threads
+        assert facade.path == "learning.db"
+        executor.shutdown()
+
+
+async def load(app, requests: int, probes: int):
+    """并发发送 requests 个慢请求和 probes 个 /health 探测，返回各自的延迟列表（秒）"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def timed(path):
+            started = time.perf_counter()
+            response = await client.get(path)
+            assert response.status_code == 200, response.text
+            return time.perf_counter() - started
+
+        slow = [asyncio.ensure_future(timed("/api/audio/manifest?ids=1")) for _ in range(requests)]
+        await asyncio.sleep(0)
+        health = [asyncio.ensure_future(timed("/health")) for _ in range(probes)]
+        return await asyncio.gather(*slow), await asyncio.gather(*health)
+
+
+class TestFastAPILoad:
+    """本地 ASGI 客户端负载测试"""
+
+    @pytest.fixture
+    def slow_app(self, monkeypatch):
+        delay = float(os.environ.get("ASYNC_LOAD_QUERY_MS", "10")) / 1000
+        storage = SlowStorage(delay)
+
+        def resolve(learning_db, pronunciation_manager, vocab_ids):
+            learning_db.get_vocabulary_count()
+            return []
+
+        monkeypatch.setattr(fastapi_app, "system_integrator", SimpleNamespace(pronunciation_manager=None))
+        monkeypatch.setattr(fastapi_app, "learning_db", storage)
+        monkeypatch.setattr(fastapi_app, "compatibility_layer", None)
+        monkeypatch.setattr(fastapi_app, "resolve_vocabulary_audio", resolve)
+        monkeypatch.setitem(fastapi_app.app.dependency_overrides, fastapi_app.require_user, lambda: "tester")
+        return storage
+
+    def test_handlers_do_not_block_event_loop(self, slow_app, monkeypatch):
+        executor = BlockingExecutor(max_workers=4)
+        monkeypatch.setattr(fastapi_app, "io_executor", executor)
+
+        async def main():
+            await load(fastapi_app.app, requests=8, probes=1)
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(main())
+        executor.shutdown()
+        assert slow_app.threads and loop_thread not in slow_app.threads
+
+    def test_p99_under_concurrent_load(self, slow_app, monkeypatch):
+        requests = int(os.environ.get("ASYNC_LOAD_REQUESTS", "200"))
+        probes = int(os.environ.get("ASYNC_LOAD_PROBES", "20"))
+        results = {}
+
+        for name, executor in (("阻塞（事件循环内执行）", InlineExecutor()),
+                               ("线程池卸载", BlockingExecutor())):
+            monkeypatch.setattr(fastapi_app, "io_executor", executor)
+            started = time.perf_counter()
+            slow, health = asyncio.run(load(fastapi_app.app, requests, probes))
+            results[name] = (time.perf_counter() - started, slow, health)
+            if isinstance(executor, BlockingExecutor):
+                executor.shutdown()
+
+        print(f"\n{requests} 个并发请求（每个查询阻塞 {slow_app.delay * 1000:.0f} ms）+ {probes} 个 /health:")
+        for name, (elapsed, slow, health) in results.items():
+            print(f"  {name}: 总耗时 {elapsed * 1000:.0f} ms, "
+                  f"p50 {percentile(slow, 0.5) * 1000:.0f} ms, p99 {percentile(slow, 0.99) * 1000:.0f} ms, "
+                  f"/health p99 {percentile(health, 0.99) * 1000:.0f} ms")
+
+        blocking, offloaded = results.values()
+        assert percentile(offloaded[1], 0.99) < percentile(blocking[1], 0.99)
+        assert percentile(offloaded[2], 0.99) < percentile(blocking[2], 0.99)
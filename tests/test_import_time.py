@@ -0,0 +1,103 @@
+"""
+导入耗时预算测试
+
+在独立解释器中用 python -X importtime 测量各入口模块的导入耗时，
+检查包 __init__ 的按需导入（PEP 562），并确保重量级第三方库
+（bs4、aiohttp、redis、yaml、cryptography、requests）不在导入路径上。
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 入口模块 → 导入耗时预算（毫秒），可用 IMPORT_BUDGET_SCALE 按机器速度放宽
+IMPORT_BUDGETS_MS = {
+    "bilingual_tutor.models": 200,
+    "bilingual_tutor.web.app": 1500,
+    "bilingual_tutor.web.fastapi_app": 3000,
+}
+
+HEAVY_MODULES = ("bs4", "aiohttp", "redis", "yaml", "cryptography", "requests")
+
+
+def import_profile(module: str) -> dict:
+    """在新解释器中导入模块，返回 {模块名: 累计导入耗时(微秒)}"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def loaded_modules(code: str) -> set:
+    """执行代码后已加载的模块"""
+    script = f"import sys\n{code}\nprint('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    return set(result.stdout.split())
+
+
+class TestLazyPackageExports:
+    """包 __init__ 按需导入"""
+
+    @pytest.mark.parametrize("package, attribute, submodule", [
+        ("bilingual_tutor.content", "ContentFilter", "bilingual_tutor.content.filter"),
+        ("bilingual_tutor.infrastructure", "ErrorHandler", "bilingual_tutor.infrastructure.error_handler"),
+        ("bilingual_tutor.services", "AIService", "bilingual_tutor.services.ai_service"),
+    ])
+    def test_attribute_loads_only_its_submodule(self, package, attribute, submodule):
+        before = loaded_modules(f"import {package}")
+        after = loaded_modules(f"import {package}\n{package}.{attribute}")
+
+        package_modules = {name for name in before if name.startswith(package + ".")}
+        assert not package_modules
+        assert submodule in after
+
+    def test_exports_resolve(self):
+        import bilingual_tutor.content as content
+        import bilingual_tutor.infrastructure as infrastructure
+        import bilingual_tutor.services as services
+
+        for package in (content, infrastructure, services):
+            for name in package.__all__:
+                assert getattr(package, name) is not None
+            assert set(package.__all__) <= set(dir(package))
+
+        from bilingual_tutor.content import batch_assess
+        from bilingual_tutor.content.batch_assessment import batch_assess as direct
+        assert batch_assess is direct
+
+        with pytest.raises(AttributeError):
+            content.NoSuchThing
+
+
+class TestImportBudget:
+    """入口模块导入耗时"""
+
+    def test_heavy_dependencies_deferred(self):
+        for module in IMPORT_BUDGETS_MS:
+            profile = import_profile(module)
+            assert not set(HEAVY_MODULES) & set(profile), module
+
+    def test_import_budgets(self):
+        scale = float(os.environ.get("IMPORT_BUDGET_SCALE", "1.0"))
+        rounds = int(os.environ.get("IMPORT_BUDGET_ROUNDS", "3"))
+
+        print()
+        for module, budget_ms in IMPORT_BUDGETS_MS.items():
+            # 取多次测量的最小值，减少机器负载的影响
+            elapsed_ms = min(import_profile(module)[module] for _ in range(rounds)) / 1000
+            print(f"{module}: {elapsed_ms:.0f} ms (预算 {budget_ms * scale:.0f} ms)")
+            assert elapsed_ms <= budget_ms * scale
@@ -0,0 +1,212 @@
+"""
+延迟组件与启动耗时测试
+
+验证 lazy_component 的线程安全一次性构建、SystemIntegrator 不在构造时构建组件、
+LearningDatabase 按表结构版本跳过 DDL，并测量导入 + 第一个请求的启动耗时，
+用 python -X importtime 防止重量级模块重新回到导入路径。
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from bilingual_tutor.core.components import component_status, lazy_component, warm_up
+from bilingual_tutor.storage import database
+from bilingual_tutor.storage.database import LearningDatabase
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入 system_integrator 时不应加载的模块（在组件首次访问时才导入）
+DEFERRED_MODULES = (
+    "bilingual_tutor.core.engine",
+    "bilingual_tutor.content.precise_level_crawler",
+    "bilingual_tutor.audio.pronunciation_manager",
+    "bilingual_tutor.storage.database",
+    "bs4",
+)
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, capture_output=True,
+                          text=True, timeout=300)
+
+
+class Service:
+    builds = 0
+
+    @lazy_component
+    def slow(self):
+        """构建较慢的组件"""
+        Service.builds += 1
+        time.sleep(0.05)
+        return object()
+
+    @lazy_component
+    def dependent(self):
+        return ("dependent", self.slow)
+
+    @lazy_component
+    def flaky(self):
+        if not getattr(self, "flaky_ready", False):
+            raise RuntimeError("not ready")
+        return "ready"
+
+
+class TestLazyComponent:
+    """延迟组件描述符"""
+
+    def test_concurrent_first_access_builds_once(self):
+        Service.builds = 0
+        service = Service()
+        barrier = threading.Barrier(8)
+        results = []
+
+        def access():
+            barrier.wait()
+            results.append(service.slow)
+
+        threads = [threading.Thread(target=access) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert Service.builds == 1
+        assert all(result is results[0] for result in results)
+
+    def test_dependencies_assignment_and_status(self):
+        service = Service()
+        assert component_status(service) == {"slow": False, "dependent": False, "flaky": False}
+
+        assert service.dependent[1] is service.slow
+        assert component_status(service)["slow"]
+
+        replacement = object()
+        service.slow = replacement
+        assert service.slow is replacement
+
+    def test_failed_build_is_retried(self):
+        service = Service()
+        with pytest.raises(RuntimeError):
+            service.flaky
+        service.flaky_ready = True
+        assert service.flaky == "ready"
+        assert set(warm_up(service, "flaky")) == {"flaky"}
+
+
+class TestSystemIntegratorStartup:
+    """SystemIntegrator 按需构建组件"""
+
+    def test_construction_builds_nothing(self, tmp_path):
+        from bilingual_tutor.core.system_integrator import SystemIntegrator
+
+        class IsolatedIntegrator(SystemIntegrator):
+            @lazy_component
+            def learning_db(self):
+                return LearningDatabase(str(tmp_path / "learning.db"))
+
+        system = IsolatedIntegrator()
+        assert not any(system.get_initialized_components().values())
+
+        assert system.learning_db.get_vocabulary_count("english") == 0
+        built = {name for name, ready in system.get_initialized_components().items() if ready}
+        assert built == {"learning_db"}
+        system.learning_db.close()
+
+    def test_importtime_excludes_deferred_modules(self):
+        result = run_python("-X", "importtime", "-c", "import bilingual_tutor.core.system_integrator")
+        assert result.returncode == 0, result.stderr
+        imported = {line.rsplit("|", 1)[-1].strip()
+                    for line in result.stderr.splitlines() if line.startswith("import time:")}
+        assert "bilingual_tutor.core.system_integrator" in imported
+        assert not imported.intersection(DEFERRED_MODULES)
+
+
+class TestSchemaVersion:
+    """表结构版本检查"""
+
+    def test_ddl_applied_once(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "learning.db")
+        with LearningDatabase(path) as db:
+            with db._pool.get_connection() as conn:
+                assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+
+        def fail(self):
+            raise AssertionError("DDL should be skipped")
+
+        monkeypatch.setattr(LearningDatabase, "_init_database", fail)
+        monkeypatch.setattr(LearningDatabase, "_create_performance_indexes", fail)
+        with LearningDatabase(path) as db:
+            assert not db._ensure_schema()
+            assert db.get_vocabulary_count() == 0
+
+    def test_outdated_schema_is_upgraded(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        with LearningDatabase(path) as db:
+            with db._pool.get_connection() as conn:
+                conn.execute("DROP INDEX idx_vocab_word")
+                conn.execute("PRAGMA user_version = 0")
+                conn.commit()
+
+        with LearningDatabase(path) as db:
+            with db._pool.get_connection() as conn:
+                names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_vocab_word" in names
+
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from bilingual_tutor.core.system_integrator import SystemIntegrator
+imported = time.perf_counter()
+system = SystemIntegrator()
+constructed = time.perf_counter()
+system.learning_db.get_vocabulary_count('english')
+first_request = time.perf_counter()
+system.warm_up()
+warmed = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'construct': constructed - imported,
+    'first_request': first_request - constructed,
+    'all_components': warmed - first_request,
+}))
+"""
+
+
+class TestStartupBenchmark:
+    """导入 + 第一个请求的启动耗时"""
+
+    def test_startup_time(self, tmp_path):
+        result = run_python("-c", STARTUP_SCRIPT)
+        assert result.returncode == 0, result.stderr
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+        lazy = timings["import"] + timings["construct"] + timings["first_request"]
+        eager = lazy + timings["all_components"]
+        print(f"\n导入: {timings['import'] * 1000:.0f} ms, 构造: {timings['construct'] * 1000:.1f} ms, "
+              f"第一个请求（只构建数据库）: {timings['first_request'] * 1000:.0f} ms")
+        print(f"延迟构建到第一个响应: {lazy * 1000:.0f} ms, "
+              f"构建全部组件（原启动路径）: {eager * 1000:.0f} ms")
+
+        rounds = int(os.environ.get("LAZY_STARTUP_BENCH_ROUNDS", "20"))
+        path = str(tmp_path / "learning.db")
+        LearningDatabase(path).close()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            LearningDatabase(path).close()
+        reopen = (time.perf_counter() - started) / rounds
+
+        started = time.perf_counter()
+        for i in range(rounds):
+            LearningDatabase(str(tmp_path / f"fresh{i}.db")).close()
+        fresh = (time.perf_counter() - started) / rounds
+        print(f"LearningDatabase 打开: 新建 {fresh * 1000:.1f} ms, 已是当前版本 {reopen * 1000:.1f} ms")
+
+        assert timings["construct"] < timings["all_components"]
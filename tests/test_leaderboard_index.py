@@ -0,0 +1,229 @@
+"""
+Tests for the incremental leaderboard index.
+
+Checks that the ranked index matches a full sort after random updates,
+that AchievementSystem keeps it in sync with user_points, that weekly and
+monthly boards roll over by period, and benchmarks updates and queries.
+"""
+
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from bilingual_tutor.gamification import AchievementSystem, Leaderboard, RankedIndex, RedisRankedIndex
+
+
+def sorted_ranking(points):
+    """Reference ranking: stable sort of an insertion-ordered dict."""
+    return sorted(points.items(), key=lambda item: item[1], reverse=True)
+
+
+class TestRankedIndex:
+    """Tests for the in-process order-statistics index."""
+
+    def test_matches_full_sort_after_random_updates(self):
+        rng = random.Random(3)
+        index = RankedIndex(load=8)
+        points = {}
+        for _ in range(3000):
+            user_id = f"user_{rng.randrange(300)}"
+            if rng.random() < 0.05 and user_id in points:
+                del points[user_id]
+                index.remove(user_id)
+                continue
+            points[user_id] = points.get(user_id, 0) + rng.randint(-20, 50)
+            index.set(user_id, points[user_id])
+
+        expected = sorted_ranking(points)
+        assert len(index) == len(points)
+        assert index.top(len(points)) == expected
+        assert list(index) == [user_id for user_id, _ in expected]
+        assert index.top(7, offset=40) == expected[40:47]
+        for rank, (user_id, score) in enumerate(expected, 1):
+            assert index.rank(user_id) == rank
+            assert index.score(user_id) == score
+
+    def test_ties_keep_first_insertion_order(self):
+        index = RankedIndex()
+        for user_id in ["a", "b", "c"]:
+            index.set(user_id, 10)
+        index.set("a", 5)
+        index.set("a", 10)
+
+        assert [member for member, _ in index.top(3)] == ["a", "b", "c"]
+
+    def test_bulk_load_and_bounds(self):
+        index = RankedIndex(load=4)
+        index.bulk_load((f"user_{i}", i % 17) for i in range(100))
+
+        assert index.top(3) == [("user_16", 16), ("user_33", 16), ("user_50", 16)]
+        assert index.top(5, offset=99) == [("user_85", 0)]
+        assert index.top(5, offset=100) == []
+        assert index.rank("missing") is None
+        assert index.increment("user_0", 100) == 100
+        assert index.rank("user_0") == 1
+
+
+class TestAchievementLeaderboard:
+    """Tests for leaderboard integration in AchievementSystem."""
+
+    def test_leaderboard_tracks_point_changes(self):
+        system = AchievementSystem()
+        system.award_points("alice", 300)
+        system.award_points("bob", 500)
+        system.user_points["carol"] = 400
+        assert system.claim_reward("bob", "dark_theme")  # bob: 300
+
+        board = system.get_leaderboard(limit=10)
+
+        assert [(e.user_id, e.points, e.rank) for e in board] == \
+            [("carol", 400, 1), ("alice", 300, 2), ("bob", 300, 3)]
+        assert system.get_user_rank("bob") == 3
+        assert [e.user_id for e in system.get_leaderboard(limit=1, offset=1)] == ["alice"]
+
+        del system.user_points["carol"]
+        assert system.get_user_rank("carol") is None
+        assert system.get_leaderboard()[0].user_id == "alice"
+
+    def test_periodic_boards_count_earned_points(self):
+        system = AchievementSystem()
+        system.award_points("alice", 100)
+        system.award_points("bob", 50)
+        system.claim_reward("alice", "dark_theme")  # spending does not lower earned points
+
+        weekly = system.get_leaderboard(period="weekly")
+        monthly = system.get_leaderboard(period="monthly")
+
+        assert [(e.user_id, e.points) for e in weekly] == [("alice", 100), ("bob", 50)]
+        assert [(e.user_id, e.points) for e in monthly] == [("alice", 100), ("bob", 50)]
+        assert system.get_user_rank("bob", period="weekly") == 2
+
+    def test_weekly_rollover_and_rank_change(self):
+        leaderboard = Leaderboard()
+        last_week = datetime.now() - timedelta(days=7)
+        leaderboard.record("alice", 100, at=last_week)
+        leaderboard.record("bob", 50, at=last_week)
+        system = AchievementSystem(leaderboard=leaderboard)
+
+        system.award_points("bob", 80)
+        system.award_points("alice", 20)
+
+        weekly = system.get_leaderboard(period="weekly")
+        assert [(e.user_id, e.points, e.change) for e in weekly] == [("bob", 80, 1), ("alice", 20, -1)]
+
+        for week in range(2, 5):
+            leaderboard.record("old", 1, at=datetime.now() - timedelta(days=7 * week))
+        assert len(leaderboard._periods["weekly"]) == leaderboard.retained_periods
+
+    def test_ledgers_sharing_an_index_apply_deltas(self):
+        # Two systems on one index stand in for two processes on one Redis key
+        leaderboard = Leaderboard()
+        first = AchievementSystem(leaderboard=leaderboard)
+        second = AchievementSystem(leaderboard=leaderboard)
+        first.award_points("alice", 300)
+        second.award_points("alice", 200)
+        assert first.get_user_points("alice") == second.get_user_points("alice") == 500
+
+        assert second.claim_reward("alice", "dark_theme")  # 200 points
+        assert first.get_user_points("alice") == 300
+
+        # Reading an unknown user does not add it to the ranking
+        assert first.get_user_points("nobody") == 0
+        assert "nobody" not in leaderboard.all_time
+        assert "nobody" not in first.user_points
+
+    def test_ledger_is_backed_by_the_index(self):
+        """Membership, length and iteration come from the index, not from local writes"""
+        leaderboard = Leaderboard()
+        first = AchievementSystem(leaderboard=leaderboard)
+        second = AchievementSystem(leaderboard=leaderboard)
+        first.award_points("alice", 300)
+        second.user_points["bob"] = 500
+
+        for ledger in (first.user_points, second.user_points):
+            assert len(ledger) == 2
+            assert "alice" in ledger and "bob" in ledger
+            assert list(ledger) == ["bob", "alice"]
+            assert dict(ledger.items()) == ledger == {"alice": 300, "bob": 500}
+            assert ledger.get("carol") is None and ledger.get("carol", 7) == 7
+
+        leaderboard.all_time.bulk_load([("carol", 100)])
+        assert dict(first.user_points) == {"carol": 100}
+        assert second.user_points.pop("carol") == 100
+        assert second.user_points.pop("carol", None) is None
+        with pytest.raises(KeyError):
+            del first.user_points["carol"]
+        assert len(first.user_points) == 0 and first.user_points["carol"] == 0
+
+    def test_unknown_period_raises(self):
+        with pytest.raises(ValueError):
+            AchievementSystem().get_leaderboard(period="daily")
+
+
+class TestRedisRankedIndex:
+    """Redis sorted-set backend (requires a local Redis server)."""
+
+    def test_redis_backend_ranks(self):
+        redis = pytest.importorskip("redis")
+        client = redis.Redis(host="localhost", port=6379, db=1, socket_connect_timeout=0.2)
+        try:
+            client.ping()
+        except redis.exceptions.RedisError:
+            pytest.skip("Redis server not available")
+
+        index = RedisRankedIndex(client, "test:leaderboard", ttl=60)
+        index.clear()
+        try:
+            index.set("alice", 10)
+            index.increment("bob", 30)
+            index.increment("alice", 5)
+
+            assert index.top(10) == [("bob", 30), ("alice", 15)]
+            assert index.rank("alice") == 2
+            assert len(index) == 2
+            assert sorted(index) == ["alice", "bob"]
+            assert index.score("carol", None) is None
+        finally:
+            index.clear()
+
+
+class TestLeaderboardBenchmark:
+    """Benchmark incremental updates against sorting on every query."""
+
+    def test_update_and_query_throughput(self):
+        # Full benchmark: LEADERBOARD_BENCH_USERS=1000000
+        user_count = int(os.environ.get("LEADERBOARD_BENCH_USERS", "200000"))
+        update_count = int(os.environ.get("LEADERBOARD_BENCH_UPDATES", "20000"))
+        rng = random.Random(11)
+
+        system = AchievementSystem()
+        start = time.perf_counter()
+        initial = {f"user_{i}": rng.randrange(100000) for i in range(user_count)}
+        system.leaderboard.all_time.bulk_load(initial.items())
+        load_time = time.perf_counter() - start
+
+        updates = [(f"user_{rng.randrange(user_count)}", rng.randint(1, 50)) for _ in range(update_count)]
+        start = time.perf_counter()
+        for user_id, points in updates:
+            system.award_points(user_id, points)
+        update_rate = update_count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(1000):
+            system.get_leaderboard(limit=10)
+            system.get_user_rank(updates[i % update_count][0])
+        query_us = (time.perf_counter() - start) / 1000 * 1e6
+
+        start = time.perf_counter()
+        baseline = sorted(system.user_points.items(), key=lambda item: item[1], reverse=True)[:10]
+        sort_ms = (time.perf_counter() - start) * 1000
+
+        print(f"\n{user_count} users, bulk load {load_time:.2f}s")
+        print(f"award_points (all-time + weekly + monthly): {update_rate:.0f} updates/s")
+        print(f"top-10 + my-rank query: {query_us:.1f} us (full sort per query: {sort_ms:.0f} ms)")
+
+        assert [(e.user_id, e.points) for e in system.get_leaderboard(limit=10)] == baseline
+        assert update_rate > 1000
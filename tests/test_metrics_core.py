@@ -0,0 +1,221 @@
+"""
+指标核心测试
+
+验证按线程分片的直方图与计数器：窗口统计（精确的 count/min/max/avg，分桶分位数）、
+滑动时间窗口过期、多线程并发记录不丢样本且线程结束后分片被回收、
+Prometheus 文本格式导出与 /metrics 接口、PerformanceMonitor.get_all_metrics 不再自锁、
+PerformanceLogger 只保留有界历史且不逐条写 INFO 日志，并测量每次记录的开销
+（METRICS_BENCH_RECORDS 调整规模）。
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import Flask
+
+from bilingual_tutor.infrastructure.logging_system import PerformanceLogger, PerformanceMetric
+from bilingual_tutor.infrastructure.metrics import MetricsRegistry, prometheus_name
+from bilingual_tutor.infrastructure.monitoring_manager import MetricData, PerformanceMonitor, monitoring_manager
+from bilingual_tutor.web.routes.monitoring import monitoring_bp
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def parse_prometheus(text):
+    """样本行 -> {名称{标签}: 值}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+class TestMetricsRegistry:
+    """注册表"""
+
+    def test_window_stats(self):
+        registry = MetricsRegistry()
+        for value in range(1, 1001):
+            registry.observe("latency", value / 1000)
+        stats = registry.window_stats("latency")
+        assert stats['count'] == 1000 and stats['min'] == 0.001 and stats['max'] == 1.0
+        assert abs(stats['avg'] - 0.5005) < 1e-9 and stats['current'] == 1.0
+        for key, expected in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            assert abs(stats[key] - expected) / expected < 0.05
+        assert registry.window_stats("missing") == {}
+
+        # 常数序列的分位数等于该常数
+        for _ in range(10):
+            registry.observe("constant", 42.0)
+        assert registry.window_stats("constant")['p99'] == 42.0
+
+    def test_sliding_window_expires_old_slots(self):
+        clock = FakeClock()
+        registry = MetricsRegistry(slot_seconds=10, window_slots=6, clock=clock)
+        registry.observe("load", 1.0)
+        clock.now += 30
+        registry.observe("load", 3.0)
+        recent = registry.window_stats("load", seconds=10)
+        assert (recent['count'], recent['min']) == (1, 3.0)
+        assert registry.window_stats("load")['count'] == 2
+
+        # 超出保留窗口的时间槽不再计入，同一位置被新时间槽覆盖
+        clock.now += 40
+        registry.observe("load", 5.0)
+        stats = registry.window_stats("load")
+        assert (stats['count'], stats['min'], stats['max']) == (2, 3.0, 5.0)
+        # 累计值仍包含全部样本
+        assert parse_prometheus(registry.render_prometheus())['load_count'] == 3
+
+    def test_concurrent_recording_and_thread_retirement(self):
+        registry = MetricsRegistry()
+        threads_count, per_thread = 8, 5000
+
+        def worker(index):
+            for i in range(per_thread):
+                registry.observe("work", (i % 100) / 1000, {'worker': str(index % 2)})
+                registry.increment("jobs")
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 线程结束后分片并入回收分片
+        assert registry._shards == []
+        assert registry.counter_value("jobs") == threads_count * per_thread
+        total = sum(registry.window_stats("work", labels={'worker': worker})['count'] for worker in ("0", "1"))
+        assert total == threads_count * per_thread
+
+    def test_prometheus_exposition(self):
+        registry = MetricsRegistry(buckets=(0.1, 0.5, 1.0))
+        registry.describe("request_seconds", "请求耗时")
+        for value in (0.05, 0.2, 0.7, 3.0):
+            registry.observe("request_seconds", value, {'endpoint': '/api/x"y'})
+        registry.increment("user_activity", labels={'activity_type': 'review'})
+        registry.set_gauge("queue depth", 7)
+        text = registry.render_prometheus("app_")
+
+        assert "# HELP app_request_seconds 请求耗时" in text
+        assert "# TYPE app_request_seconds histogram" in text
+        samples = parse_prometheus(text)
+        labels = 'endpoint="/api/x\\"y"'
+        assert [samples[f'app_request_seconds_bucket{{{labels},le="{le}"}}'] for le in ("0.1", "0.5", "1", "+Inf")] \
+            == [1, 2, 3, 4]
+        assert samples[f'app_request_seconds_count{{{labels}}}'] == 4
+        assert abs(samples[f'app_request_seconds_sum{{{labels}}}'] - 3.95) < 1e-9
+        assert samples['app_user_activity_total{activity_type="review"}'] == 1
+        assert samples['app_queue_depth'] == 7
+        assert samples[f'app_request_seconds_last{{{labels}}}'] == 3.0
+        assert all(re.match(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{.*\})? \S+$', line)
+                   for line in text.splitlines() if not line.startswith('#'))
+        assert prometheus_name("api_response_time_/api/v1") == "api_response_time__api_v1"
+
+
+class TestPerformanceMonitor:
+    """PerformanceMonitor 与 PerformanceLogger"""
+
+    def test_get_all_metrics_does_not_deadlock(self):
+        monitor = PerformanceMonitor(history_size=10)
+        for value in range(20):
+            monitor.record_metric("cpu_usage", float(value))
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(monitor.get_all_metrics()), daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        # 统计覆盖全部样本，原始历史只保留最近 history_size 个
+        assert result['cpu_usage']['count'] == 20 and result['cpu_usage']['current'] == 19.0
+        assert len(monitor.get_metric("cpu_usage")) == 10
+
+    def test_api_response_time_uses_labels(self):
+        monitor = PerformanceMonitor()
+        manager = type(monitoring_manager).__new__(type(monitoring_manager))
+        manager.performance_monitor = monitor
+        manager.record_api_response_time("/api/learning/plan", 0.25)
+        manager.record_user_activity("alice", "review")
+        assert monitor.get_metric_stats("api_response_time_/api/learning/plan")['avg'] == 0.25
+        assert monitor.get_metric("api_response_time_/api/learning/plan")[0].metadata == {
+            'endpoint': "/api/learning/plan"}
+        samples = parse_prometheus(monitor.render_prometheus())
+        assert samples['bilingual_tutor_api_response_time_seconds_count{endpoint="/api/learning/plan"}'] == 1
+        assert samples['bilingual_tutor_user_activity_total{activity_type="review"}'] == 1
+
+    def test_performance_logger_is_bounded(self, caplog):
+        logger = logging.getLogger("test_metrics_core")
+        performance_logger = PerformanceLogger(logger, history_size=5)
+        with caplog.at_level(logging.INFO, logger="test_metrics_core"):
+            for i in range(20):
+                performance_logger.record_metric(PerformanceMetric(
+                    name="a" if i % 2 else "b", value=i, unit="ms", timestamp=datetime.now().isoformat()))
+        assert caplog.records == []
+        assert len(performance_logger.get_metrics("a")) == 5 and len(performance_logger.get_metrics()) == 10
+        assert performance_logger.get_metric_stats("a")['count'] == 10
+        with performance_logger.measure_performance("block"):
+            pass
+        assert performance_logger.get_metric_stats("block")['count'] == 1
+        performance_logger.clear_metrics()
+        assert performance_logger.get_metrics() == [] and performance_logger.get_metric_stats("a") == {}
+
+    def test_metrics_endpoint(self):
+        app = Flask(__name__)
+        app.register_blueprint(monitoring_bp)
+        monitoring_manager.performance_monitor.record_metric("endpoint_test_metric", 1.5)
+        response = app.test_client().get("/metrics")
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith("text/plain; version=0.0.4")
+        assert 'bilingual_tutor_endpoint_test_metric_count 1' in response.get_data(as_text=True)
+
+
+class TestMetricsOverheadBenchmark:
+    """每次记录的开销"""
+
+    def test_record_overhead(self):
+        records = int(os.environ.get("METRICS_BENCH_RECORDS", "200000"))
+        registry = MetricsRegistry()
+        monitor = PerformanceMonitor(history_size=100)
+        performance_logger = PerformanceLogger(logging.getLogger("test_metrics_bench"))
+        metric = PerformanceMetric(name="bench", value=0.003, unit="s", timestamp="")
+
+        # 原实现：加锁、创建 MetricData、追加到 deque；统计时复制并扫描
+        lock, history = threading.Lock(), deque(maxlen=100)
+
+        def legacy_record(value):
+            with lock:
+                history.append(MetricData(timestamp=datetime.now(), value=value, metadata={}))
+
+        cases = {
+            "MetricsRegistry.observe": lambda value: registry.observe("bench", value),
+            "MetricsRegistry.increment": lambda value: registry.increment("bench_total"),
+            "PerformanceMonitor.record_metric": lambda value: monitor.record_metric("bench", value),
+            "PerformanceLogger.record_metric": lambda value: performance_logger.record_metric(metric),
+            "原 PerformanceMonitor.record_metric": legacy_record,
+        }
+        print(f"\n每次记录开销（{records} 次）:")
+        timings = {}
+        for label, record in cases.items():
+            started = time.perf_counter()
+            for i in range(records):
+                record((i % 1000) / 1e5)
+            timings[label] = (time.perf_counter() - started) / records * 1e9
+            print(f"  {label}: {timings[label]:.0f} ns")
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            registry.window_stats("bench", 300)
+        print(f"  窗口统计（p50/p95/p99）: {(time.perf_counter() - started):.3f} ms/次")
+        assert registry.window_stats("bench")['count'] == records
+        assert timings["MetricsRegistry.observe"] < 10000
@@ -0,0 +1,293 @@
+"""
+密码哈希线程池测试
+
+验证带参数的编码哈希（调整迭代次数后旧密码仍可验证、登录时自动升级）、
+有界排队在过载时快速返回 503（并发登录时排队数不超过上限），并用登录风暴基准
+（LOGIN_STORM_BENCH=1 时运行）比较请求线程内联计算与专用哈希线程池对其他接口延迟的影响。
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from bilingual_tutor.infrastructure import password_hashing
+from bilingual_tutor.infrastructure.password_hashing import (
+    LEGACY_ITERATIONS, HashingPool, HashingPoolBusy, PasswordHasher, pbkdf2_hex
+)
+from bilingual_tutor.infrastructure.security_manager import PasswordSecurity
+from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.web.routes.auth import user_repository
+
+PASSWORD = "Str0ngPassw0rd"
+
+# 登录风暴基准比较墙钟延迟，结果受机器负载影响，默认不运行
+RUN_STORM_BENCH = os.environ.get("LOGIN_STORM_BENCH", "0") == "1"
+
+
+@pytest.fixture
+def bound_repository(tmp_path):
+    """把路由使用的全局仓库绑定到临时数据库"""
+    db = LearningDatabase(str(tmp_path / "learning.db"))
+    previous = user_repository._database
+    user_repository.bind(db)
+    yield user_repository
+    user_repository.bind(previous)
+    db.close()
+
+
+@pytest.fixture
+def use_pool():
+    """临时替换进程共享的哈希线程池"""
+    installed = []
+    previous = password_hashing.set_hashing_pool(None)
+
+    def install(pool):
+        installed.append(pool)
+        password_hashing.set_hashing_pool(pool)
+        return pool
+
+    yield install
+    password_hashing.set_hashing_pool(previous)
+    for pool in installed:
+        pool.shutdown()
+
+
+def make_client():
+    from bilingual_tutor.web.app import create_app
+    app = create_app()
+    app.config.update(TESTING=True)
+    return app.test_client()
+
+
+def login(client, username, password=PASSWORD):
+    return client.post("/api/auth/login", json={"username": username, "password": password})
+
+
+class TestPasswordHasher:
+    """编码哈希"""
+
+    def test_parameters_travel_with_hash(self):
+        fast = PasswordHasher(iterations=1000)
+        encoded = fast.hash(PASSWORD, "salt")
+        assert encoded == f"pbkdf2_sha256$1000$salt${pbkdf2_hex(PASSWORD, 'salt', 1000)}"
+
+        # 调整迭代次数后旧哈希仍可验证，但需要升级
+        tuned = PasswordHasher(iterations=2000)
+        assert tuned.verify(PASSWORD, encoded)
+        assert not tuned.verify(PASSWORD + "x", encoded)
+        assert tuned.needs_rehash(encoded) and not fast.needs_rehash(encoded)
+
+        legacy = pbkdf2_hex(PASSWORD, "salt", LEGACY_ITERATIONS)
+        assert tuned.verify(PASSWORD, legacy, "salt")
+        assert not tuned.verify(PASSWORD, legacy, "other")
+        assert tuned.needs_rehash(legacy)
+        assert not tuned.verify(PASSWORD, "bcrypt$12$salt$hash")
+
+    def test_password_security_accepts_encoded_hash(self, use_pool):
+        use_pool(HashingPool(max_workers=1, hasher=PasswordHasher(iterations=1000)))
+        security = PasswordSecurity(iterations=1000)
+        result = security.hash_password(PASSWORD)
+        assert result['encoded'].startswith("pbkdf2_sha256$1000$")
+        assert security.verify_password(PASSWORD, result['hash'], result['salt'])
+        assert security.verify_password(PASSWORD, result['encoded'])
+        assert not PasswordSecurity().verify_password(PASSWORD, result['hash'], result['salt'])
+        assert PasswordSecurity().verify_password(PASSWORD, result['hash'], result['salt'], iterations=1000)
+
+
+class TestHashingPool:
+    """有界哈希线程池"""
+
+    def test_queue_limit_rejects_immediately(self):
+        pool = HashingPool(max_workers=1, max_queue=2)
+        release = threading.Event()
+        try:
+            futures = [pool.submit(release.wait) for _ in range(3)]
+            started = time.perf_counter()
+            with pytest.raises(HashingPoolBusy) as excinfo:
+                pool.submit(release.wait)
+            assert time.perf_counter() - started < 0.05
+            assert excinfo.value.queued == 2
+            release.set()
+            assert all(future.result(timeout=5) for future in futures)
+            stats = pool.get_stats()
+            assert (stats['submitted'], stats['rejected'], stats['completed'], stats['pending']) == (3, 1, 3, 0)
+            assert pool.verify(PASSWORD, pool.hash(PASSWORD))
+        finally:
+            release.set()
+            pool.shutdown()
+
+    def test_inline_mode_and_async(self):
+        import asyncio
+
+        pool = HashingPool(max_workers=0, hasher=PasswordHasher(iterations=1000))
+        encoded = pool.hash(PASSWORD)
+        assert pool.verify(PASSWORD, encoded)
+
+        threaded = HashingPool(max_workers=1, hasher=PasswordHasher(iterations=1000))
+        try:
+            assert asyncio.run(threaded.verify_async(PASSWORD, asyncio.run(threaded.hash_async(PASSWORD))))
+        finally:
+            threaded.shutdown()
+
+
+class TestLoginHashing:
+    """登录与哈希升级"""
+
+    def test_login_upgrades_legacy_and_retuned_hashes(self, bound_repository, use_pool):
+        use_pool(HashingPool(max_workers=1, hasher=PasswordHasher(iterations=1000)))
+        bound_repository.create_user("grace", pbkdf2_hex(PASSWORD, "old_salt", LEGACY_ITERATIONS),
+                                     salt="old_salt")
+        client = make_client()
+
+        assert login(client, "grace").status_code == 200
+        upgraded = bound_repository.get_user("grace")
+        assert upgraded["password_hash"].startswith("pbkdf2_sha256$1000$")
+        assert upgraded["salt"] != "old_salt"
+
+        # 调整迭代次数：旧哈希照常登录，之后保存为新参数
+        use_pool(HashingPool(max_workers=1, hasher=PasswordHasher(iterations=1500)))
+        assert login(client, "grace", PASSWORD + "x").status_code == 401
+        assert login(client, "grace").status_code == 200
+        assert bound_repository.get_user("grace")["password_hash"].startswith("pbkdf2_sha256$1500$")
+
+    def test_full_queue_returns_503(self, bound_repository, use_pool):
+        pool = use_pool(HashingPool(max_workers=1, max_queue=0, hasher=PasswordHasher(iterations=1000)))
+        bound_repository.create_user("heidi", pool.hash(PASSWORD))
+        client = make_client()
+
+        release = threading.Event()
+        blocker = pool.submit(release.wait)
+        try:
+            response = login(client, "heidi")
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "1"
+            register = client.post("/api/auth/register", json={"username": "ivan", "password": PASSWORD})
+            assert register.status_code == 503
+            assert "ivan" not in bound_repository.users
+        finally:
+            release.set()
+            blocker.result(timeout=5)
+        assert login(client, "heidi").status_code == 200
+
+    def test_concurrent_logins_respect_queue_bound(self, bound_repository, use_pool):
+        pool = use_pool(HashingPool(max_workers=1, max_queue=2, hasher=PasswordHasher(iterations=1000)))
+        usernames = [f"burst_{i}" for i in range(8)]
+        for username in usernames:
+            bound_repository.create_user(username, pool.hash(PASSWORD))
+        app = make_client().application
+
+        # 占住唯一的工作线程，之后的登录只能排队或被拒绝
+        release = threading.Event()
+        blocker = pool.submit(release.wait)
+        responses = {}
+
+        def student(username):
+            response = login(app.test_client(), username)
+            responses[username] = (response.status_code, response.headers.get("Retry-After"))
+
+        threads = [threading.Thread(target=student, args=(username,)) for username in usernames]
+        try:
+            for thread in threads:
+                thread.start()
+            deadline = time.time() + 10
+            while pool.get_stats()['rejected'] < 6 and time.time() < deadline:
+                time.sleep(0.01)
+            stats = pool.get_stats()
+            assert (stats['rejected'], stats['pending']) == (6, 3)
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join(10)
+            blocker.result(timeout=5)
+
+        statuses = sorted(responses.values(), key=lambda item: item[0])
+        assert statuses == [(200, None)] * 2 + [(503, "1")] * 6
+        # 运行中 + 排队的哈希任务从未超过 max_workers + max_queue
+        assert pool.get_stats()['peak_pending'] == 3
+
+
+@pytest.mark.skipif(not RUN_STORM_BENCH, reason="设置 LOGIN_STORM_BENCH=1 运行登录风暴基准")
+class TestLoginStorm:
+    """登录风暴基准"""
+
+    def run_storm(self, app, pool, usernames, rounds):
+        """每个学生一个线程（相当于一个 Flask 工作线程），同时用探针线程请求轻量接口"""
+        password_hashing.set_hashing_pool(pool)
+        login_latencies, rejected_latencies, probe_latencies = [], [], []
+        lock = threading.Lock()
+        storm_done = threading.Event()
+
+        def student(username):
+            client = app.test_client()
+            for _ in range(rounds):
+                while True:
+                    started = time.perf_counter()
+                    status = login(client, username).status_code
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        (login_latencies if status == 200 else rejected_latencies).append(elapsed)
+                    if status == 200:
+                        break
+                    assert status == 503
+                    time.sleep(0.25)  # 按 Retry-After 退避（缩短以加快测试）
+
+        def probe():
+            client = app.test_client()
+            while not storm_done.is_set():
+                started = time.perf_counter()
+                assert client.get("/api/auth/status").status_code == 200
+                probe_latencies.append(time.perf_counter() - started)
+                time.sleep(0.01)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=student, args=(username,)) for username in usernames]
+        prober = threading.Thread(target=probe)
+        prober.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        storm_done.set()
+        prober.join()
+        pool.shutdown()
+        return login_latencies, rejected_latencies, probe_latencies, elapsed
+
+    def test_login_storm(self, bound_repository, use_pool):
+        clients = int(os.environ.get("LOGIN_STORM_CLIENTS", "48"))
+        rounds = int(os.environ.get("LOGIN_STORM_ROUNDS", "2"))
+        workers = password_hashing.DEFAULT_HASH_WORKERS or 1
+
+        legacy_hash = pbkdf2_hex(PASSWORD, "storm_salt", LEGACY_ITERATIONS)
+        usernames = [f"storm_{i}" for i in range(clients)]
+        for username in usernames:
+            bound_repository.create_user(username, legacy_hash, salt="storm_salt")
+        app = make_client().application
+
+        def percentile(values, fraction):
+            values = sorted(values)
+            return values[max(int(len(values) * fraction) - 1, 0)] * 1000 if values else 0.0
+
+        print(f"\n登录风暴: {clients} 个并发学生 x {rounds} 次登录, {LEGACY_ITERATIONS} 次迭代, "
+              f"{os.cpu_count()} 个 CPU")
+        results = {}
+        for label, pool in (("请求线程内联计算", HashingPool(max_workers=0, max_queue=clients * 2)),
+                            (f"哈希线程池({workers} 线程, 排队上限 {workers * 8})",
+                             HashingPool(max_workers=workers, max_queue=workers * 8))):
+            use_pool(pool)
+            # 第一次登录会把旧格式哈希升级一次，两种模式都从旧格式开始
+            for username in usernames:
+                bound_repository.update_user(username, password_hash=legacy_hash, salt="storm_salt")
+            logins, rejected, probes, elapsed = self.run_storm(app, pool, usernames, rounds)
+            results[label] = percentile(probes, 0.99)
+            print(f"  {label}: {len(logins)} 次登录 {elapsed:.1f}s, 登录 p50 {percentile(logins, 0.5):.0f} ms, "
+                  f"503 {len(rejected)} 次 (p99 {percentile(rejected, 0.99):.1f} ms), "
+                  f"/api/auth/status p50 {percentile(probes, 0.5):.1f} ms / p99 {results[label]:.1f} ms")
+            assert len(logins) == clients * rounds
+            if rejected:
+                assert percentile(rejected, 0.5) < percentile(logins, 0.5)
+
+        inline_p99, pooled_p99 = results.values()
+        assert pooled_p99 < inline_p99
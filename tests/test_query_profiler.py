@@ -0,0 +1,247 @@
+"""
+查询剖析与执行计划回归测试
+
+验证 SQL 指纹归一、HDR 风格直方图的精度与固定内存、指纹数和慢查询队列有上限、
+语句耗时包含 fetch 阶段、慢查询自动保存 EXPLAIN QUERY PLAN；
+热点查询的执行计划回归检查（删除预期索引后检查失败），
+并测量热点查询的延迟分布和剖析本身的开销（QUERY_PLAN_BENCH_RECORDS 调整规模）。
+"""
+
+import os
+import re
+import sqlite3
+import time
+
+import pytest
+
+from bilingual_tutor.storage import database
+from bilingual_tutor.storage.bulk_load import normalize_vocabulary_row
+from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.storage.query_profiler import (
+    OTHER_FINGERPRINT, ProfiledConnection, QueryHistogram, QueryProfiler, fingerprint
+)
+
+# 热点查询：(名称, 调用, 计划中必须出现的索引, 是否要求不做临时排序)
+HOT_QUERIES = [
+    ("get_due_reviews", lambda db, user: db.get_due_reviews(user), ["idx_records_user_due"], True),
+    ("get_due_reviews(item_type)", lambda db, user: db.get_due_reviews(user, "vocabulary"),
+     ["idx_records_user_type_due"], True),
+    ("execute_optimized_review_query", lambda db, user: db.execute_optimized_review_query(user),
+     ["idx_records_user_due"], True),
+    ("get_learning_stats", lambda db, user: db.get_learning_stats(user),
+     ["idx_records_user_due", "idx_records_user_last_review"], False),
+    ("optimize_vocabulary_queries", lambda db, user: db.optimize_vocabulary_queries(user, "english", [0, 1]),
+     ["idx_records_vocab_query"], False),
+    ("get_vocabulary_page", lambda db, user: db.get_vocabulary_page("english", "CET-4", None, 50),
+     ["idx_vocab_language_level"], True),
+    ("get_latest_learning_record", lambda db, user: db.get_latest_learning_record(user, 5, "vocabulary"),
+     ["sqlite_autoindex_learning_records_1"], True),
+]
+
+# 大表上的全表扫描
+FULL_SCAN = re.compile(r"^SCAN (lr|v|(main\.)?learning_records|vocabulary)\b")
+
+
+@pytest.fixture
+def db(tmp_path):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    yield learning_db
+    learning_db.close()
+
+
+@pytest.fixture(scope="module")
+def loaded_db(tmp_path_factory):
+    """词汇和学习记录都有一定规模、已 ANALYZE 的数据库"""
+    records = int(os.environ.get("QUERY_PLAN_BENCH_RECORDS", "20000"))
+    users = max(1, records // 400)
+    learning_db = LearningDatabase(str(tmp_path_factory.mktemp("plans") / "learning.db"))
+    learning_db.bulk_load_vocabulary(
+        normalize_vocabulary_row({'word': f"word{i}", 'meaning': f"释义{i}"},
+                                 "english" if i % 2 else "japanese", "CET-4" if i % 3 else "N5")
+        for i in range(records))
+    now = time.time()
+    learning_db.batch_insert_learning_records([{
+        'user_id': f"user{i % users}", 'item_id': i + 1, 'item_type': "vocabulary" if i % 4 else "grammar",
+        'last_review_date': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now - (i % 30) * 86400)),
+        'next_review_date': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now + ((i % 11) - 5) * 86400)),
+        'mastery_level': i % 6, 'memory_strength': (i % 100) / 100,
+    } for i in range(records)])
+    learning_db.vacuum_database()
+    yield learning_db
+    learning_db.close()
+
+
+def plan_regressions(db, call, indexes, sorted_by_index):
+    """执行一次热点查询，返回执行计划中的问题（空列表表示符合预期）"""
+    profiler = db.query_profiler
+    profiler.reset()
+    slow_seconds, profiler.slow_seconds = profiler.slow_seconds, 0.0  # 每个指纹都保存执行计划
+    try:
+        call(db, "user1")
+    finally:
+        profiler.slow_seconds = slow_seconds
+    plans = [(item['fingerprint'], item['plan'] or []) for item in profiler.snapshot(top=100)]
+    problems = []
+    for index in indexes:
+        if not any(index in line for _, plan in plans for line in plan):
+            problems.append(f"没有使用索引 {index}: {plans}")
+    for query, plan in plans:
+        for line in plan:
+            if FULL_SCAN.match(line):
+                problems.append(f"全表扫描 {line}: {query}")
+            if sorted_by_index and "USE TEMP B-TREE" in line:
+                problems.append(f"临时排序 {line}: {query}")
+    return problems
+
+
+class TestFingerprint:
+    """SQL 指纹"""
+
+    def test_literals_and_lists_are_normalized(self):
+        assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'it''s'  -- 注释\n  AND x = -2.5;") == \
+            "SELECT * FROM t WHERE id IN (...) AND name = ? AND x = ?"
+        assert fingerprint("SELECT * FROM t WHERE id IN (?,?)") == fingerprint("SELECT * FROM t WHERE id IN (?)")
+        assert fingerprint("INSERT INTO t VALUES (1, 'a'), (2, 'b')") == "INSERT INTO t VALUES (...)"
+        # 标识符中的数字不替换
+        assert fingerprint("SELECT col2 FROM t1") == "SELECT col2 FROM t1"
+
+
+class TestHistogram:
+    """HDR 风格直方图"""
+
+    def test_percentiles_within_bucket_error(self):
+        histogram = QueryHistogram()
+        for micros in range(1, 100001):
+            histogram.record(micros / 1e6)
+        snapshot = histogram.snapshot()
+        for key, expected in (('p50_ms', 50.0), ('p95_ms', 95.0), ('p99_ms', 99.0)):
+            assert abs(snapshot[key] - expected) / expected < 0.07
+        assert snapshot['count'] == 100000 and snapshot['max_ms'] == 100.0
+
+    def test_memory_is_fixed(self):
+        histogram = QueryHistogram()
+        buckets = len(histogram.counts)
+        for seconds in (0.0, 1e-7, 0.5, 3600.0, 1e9):
+            histogram.record(seconds)
+        assert len(histogram.counts) == buckets and sum(histogram.counts) == 5
+
+
+class TestQueryProfiler:
+    """剖析器"""
+
+    def test_fingerprints_and_slow_log_are_bounded(self):
+        profiler = QueryProfiler(slow_ms=1, max_fingerprints=3, slow_log_size=5)
+        for i in range(10):
+            profiler.observe(f"SELECT * FROM table{i} WHERE id = {i}", 0.002)
+        fingerprints = [item['fingerprint'] for item in profiler.snapshot()]
+        assert len(fingerprints) == 4 and OTHER_FINGERPRINT in fingerprints
+        assert profiler.query_count == 10 and profiler.slow_count == 10
+        assert len(profiler.recent_slow_queries(100)) == 5
+
+    def test_fetch_time_and_plan_are_recorded(self):
+        profiler = QueryProfiler(slow_ms=20)
+        conn = sqlite3.connect(":memory:", factory=ProfiledConnection)
+        conn.profiler = profiler
+        conn.create_function("slow", 1, lambda value: time.sleep(0.005) or value)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("CREATE INDEX idx_t_name ON t(name)")
+        conn.executemany("INSERT INTO t (name) VALUES (?)", [(f"n{i}",) for i in range(10)])
+
+        # execute 只执行到第一行，其余 9 行在 fetchall 中计算
+        rows = conn.execute("SELECT slow(id) FROM t WHERE name > ?", ("n",)).fetchall()
+        assert len(rows) == 10
+        histogram = profiler.histogram("SELECT slow(id) FROM t WHERE name > ?")
+        assert histogram['count'] == 1 and histogram['max_ms'] >= 45
+        assert any("idx_t_name" in line for line in profiler.plan("SELECT slow(id) FROM t WHERE name > 'x'"))
+
+        # 快查询和 executemany 不取执行计划
+        assert profiler.plan("INSERT INTO t (name) VALUES (?)") is None
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM t WHERE id = ?", (1,))
+        assert cursor.fetchone()[0] == 1
+        cursor.close()
+        assert profiler.histogram("SELECT id FROM t WHERE id = ?")['count'] == 1
+        assert profiler.plan("SELECT id FROM t WHERE id = ?") is None
+        conn.close()
+
+    def test_database_performance_stats(self, db):
+        db.query_profiler.reset()
+        db.query_profiler.slow_seconds = 0.0
+        for i in range(3):
+            db.get_learning_stats(f"user{i}")
+        stats = db.get_performance_stats()
+        assert stats['query_count'] == 12 and stats['slow_queries_count'] == 12
+        assert len(stats['slow_queries']) == 10 and len(stats['queries']) <= 10
+        due = next(item for item in stats['queries'] if item['fingerprint'] == fingerprint(database.DUE_COUNT_QUERY))
+        assert due['count'] == 3 and any("idx_records_user_due" in line for line in due['plan'])
+
+    def test_profiling_can_be_disabled(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(database, "PROFILING_ENABLED", False)
+        plain = LearningDatabase(str(tmp_path / "plain.db"))
+        try:
+            assert plain.query_profiler is None
+            plain.get_learning_stats("user1")
+            stats = plain.get_performance_stats()
+            assert stats['query_count'] == 0 and stats['slow_queries'] == []
+            with plain._pool.get_connection() as conn:
+                assert type(conn) is sqlite3.Connection
+        finally:
+            plain.close()
+
+
+class TestQueryPlanRegression:
+    """热点查询必须使用预期的索引"""
+
+    @pytest.mark.parametrize("name, call, indexes, sorted_by_index", HOT_QUERIES,
+                             ids=[entry[0] for entry in HOT_QUERIES])
+    def test_hot_query_uses_index(self, loaded_db, name, call, indexes, sorted_by_index):
+        assert plan_regressions(loaded_db, call, indexes, sorted_by_index) == []
+
+    def test_dropped_index_is_detected(self, db):
+        name, call, indexes, sorted_by_index = HOT_QUERIES[0]
+        assert plan_regressions(db, call, indexes, sorted_by_index) == []
+        with db._pool.get_connection() as conn:
+            conn.execute("DROP INDEX idx_records_user_due")
+            conn.commit()
+        assert plan_regressions(db, call, indexes, sorted_by_index)
+
+
+class TestQueryProfilerBenchmark:
+    """热点查询延迟分布与剖析开销"""
+
+    def test_hot_query_latency(self, loaded_db):
+        repeat = int(os.environ.get("QUERY_PLAN_BENCH_REPEAT", "200"))
+        profiler = loaded_db.query_profiler
+        profiler.reset()
+        for i in range(repeat):
+            for _, call, _, _ in HOT_QUERIES:
+                call(loaded_db, f"user{i % 10}")
+        print(f"\n热点查询延迟（每个 {repeat} 次）:")
+        for item in profiler.snapshot(top=20):
+            print(f"  p50 {item['p50_ms']:.3f}ms p99 {item['p99_ms']:.3f}ms max {item['max_ms']:.3f}ms "
+                  f"x{item['count']}: {item['fingerprint'][:90]}")
+        assert profiler.query_count >= repeat * len(HOT_QUERIES)
+
+    def test_profiling_overhead(self, tmp_path):
+        path = str(tmp_path / "overhead.db")
+        setup = sqlite3.connect(path)
+        setup.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        setup.executemany("INSERT INTO t (name) VALUES (?)", [(f"n{i}",) for i in range(1000)])
+        setup.commit()
+        setup.close()
+
+        iterations = 20000
+        timings = {}
+        for label, factory in (("sqlite3.Connection", sqlite3.Connection), ("ProfiledConnection", ProfiledConnection)):
+            conn = sqlite3.connect(path, factory=factory)
+            if factory is ProfiledConnection:
+                conn.profiler = QueryProfiler()
+            started = time.perf_counter()
+            for i in range(iterations):
+                conn.execute("SELECT name FROM t WHERE id = ?", (i % 1000 + 1,)).fetchone()
+            timings[label] = (time.perf_counter() - started) / iterations * 1e6
+            conn.close()
+        overhead = timings["ProfiledConnection"] - timings["sqlite3.Connection"]
+        print(f"\n主键点查 {iterations} 次: " + ", ".join(f"{label} {value:.2f}µs" for label, value in timings.items())
+              + f"，每条语句剖析开销 {overhead:.2f}µs")
+        assert overhead < 20
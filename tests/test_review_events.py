@@ -0,0 +1,270 @@
+"""
+复习事件日志测试
+
+验证答题写入只追加的 review_events、learning_records 与从日志重放的结果一致
+（包括启用日志前已有的记录）、批量写入与按时间范围读取，并测量流式重放的内存占用
+以及逐条 UPDATE 与事件日志的写放大。
+"""
+
+import os
+import sqlite3
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+
+from bilingual_tutor.storage.database import LearningDatabase, to_epoch
+from bilingual_tutor.storage.review_events import (
+    PROJECTION_FIELDS, ReviewEvent, ReviewEventLog, fold_answer, fold_review, iter_events, main,
+    rebuild_learning_records
+)
+
+ANSWERS = [True, True, False, True, True, True, False, True]
+
+
+@pytest.fixture
+def db(tmp_path):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    yield learning_db
+    learning_db.close()
+
+
+def projection(db):
+    with db._pool.get_connection() as conn:
+        return {(row['user_id'], row['item_id'], row['item_type']): tuple(row[name] for name in PROJECTION_FIELDS)
+                for row in conn.execute("SELECT * FROM learning_records")}
+
+
+def corrupt_projection(db):
+    with db._pool.get_connection() as conn:
+        conn.execute("UPDATE learning_records SET learn_count = 0, easiness_factor = 9.9")
+        conn.commit()
+
+
+def written_bytes():
+    """本进程累计写入的字节数（/proc/self/io 的 wchar）"""
+    with open("/proc/self/io") as f:
+        return int(next(line for line in f if line.startswith("wchar")).split()[1])
+
+
+class TestReviewEvents:
+    """事件日志与投影"""
+
+    def test_record_learning_appends_events(self, db):
+        for correct in ANSWERS:
+            record = db.record_learning("u1", 1, "vocabulary", correct, response_ms=1200)
+        db.record_learning("u1", 2, "grammar", False)
+
+        events = list(iter_events(db))
+        assert [event.correct for event in events if event.item_id == 1] == ANSWERS
+        assert events[0].response_ms == 1200 and events[-1].item_type == "grammar"
+
+        # 在线写入与纯函数折叠的结果一致
+        state = None
+        for event in events[:len(ANSWERS)]:
+            state = fold_answer(state, event.correct, event.reviewed_ts)
+        assert state['learn_count'] == record.learn_count == len(ANSWERS)
+        assert state['consecutive_correct'] == record.consecutive_correct == 1
+        assert state['easiness_factor'] == pytest.approx(record.easiness_factor)
+        assert state['next_review_ts'] == to_epoch(record.next_review_date)
+
+    def test_rebuild_restores_projection(self, db):
+        for item_id in range(1, 6):
+            for correct in ANSWERS[:item_id + 2]:
+                db.record_learning("u1", item_id, "vocabulary", correct)
+        expected = projection(db)
+        assert rebuild_learning_records(db.db_path, write=False)['mismatched'] == 0
+
+        corrupt_projection(db)
+        assert main([db.db_path, "--verify"]) == 1
+        stats = rebuild_learning_records(db.db_path, batch_size=2)
+        assert (stats['items'], stats['mismatched'], stats['written']) == (5, 5, 5)
+        assert projection(db) == expected
+
+    def test_rebuild_starts_from_baseline(self, tmp_path):
+        """启用日志前已有的记录：重放从基线状态开始折叠"""
+        path = str(tmp_path / "learning.db")
+        db = LearningDatabase(path)
+        db.record_learning("u1", 1, "vocabulary", True)
+        db.record_learning("u1", 2, "vocabulary", True)
+        db.close()
+
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            DROP TABLE review_events; DROP TABLE review_event_ranges; DROP TABLE review_baseline;
+            PRAGMA user_version = 3;
+        """)
+        conn.close()
+
+        db = LearningDatabase(path)
+        with db._pool.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM review_baseline").fetchone()[0] == 2
+        db.record_learning("u1", 1, "vocabulary", True)
+        record = db.record_learning("u1", 1, "vocabulary", True)
+        expected = projection(db)
+
+        corrupt_projection(db)
+        stats = rebuild_learning_records(path)
+        assert (stats['items'], stats['written']) == (1, 1)
+        rebuilt = projection(db)
+        assert rebuilt[("u1", 1, "vocabulary")] == expected[("u1", 1, "vocabulary")]
+        assert rebuilt[("u1", 1, "vocabulary")][0] == record.learn_count == 3
+        # 没有事件的条目不变
+        assert rebuilt[("u1", 2, "vocabulary")][0] == 0
+        db.close()
+
+    def test_batched_log_and_time_ranges(self, db):
+        base = to_epoch(datetime(2026, 3, 1, 9))
+        log = ReviewEventLog(db, batch_size=4, flush_interval=3600)
+        for day in range(3):
+            for item_id in (1, 2):
+                log.append(ReviewEvent("u1", item_id, "vocabulary", True, reviewed_ts=base + day * 86400))
+            log.append(ReviewEvent("u2", 1, "vocabulary", day != 1, reviewed_ts=base + day * 86400 + 60))
+        assert log.get_stats()['buffered'] == 1
+        log.close()
+
+        stats = log.get_stats()
+        assert (stats['flushed'], stats['batches'], stats['buffered']) == (9, 3, 0)
+        assert stats['projection_writes'] < stats['flushed']
+        assert projection(db)[("u1", 1, "vocabulary")][:3] == (3, 3, 3)
+        assert rebuild_learning_records(db.db_path, write=False)['mismatched'] == 0
+
+        second_day = list(iter_events(db, base + 86400, base + 2 * 86400, page_size=2))
+        assert [(event.user_id, event.correct) for event in second_day] == \
+            [("u1", True), ("u1", True), ("u2", False)]
+        assert [event.item_id for event in iter_events(db, start_ts=base + 2 * 86400, user_id="u1")] == [1, 2]
+        assert list(iter_events(db, start_ts=base + 30 * 86400)) == []
+        with db._pool.get_connection() as conn:
+            assert conn.execute("SELECT SUM(event_count) FROM review_event_ranges").fetchone()[0] == 9
+
+
+    def test_timer_flush_and_retry_after_failure(self, db, monkeypatch):
+        log = ReviewEventLog(db, batch_size=100, flush_interval=0.05)
+        log.record("u1", 1, "vocabulary", True)
+        deadline = time.time() + 5
+        while log.get_stats()['flushed'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        assert log.get_stats()['flushed'] == 1 and log.get_stats()['buffered'] == 0
+
+        log = ReviewEventLog(db, batch_size=100, flush_interval=3600)
+        for correct in (True, False):
+            log.record("u1", 2, "vocabulary", correct)
+
+        def fail(pool, events):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(log, "_write", fail)
+        with pytest.raises(sqlite3.OperationalError):
+            log.flush()
+        assert log.get_stats()['buffered'] == 2
+        monkeypatch.undo()
+        assert log.flush() == 2
+        assert [event.correct for event in iter_events(db, user_id="u1") if event.item_id == 2] == [True, False]
+
+    def test_batch_writes_survive_rebuild(self, db):
+        now = datetime.now()
+        db.record_learning("u1", 1, "vocabulary", True)
+        assert db.batch_insert_learning_records([
+            {'user_id': "u1", 'item_id': 1, 'item_type': "vocabulary", 'learn_count': 10, 'correct_count': 9,
+             'consecutive_correct': 4, 'last_review_date': now.isoformat(),
+             'next_review_date': (now + timedelta(days=20)).isoformat(), 'mastery_level': 4},
+            {'user_id': "u1", 'item_id': 2, 'item_type': "vocabulary", 'learn_count': 3},
+        ])
+        record_id = db.get_latest_learning_record("u1", 2, "vocabulary").id
+        assert db.batch_update_learning_records([(5, 5, 1.0, 2, (now + timedelta(days=6)).isoformat(),
+                                                  now.isoformat(), record_id)])
+        expected = projection(db)
+        assert expected[("u1", 1, "vocabulary")][0] == 10 and expected[("u1", 2, "vocabulary")][0] == 5
+
+        # 直接写入的状态成为重放基线，重建不会回退到事件折叠的结果
+        corrupt_projection(db)
+        rebuild_learning_records(db.db_path)
+        assert projection(db)[("u1", 1, "vocabulary")] == expected[("u1", 1, "vocabulary")]
+        assert rebuild_learning_records(db.db_path, write=False)['mismatched'] == 0
+
+        # 之后的答题从直接写入的状态继续折叠；SNAPSHOT 事件不出现在答题事件中
+        record = db.record_learning("u1", 1, "vocabulary", True)
+        assert record.learn_count == 11
+        assert rebuild_learning_records(db.db_path, write=False)['mismatched'] == 0
+        assert [event.correct for event in iter_events(db, user_id="u1")] == [True, True]
+
+
+class TestReviewEventBenchmarks:
+    """重放内存与写放大"""
+
+    def test_streaming_replay_memory(self, db):
+        events = int(os.environ.get("REVIEW_EVENTS_REPLAY", "200000"))
+        items = int(os.environ.get("REVIEW_EVENTS_ITEMS", str(max(events // 20, 1))))
+        base = to_epoch(datetime(2026, 1, 1))
+        with db._pool.get_connection() as conn:
+            conn.execute("""
+                WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n + 1 < ?)
+                INSERT INTO review_events (user_id, item_id, item_type, correct, reviewed_ts)
+                SELECT 'user_' || (n % ? % 100), n % ?, 'vocabulary', (n % 7) != 3, ? + n * 30 FROM seq
+            """, (events, items, items, base))
+            conn.commit()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        stats = rebuild_learning_records(db.db_path, cache_kb=4096)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"\n重放 {events} 个事件 / {items} 个条目: {elapsed:.1f}s ({events / elapsed:.0f} 事件/s), "
+              f"Python 峰值内存 {peak / 1024 / 1024:.1f} MB")
+        assert stats['items'] == stats['written'] == items
+        assert rebuild_learning_records(db.db_path, write=False)['mismatched'] == 0
+        # 内存占用只与批大小有关，与事件数无关
+        assert peak < 16 * 1024 * 1024
+
+    def test_write_amplification(self, tmp_path):
+        if not os.path.exists("/proc/self/io"):
+            pytest.skip("需要 /proc/self/io")
+        answers = int(os.environ.get("REVIEW_EVENTS_ANSWERS", "2000"))
+        items = 200
+        answer_list = [(f"user_{i % 20}", i % items, i % 5 != 0) for i in range(answers)]
+
+        def legacy_update(db):
+            """原来的写法：每次答题就地 UPDATE learning_records"""
+            for user_id, item_id, correct in answer_list:
+                with db._pool.get_connection() as conn:
+                    row = conn.execute("SELECT * FROM learning_records WHERE user_id = ? AND item_id = ? "
+                                       "AND item_type = 'vocabulary'", (user_id, item_id)).fetchone()
+                    state = fold_review(dict(row) if row else None, correct, datetime.now())
+                    if row:
+                        conn.execute(f"UPDATE learning_records SET {', '.join(f'{k} = ?' for k in state)} "
+                                     "WHERE id = ?", (*state.values(), row['id']))
+                    else:
+                        conn.execute(f"INSERT INTO learning_records (user_id, item_id, item_type, "
+                                     f"{', '.join(state)}) VALUES (?, ?, 'vocabulary', "
+                                     f"{', '.join('?' * len(state))})", (user_id, item_id, *state.values()))
+                    conn.commit()
+
+        def online_events(db):
+            for user_id, item_id, correct in answer_list:
+                db.record_learning(user_id, item_id, "vocabulary", correct)
+
+        def batched_events(db):
+            log = ReviewEventLog(db, batch_size=500, flush_interval=3600)
+            for user_id, item_id, correct in answer_list:
+                log.record(user_id, item_id, "vocabulary", correct)
+            log.close()
+
+        print(f"\n{answers} 次答题 / {items} 个条目 的写放大（/proc/self/io wchar）:")
+        results = {}
+        for label, writer in (("逐条 UPDATE（原写法）", legacy_update),
+                              ("逐条事件 + 投影", online_events),
+                              ("批量事件 + 投影（500/批）", batched_events)):
+            db = LearningDatabase(str(tmp_path / f"{len(results)}.db"))
+            before = written_bytes()
+            started = time.perf_counter()
+            writer(db)
+            elapsed = time.perf_counter() - started
+            results[label] = (written_bytes() - before) / answers
+            print(f"  {label}: 每次答题写入 {results[label] / 1024:.1f} KB, {answers / elapsed:.0f} 次/s")
+            db.close()
+
+        legacy, online, batched = results.values()
+        assert batched < legacy
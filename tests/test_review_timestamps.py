@@ -0,0 +1,241 @@
+"""
+复习时间整数列测试
+
+验证 learning_records 的 epoch 秒整数列：新旧写入路径保持同步（包括只写文本列的
+手工 SQL）、旧数据库升级与迁移脚本的分批回填、复习查询的 EXPLAIN QUERY PLAN
+使用覆盖索引且不需要临时排序，并在大表上比较文本时间与整数时间的查询耗时。
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from bilingual_tutor.storage import database
+from bilingual_tutor.storage.database import (
+    DUE_COUNT_QUERY, DUE_REVIEWS_BY_TYPE_QUERY, DUE_REVIEWS_QUERY, RECENT_ACTIVITY_QUERY,
+    LearningDatabase, to_epoch
+)
+from bilingual_tutor.storage.migrate_database import migrate_review_timestamps
+
+
+@pytest.fixture
+def db(tmp_path):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    yield learning_db
+    learning_db.close()
+
+
+def query_plan(conn, query, params):
+    return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+
+
+def insert_text_only(conn, user_id, item_id, last_review, next_review):
+    """旧代码的写法：只写文本时间列"""
+    conn.execute("""
+        INSERT INTO learning_records (user_id, item_id, item_type, learn_count, correct_count,
+                                      last_review_date, next_review_date, memory_strength)
+        VALUES (?, ?, 'vocabulary', 1, 1, ?, ?, 0.5)
+    """, (user_id, item_id, last_review.isoformat(), next_review.isoformat()))
+
+
+def drop_timestamp_schema(conn):
+    """还原为版本 2 的表结构（没有整数时间列）"""
+    conn.execute("DROP TRIGGER IF EXISTS trg_records_review_ts_insert")
+    conn.execute("DROP TRIGGER IF EXISTS trg_records_review_ts_update")
+    for index in ("idx_records_user_due", "idx_records_user_type_due", "idx_records_user_last_review"):
+        conn.execute(f"DROP INDEX {index}")
+    conn.execute("ALTER TABLE learning_records DROP COLUMN last_review_ts")
+    conn.execute("ALTER TABLE learning_records DROP COLUMN next_review_ts")
+    conn.execute("CREATE INDEX idx_records_user_review ON learning_records(user_id, next_review_date)")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+
+
+class TestTimestampColumns:
+    """整数时间列的写入与同步"""
+
+    def test_writers_fill_epoch_columns(self, db):
+        record = db.record_learning("u1", 1, "vocabulary", True)
+        db.batch_insert_learning_records([{
+            'user_id': "u1", 'item_id': 2, 'item_type': "grammar",
+            'last_review_date': "2026-03-01T08:00:00", 'next_review_date': "2026-03-02T08:00:00.500000",
+        }])
+        with db._pool.get_connection() as conn:
+            rows = {row['item_id']: row for row in conn.execute(
+                "SELECT item_id, last_review_ts, next_review_ts FROM learning_records")}
+        assert rows[1]['next_review_ts'] == to_epoch(record.next_review_date)
+        assert rows[2]['last_review_ts'] == to_epoch("2026-03-01T08:00:00")
+        assert rows[2]['next_review_ts'] == to_epoch(datetime(2026, 3, 2, 8))
+
+        # SM-2 间隔由整数列计算：第三次答对时间隔 = 6 天 * EF
+        db.record_learning("u1", 1, "vocabulary", True)
+        third = db.record_learning("u1", 1, "vocabulary", True)
+        assert (third.next_review_date - third.last_review_date).days == int(6 * third.easiness_factor)
+
+    def test_text_only_writes_are_synced_by_triggers(self, db):
+        now = datetime.now().replace(microsecond=0)
+        with db._pool.get_connection() as conn:
+            insert_text_only(conn, "u2", 1, now - timedelta(days=1), now - timedelta(hours=1))
+            conn.commit()
+            row = conn.execute("SELECT last_review_ts, next_review_ts FROM learning_records").fetchone()
+            assert tuple(row) == (to_epoch(now - timedelta(days=1)), to_epoch(now - timedelta(hours=1)))
+
+            conn.execute("UPDATE learning_records SET next_review_date = ?",
+                         ((now + timedelta(days=3)).isoformat(),))
+            conn.commit()
+            row = conn.execute("SELECT last_review_ts, next_review_ts FROM learning_records").fetchone()
+            assert tuple(row) == (to_epoch(now - timedelta(days=1)), to_epoch(now + timedelta(days=3)))
+
+        assert db.get_due_reviews("u2") == []
+
+    def test_summary_counts_same_day_reviews(self, db):
+        """旧查询用 datetime('now') 比较 ISO 文本（'T' 与空格、UTC 与本地时间），当天到期的项目计数错误"""
+        now = datetime.now()
+        with db._pool.get_connection() as conn:
+            insert_text_only(conn, "u3", 1, now - timedelta(hours=2), now - timedelta(minutes=30))
+            insert_text_only(conn, "u3", 2, now - timedelta(hours=2), now + timedelta(hours=3))
+            conn.commit()
+        assert db.get_user_learning_summary("u3")['overall']['due_reviews'] == 1
+        assert db.get_learning_stats("u3")['due_reviews'] == 1
+        assert [row['item_id'] for row in db.get_due_reviews("u3", "vocabulary")] == [1]
+
+
+class TestMigration:
+    """旧数据库升级与回填"""
+
+    def make_version_2_database(self, path, rows):
+        now = datetime.now().replace(microsecond=0)
+        with LearningDatabase(path) as db:
+            with db._pool.get_connection() as conn:
+                drop_timestamp_schema(conn)
+                for i in range(rows):
+                    insert_text_only(conn, f"user{i % 3}", i, now - timedelta(days=2),
+                                     now + timedelta(hours=i - rows // 2))
+                conn.commit()
+        return now
+
+    def test_open_upgrades_and_backfills(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        self.make_version_2_database(path, 30)
+
+        with LearningDatabase(path) as db:
+            with db._pool.get_connection() as conn:
+                assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+                missing = conn.execute("SELECT COUNT(*) FROM learning_records WHERE next_review_ts IS NULL "
+                                       "OR next_review_ts != CAST(strftime('%s', next_review_date, 'utc') AS INTEGER)"
+                                       ).fetchone()[0]
+                indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            assert missing == 0
+            assert "idx_records_user_due" in indexes and "idx_records_user_review" not in indexes
+            assert sum(len(db.get_due_reviews(f"user{i}", limit=100)) for i in range(3)) == 16
+
+    def test_migration_script_backfills_in_batches(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        now = self.make_version_2_database(path, 25)
+        # 迁移前已有整数列（例如部分升级的数据库），脚本只回填缺失的行
+        with sqlite3.connect(path) as conn:
+            conn.execute("ALTER TABLE learning_records ADD COLUMN last_review_ts INTEGER")
+            conn.execute("ALTER TABLE learning_records ADD COLUMN next_review_ts INTEGER")
+            conn.execute("UPDATE learning_records SET last_review_ts = 0, next_review_ts = 0 WHERE item_id < 5")
+
+        assert migrate_review_timestamps(path, batch_size=7) == 20
+        with sqlite3.connect(path) as conn:
+            stale = conn.execute("SELECT COUNT(*) FROM learning_records WHERE next_review_ts = 0").fetchone()[0]
+            filled = conn.execute("SELECT next_review_ts FROM learning_records WHERE item_id = 24").fetchone()[0]
+        assert stale == 5
+        assert filled == to_epoch(now + timedelta(hours=24 - 12))
+
+
+class TestQueryPlans:
+    """热点复习查询的查询计划"""
+
+    def test_review_queries_use_covering_indexes(self, db):
+        now = int(time.time())
+        with db._pool.get_connection() as conn:
+            conn.execute("ANALYZE")
+            due = query_plan(conn, DUE_REVIEWS_QUERY, ("u", now, 20))
+            by_type = query_plan(conn, DUE_REVIEWS_BY_TYPE_QUERY, ("u", "vocabulary", now, 20))
+            due_count = query_plan(conn, DUE_COUNT_QUERY, ("u", now))
+            recent = query_plan(conn, RECENT_ACTIVITY_QUERY, ("u", now))
+
+        assert "idx_records_user_due (user_id=? AND next_review_ts<?)" in due
+        assert "idx_records_user_type_due (user_id=? AND item_type=? AND next_review_ts<?)" in by_type
+        assert "TEMP B-TREE" not in due and "TEMP B-TREE" not in by_type
+        assert "COVERING INDEX idx_records_user_due" in due_count
+        assert "COVERING INDEX idx_records_user_last_review" in recent
+
+
+LEGACY_DUE_QUERY = """
+    SELECT lr.*, v.word, v.meaning, v.reading
+    FROM learning_records lr
+    LEFT JOIN vocabulary v ON lr.item_id = v.id AND lr.item_type = 'vocabulary'
+    WHERE lr.user_id = ? AND lr.next_review_date <= ?
+    ORDER BY lr.next_review_date ASC, lr.memory_strength ASC
+    LIMIT ?
+"""
+LEGACY_DUE_COUNT_QUERY = "SELECT COUNT(*) FROM learning_records WHERE user_id = ? AND next_review_date <= ?"
+
+
+class TestReviewQueryBenchmark:
+    """大表基准（REVIEW_TS_ROWS=10000000 为完整规模）"""
+
+    def test_epoch_vs_text_queries(self, tmp_path):
+        rows = int(os.environ.get("REVIEW_TS_ROWS", "200000"))
+        users = int(os.environ.get("REVIEW_TS_USERS", str(max(rows // 500, 1))))
+        probes = int(os.environ.get("REVIEW_TS_PROBES", "300"))
+        path = str(tmp_path / "learning.db")
+        LearningDatabase(path).close()
+
+        conn = sqlite3.connect(path)
+        drop_timestamp_schema(conn)
+        started = time.perf_counter()
+        # 复习时间分布在前后 60 天内（ISO 文本，与 datetime.isoformat() 格式相同）
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {rows - 1})
+            INSERT INTO learning_records (user_id, item_id, item_type, learn_count, correct_count,
+                                          memory_strength, last_review_date, next_review_date)
+            SELECT 'user' || (n % {users}), n, CASE n % 3 WHEN 0 THEN 'vocabulary' WHEN 1 THEN 'grammar'
+                   ELSE 'content' END, 3, 2, (n % 100) / 100.0,
+                   strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime', '-' || (n % 30) || ' days'),
+                   strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime', ((n * 7919) % 120 - 60) || ' days',
+                            ((n * 104729) % 86400) || ' seconds')
+            FROM seq
+        """)
+        conn.commit()
+        load_time = time.perf_counter() - started
+        conn.close()
+
+        started = time.perf_counter()
+        migrate_review_timestamps(path)
+        backfill_time = time.perf_counter() - started
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE INDEX idx_legacy_user_review ON learning_records(user_id, next_review_date)")
+        conn.execute("ANALYZE")
+
+        def bench(query, params_for):
+            started = time.perf_counter()
+            for i in range(probes):
+                conn.execute(query, params_for(f"user{(i * 7) % users}")).fetchall()
+            return (time.perf_counter() - started) / probes * 1000
+
+        now_text, now_ts = datetime.now().isoformat(), int(time.time())
+        results = {
+            "待复习列表 LIMIT 20": (bench(LEGACY_DUE_QUERY, lambda user: (user, now_text, 20)),
+                                bench(DUE_REVIEWS_QUERY, lambda user: (user, now_ts, 20))),
+            "待复习计数": (bench(LEGACY_DUE_COUNT_QUERY, lambda user: (user, now_text)),
+                          bench(DUE_COUNT_QUERY, lambda user: (user, now_ts))),
+        }
+        legacy_plan = query_plan(conn, LEGACY_DUE_QUERY, ("user0", now_text, 20))
+        conn.close()
+
+        print(f"\n{rows} 条学习记录, {users} 个用户: 生成 {load_time:.1f}s, "
+              f"回填整数列 {backfill_time:.1f}s ({rows / backfill_time:,.0f} 行/秒)")
+        print(f"  文本列查询计划: {legacy_plan}")
+        for name, (legacy, epoch) in results.items():
+            print(f"  {name}: 文本时间 {legacy:.3f} ms, 整数时间 {epoch:.3f} ms ({legacy / epoch:.1f}x)")
+        assert "TEMP B-TREE" in legacy_plan
+        for legacy, epoch in results.values():
+            assert epoch < legacy * 1.5
@@ -0,0 +1,257 @@
+"""
+全文检索测试
+
+验证触发器让 FTS5 索引与词汇、语法、内容表保持同步（插入、更新、删除、REPLACE 覆盖）、
+日文假名/汉字与英文的检索、少于 3 个字符的检索词、相关度排序、过滤与分页、检索接口，
+并测量大语料（SEARCH_BENCH_ROWS=500000 为完整规模）下的检索延迟。
+"""
+
+import os
+import random
+import time
+
+import pytest
+
+from bilingual_tutor.storage.database import ContentItem, LearningDatabase, VocabularyItem
+from bilingual_tutor.storage import search as search_module
+from bilingual_tutor.storage.search import SHADOW_TABLE_ROWS
+from bilingual_tutor.web.app import create_app
+from bilingual_tutor.web.routes import api as api_routes
+
+
+@pytest.fixture
+def db(tmp_path):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    yield learning_db
+    learning_db.close()
+
+
+def add_word(db, word, meaning, language="english", level="CET-4", reading="", example=""):
+    return db.add_vocabulary(VocabularyItem(word=word, reading=reading, meaning=meaning,
+                                            example_sentence=example, language=language, level=level))
+
+
+def titles(result):
+    return [item['title'] for item in result['results']]
+
+
+def fts_rowids(db, table):
+    with db._pool.get_connection() as conn:
+        return sorted(row[0] for row in conn.execute(f"SELECT rowid FROM {table}_fts"))
+
+
+class TestSearchIndex:
+    """索引同步"""
+
+    def test_triggers_keep_index_in_sync(self, db):
+        cat = add_word(db, "category", "类别")
+        add_word(db, "catalogue", "目录")
+        assert titles(db.search("catego")) == ["category"]
+
+        with db._pool.get_connection() as conn:
+            conn.execute("UPDATE vocabulary SET word = 'classification' WHERE id = ?", (cat,))
+            conn.commit()
+        assert titles(db.search("catego")) == []
+        assert titles(db.search("classif")) == ["classification"]
+
+        with db._pool.get_connection() as conn:
+            conn.execute("DELETE FROM vocabulary WHERE id = ?", (cat,))
+            conn.commit()
+        assert titles(db.search("classif")) == []
+
+        # 重复添加同一词汇原地更新，更新触发器同步索引，不留旧索引行
+        again = add_word(db, "catalogue", "目录（新）")
+        assert titles(db.search("catalog")) == ["catalogue"]
+        assert fts_rowids(db, "vocabulary") == [again]
+        assert db.rebuild_search_index()['vocabulary'] == {'removed': 0, 'added': 0}
+
+    def test_shadow_table_statistics_are_pinned(self, db):
+        """空影子表的统计信息会让 FTS5 内部查询走全表扫描，写入耗时随索引增长"""
+        assert db.vacuum_database()
+        with db._pool.get_connection() as conn:
+            stats = {row[0]: row[1] for row in conn.execute("SELECT tbl, stat FROM sqlite_stat1 WHERE tbl LIKE '%_fts_%'")}
+        assert stats and set(stats.values()) == {str(SHADOW_TABLE_ROWS)}
+
+    def test_analyzing_connection_keeps_fast_writes(self, tmp_path):
+        """执行 ANALYZE 的那个池连接写入全文索引的速度与其他连接相同"""
+        db = LearningDatabase(str(tmp_path / "learning.db"))
+        connections = []
+        while not db._pool._pool.empty():
+            connections.append(db._pool._pool.get_nowait())
+        try:
+            start, rates = 0, []
+            for _ in range(2):
+                for conn in connections:
+                    started = time.perf_counter()
+                    conn.executemany("INSERT INTO vocabulary (word, meaning, language, level) "
+                                     "VALUES (?, ?, 'english', 'CET-4')",
+                                     [(f"word{i}", f"释义{i}") for i in range(start, start + 20000)])
+                    conn.commit()
+                    start += 20000
+                    rates.append(20000 / (time.perf_counter() - started))
+            assert min(rates) > max(rates) / 3
+        finally:
+            for conn in connections:
+                db._pool._pool.put(conn)
+            db.close()
+
+    def test_existing_rows_are_indexed_on_upgrade(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        db = LearningDatabase(path)
+        add_word(db, "existing", "已有")
+        with db._pool.get_connection() as conn:
+            conn.executescript("DROP TABLE vocabulary_fts; PRAGMA user_version = 5;")
+        db.close()
+
+        db = LearningDatabase(path)
+        assert titles(db.search("existing")) == ["existing"]
+        db.close()
+
+
+class TestSearchQueries:
+    """检索与排序"""
+
+    def test_japanese_and_english(self, db):
+        add_word(db, "勉強", "学习", language="japanese", level="N5", reading="べんきょう",
+                 example="毎日日本語を勉強します")
+        add_word(db, "日本語", "日语", language="japanese", level="N5", reading="にほんご")
+        add_word(db, "Study", "学习", example="I study every day")
+        db.add_grammar("〜ています", "Vて + います", "表示动作正在进行", [], "japanese", "N5")
+        db.add_content(ContentItem(title="日本語の勉強", body="日本語を勉強するのは楽しいです",
+                                   content_type="article", language="japanese", level="N5"))
+
+        assert titles(db.search("べんきょう")) == ["勉強"]
+        assert titles(db.search("STUDY", item_type="vocabulary")) == ["Study"]
+        assert set(titles(db.search("日本語"))) == {"日本語", "勉強", "日本語の勉強"}
+        assert titles(db.search("ています", item_type="grammar")) == ["〜ています"]
+        assert titles(db.search("日本語 楽しい")) == ["日本語の勉強"]
+        # 少于 3 个字符：在源表上扫描，完全匹配排在前面
+        assert titles(db.search("勉強", item_type="vocabulary")) == ["勉強"]
+        assert titles(db.search("学习")) == ["勉強", "Study"]
+        assert titles(db.search("日本語", language="english")) == []
+
+        first = db.search("日本語")['results'][0]
+        assert first['type'] in ("vocabulary", "content") and '[' in first['snippet']
+
+    def test_ranking_prefers_headword(self, db):
+        add_word(db, "apple", "苹果")
+        add_word(db, "pie", "馅饼", example="an apple pie")
+        add_word(db, "pineapple", "菠萝")
+        assert titles(db.search("apple", item_type="vocabulary"))[0] == "apple"
+        assert titles(db.search("apple pie", item_type="vocabulary")) == ["pie"]
+        # LIKE 通配符按字面匹配
+        assert titles(db.search("100%")) == []
+
+    def test_pagination_and_errors(self, db, monkeypatch):
+        for i in range(25):
+            add_word(db, f"running{i:02d}", "跑", level="CET-4" if i % 2 else "CET-6")
+        first = db.search("running", page=1, per_page=10)
+        second = db.search("running", page=2, per_page=10)
+        third = db.search("running", page=3, per_page=10)
+        assert first['has_more'] and second['has_more'] and not third['has_more']
+        assert len(third['results']) == 5
+        assert len(set(titles(first)) | set(titles(second)) | set(titles(third))) == 25
+        assert len(db.search("running", level="CET-6", per_page=50)['results']) == 13
+        assert db.search("running", per_page=1000)['per_page'] == 50
+
+        # 超过 MAX_OFFSET 的页返回空结果，而不是重复最后一页
+        monkeypatch.setattr(search_module, "MAX_OFFSET", 20)
+        last = db.search("running", page=2, per_page=10)
+        assert len(last['results']) == 10 and not last['has_more']
+        beyond = db.search("running", page=3, per_page=10)
+        assert beyond['results'] == [] and not beyond['has_more']
+
+        with pytest.raises(ValueError):
+            db.search("   ")
+        with pytest.raises(ValueError):
+            db.search("running", item_type="audio")
+
+    def test_all_types_interleave_by_rank(self, db):
+        """不同 FTS 表的 bm25 分数不可比较，全部类型检索时按类型内名次交错"""
+        for i in range(3):
+            add_word(db, f"travel{i}", "旅行", example="travel " * (i + 1))
+        db.add_grammar("travel pattern", "travel + ing", "travel", [], "english", "CET-4")
+        db.add_content(ContentItem(title="travel notes", body="notes about travel",
+                                   content_type="article", language="english", level="CET-4"))
+
+        results = db.search("travel")['results']
+        assert [result['type'] for result in results] == [
+            "vocabulary", "grammar", "content", "vocabulary", "vocabulary"]
+        assert [result['title'] for result in results if result['type'] == "vocabulary"] == \
+            titles(db.search("travel", item_type="vocabulary"))
+        # 交错后的分页与整体结果一致
+        pages = [db.search("travel", page=page, per_page=2) for page in (1, 2, 3)]
+        assert sum((page['results'] for page in pages), []) == results
+        assert [page['has_more'] for page in pages] == [True, True, False]
+
+    def test_search_endpoint(self, db, monkeypatch):
+        add_word(db, "library", "图书馆")
+        monkeypatch.setattr(api_routes, "_system_integrator", type("System", (), {"learning_db": db})())
+        app = create_app()
+        app.config['TESTING'] = True
+        client = app.test_client()
+        assert client.get("/api/search?q=library").status_code == 401
+
+        with client.session_transaction() as flask_session:
+            flask_session['user_id'] = 'tester'
+        body = client.get("/api/search?q=librar&type=vocabulary&per_page=5").get_json()
+        assert body['success'] and body['results'][0]['title'] == "library"
+        assert body['per_page'] == 5 and body['has_more'] is False
+        assert client.get("/api/search?q=").status_code == 400
+
+
+SYLLABLES = ["ka", "ri", "to", "men", "sa", "lo", "ver", "in", "tion", "pre", "con", "al", "ble", "st", "ou"]
+KANA = "あいうえおかきくけこさしすせそたちつてと"
+
+
+def make_corpus(db, rows, seed=7):
+    """生成词汇（英日各半）、语法和阅读内容，共 rows 行"""
+    rng = random.Random(seed)
+    vocabulary, grammar, content = [], [], []
+    for i in range(rows):
+        if i % 20 == 18:
+            grammar.append((f"文型{i}", "".join(rng.choices(KANA, k=4)), "".join(rng.choices(KANA, k=30)),
+                            "japanese", "N3"))
+        elif i % 20 == 19:
+            body = " ".join("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(60))
+            content.append((f"article {i}", body, "article", "english", "CET-4"))
+        elif i % 2:
+            word = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) + str(i)
+            vocabulary.append((word, "", f"释义{i % 5000}", f"the {word} example", "english", "CET-4"))
+        else:
+            kanji = "".join(chr(0x4E00 + rng.randrange(2000)) for _ in range(rng.randint(1, 3)))
+            vocabulary.append((f"{kanji}{i}", "".join(rng.choices(KANA, k=rng.randint(2, 5))),
+                               f"释义{i % 5000}", "", "japanese", "N3"))
+    with db._pool.get_connection() as conn:
+        conn.executemany("INSERT INTO vocabulary (word, reading, meaning, example_sentence, language, level) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", vocabulary)
+        conn.executemany("INSERT INTO grammar (name, pattern, explanation, language, level) VALUES (?, ?, ?, ?, ?)",
+                         grammar)
+        conn.executemany("INSERT INTO content (title, body, content_type, language, level) VALUES (?, ?, ?, ?, ?)",
+                         content)
+        conn.commit()
+
+
+class TestSearchBenchmark:
+    """大语料检索延迟"""
+
+    def test_query_latency(self, db):
+        rows = int(os.environ.get("SEARCH_BENCH_ROWS", "100000"))
+        started = time.perf_counter()
+        make_corpus(db, rows)
+        print(f"\n{rows} 行语料写入并建立索引: {time.perf_counter() - started:.1f}s")
+
+        queries = [("英文词干", "tion", None), ("英文罕见词", "verpremen", None), ("英文多词", "con ble", None),
+                   ("假名", "かきく", "vocabulary"), ("释义", "释义42", "vocabulary"),
+                   ("单个汉字（扫描）", chr(0x4E00 + 5), "vocabulary"), ("第 5 页", "tion", "vocabulary")]
+        for label, text, item_type in queries:
+            page = 5 if label == "第 5 页" else 1
+            timings = []
+            for _ in range(20):
+                started = time.perf_counter()
+                result = db.search(text, item_type=item_type, page=page)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(f"  {label} {text!r}: p50 {timings[10] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms, "
+                  f"{len(result['results'])} 条")
+            assert result['results']
@@ -0,0 +1,267 @@
+"""
+学习数据库分片测试
+
+验证一致性哈希路由稳定且扩容时只迁移少量用户、分片连接可以联表查询目录库中的词汇、
+单文件迁移到分片以及分片数调整后数据不丢失、分片配置不一致时拒绝打开，
+并比较 1、4、16 个分片下多线程写入的吞吐量。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.storage.review_events import ReviewEventLog, iter_events
+from bilingual_tutor.storage.sharding import HashRing, main, rebalance_shards, shard_path
+from bilingual_tutor.storage.user_repository import UserRepository
+
+
+def add_vocabulary(db, count):
+    with db._pool.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO vocabulary (word, reading, meaning, language, level) VALUES (?, ?, ?, 'english', 'CET-4')",
+            [(f"word{i}", "", f"meaning{i}") for i in range(count)])
+        conn.commit()
+
+
+def count_rows(db, table="learning_records"):
+    total = 0
+    for pool in db._user_pools():
+        with pool.get_connection() as conn:
+            total += conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+    return total
+
+
+def snapshot(db):
+    """所有用户的学习记录（不含分片内的 id）"""
+    rows = set()
+    for pool in db._user_pools():
+        with pool.get_connection() as conn:
+            rows.update(tuple(row) for row in conn.execute(
+                "SELECT user_id, item_id, item_type, learn_count, correct_count, next_review_ts "
+                "FROM main.learning_records"))
+    return rows
+
+
+class TestHashRing:
+    """一致性哈希路由"""
+
+    def test_routing_is_stable_and_balanced(self):
+        ring = HashRing(range(4))
+        users = [f"user_{i}" for i in range(4000)]
+        owners = [ring.node_for(user) for user in users]
+        assert owners == [HashRing(range(4)).node_for(user) for user in users]
+        counts = [owners.count(node) for node in range(4)]
+        assert min(counts) > 4000 / 4 * 0.6
+
+    def test_adding_a_shard_moves_few_users(self):
+        users = [f"user_{i}" for i in range(4000)]
+        before, after = HashRing(range(4)), HashRing(range(5))
+        moved = [user for user in users if before.node_for(user) != after.node_for(user)]
+        # 理想情况下移动 1/5，取模路由会移动约 4/5
+        assert len(moved) < len(users) * 0.35
+        assert all(after.node_for(user) == 4 for user in moved)
+
+
+class TestShardedDatabase:
+    """分片数据库"""
+
+    def test_per_user_tables_live_in_shards(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        db = LearningDatabase(path, shards=4)
+        try:
+            add_vocabulary(db, 20)
+            for i in range(40):
+                db.record_learning(f"user_{i}", i % 20 + 1, "vocabulary", i % 3 != 0)
+            assert all(os.path.exists(shard_path(path, i)) for i in range(4))
+            assert count_rows(db) == 40
+            assert db.get_database_stats()['shards'] == 4
+
+            # 目录库只保存共享表
+            with db._pool.get_connection() as conn:
+                tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            assert "vocabulary" in tables and "learning_records" not in tables
+
+            # 分片连接 ATTACH 了目录库，与词汇表的联表查询照常工作
+            with db._user_pool("user_0").get_connection() as conn:
+                conn.execute("UPDATE learning_records SET next_review_ts = 0 WHERE user_id = 'user_0'")
+                conn.commit()
+            due = db.get_due_reviews("user_0", limit=10, item_type="vocabulary")
+            assert [item['item_id'] for item in due] == [1]
+            assert due[0]['word'] == "word0"
+            assert db.get_user_learning_summary("user_3")['overall']['total_items'] == 1
+            assert db.get_latest_learning_record("user_5", 6, "vocabulary").learn_count == 1
+
+            # 批量写入按用户分组到各自的分片
+            assert db.batch_insert_learning_records([
+                {'user_id': f"bulk_{i}", 'item_id': 1, 'item_type': "vocabulary"} for i in range(30)])
+            assert count_rows(db) == 70
+            # 分片内的 id 不唯一，批量更新必须带 user_id
+            assert not db.batch_update_learning_records([(1, 1, 0.5, 1, "2026-01-01", "2026-01-01", 1)])
+            assert db.batch_update_learning_records([(9, 9, 0.9, 3, "2026-01-01", "2026-01-01", 1, "bulk_0")])
+        finally:
+            db.close()
+
+    def test_event_log_routes_by_user(self, tmp_path):
+        db = LearningDatabase(str(tmp_path / "learning.db"), shards=3)
+        try:
+            log = ReviewEventLog(db, batch_size=1000, flush_interval=3600)
+            for i in range(60):
+                log.record(f"user_{i % 12}", i % 5, "vocabulary", i % 4 != 0)
+            log.close()
+            assert count_rows(db, "review_events") == 60
+            assert len(list(iter_events(db))) == 60
+            assert [event.user_id for event in iter_events(db, user_id="user_7")] == ["user_7"] * 5
+        finally:
+            db.close()
+
+    def test_shard_count_must_match_catalog(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        LearningDatabase(path, shards=2).close()
+        with pytest.raises(ValueError):
+            LearningDatabase(path, shards=3)
+        with pytest.raises(ValueError):
+            LearningDatabase(path)
+
+    def test_backup_and_restore_include_shards(self, tmp_path):
+        db = LearningDatabase(str(tmp_path / "learning.db"), shards=3)
+        try:
+            add_vocabulary(db, 10)
+            for i in range(30):
+                db.record_learning(f"user_{i}", i % 10 + 1, "vocabulary", True)
+            before = snapshot(db)
+            backup = str(tmp_path / "backup.db")
+            assert db.backup_database(backup)
+            assert all(os.path.exists(shard_path(backup, i)) for i in range(3))
+
+            for i in range(30, 45):
+                db.record_learning(f"user_{i}", 1, "vocabulary", False)
+            assert count_rows(db) == 45
+
+            assert db.restore_database(backup)
+            assert snapshot(db) == before
+            # 恢复后分片连接池可以继续写入
+            db.record_learning("user_new", 2, "vocabulary", True)
+            assert count_rows(db) == 31
+
+            # 缺少分片备份时拒绝恢复，不只恢复目录库
+            os.remove(shard_path(backup, 1))
+            assert not db.restore_database(backup)
+            assert count_rows(db) == 31
+        finally:
+            db.close()
+
+
+class TestShardedUsers:
+    """分片模式下的用户与偏好（users 和 user_preferences 在目录库中）"""
+
+    def test_user_repository_on_sharded_database(self, tmp_path):
+        db = LearningDatabase(str(tmp_path / "learning.db"), shards=2)
+        repository = UserRepository(db)
+        for name in ("alice", "bob"):
+            repository.save_user(name)
+            assert repository.set_preferences(name, {"learning_preferences": {"name": name}, "target_goals": {}})
+        assert repository.get_preferences("alice") == {"learning_preferences": {"name": "alice"}, "target_goals": {}}
+        assert repository.list_profile_ids() == ["alice", "bob"]
+        assert not repository.set_preferences("carol", {"daily_goal": 30})
+
+        # 删除用户时级联删除偏好，不会留下按 id 复用的旧偏好
+        assert repository.delete_user("alice")
+        repository.save_user("alice")
+        assert repository.get_preferences("alice") == {}
+        assert repository.delete_profile("bob")
+        assert repository.list_profile_ids() == []
+        repository.set_preferences("alice", {"learning_preferences": {}})
+        repository.clear_profiles()
+        assert repository.list_profile_ids() == []
+        assert db.get_database_stats()["user_preferences_count"] == 0
+        db.close()
+
+
+class TestRebalance:
+    """分片迁移工具"""
+
+    def test_unsharded_to_sharded_and_resize(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        db = LearningDatabase(path)
+        add_vocabulary(db, 10)
+        for i in range(200):
+            db.record_learning(f"user_{i % 25}", i % 10 + 1, "vocabulary", i % 4 != 0)
+        expected = snapshot(db)
+        db.close()
+        UserRepository(LearningDatabase(path)).save_user("user_1")
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO user_preferences (user_id, preference_key, preference_value) "
+                     "SELECT id, 'daily_goal', '30' FROM users WHERE username = 'user_1'")
+        conn.commit()
+        conn.close()
+
+        stats = rebalance_shards(path, 4)
+        assert stats['users_moved'] == 25
+        conn = sqlite3.connect(path)
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'learning_records'").fetchone() is None
+        conn.close()
+
+        db = LearningDatabase(path, shards=4)
+        assert snapshot(db) == expected
+        assert count_rows(db, "review_events") == 200
+        # 用户偏好按 users.id 关联，留在目录库
+        assert UserRepository(db).get_preferences("user_1") == {"daily_goal": 30}
+        db.close()
+
+        # 4 -> 5：只有落到新分片的用户移动
+        assert main([path, "5"]) == 0
+        db = LearningDatabase(path, shards=5)
+        assert snapshot(db) == expected
+        ring = HashRing(range(5))
+        for index, pool in enumerate(db._user_pools()):
+            with pool.get_connection() as conn:
+                owners = {ring.node_for(row[0]) for row in conn.execute("SELECT DISTINCT user_id FROM main.learning_records")}
+            assert owners <= {index}
+        db.record_learning("user_3", 1, "vocabulary", True)
+        db.close()
+
+        # 5 -> 2：多出的分片文件被删除
+        rebalance_shards(path, 2)
+        assert not os.path.exists(shard_path(path, 4))
+        db = LearningDatabase(path, shards=2)
+        assert count_rows(db) == len(expected) + 1
+        assert count_rows(db, "review_events") == 201
+        db.close()
+
+
+class TestShardWriteBenchmark:
+    """多线程写入吞吐量（SHARD_BENCH_WRITES、SHARD_BENCH_THREADS 调整规模）"""
+
+    def test_write_throughput(self, tmp_path):
+        writes = int(os.environ.get("SHARD_BENCH_WRITES", "1600"))
+        threads = int(os.environ.get("SHARD_BENCH_THREADS", "8"))
+        print(f"\n{threads} 个线程共 {writes} 次答题（每次一个事务）:")
+        results = {}
+        for shards in (1, 4, 16):
+            db = LearningDatabase(str(tmp_path / f"bench_{shards}.db"), max_connections=threads, shards=shards)
+            errors = []
+
+            def worker(offset):
+                try:
+                    for i in range(offset, writes, threads):
+                        db.record_learning(f"user_{i % 500}", i % 300, "vocabulary", i % 5 != 0)
+                except Exception as e:
+                    errors.append(e)
+
+            workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            results[shards] = writes / elapsed
+            assert not errors
+            assert count_rows(db, "review_events") == writes
+            db.close()
+            print(f"  {shards} 个分片: {results[shards]:.0f} 次/s")
+        assert all(rate > 0 for rate in results.values())
@@ -0,0 +1,231 @@
+"""
+共享词表测试
+
+验证内存映射词表的构建、查找、级别视图和数据源变化后的重建，
+并报告每个工作进程的内存占用和查找耗时。
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import psutil
+import pytest
+
+from bilingual_tutor.storage import lexicon as lexicon_module
+from bilingual_tutor.storage.lexicon import (
+    Lexicon, LevelWordSet, WordFrequencies, build_lexicon, get_shared_lexicon, reset_shared_lexicon,
+    HEADER
+)
+from bilingual_tutor.content.precise_level_crawler import PreciseLevelContentCrawler
+from bilingual_tutor.content.level_generator import LevelAppropriateContentGenerator
+
+
+def write_vocabulary_json(directory, language, level, words):
+    """写入 vocabulary_data 格式的词表文件"""
+    path = os.path.join(directory, f"custom_{language}_{level}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "metadata": {"language": language, "level": level},
+            "words": [{"word": word, "meaning": "-"} for word in words]
+        }, f, ensure_ascii=False)
+    return path
+
+
+def create_vocabulary_db(path, rows):
+    """创建只含 vocabulary 表的数据库"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE vocabulary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT NOT NULL, meaning TEXT, language TEXT NOT NULL, level TEXT NOT NULL
+        )
+    """)
+    conn.executemany("INSERT INTO vocabulary (word, meaning, language, level) VALUES (?, '-', ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def _worker_lookup(path, words):
+    """子进程中打开词表并查询，返回 (命中数, RSS增量字节)"""
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    lexicon = Lexicon(path)
+    hits = sum(1 for word in words if lexicon.lookup(word, "english") is not None)
+    return hits, process.memory_info().rss - rss_before
+
+
+@pytest.fixture
+def sources(tmp_path):
+    vocabulary_dir = tmp_path / "vocabulary_data"
+    vocabulary_dir.mkdir()
+    write_vocabulary_json(str(vocabulary_dir), "english", "CET-4", ["Abandon", "ability"])
+    write_vocabulary_json(str(vocabulary_dir), "japanese", "N5", ["あい", "学校"])
+    db_path = str(tmp_path / "learning.db")
+    create_vocabulary_db(db_path, [
+        ("elaborate", "english", "CET-6"),
+        ("ability", "english", "CET-6"),  # JSON 中已有，保留先出现的级别
+        ("哲学", "japanese", "N2"),
+    ])
+    return str(vocabulary_dir), db_path
+
+
+class TestLexicon:
+    """词表构建与查找"""
+
+    def test_build_and_lookup(self, tmp_path, sources):
+        vocabulary_dir, db_path = sources
+        path = str(tmp_path / "lexicon.bin")
+
+        count = build_lexicon(path, vocabulary_dir, db_path,
+                              extra_entries=[("the", "english", None, 1)])
+        lexicon = Lexicon(path)
+
+        assert count == len(lexicon) == 7
+        assert os.path.getsize(path) == HEADER.size + 4 * (count + 1) + 4 * count + count + sum(
+            len(word.encode("utf-8")) + 1 for word in ["abandon", "ability", "elaborate", "the", "あい", "学校", "哲学"])
+        assert lexicon.level_of("abandon", "english") == "CET-4"
+        assert lexicon.level_of("ABANDON", "english") == "CET-4"
+        assert lexicon.level_of("ability", "english") == "CET-4"
+        assert lexicon.level_of("elaborate", "english") == "CET-6"
+        assert lexicon.level_of("学校", "japanese") == "N5"
+        assert lexicon.level_of("哲学", "japanese") == "N2"
+        assert lexicon.lookup("学校", "english") is None
+        assert lexicon.lookup("missing", "english") is None
+
+        the = lexicon.lookup("the", "english")
+        assert the.level is None and the.rank == 1
+        assert ("elaborate", "english") in lexicon
+
+    def test_iteration_is_sorted_and_filtered(self, tmp_path, sources):
+        vocabulary_dir, db_path = sources
+        path = str(tmp_path / "lexicon.bin")
+        build_lexicon(path, vocabulary_dir, db_path)
+        lexicon = Lexicon(path)
+
+        english = [entry.word for entry in lexicon.iter_entries("english")]
+        assert english == sorted(english)
+        assert [e.word for e in lexicon.iter_entries("english", "CET-4")] == ["abandon", "ability"]
+        assert lexicon.count("japanese", "N5") == 2
+
+    def test_level_word_set_merges_seed_and_lexicon(self, tmp_path, sources):
+        vocabulary_dir, db_path = sources
+        path = str(tmp_path / "lexicon.bin")
+        build_lexicon(path, vocabulary_dir, db_path)
+        lexicon = Lexicon(path)
+
+        words = LevelWordSet(frozenset({"able", "abandon"}), "english", "CET-4", lexicon)
+
+        assert "able" in words
+        assert "ability" in words
+        assert "elaborate" not in words
+        assert len(words) == 3
+        assert set(words) == {"able", "abandon", "ability"}
+        assert words.intersection(["ability", "elaborate", "able"]) == {"ability", "able"}
+
+    def test_word_frequencies_are_read_only_and_use_ranks(self, tmp_path, sources):
+        from bilingual_tutor.content import content_quality_assessor
+
+        vocabulary_dir, db_path = sources
+        path = str(tmp_path / "lexicon.bin")
+        build_lexicon(path, vocabulary_dir, db_path,
+                      extra_entries=[("the", "english", None, 1), ("elaborate", "english", None, 100)])
+        frequencies = WordFrequencies({"the": 0.9, "be": 0.8}, "english", Lexicon(path))
+
+        assert frequencies["the"] == 0.9  # 种子词频优先
+        assert frequencies["elaborate"] == 1 / 3
+        assert "abandon" not in frequencies  # 没有词频排名
+        assert frequencies.get("missing") is None
+        assert len(frequencies) == 3 and set(frequencies) == {"the", "be", "elaborate"}
+        with pytest.raises(TypeError):
+            frequencies["new"] = 0.1
+        with pytest.raises(TypeError):
+            content_quality_assessor.ENGLISH_WORD_FREQUENCIES["the"] = 0.0
+        assert WordFrequencies({"は": 0.9}, "japanese")["は"] == 0.9
+
+    def test_shared_lexicon_rebuilds_when_sources_change(self, tmp_path, sources):
+        vocabulary_dir, db_path = sources
+        path = str(tmp_path / "lexicon.bin")
+        try:
+            lexicon = get_shared_lexicon(path, vocabulary_dir, db_path)
+            assert get_shared_lexicon(path, vocabulary_dir, db_path) is lexicon
+            assert lexicon.lookup("stable", "english") is None
+
+            conn = sqlite3.connect(db_path)
+            conn.execute("INSERT INTO vocabulary (word, meaning, language, level) VALUES ('stable', '-', 'english', 'CET-6')")
+            conn.commit()
+            conn.close()
+
+            reset_shared_lexicon()
+            rebuilt = get_shared_lexicon(path, vocabulary_dir, db_path)
+            assert rebuilt.level_of("stable", "english") == "CET-6"
+        finally:
+            reset_shared_lexicon()
+
+    def test_content_components_use_shared_lexicon(self, tmp_path, monkeypatch, request):
+        # 默认词表写入缓存目录而不是包目录；测试中改为临时目录
+        assert not lexicon_module.DEFAULT_LEXICON_PATH.startswith(os.path.dirname(lexicon_module.__file__))
+        monkeypatch.setattr(lexicon_module, "DEFAULT_LEXICON_PATH", str(tmp_path / "lexicon.bin"))
+        reset_shared_lexicon()
+        request.addfinalizer(reset_shared_lexicon)
+
+        crawler = PreciseLevelContentCrawler()
+        generator = LevelAppropriateContentGenerator()
+
+        # 内置种子词保持原有级别
+        assert "professional" in crawler.cet_vocabulary["CET-5"]
+        assert "学校" in crawler.jlpt_vocabulary["N5"]
+        assert "academic" in crawler.cet_vocabulary["CET-4"]
+        assert generator._get_word_difficulty("academic", "english") == 1 / 4
+        assert generator._get_word_difficulty("unknownword", "english") == 0.9
+        assert generator.match_vocabulary_to_level(["student", "research"], "english", "CET-4") == ["student"]
+
+        # vocabulary_data 中的词来自共享词表
+        if crawler.cet_vocabulary["CET-4"].lexicon is not None:
+            assert crawler.cet_vocabulary["CET-4"].lexicon.path == str(tmp_path / "lexicon.bin")
+            assert "abnormal" in crawler.cet_vocabulary["CET-4"]
+            assert generator._get_word_difficulty("abnormal", "english") == 0.0
+
+
+class TestLexiconBenchmark:
+    """词表查找耗时与进程内存基准"""
+
+    def test_lookup_latency_and_worker_memory(self, tmp_path):
+        word_count = int(os.environ.get("LEXICON_BENCH_WORDS", "50000"))
+        levels = ["CET-4", "CET-5", "CET-6"]
+        entries = [(f"word{i:06d}", "english", levels[i % 3], i + 1) for i in range(word_count)]
+        path = str(tmp_path / "lexicon.bin")
+
+        start = time.perf_counter()
+        build_lexicon(path, extra_entries=entries)
+        build_time = time.perf_counter() - start
+
+        lexicon = Lexicon(path)
+        probes = [f"word{i:06d}" for i in range(0, word_count, 7)] + ["missing"] * 100
+        lexicon.lookup(probes[0], "english")
+
+        start = time.perf_counter()
+        for word in probes:
+            lexicon.lookup(word, "english")
+        ns_per_op = (time.perf_counter() - start) / len(probes) * 1e9
+
+        # 对照: 每个实例构建 Python 集合的内存
+        python_sets = {level: {w for w, _, l, _ in entries if l == level} for level in levels}
+        set_bytes = sum(sys.getsizeof(words) + sum(sys.getsizeof(w) for w in words)
+                        for words in python_sets.values())
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(_worker_lookup, [path, path], [probes, probes]))
+
+        print(f"\n词表: {word_count} 词, 文件 {os.path.getsize(path) / 1024:.0f} KB, 构建 {build_time * 1000:.0f} ms")
+        print(f"查找耗时: {ns_per_op:.0f} ns/op")
+        print(f"Python 集合内存: {set_bytes / 1024:.0f} KB/进程")
+        for hits, rss_delta in results:
+            print(f"工作进程 mmap 词表 RSS 增量: {rss_delta / 1024:.0f} KB (命中 {hits})")
+
+        assert len(python_sets["CET-4"]) == (word_count + 2) // 3
+        assert all(hits == len(probes) - 100 for hits, _ in results)
+        assert ns_per_op < 100_000
@@ -0,0 +1,292 @@
+"""
+在线快照测试
+
+验证分段备份在持续写入时得到一致快照且不阻塞写入者、VACUUM INTO 紧凑快照、
+数据库备份与恢复、目录快照对未变化文件（音频）的硬链接去重、保留策略与定时快照，
+并比较一次性备份、分段备份与 VACUUM INTO 期间写入者的 p99 延迟。
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from bilingual_tutor.infrastructure.operations_manager import BackupManager
+from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.storage.snapshots import (
+    SCHEDULE_LOCK_NAME, RetentionPolicy, SnapshotManager, SnapshotScheduler, fcntl, sqlite_snapshot
+)
+
+
+def make_database(path, rows, blob_size=1000):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload BLOB, created REAL)")
+    conn.execute("""
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+        INSERT INTO items (payload, created) SELECT randomblob(?), 0 FROM seq
+    """, (rows, blob_size))
+    conn.commit()
+    conn.close()
+
+
+class Writer(threading.Thread):
+    """持续写入的线程，记录每次提交的延迟"""
+
+    def __init__(self, path, interval=0.002):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.latencies = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            conn.execute("INSERT INTO items (payload, created) VALUES (randomblob(200), ?)", (time.time(),))
+            conn.commit()
+            self.latencies.append(time.perf_counter() - started)
+            time.sleep(self.interval)
+        conn.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+        return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def p99_ms(values):
+    values = sorted(values)
+    return values[max(int(len(values) * 0.99) - 1, 0)] * 1000 if values else 0.0
+
+
+class TestSqliteSnapshot:
+    """数据库在线快照"""
+
+    def test_chunked_backup_is_consistent_while_writing(self, tmp_path):
+        source = str(tmp_path / "source.db")
+        make_database(source, 3000)
+        writer = Writer(source)
+        writer.start()
+        time.sleep(0.05)
+        try:
+            before = count_rows(source)
+            stats = sqlite_snapshot(source, str(tmp_path / "snap.db"), pages=16, sleep=0.002)
+            written_during = len(writer.latencies)
+            after = count_rows(source)
+        finally:
+            writer.stop()
+
+        assert stats['steps'] > 10
+        assert written_during > 0 and after > before
+        assert before <= count_rows(str(tmp_path / "snap.db")) <= after
+        assert not os.path.exists(str(tmp_path / "snap.db.partial"))
+
+    def test_vacuum_into_is_compact(self, tmp_path):
+        source = str(tmp_path / "source.db")
+        make_database(source, 2000)
+        conn = sqlite3.connect(source)
+        conn.execute("DELETE FROM items WHERE id % 2 = 0")
+        conn.commit()
+        conn.close()
+
+        full = sqlite_snapshot(source, str(tmp_path / "full.db"))
+        compact = sqlite_snapshot(source, str(tmp_path / "compact.db"), compact=True)
+        assert compact['method'] == "vacuum_into"
+        assert compact['size'] < full['size'] * 0.7
+        assert count_rows(str(tmp_path / "compact.db")) == 1000
+
+    def test_database_backup_and_restore(self, tmp_path):
+        db = LearningDatabase(str(tmp_path / "learning.db"))
+        try:
+            db.record_learning("u1", 1, "vocabulary", True)
+            backup = str(tmp_path / "backup.db")
+            assert db.backup_database(backup)
+            db.record_learning("u1", 2, "vocabulary", True)
+
+            assert db.restore_database(backup)
+            with db._pool.get_connection() as conn:
+                items = [row[0] for row in conn.execute("SELECT item_id FROM learning_records")]
+            assert items == [1]
+            assert db.backup_database(str(tmp_path / "compact.db"), compact=True)
+        finally:
+            db.close()
+
+
+class TestDirectorySnapshots:
+    """目录快照、去重与保留"""
+
+    def make_source(self, tmp_path):
+        source = tmp_path / "data"
+        (source / "audio").mkdir(parents=True)
+        for i in range(5):
+            (source / "audio" / f"word_{i}.mp3").write_bytes(os.urandom(4096))
+        make_database(str(source / "learning.db"), 100)
+        return source
+
+    def test_unchanged_files_are_hard_linked(self, tmp_path):
+        source = self.make_source(tmp_path)
+        manager = BackupManager(str(tmp_path / "backups"))
+
+        first = manager.create_backup(str(source), "first")
+        assert first['success'] and first['stats']['copied'] == 5 and first['stats']['databases'] == 1
+
+        (source / "audio" / "word_0.mp3").write_bytes(os.urandom(4096))
+        (source / "audio" / "copy_of_1.mp3").write_bytes((source / "audio" / "word_1.mp3").read_bytes())
+        second = manager.create_backup(str(source), "second")
+        assert (second['stats']['linked'], second['stats']['copied']) == (5, 1)
+        assert second['stats']['bytes_copied'] < first['stats']['bytes_copied']
+        first_audio = tmp_path / "backups" / "first" / "audio"
+        second_audio = tmp_path / "backups" / "second" / "audio"
+        assert os.stat(first_audio / "word_2.mp3").st_ino == os.stat(second_audio / "word_2.mp3").st_ino
+        assert os.stat(first_audio / "word_0.mp3").st_ino != os.stat(second_audio / "word_0.mp3").st_ino
+        assert {b['name'] for b in manager.list_backups()} == {"first", "second"}
+
+        # 恢复：数据库通过 backup API 写回，音频文件复制
+        conn = sqlite3.connect(str(source / "learning.db"))
+        conn.execute("DELETE FROM items")
+        conn.commit()
+        conn.close()
+        (source / "audio" / "word_3.mp3").unlink()
+        assert manager.restore_backup("second", str(source))['success']
+        assert count_rows(str(source / "learning.db")) == 100
+        assert (source / "audio" / "word_3.mp3").read_bytes() == (second_audio / "word_3.mp3").read_bytes()
+
+        # 删除第一个备份不影响第二个备份的硬链接文件
+        assert manager.delete_backup("first")['success']
+        assert (second_audio / "word_2.mp3").stat().st_size == 4096
+
+    def test_retention_policy(self):
+        now = datetime(2026, 3, 20, 12)
+        snapshots = [{'name': f"s{hours}", 'created': now - timedelta(hours=hours)}
+                     for hours in range(0, 24 * 40, 6)]
+        keep = RetentionPolicy(keep_last=2, keep_daily=3, keep_weekly=2).select(snapshots)
+        # 最近 2 个 + 最近 3 天各 1 个 + 最近 2 周各 1 个（有重叠）
+        assert keep[:2] == ["s0", "s6"]
+        assert len(keep) == 5
+        assert keep == sorted(keep, key=lambda name: int(name[1:]))
+
+    def test_scheduler_snapshots_and_prunes(self, tmp_path):
+        source = self.make_source(tmp_path)
+        manager = SnapshotManager(str(tmp_path / "snapshots"),
+                                  retention=RetentionPolicy(keep_last=2, keep_daily=0, keep_weekly=0))
+        scheduler = SnapshotScheduler(manager, str(source), interval=0.05)
+        assert scheduler.start()
+        deadline = time.time() + 10
+        while (scheduler.last_result is None or not scheduler.last_result['pruned']) and time.time() < deadline:
+            time.sleep(0.05)
+        scheduler.stop()
+
+        assert scheduler.failures == 0
+        assert scheduler.last_result['pruned']
+        assert len(manager.list_snapshots()) == 2
+        assert not SnapshotScheduler(manager, str(source), interval=0).start()
+
+    @pytest.mark.skipif(fcntl is None, reason="需要 fcntl.flock")
+    def test_only_one_process_runs_the_schedule(self, tmp_path):
+        source = self.make_source(tmp_path)
+        manager = SnapshotManager(str(tmp_path / "snapshots"))
+        # 另一个进程已持有定时快照锁
+        holder = subprocess.Popen(
+            [sys.executable, "-c",
+             "import fcntl, sys; f = open(sys.argv[1], 'a'); fcntl.flock(f, fcntl.LOCK_EX); "
+             "print('locked', flush=True); sys.stdin.read()",
+             str(tmp_path / "snapshots" / SCHEDULE_LOCK_NAME)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        scheduler = SnapshotScheduler(manager, str(source), interval=0.05)
+        try:
+            assert holder.stdout.readline().strip() == "locked"
+            assert scheduler.start()
+            deadline = time.time() + 10
+            while scheduler.skipped < 3 and time.time() < deadline:
+                time.sleep(0.05)
+            assert scheduler.skipped >= 3 and not scheduler.leader
+            assert manager.list_snapshots() == []
+
+            # 持有锁的进程退出后由本进程接管
+            holder.stdin.close()
+            holder.wait(10)
+            deadline = time.time() + 10
+            while scheduler.last_result is None and time.time() < deadline:
+                time.sleep(0.05)
+            assert scheduler.leader and manager.list_snapshots()
+        finally:
+            scheduler.stop()
+            if holder.poll() is None:
+                holder.kill()
+        assert not scheduler.leader
+
+    def test_configured_schedule_starts_with_app(self, tmp_path, monkeypatch):
+        from bilingual_tutor.infrastructure import operations_manager as operations_module
+        from bilingual_tutor.storage import snapshots as snapshots_module
+        from bilingual_tutor.web.app import create_app
+
+        source = self.make_source(tmp_path)
+        backup_manager = BackupManager(str(tmp_path / "backups"))
+        assert not backup_manager.start_configured_schedule(0, str(source))
+
+        monkeypatch.setattr(snapshots_module, "DEFAULT_SNAPSHOT_INTERVAL", 3600)
+        monkeypatch.setattr(operations_module, "DEFAULT_BACKUP_SOURCE", str(source))
+        monkeypatch.setattr(operations_module.operations_manager, "backup_manager", backup_manager)
+        try:
+            create_app()
+            status = backup_manager.get_schedule_status()
+            assert status['running'] and status['interval'] == 3600
+            assert status['source_dir'] == str(source)
+            # 再次创建应用不会重启已在运行的定时备份
+            scheduler = backup_manager._scheduler
+            create_app()
+            assert backup_manager._scheduler is scheduler
+        finally:
+            backup_manager.stop_schedule()
+        assert not backup_manager.get_schedule_status()['running']
+
+
+class TestSnapshotBenchmark:
+    """备份期间写入延迟（SNAPSHOT_BENCH_MB=5120 为完整规模）"""
+
+    def test_writer_latency_during_backup(self, tmp_path):
+        size_mb = int(os.environ.get("SNAPSHOT_BENCH_MB", "64"))
+        source = str(tmp_path / "large.db")
+        make_database(source, size_mb * 1024 * 1024 // 1100)
+
+        def one_step(dest):
+            """原来的写法：一次 backup 复制所有页"""
+            src, dst = sqlite3.connect(source), sqlite3.connect(dest)
+            src.backup(dst)
+            src.close()
+            dst.close()
+
+        methods = (("空闲（无备份）", lambda dest: time.sleep(1.0)),
+                   ("一次性 backup", one_step),
+                   ("分段 backup", lambda dest: sqlite_snapshot(source, dest)),
+                   ("VACUUM INTO", lambda dest: sqlite_snapshot(source, dest, compact=True)))
+        print(f"\n{os.path.getsize(source) / 1024 / 1024:.0f} MB 数据库，备份期间持续写入:")
+        for i, (label, run) in enumerate(methods):
+            writer = Writer(source)
+            writer.start()
+            time.sleep(0.05)
+            started = time.perf_counter()
+            run(str(tmp_path / f"backup_{i}.db"))
+            elapsed = time.perf_counter() - started
+            writer.stop()
+            print(f"  {label}: 耗时 {elapsed:.2f}s, 写入 {len(writer.latencies)} 次, "
+                  f"写入 p99 {p99_ms(writer.latencies):.1f} ms")
+            assert writer.latencies
+            if i:
+                assert count_rows(str(tmp_path / f"backup_{i}.db")) > 0
@@ -0,0 +1,287 @@
+"""
+键集分页与流式导出测试
+
+验证词汇、学习记录、音频记录的键集分页没有重复和遗漏（翻页期间插入新行也一样）、无效游标被拒绝、
+NDJSON/CSV/JSON 导出可以完整解析回来、用户数据和词汇导出接口返回分块响应，
+并在子进程中导出大词汇表（EXPORT_BENCH_ROWS=2000000 为完整规模），确认内存占用不随行数增长。
+"""
+
+import base64
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bilingual_tutor.audio.pronunciation_manager import PRONUNCIATION_INDEX_FIELDS, PronunciationManager
+from bilingual_tutor.infrastructure.security_manager import AuditLogger, DataPrivacyManager
+from bilingual_tutor.storage.database import VOCABULARY_EXPORT_FIELDS, LearningDatabase
+from bilingual_tutor.storage.export import csv_chunks, export_chunks, ndjson_chunks
+from bilingual_tutor.storage.pagination import decode_cursor, encode_cursor
+from bilingual_tutor.storage.session_store import SQLiteSessionStore
+from bilingual_tutor.web import fastapi_app
+from bilingual_tutor.web.async_facade import BlockingExecutor
+from bilingual_tutor.web.app import create_app
+from bilingual_tutor.web.routes import api as api_routes
+from bilingual_tutor.web.routes.data_privacy import data_privacy_bp
+
+
+@pytest.fixture
+def db(tmp_path):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    yield learning_db
+    learning_db.close()
+
+
+def add_vocabulary(db, rows, start=0):
+    with db._pool.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO vocabulary (word, reading, meaning, language, level) VALUES (?, ?, ?, ?, ?)",
+            [(f"word{i}", "", f"释义{i}", "english" if i % 3 else "japanese", "CET-4" if i % 2 else "N5")
+             for i in range(start, start + rows)])
+        conn.commit()
+
+
+def add_audio(storage, rows):
+    storage._conn.executemany(
+        "INSERT INTO audio_records (word, language, level, file_path, file_size, source) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"word{i}", "english", "CET-4" if i % 2 else "CET-6", f"/audio/word{i}.mp3", i, "youdao")
+         for i in range(rows)])
+    storage._conn.commit()
+
+
+class TestKeysetPagination:
+    """键集分页"""
+
+    def test_cursor_round_trip(self):
+        assert decode_cursor(encode_cursor([3, "vocabulary"]), 2) == [3, "vocabulary"]
+        assert decode_cursor(None, 1) is None
+        not_a_list = base64.urlsafe_b64encode(b'{"id": 1}').decode()
+        for bad in ("not-a-cursor!", encode_cursor([1, 2]), not_a_list):
+            with pytest.raises(ValueError):
+                decode_cursor(bad, 1)
+
+    def test_vocabulary_pages_survive_concurrent_inserts(self, db):
+        add_vocabulary(db, 250)
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = db.get_vocabulary_page(language="english", cursor=cursor, limit=40)
+            seen.extend(item.id for item in page.items)
+            pages += 1
+            if pages == 2:
+                # 翻页过程中写入的新行出现在后面的页里，已返回的行不会重复
+                add_vocabulary(db, 30, start=250)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        assert seen == sorted(set(seen))
+        with db._pool.get_connection() as conn:
+            expected = [row[0] for row in conn.execute(
+                "SELECT id FROM vocabulary WHERE language = 'english' ORDER BY id")]
+        assert seen == expected
+
+        assert [item['id'] for item in db.iter_vocabulary(level="N5", page_size=7)] == [
+            item.id for item in db.get_vocabulary_page(level="N5", limit=1000).items]
+        assert len(db.get_vocabulary_page(limit=100000).items) == 280 and db.get_vocabulary_page(limit=0).items
+        with pytest.raises(ValueError):
+            db.get_vocabulary_page(cursor="%%%")
+
+    def test_learning_record_pages(self, db):
+        add_vocabulary(db, 60)
+        for i in range(60):
+            db.record_learning("alice", i + 1, "vocabulary", i % 3 != 0)
+        for i in range(10):
+            db.record_learning("alice", i + 1, "grammar", True)
+        db.record_learning("bob", 1, "vocabulary", True)
+
+        records = list(db.iter_learning_records("alice", page_size=9))
+        keys = [(record['item_id'], record['item_type']) for record in records]
+        assert len(records) == 70 and keys == sorted(set(keys))
+        assert len(list(db.iter_learning_records("alice", item_type="grammar", page_size=3))) == 10
+
+        # 按记忆强度排序的复习列表：分页结果与一次性查询一致
+        full = db.optimize_vocabulary_queries("alice", "english", [0, 1, 2, 3, 4, 5])
+        paged, cursor = [], None
+        while True:
+            page = db.get_vocabulary_records_page("alice", "english", [0, 1, 2, 3, 4, 5], cursor, limit=6)
+            paged.extend(page.items)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        assert sorted(row['id'] for row in paged) == sorted(row['id'] for row in full)
+        assert len({row['id'] for row in paged}) == len(paged)
+        assert len(db.optimize_vocabulary_queries("alice", "english", [0, 1, 2, 3, 4, 5], limit=5)) == 5
+
+    def test_audio_record_pages(self, tmp_path):
+        manager = PronunciationManager(str(tmp_path / "audio"))
+        try:
+            add_audio(manager.storage, 45)
+            newest = manager.storage.search_audio_files_page(level="CET-4", limit=10)
+            assert [record.word for record in newest.items][:2] == ["word43", "word41"]
+            rest = manager.storage.search_audio_files_page(level="CET-4", cursor=newest.next_cursor, limit=100)
+            assert len(newest.items) + len(rest.items) == 22 and rest.next_cursor is None
+            assert [record.id for record in manager.storage.iter_audio_records()] == list(range(1, 46))
+        finally:
+            manager.close()
+
+
+class TestStreamingExport:
+    """流式导出"""
+
+    def test_chunk_generators(self):
+        records = [{'id': i, 'word': f"単語{i}", 'note': "a,b\n\"c\""} for i in range(2000)]
+        chunks = list(ndjson_chunks(iter(records), chunk_bytes=1024))
+        assert len(chunks) > 10 and all(isinstance(chunk, bytes) for chunk in chunks)
+        assert [json.loads(line) for line in b"".join(chunks).decode().splitlines()] == records
+
+        chunks = list(csv_chunks(iter(records), ["id", "note"], chunk_bytes=1024))
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+        assert len(chunks) > 10 and rows[5] == {'id': "5", 'note': "a,b\n\"c\""}
+        with pytest.raises(ValueError):
+            export_chunks(iter(records), "xml")
+        with pytest.raises(ValueError):
+            export_chunks(iter(records), "csv")
+
+    def test_pronunciation_index_formats(self, tmp_path):
+        manager = PronunciationManager(str(tmp_path / "audio"))
+        try:
+            add_audio(manager.storage, 1500)
+            assert manager.export_pronunciation_index(str(tmp_path / "index.json"))
+            with open(tmp_path / "index.json", encoding="utf-8") as f:
+                data = json.load(f)
+            assert data['total_records'] == 1500 and data['records'][1499]['word'] == "word1499"
+            assert set(data['records'][0]) == set(PRONUNCIATION_INDEX_FIELDS)
+
+            assert manager.export_pronunciation_index(str(tmp_path / "index.ndjson"))
+            with open(tmp_path / "index.ndjson", encoding="utf-8") as f:
+                assert [json.loads(line)['word'] for line in f] == [f"word{i}" for i in range(1500)]
+
+            assert manager.export_pronunciation_index(str(tmp_path / "index.csv"))
+            with open(tmp_path / "index.csv", encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+            assert len(rows) == 1500 and rows[0]['file_path'] == "/audio/word0.mp3"
+        finally:
+            manager.close()
+
+    def test_user_data_stream(self, db, tmp_path):
+        add_vocabulary(db, 30)
+        for i in range(30):
+            db.record_learning("alice", i + 1, "vocabulary", i % 2 == 0)
+        privacy = DataPrivacyManager(AuditLogger(str(tmp_path / "audit.log")))
+
+        lines = b"".join(privacy.stream_user_data("alice", "ndjson", db)).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        types = [record['record_type'] for record in records]
+        assert types[:3] == ["export", "profile", "settings"]
+        assert types.count("learning_record") == 30 and types.count("review_event") == 30
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(privacy.stream_user_data("alice", "csv", db)).decode())))
+        assert rows[0]['Category'] == "user_id" and rows[0]['Value'] == "alice"
+        assert any(row['Key'] == "vocabulary:7.learn_count" for row in rows)
+        with pytest.raises(ValueError):
+            privacy.stream_user_data("alice", "xml", db)
+
+    def test_export_endpoints(self, db, monkeypatch):
+        add_vocabulary(db, 1200)
+        monkeypatch.setattr(api_routes, "_system_integrator", type("System", (), {"learning_db": db})())
+        app = create_app()
+        app.config['TESTING'] = True
+        # 数据隐私蓝图不在 register_routes 的核心路由中，这里单独注册
+        app.register_blueprint(data_privacy_bp)
+        client = app.test_client()
+        assert client.get("/api/vocabulary/export").status_code == 401
+        with client.session_transaction() as flask_session:
+            flask_session['user_id'] = "alice"
+            flask_session['role'] = "student"
+
+        response = client.get("/api/vocabulary/export?format=csv&language=japanese")
+        assert response.is_streamed and response.mimetype == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert len(rows) == 400 and list(rows[0]) == VOCABULARY_EXPORT_FIELDS
+
+        body = client.get("/api/vocabulary?limit=500").get_json()
+        second = client.get(f"/api/vocabulary?limit=500&cursor={body['next_cursor']}").get_json()
+        assert len(body['items']) == 500 and second['items'][0]['id'] == 501
+        assert client.get("/api/vocabulary?cursor=bogus").status_code == 400
+
+        response = client.get("/api/data/export?format=ndjson")
+        assert response.status_code == 200 and response.is_streamed
+        assert json.loads(response.get_data(as_text=True).splitlines()[0])['user_id'] == "alice"
+
+        # FastAPI：不进入 lifespan（不构建 SystemIntegrator），只替换数据库
+        monkeypatch.setattr(fastapi_app, "learning_db", db)
+        monkeypatch.setattr(fastapi_app, "compatibility_layer", None)
+        fastapi_client = TestClient(fastapi_app.app)
+        bad_token = {"Authorization": "Bearer x"}
+        for url in ("/api/vocabulary/export", "/api/vocabulary"):
+            assert fastapi_client.get(url).status_code == 401
+            assert fastapi_client.get(url, headers=bad_token).status_code == 401
+        SQLiteSessionStore(db).save("alice-session", {"user_id": "alice"}, 3600, user_id="alice")
+        response = fastapi_client.get("/api/vocabulary?limit=2", headers={"Authorization": "Bearer alice-session"})
+        assert response.status_code == 200 and len(response.json()['items']) == 2
+        monkeypatch.setitem(fastapi_app.app.dependency_overrides, fastapi_app.require_user, lambda: "alice")
+        executor = BlockingExecutor(max_workers=2)
+        monkeypatch.setattr(fastapi_app, "io_executor", executor)
+        response = fastapi_client.get("/api/vocabulary/export?level=N5")
+        assert response.headers['content-type'] == "application/x-ndjson"
+        assert len(response.text.splitlines()) == 600
+        body = fastapi_client.get("/api/vocabulary?language=english&limit=3").json()
+        assert [item['word'] for item in body['items']] == ["word1", "word2", "word4"]
+        assert fastapi_client.get("/api/vocabulary/export?format=xml").status_code == 400
+        # 导出块在 io_executor 中生成
+        assert executor.get_stats()['calls'] > 1
+        executor.shutdown()
+
+
+BENCH_SCRIPT = textwrap.dedent("""
+    import sys, time
+    from bilingual_tutor.storage.database import VOCABULARY_EXPORT_FIELDS, LearningDatabase
+    from bilingual_tutor.storage.export import export_chunks
+
+    def status_kb(field):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+        return 0
+
+    db = LearningDatabase(sys.argv[1])
+    baseline = status_kb("VmRSS")
+    total, rows, started = 0, 0, time.perf_counter()
+    for chunk in export_chunks(db.iter_vocabulary(), sys.argv[2], VOCABULARY_EXPORT_FIELDS):
+        total += len(chunk)
+        rows += chunk.count(b"\\n")
+    elapsed = time.perf_counter() - started
+    # VmHWM：本进程（exec 之后）的峰值 RSS；ru_maxrss 会带上 fork 时父进程的 RSS
+    print(rows, total, baseline, status_kb("VmHWM"), f"{elapsed:.3f}")
+""")
+
+
+class TestExportMemoryBenchmark:
+    """大词汇表导出的内存占用（EXPORT_BENCH_ROWS 调整规模）"""
+
+    def test_export_memory_is_flat(self, tmp_path):
+        rows = int(os.environ.get("EXPORT_BENCH_ROWS", "200000"))
+        path = str(tmp_path / "learning.db")
+        db = LearningDatabase(path)
+        batch = 50000
+        for start in range(0, rows, batch):
+            add_vocabulary(db, min(batch, rows - start), start)
+        db.close()
+
+        print(f"\n导出 {rows} 行词汇（独立进程）:")
+        for export_format in ("ndjson", "csv"):
+            result = subprocess.run([sys.executable, "-c", BENCH_SCRIPT, path, export_format],
+                                    capture_output=True, text=True, check=True)
+            exported, size, baseline, peak, elapsed = result.stdout.split()
+            print(f"  {export_format}: {int(size) / 1e6:.0f} MB, {float(elapsed):.1f}s "
+                  f"({int(exported) / float(elapsed):.0f} 行/s), RSS {int(baseline) / 1024:.1f} MB -> "
+                  f"峰值 {int(peak) / 1024:.1f} MB")
+            assert int(exported) == rows + (1 if export_format == "csv" else 0)
+            # 解释器 + 一页数据 + 一个输出块 + 导出连接的页缓存，不随行数增长
+            assert int(peak) < 50 * 1024
@@ -0,0 +1,347 @@
+"""
+请求链路追踪测试
+
+验证 contextvars 传播（嵌套调用、asyncio 任务、AsyncFacade 线程池）、采样与 traceparent、
+环形缓冲区和单个追踪的 span 上限、按端点的火焰图式分解（自身耗时、位置、折叠调用栈）、
+OTLP-JSON 导出、Flask 请求的根 span 与各层（学习引擎、数据库、SQL、AI）的子 span，
+以及监控接口；并测量每个请求的追踪开销（TRACE_BENCH_REQUESTS 调整规模）。
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from bilingual_tutor.core.engine import CoreLearningEngine
+from bilingual_tutor.infrastructure import tracing
+from bilingual_tutor.infrastructure.tracing import (
+    NOOP_SPAN, SPAN_KIND_CLIENT, STATUS_ERROR, Tracer, current_span, record_span, span, traced
+)
+from bilingual_tutor.services.ai_service import AIModelConfig, AIModelType, BaseAIModelAdapter
+from bilingual_tutor.storage.database import ConnectionPool, LearningDatabase
+from bilingual_tutor.storage.query_profiler import QueryProfiler
+from bilingual_tutor.web.app import register_tracing
+from bilingual_tutor.web.async_facade import BlockingExecutor
+from bilingual_tutor.web.routes.monitoring import monitoring_bp
+
+
+@traced()
+def load_plan(delay=0.0):
+    time.sleep(delay)
+    with span("db.query", {'table': 'vocabulary'}, SPAN_KIND_CLIENT):
+        time.sleep(delay)
+    return "plan"
+
+
+@traced("ai.call")
+async def call_model():
+    await asyncio.sleep(0)
+    return current_span().name
+
+
+def spans_by_name(trace):
+    return {item['name']: item for item in trace['spans']}
+
+
+class TestSpans:
+    """span 创建与传播"""
+
+    def test_nested_spans_and_context_propagation(self):
+        tracer = Tracer(sample_rate=1.0)
+        with tracer.trace("GET /api/learning/plan") as root:
+            assert current_span() is root
+            assert load_plan() == "plan"
+            assert asyncio.run(call_model()) == "ai.call"
+
+            # AsyncFacade 的线程池在提交时的上下文中执行
+            executor = BlockingExecutor(max_workers=2)
+            try:
+                assert asyncio.run(executor.run(load_plan)) == "plan"
+            finally:
+                executor.shutdown()
+            assert current_span() is root
+        assert current_span() is None
+
+        trace = tracer.get_trace(root.trace.trace_id)
+        names = [item['name'] for item in trace['spans']]
+        assert names == ["GET /api/learning/plan", "load_plan", "db.query", "ai.call", "load_plan", "db.query"]
+        ids = {item['span_id']: item for item in trace['spans']}
+        for item in trace['spans'][1:]:
+            parent = ids[item['parent_id']]
+            assert parent['name'] == ("load_plan" if item['name'] == "db.query" else "GET /api/learning/plan")
+        assert spans_by_name(trace)['db.query']['attributes'] == {'table': 'vocabulary'}
+
+    def test_errors_and_record_span(self):
+        tracer = Tracer(sample_rate=1.0)
+        with pytest.raises(ValueError):
+            with tracer.trace("job") as root:
+                record_span("sql", 0.002, {'db.statement': "SELECT ?"}, SPAN_KIND_CLIENT)
+                with span("failing"):
+                    raise ValueError("坏数据")
+        trace = tracer.get_trace(root.trace.trace_id)
+        spans = spans_by_name(trace)
+        assert trace['error'] and spans['failing']['status'] == STATUS_ERROR
+        assert spans['failing']['status_message'] == "ValueError: 坏数据"
+        assert spans['job']['status'] == STATUS_ERROR
+        assert abs(spans['sql']['duration_ms'] - 2.0) < 0.01
+
+    def test_sampling_and_traceparent(self):
+        tracer = Tracer(sample_rate=0.0)
+        assert tracer.trace("GET /") is NOOP_SPAN
+        with tracer.trace("GET /"):
+            assert current_span() is None and span("child") is NOOP_SPAN
+            assert load_plan() == "plan"
+        assert tracer.recent_traces() == [] and tracer.stats()['started'] == 2
+
+        # 默认不信任上游的采样标志：客户端无法强制追踪，仍按本地采样率
+        upstream = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        assert tracer.trace("GET /", traceparent=upstream) is NOOP_SPAN
+        always = Tracer(sample_rate=1.0)
+        # 本地采样时仍沿用 trace id，根 span 的父节点为上游 span
+        with always.trace("GET /", traceparent=upstream[:-2] + "00") as root:
+            assert tracing.format_traceparent(root).startswith("00-0af7651916cd43dd8448eb211c80319c-")
+        assert root.trace.trace_id == "0af7651916cd43dd8448eb211c80319c" and root.parent_id == "b7ad6b7169203331"
+
+        # 受信任的上游：听从头中的采样标志
+        trusting = Tracer(sample_rate=0.0, trust_parent=True)
+        with trusting.trace("GET /", traceparent=upstream) as root:
+            assert root.trace.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert Tracer(sample_rate=1.0, trust_parent=True).trace(
+            "GET /", traceparent=upstream[:-2] + "00") is NOOP_SPAN
+
+    def test_buffer_and_span_limits(self):
+        tracer = Tracer(sample_rate=1.0, buffer_size=3, max_spans=4)
+        for i in range(5):
+            with tracer.trace(f"job{i}"):
+                for _ in range(10):
+                    with span("step"):
+                        pass
+        recent = tracer.recent_traces()
+        assert [item['name'] for item in recent] == ["job4", "job3", "job2"]
+        assert recent[0]['span_count'] == 4 and recent[0]['dropped_spans'] == 7
+        assert tracer.recent_traces(name="job3")[0]['name'] == "job3"
+        assert tracer.get_trace("missing") is None
+
+
+class TestProfile:
+    """火焰图式分解与导出"""
+
+    def test_profile_breakdown(self):
+        tracer = Tracer(sample_rate=1.0)
+        for _ in range(3):
+            with tracer.trace("GET /plan"):
+                load_plan(0.002)
+                with span("cache.get"):
+                    pass
+        profile = tracer.profile("GET /plan")
+        frames = {frame['stack']: frame for frame in profile['frames']}
+        assert profile['traces'] == 3
+        assert [frame['stack'] for frame in profile['frames']] == [
+            "GET /plan", "GET /plan;load_plan", "GET /plan;load_plan;db.query", "GET /plan;cache.get"]
+        plan, query = frames["GET /plan;load_plan"], frames["GET /plan;load_plan;db.query"]
+        assert plan['calls'] == 3 and plan['depth'] == 1
+        assert 1.5 < plan['self_avg_ms'] < plan['avg_ms'] and query['avg_ms'] > 1.5
+        assert query['offset'] == 0.0 and 0.9 < plan['share'] <= 1.0
+        assert frames["GET /plan;cache.get"]['offset'] == pytest.approx(plan['share'])
+        assert tracer.endpoints()[0]['endpoint'] == "GET /plan" and tracer.profile("missing") is None
+
+        folded = tracer.folded_stacks("GET /plan").splitlines()
+        assert [line.rsplit(' ', 1)[0] for line in folded] == [
+            "GET /plan", "GET /plan;cache.get", "GET /plan;load_plan", "GET /plan;load_plan;db.query"]
+        assert int(folded[3].rsplit(' ', 1)[1]) >= 6000
+
+    def test_otlp_json_export(self, tmp_path):
+        tracer = Tracer(sample_rate=1.0)
+        with tracer.trace("GET /plan", {'http.status_code': 200, 'sampled': True, 'ratio': 0.5}) as root:
+            load_plan()
+        path = str(tmp_path / "otlp" / "traces.json")
+        assert tracer.export_otlp_json(path) == 3
+        assert tracer.export_otlp_json(path) == 3
+
+        lines = open(path, encoding="utf-8").read().splitlines()
+        assert len(lines) == 2
+        request = json.loads(lines[0])
+        resource = request['resourceSpans'][0]
+        assert resource['resource']['attributes'] == [
+            {'key': 'service.name', 'value': {'stringValue': "bilingual-tutor"}}]
+        spans = resource['scopeSpans'][0]['spans']
+        exported_root = spans[0]
+        assert exported_root['traceId'] == root.trace.trace_id and len(exported_root['traceId']) == 32
+        assert 'parentSpanId' not in exported_root and exported_root['kind'] == tracing.SPAN_KIND_INTERNAL
+        assert int(exported_root['endTimeUnixNano']) >= int(exported_root['startTimeUnixNano'])
+        assert exported_root['attributes'] == [
+            {'key': 'http.status_code', 'value': {'intValue': "200"}},
+            {'key': 'sampled', 'value': {'boolValue': True}},
+            {'key': 'ratio', 'value': {'doubleValue': 0.5}}]
+        assert spans[2]['parentSpanId'] == spans[1]['spanId'] and spans[2]['kind'] == SPAN_KIND_CLIENT
+
+    def test_batched_export(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tracing, "EXPORT_BATCH", 2)
+        path = str(tmp_path / "traces.json")
+        tracer = Tracer(sample_rate=1.0, export_path=path)
+        for i in range(5):
+            with tracer.trace(f"job{i}"):
+                pass
+        lines = open(path, encoding="utf-8").read().splitlines()
+        assert len(lines) == 2
+        assert [item['name'] for line in lines
+                for item in json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans']] == [
+            "job0", "job1", "job2", "job3"]
+
+
+class _RecordingAdapter(BaseAIModelAdapter):
+    """只更新指标的适配器"""
+
+    async def generate(self, request):
+        self._update_metrics(True, 12.5)
+
+    async def chat(self, messages, **kwargs):
+        self._update_metrics(False, 3.0)
+
+
+class TestLayers:
+    """各层的 span"""
+
+    def test_layers_inside_request(self, tmp_path, sample_user_profile):
+        tracer = Tracer(sample_rate=1.0)
+        db = LearningDatabase(str(tmp_path / "learning.db"))
+        db._pool.profiler = db._profiler or QueryProfiler()
+        pool = ConnectionPool(str(tmp_path / "profiled.db"), max_connections=2, profiler=QueryProfiler())
+        engine = CoreLearningEngine()
+        adapter = _RecordingAdapter(AIModelConfig(AIModelType.DEEPSEEK, "key", "", "deepseek-chat"))
+        try:
+            with tracer.trace("GET /api/learning/plan") as root:
+                engine.generate_learning_plan(sample_user_profile)
+                db.get_vocabulary_count("english")
+                with pool.get_connection() as conn:
+                    conn.execute("SELECT 1").fetchall()
+                asyncio.run(adapter.generate(None))
+                asyncio.run(adapter.chat([]))
+        finally:
+            pool.close_all()
+            db.close()
+
+        spans = tracer.get_trace(root.trace.trace_id)['spans']
+        by_name = {}
+        for item in spans:
+            by_name.setdefault(item['name'], item)
+        assert "CoreLearningEngine.generate_learning_plan" in by_name
+        assert by_name["db.get_vocabulary_count"]['kind'] == SPAN_KIND_CLIENT
+        assert by_name["db.get_vocabulary_count"]['attributes']['db.name'] == "learning.db"
+        sql = [item for item in spans if item['name'] == "sql"]
+        assert any(item['attributes']['db.statement'] == "SELECT ?" for item in sql)
+        assert by_name["ai.deepseek"]['attributes'] == {'ai.model': "deepseek-chat"}
+        assert abs(by_name["ai.deepseek"]['duration_ms'] - 12.5) < 0.01
+        assert [item['status'] for item in spans if item['name'] == "ai.deepseek"] == [0, STATUS_ERROR]
+
+    def test_flask_requests_and_monitoring_routes(self, monkeypatch):
+        # 监控接口读取全局追踪器
+        tracer = tracing.tracer
+        monkeypatch.setattr(tracer, "sample_rate", 1.0)
+        tracer.reset()
+        app = Flask(__name__)
+        app.register_blueprint(monitoring_bp)
+        register_tracing(app, tracer)
+
+        @app.route("/api/items/<int:item_id>")
+        def get_item(item_id):
+            return jsonify({'plan': load_plan(), 'item': item_id})
+
+        @app.route("/api/broken")
+        def broken():
+            raise RuntimeError("失败")
+
+        client = app.test_client()
+        response = client.get("/api/items/7")
+        assert response.status_code == 200
+        trace_id = response.headers['X-Trace-Id']
+        client.get("/api/items/8")
+        app.config['PROPAGATE_EXCEPTIONS'] = False
+        assert client.get("/api/broken").status_code == 500
+
+        trace = tracer.get_trace(trace_id)
+        assert trace['name'] == "GET /api/items/<int:item_id>"
+        assert spans_by_name(trace)["GET /api/items/<int:item_id>"]['attributes'] == {
+            'http.method': "GET", 'http.target': "/api/items/7", 'http.status_code': 200}
+        assert tracer.recent_traces(name="GET /api/broken")[0]['error']
+
+        # 监控接口（它们本身也被追踪）
+        data = client.get("/api/monitoring/traces?name=GET /api/items/<int:item_id>").get_json()
+        assert [item['trace_id'] for item in data['traces']][-1] == trace_id
+        assert {item['endpoint'] for item in data['endpoints']} >= {"GET /api/items/<int:item_id>",
+                                                                      "GET /api/broken"}
+        assert data['stats']['sample_rate'] == 1.0
+        assert client.get(f"/api/monitoring/traces/{trace_id}").get_json()['trace']['span_count'] == 3
+        assert client.get("/api/monitoring/traces/0000").status_code == 404
+
+        profile = client.get("/api/monitoring/traces/profile",
+                             query_string={'endpoint': "GET /api/items/<int:item_id>"}).get_json()['profile']
+        assert profile['traces'] == 2 and [frame['name'] for frame in profile['frames']] == [
+            "GET /api/items/<int:item_id>", "load_plan", "db.query"]
+        assert client.get("/api/monitoring/traces/profile").status_code == 400
+        folded = client.get("/api/monitoring/traces/profile?format=folded").get_data(as_text=True)
+        assert "GET /api/items/<int:item_id>;load_plan;db.query " in folded
+
+        export = client.get("/api/monitoring/traces/export")
+        assert export.headers['Content-Disposition'].startswith("attachment; filename=traces-")
+        assert len(export.get_json()['resourceSpans'][0]['scopeSpans'][0]['spans']) >= 7
+        tracer.reset()
+
+    def test_unsampled_requests(self):
+        tracer = Tracer(sample_rate=0.0)
+        app = Flask(__name__)
+        register_tracing(app, tracer)
+        app.add_url_rule("/plan", "plan", lambda: load_plan())
+        response = app.test_client().get("/plan")
+        assert response.get_data(as_text=True) == "plan" and 'X-Trace-Id' not in response.headers
+        assert tracer.recent_traces() == []
+
+
+class TestTracingOverheadBenchmark:
+    """每个请求的追踪开销"""
+
+    def test_request_overhead(self):
+        requests = int(os.environ.get("TRACE_BENCH_REQUESTS", "10000"))
+        spans_per_request = 20
+
+        @traced()
+        def layer(depth):
+            if depth:
+                layer(depth - 1)
+
+        def handle(tracer):
+            with tracer.trace("GET /api/learning/plan"):
+                for _ in range(spans_per_request // 4):
+                    layer(3)
+
+        def handle_plain():
+            for _ in range(spans_per_request // 4):
+                plain_layer(3)
+
+        def plain_layer(depth):
+            if depth:
+                plain_layer(depth - 1)
+
+        def per_request(run):
+            # 取 3 轮中最快的一轮，减少其他进程和 GC 的干扰
+            timings = []
+            for _ in range(3):
+                started = time.perf_counter()
+                for _ in range(requests):
+                    run()
+                timings.append((time.perf_counter() - started) / requests)
+            return min(timings)
+
+        baseline = per_request(handle_plain)
+        print(f"\n每个请求 {spans_per_request} 个 span（{requests} 次请求），相对 1k req/s（每请求 1ms）的开销:")
+        costs = {}
+        for rate in (0.0, tracing.SAMPLE_RATE, 1.0):
+            tracer = Tracer(sample_rate=rate)
+            costs[rate] = per_request(lambda: handle(tracer)) - baseline
+            print(f"  采样率 {rate:g}: {costs[rate] * 1e6:.1f} us/请求, {costs[rate] / 1e-3:.2%}")
+        assert len(tracer.recent_traces(limit=10)) == 10
+        # 默认采样率下的开销低于 1ms 请求的 2%
+        assert costs[tracing.SAMPLE_RATE] < 20e-6
@@ -0,0 +1,274 @@
+"""
+流量分发层测试
+
+用最小的 Flask 和 FastAPI 应用验证 APICompatibilityLayer 的进程内分发
+（FastAPI 直接调用，Flask 经 WSGIAdapter）、不改动全局随机数状态的稳定分流、
+每个后端的延迟直方图和影子流量比较，并测量每个请求的路由开销。
+"""
+
+import asyncio
+import os
+import random
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+flask = pytest.importorskip("flask")
+httpx = pytest.importorskip("httpx")
+
+from fastapi import FastAPI, Request
+
+from bilingual_tutor.web.api_compatibility import (
+    APICompatibilityLayer,
+    BodyDigest,
+    CompatibilityConfig,
+    DeploymentMode,
+    LatencyHistogram,
+    build_scope,
+    call_asgi,
+    traffic_bucket
+)
+
+
+def make_flask_app():
+    app = flask.Flask("flask_backend")
+
+    @app.route("/api/ping")
+    def ping():
+        return flask.jsonify({"success": True, "value": flask.request.args.get("value", "")})
+
+    @app.route("/api/echo", methods=["POST"])
+    def echo():
+        return flask.jsonify({"success": True, "backend": "flask", "data": flask.request.get_json()})
+
+    @app.route("/api/version")
+    def version():
+        return flask.jsonify({"backend": "flask"})
+
+    @app.route("/api/stream")
+    def stream():
+        return flask.Response((f"chunk{i}\n".encode() for i in range(3)), mimetype="text/plain")
+
+    return app
+
+
+def make_fastapi_app():
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping(value: str = ""):
+        return {"success": True, "value": value}
+
+    @app.post("/api/echo")
+    async def echo(request: Request):
+        return {"success": True, "backend": "fastapi", "data": await request.json()}
+
+    @app.get("/api/version")
+    async def version():
+        return {"backend": "fastapi"}
+
+    return app
+
+
+def make_layer(mode=DeploymentMode.GRADUAL, percentage=0.5, flask_app=True, fastapi_app=True, **options):
+    config = CompatibilityConfig(deployment_mode=mode, traffic_percentage=percentage,
+                                 enable_logging=False, **options)
+    return APICompatibilityLayer(config,
+                                 flask_app=make_flask_app() if flask_app else None,
+                                 fastapi_app=make_fastapi_app() if fastapi_app else None)
+
+
+async def get_all(app, paths):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return [await client.get(path) for path in paths]
+
+
+class TestStableSplit:
+    """稳定的哈希分流"""
+
+    def test_split_is_deterministic_and_leaves_global_rng_alone(self):
+        layer = make_layer(percentage=0.3)
+        random.seed(1234)
+        state = random.getstate()
+
+        endpoints = [f"/api/item/{i}" for i in range(2000)]
+        first = [layer._select_backend(endpoint, "GET") for endpoint in endpoints]
+        second = [layer._select_backend(endpoint, "GET") for endpoint in endpoints]
+
+        assert first == second
+        assert random.getstate() == state
+        assert abs(first.count("fastapi") / len(first) - 0.3) < 0.05
+
+    def test_raising_percentage_only_moves_endpoints_to_fastapi(self):
+        layer = make_layer(percentage=0.2)
+        endpoints = [f"/api/item/{i}" for i in range(500)]
+        before = {e for e in endpoints if layer._select_backend(e, "GET") == "fastapi"}
+        layer.config.traffic_percentage = 0.6
+        after = {e for e in endpoints if layer._select_backend(e, "GET") == "fastapi"}
+        assert before < after
+        assert 0 <= traffic_bucket("GET /api/item/1") < 1
+
+
+class TestDispatch:
+    """进程内 ASGI/WSGI 分发"""
+
+    def test_route_request_reaches_real_backends(self):
+        async def main():
+            fastapi_layer = make_layer(DeploymentMode.FULL)
+            flask_layer = make_layer(DeploymentMode.ROLLED_BACK)
+            return (await fastapi_layer.route_request("/api/echo", "POST", {"word": "猫"}),
+                    await flask_layer.route_request("/api/echo", "POST", {"word": "猫"}),
+                    await flask_layer.route_request("/api/ping", "GET", {"value": "x"}),
+                    await flask_layer.route_request("/missing"))
+
+        fastapi_echo, flask_echo, flask_ping, missing = asyncio.run(main())
+        assert fastapi_echo == ({"success": True, "backend": "fastapi", "data": {"word": "猫"}}, 200)
+        assert flask_echo == ({"success": True, "backend": "flask", "data": {"word": "猫"}}, 200)
+        assert flask_ping == ({"success": True, "value": "x"}, 200)
+        assert missing[1] == 404
+
+    def test_asgi_entry_splits_traffic_and_records_histograms(self):
+        layer = make_layer(percentage=0.5)
+        paths = [f"/api/version?i={i}" for i in range(5)] + ["/api/ping?value=1"]
+        expected = layer._select_backend("/api/version", "GET")
+
+        responses = asyncio.run(get_all(layer, paths))
+        assert [r.json()["backend"] for r in responses[:5]] == [expected] * 5
+
+        metrics = asyncio.run(layer.get_metrics())
+        latency = metrics["latency"]
+        assert latency["flask"]["count"] + latency["fastapi"]["count"] == 6
+        assert metrics["requests"]["total"] == 6
+        assert latency[expected]["p99_ms"] > 0
+
+    def test_wsgi_chunks_are_forwarded_as_they_arrive(self):
+        layer = make_layer(DeploymentMode.ROLLED_BACK, fastapi_app=False)
+        messages = []
+
+        async def main():
+            async def send(message):
+                messages.append(message)
+            await layer(build_scope("GET", "/api/stream"), layer._replay(b""), send)
+
+        asyncio.run(main())
+        assert messages[0]["type"] == "http.response.start" and messages[0]["status"] == 200
+        bodies = [m for m in messages[1:] if m["body"]]
+        assert [m["body"] for m in bodies] == [b"chunk0\n", b"chunk1\n", b"chunk2\n"]
+        assert all(m["more_body"] for m in bodies)
+        assert messages[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+    def test_falls_back_to_configured_backend(self):
+        layer = make_layer(DeploymentMode.ROLLED_BACK, flask_app=False)
+        response = asyncio.run(get_all(layer, ["/api/version"]))[0]
+        assert response.json() == {"backend": "fastapi"}
+
+    def test_compare_endpoint_responses(self):
+        layer = make_layer()
+
+        async def main():
+            return (await layer.compare_endpoint_responses("/api/ping", "GET", {"value": "a"}),
+                    await layer.compare_endpoint_responses("/api/version", "GET", {}))
+
+        same, different = asyncio.run(main())
+        assert same["responses_match"] is True
+        assert different["responses_match"] is False
+
+
+class TestShadowTraffic:
+    """影子流量比较"""
+
+    def test_shadow_compares_safe_methods_only(self):
+        layer = make_layer(DeploymentMode.FULL, shadow_traffic=True)
+
+        async def main():
+            transport = httpx.ASGITransport(app=layer)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                ping = await client.get("/api/ping?value=1")
+                version = await client.get("/api/version")
+                echo = await client.post("/api/echo", json={"a": 1})
+            await layer.drain_shadow_traffic()
+            return ping, version, echo
+
+        ping, version, echo = asyncio.run(main())
+        assert ping.json() == {"success": True, "value": "1"}
+        assert version.json() == {"backend": "fastapi"}
+        assert echo.json()["backend"] == "fastapi"
+
+        shadow = asyncio.run(layer.get_metrics())["shadow"]
+        assert (shadow["compared"], shadow["matched"], shadow["mismatched"]) == (2, 1, 1)
+        assert shadow["recent_mismatches"][0]["endpoint"] == "/api/version"
+        assert shadow["recent_mismatches"][0]["shadow_backend"] == "flask"
+
+
+    def test_body_digest_is_bounded(self):
+        small = BodyDigest()
+        small.update(b'{"b": 1, ')
+        small.update(b'"a": 2}')
+        reordered = BodyDigest()
+        reordered.update(b'{"a":2,"b":1}')
+        assert small.hexdigest() == reordered.hexdigest()
+
+        large = BodyDigest(limit=16)
+        for _ in range(100):
+            large.update(b"x" * 10)
+        assert large.size == 1000 and large._chunks is None
+        raw = BodyDigest(limit=16)
+        raw.update(b"x" * 1000)
+        assert large.hexdigest() == raw.hexdigest()
+
+
+class TestLatencyHistogram:
+    """流式延迟直方图"""
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.observe(value / 10)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 1000
+        assert abs(snapshot["avg_ms"] - 50.05) < 0.01
+        assert 25 <= snapshot["p50_ms"] <= 100
+        assert 50 <= snapshot["p99_ms"] <= 100
+        assert snapshot["max_ms"] == 100
+        assert sum(snapshot["buckets"].values()) == 1000
+
+
+class TestRoutingBenchmark:
+    """每个请求的路由开销"""
+
+    def test_routing_overhead(self):
+        rounds = int(os.environ.get("TRAFFIC_SPLIT_BENCH_ROUNDS", "2000"))
+        layer = make_layer(DeploymentMode.GRADUAL, percentage=1.0)
+        fastapi_app = layer.fastapi_app
+
+        async def measure(app):
+            scope = build_scope("GET", "/api/version")
+            for _ in range(50):
+                await call_asgi(app, scope)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                await call_asgi(app, scope)
+            return (time.perf_counter() - started) / rounds
+
+        direct = asyncio.run(measure(fastapi_app))
+        routed = asyncio.run(measure(layer))
+
+        started = time.perf_counter()
+        for i in range(rounds):
+            random.seed(f"/api/item/{i}GET")
+            random.random()
+        seeded = (time.perf_counter() - started) / rounds
+        started = time.perf_counter()
+        for i in range(rounds):
+            layer._select_backend(f"/api/item/{i}", "GET")
+        hashed = (time.perf_counter() - started) / rounds
+
+        print(f"\n直接调用 FastAPI: {direct * 1e6:.0f} µs/请求, 经兼容性层: {routed * 1e6:.0f} µs/请求, "
+              f"路由开销 {(routed - direct) * 1e6:.1f} µs")
+        print(f"后端选择: random.seed {seeded * 1e6:.2f} µs, crc32 哈希 {hashed * 1e6:.2f} µs")
+
+        assert layer.metrics.fastapi_requests == rounds + 50
+        assert hashed < seeded
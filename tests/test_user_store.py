@@ -0,0 +1,321 @@
+"""
+用户仓库与服务端会话测试
+
+验证用户、学习档案和会话保存在共享数据库中（不再是进程内字典）：
+仓库的读穿缓存与失效、旧数据库的表结构升级、两个 Flask 应用共享登录状态，
+并用多个独立 worker 进程做负载测试，比较服务端会话与签名 Cookie 会话在请求
+落到其他 worker 时的表现。
+"""
+
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.cookies import SimpleCookie
+
+import pytest
+
+from bilingual_tutor.models import ContentType, Goals, Preferences, Skill, UserProfile, WeakArea
+from bilingual_tutor.storage import database
+from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.storage.user_repository import UNUSABLE_PASSWORD, UserRepository
+from bilingual_tutor.web.routes.auth import user_repository
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "Str0ngPassw0rd"
+
+
+def make_profile(user_id):
+    return UserProfile(
+        user_id=user_id,
+        english_level="CET-5",
+        japanese_level="N3",
+        daily_study_time=75,
+        target_goals=Goals("CET-6", "N1", datetime(2028, 1, 1), [Skill.READING], ["通过N1"]),
+        learning_preferences=Preferences(["晚上"], [ContentType.NEWS, ContentType.ARTICLE], "适中",
+                                         {"english": 0.7, "japanese": 0.3}),
+        weak_areas=[WeakArea("w1", Skill.GRAMMAR, "japanese", 0.4, ["は/が"], ["多做练习"],
+                             datetime(2026, 1, 1))],
+        created_at=datetime(2026, 1, 1),
+        updated_at=datetime(2026, 1, 2)
+    )
+
+
+@pytest.fixture
+def db(tmp_path):
+    learning_db = LearningDatabase(str(tmp_path / "learning.db"))
+    yield learning_db
+    learning_db.close()
+
+
+@pytest.fixture
+def bound_repository(db):
+    """把路由使用的全局仓库绑定到临时数据库"""
+    previous = user_repository._database
+    user_repository.bind(db)
+    yield user_repository
+    user_repository.bind(previous)
+
+
+class TestUserRepository:
+    """用户仓库"""
+
+    def test_users_are_shared_between_repositories(self, db):
+        worker_a = UserRepository(db, cache_ttl=60)
+        worker_b = UserRepository(db, cache_ttl=60)
+
+        assert worker_b.get_user("alice") is None
+        assert worker_a.create_user("alice", "hash", salt="salt", daily_study_time=45)
+        assert not worker_b.create_user("alice", "other")
+
+        # 不缓存“不存在”：另一个 worker 刚注册的用户立即可见
+        record = worker_b.users["alice"]
+        assert (record["password_hash"], record["salt"], record["daily_time"]) == ("hash", "salt", 45)
+
+        worker_a.update_user("alice", password_hash="new")
+        assert worker_a.users["alice"]["password_hash"] == "new"
+        assert worker_b.users["alice"]["password_hash"] == "hash"  # 缓存有效期内
+        worker_b.invalidate("alice")
+        assert worker_b.users["alice"]["password_hash"] == "new"
+        assert worker_b.get_cache_stats()["hits"] >= 1
+
+        with pytest.raises(ValueError):
+            worker_a.update_user("alice", is_admin=True)
+
+    def test_profiles_round_trip(self, db):
+        worker_a = UserRepository(db)
+        worker_a.create_user("bob", "hash")
+        sample = make_profile("bob")
+        worker_a.profiles["bob"] = sample
+
+        loaded = UserRepository(db).profiles["bob"]
+        assert loaded.learning_preferences == sample.learning_preferences
+        assert loaded.target_goals == sample.target_goals
+        assert loaded.english_level == sample.english_level
+        assert loaded.weak_areas == sample.weak_areas
+        assert list(UserRepository(db).profiles) == ["bob"]
+
+        # 没有注册的用户只保存档案，不能登录
+        worker_a.profiles["carol"] = make_profile("carol")
+        assert worker_a.get_user("carol")["password_hash"] == UNUSABLE_PASSWORD
+        assert worker_a.list_usernames(registered_only=True) == ["bob"]
+
+        worker_a.profiles.clear()
+        assert "bob" in worker_a.users and "carol" not in worker_a.users
+        assert len(worker_a.profiles) == 0
+
+    def test_old_schema_gets_auth_columns(self, tmp_path):
+        path = str(tmp_path / "learning.db")
+        with LearningDatabase(path) as db:
+            with db._pool.get_connection() as conn:
+                for column in ("salt", "last_login", "password_changed_at"):
+                    conn.execute(f"ALTER TABLE users DROP COLUMN {column}")
+                conn.execute("DROP TABLE web_sessions")
+                conn.execute("PRAGMA user_version = 1")
+                conn.commit()
+
+        with LearningDatabase(path) as db:
+            with db._pool.get_connection() as conn:
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+            assert {"salt", "last_login", "password_changed_at"} <= columns
+            assert version == database.SCHEMA_VERSION
+            assert UserRepository(db).sessions.count_active() == 0
+
+
+def make_app(secret_key: str):
+    from bilingual_tutor.web.app import create_app
+    app = create_app()
+    app.config.update(TESTING=True, SECRET_KEY=secret_key)
+    return app
+
+
+def register(client, username):
+    return client.post("/api/auth/register", json={"username": username, "password": PASSWORD})
+
+
+class TestServerSideSessions:
+    """服务端会话"""
+
+    def test_session_is_shared_between_apps(self, bound_repository):
+        client_a = make_app("key-a").test_client()
+        client_b = make_app("key-b").test_client()
+
+        assert register(client_a, "dave").status_code == 200
+        response = client_a.post("/api/auth/login", json={"username": "dave", "password": PASSWORD})
+        assert response.status_code == 200
+        sid = client_a.get_cookie("session").value
+        assert bound_repository.sessions.count_active("dave") == 1  # 登录更换了会话 ID
+
+        client_b.set_cookie("session", sid)
+        status = client_b.get("/api/auth/status").get_json()
+        assert status["authenticated"] and status["user_id"] == "dave"
+        assert client_b.get("/api/user/profile").status_code == 200
+        assert bound_repository.get_user("dave")["last_login"]
+
+        assert client_b.post("/api/auth/logout").status_code == 200
+        assert client_a.get("/api/auth/status").get_json() == {"authenticated": False}
+        assert bound_repository.sessions.count_active() == 0
+
+    def test_profile_update_is_persisted(self, bound_repository):
+        client = make_app("key").test_client()
+        register(client, "erin")
+        response = client.put("/api/user/profile", json={"english_level": "CET-6", "daily_time": 90})
+        assert response.status_code == 200
+
+        stored = UserRepository(bound_repository.database).profiles["erin"]
+        assert (stored.english_level, stored.daily_study_time) == ("CET-6", 90)
+
+    def test_password_change_signs_out_other_sessions(self, bound_repository):
+        client_a = make_app("key").test_client()
+        client_b = make_app("key").test_client()
+        register(client_a, "frank")
+        client_b.post("/api/auth/login", json={"username": "frank", "password": PASSWORD})
+        assert bound_repository.sessions.count_active("frank") == 2
+
+        response = client_a.post("/api/auth/change-password",
+                                  json={"current_password": PASSWORD, "new_password": "N3wPassw0rd"})
+        assert response.status_code == 200
+        assert client_a.get("/api/auth/status").get_json()["authenticated"]
+        assert client_b.get("/api/auth/status").get_json() == {"authenticated": False}
+
+
+    def test_expired_sessions_are_purged_periodically(self, bound_repository):
+        def stored_sessions():
+            with bound_repository.database._pool.get_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM web_sessions").fetchone()[0]
+
+        for i in range(5):
+            bound_repository.sessions.save(f"stale-{i}", {"user_id": "ghost"}, -1, user_id="ghost")
+        app = make_app("key")
+        app.session_interface.purge_every = 3
+
+        # 每次注册保存一次新会话
+        register(app.test_client(), "gina")
+        register(app.test_client(), "hank")
+        assert stored_sessions() == 7
+        register(app.test_client(), "iris")  # 第三次保存时清理过期会话
+        assert stored_sessions() == bound_repository.sessions.count_active() == 3
+
+
+WORKER_SCRIPT = """
+import sys
+from werkzeug.serving import make_server
+from bilingual_tutor.storage.database import LearningDatabase
+from bilingual_tutor.web.routes.auth import user_repository
+user_repository.bind(LearningDatabase(sys.argv[1]))
+from bilingual_tutor.web.app import create_app
+server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def start_workers(count, db_path, session_backend):
+    env = dict(os.environ, SESSION_BACKEND=session_backend, BILINGUAL_TUTOR_USER_CACHE_TTL="0.2")
+    workers = [subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, db_path], cwd=PROJECT_ROOT, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+               for _ in range(count)]
+    return workers, [int(worker.stdout.readline()) for worker in workers]
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = {"Content-Type": "application/json"}
+    if cookie:
+        headers["Cookie"] = f"session={cookie}"
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    payload = response.read()
+    cookies = SimpleCookie(response.getheader("Set-Cookie") or "")
+    conn.close()
+    new_cookie = cookies["session"].value if "session" in cookies else None
+    return response.status, json.loads(payload or b"{}"), new_cookie
+
+
+class TestMultiWorkerLoad:
+    """多 worker 进程负载测试"""
+
+    def run_load(self, db_path, session_backend, worker_count, user_count, request_count):
+        workers, ports = start_workers(worker_count, db_path, session_backend)
+        try:
+            cookies = {}
+            for i in range(user_count):
+                username = f"{session_backend}_student_{i}"
+                # 在一个 worker 注册，在另一个 worker 登录
+                request(ports[i % worker_count], "POST", "/api/auth/register",
+                        {"username": username, "password": PASSWORD})
+                status, _, cookie = request(ports[(i + 1) % worker_count], "POST", "/api/auth/login",
+                                            {"username": username, "password": PASSWORD})
+                assert status == 200
+                cookies[username] = cookie
+
+            results = []
+            lock = threading.Lock()
+            usernames = list(cookies)
+
+            def client(offset):
+                for n in range(offset, request_count, 8):
+                    username = usernames[n % len(usernames)]
+                    started = time.perf_counter()
+                    status, payload, _ = request(ports[n % worker_count], "GET", "/api/user/profile",
+                                                 cookie=cookies[username])
+                    ok = status == 200 and payload["profile"]["user_id"] == username
+                    with lock:
+                        results.append((ok, time.perf_counter() - started))
+
+            started = time.perf_counter()
+            threads = [threading.Thread(target=client, args=(offset,)) for offset in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            # 一个 worker 更新档案，其他 worker 在缓存有效期后读到新值
+            consistent = None
+            if session_backend == "server":
+                username = usernames[0]
+                status, _, _ = request(ports[0], "PUT", "/api/user/profile", {"daily_time": 120},
+                                       cookie=cookies[username])
+                assert status == 200
+                time.sleep(0.3)
+                consistent = all(
+                    request(port, "GET", "/api/user/profile", cookie=cookies[username])[1]
+                    ["profile"]["daily_study_time"] == 120
+                    for port in ports)
+            return results, elapsed, consistent
+        finally:
+            for worker in workers:
+                worker.kill()
+                worker.wait()
+
+    def test_requests_survive_worker_hops(self, tmp_path):
+        worker_count = int(os.environ.get("USER_STORE_WORKERS", "3"))
+        user_count = int(os.environ.get("USER_STORE_USERS", "6"))
+        request_count = int(os.environ.get("USER_STORE_REQUESTS", "240"))
+        db_path = str(tmp_path / "learning.db")
+        LearningDatabase(db_path).close()
+
+        print(f"\n{worker_count} 个 worker 进程, {user_count} 个用户, {request_count} 个请求（轮询 worker）:")
+        outcomes = {}
+        for backend in ("cookie", "server"):
+            results, elapsed, consistent = self.run_load(db_path, backend, worker_count, user_count,
+                                                         request_count)
+            ok = sum(1 for success, _ in results if success)
+            latencies = sorted(latency for _, latency in results)
+            outcomes[backend] = ok / len(results)
+            label = "签名 Cookie 会话（各进程 SECRET_KEY 不同）" if backend == "cookie" else "服务端会话"
+            print(f"  {label}: 成功 {ok}/{len(results)}, {len(results) / elapsed:.0f} req/s, "
+                  f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f} ms"
+                  + (f", 跨 worker 档案一致: {consistent}" if consistent is not None else ""))
+            if consistent is not None:
+                assert consistent
+
+        assert outcomes["server"] == 1.0
+        assert outcomes["cookie"] < 1.0